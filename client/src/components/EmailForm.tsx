@@ -17,11 +17,11 @@ export const EmailForm: React.FC<EmailFormProps> = ({ onResult, onError }) => {
     
     if (!selectedFile) return;
 
-    const validExtensions = ['.txt', '.pdf'];
+    const validExtensions = ['.txt', '.pdf', '.eml'];
     const fileExtension = selectedFile.name.toLowerCase().match(/\.[^.]+$/)?.[0];
     
     if (!fileExtension || !validExtensions.includes(fileExtension)) {
-      onError('Apenas arquivos .txt ou .pdf são aceitos');
+      onError('Apenas arquivos .txt, .pdf ou .eml são aceitos');
       return;
     }
 
@@ -86,13 +86,13 @@ export const EmailForm: React.FC<EmailFormProps> = ({ onResult, onError }) => {
       {/* File Upload */}
       <div>
         <label className="block text-sm font-medium text-gray-700 mb-2">
-          Upload de arquivo (.txt ou .pdf)
+          Upload de arquivo (.txt, .pdf ou .eml)
         </label>
         <div className="flex items-center gap-4">
           <input
             ref={fileInputRef}
             type="file"
-            accept=".txt,.pdf"
+            accept=".txt,.pdf,.eml"
             onChange={handleFileChange}
             disabled={isProcessing}
             className="block w-full text-sm text-gray-500
@@ -0,0 +1,64 @@
+"""
+Export API endpoints - Exportação em lote das análises de um período
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Iterator, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.services.export import FORMATS, stream_export
+from app.utils.database import get_database
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+def to_db_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Datetime da query no formato de created_at (UTC, 'YYYY-MM-DD HH:MM:SS')"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _logged(chunks: Iterator[bytes], fmt: str) -> Iterator[bytes]:
+    # Depois do primeiro byte o status já foi enviado: erros só podem ser logados
+    sent = 0
+    try:
+        for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+    except Exception as e:
+        logger.error(f"Exportação interrompida após {sent} bytes: {str(e)}")
+        raise
+    logger.info(f"Exportação {fmt} concluída ({sent} bytes)")
+
+
+@router.get("/export")
+async def export_analyses(
+    start: Optional[datetime] = Query(None, description="created_at inicial, inclusivo (ISO 8601, UTC)"),
+    end: Optional[datetime] = Query(None, description="created_at final, exclusivo (ISO 8601, UTC)"),
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    gzip: bool = Query(False, description="Entrega um arquivo .gz")
+):
+    """
+    Análises do período em ordem de created_at, em streaming
+
+    Linhas saem do banco em lotes direto para a resposta: a memória usada não
+    depende do tamanho do período.
+    """
+    start_ts, end_ts = to_db_timestamp(start), to_db_timestamp(end)
+    if start_ts and end_ts and start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="start deve ser anterior a end")
+
+    filename = f"analyses.{format}" + (".gz" if gzip else "")
+    # Gerador síncrono: o Starlette consome em threadpool (não bloqueia o loop)
+    analyses = get_database().iter_analyses(start_ts, end_ts)
+    return StreamingResponse(
+        _logged(stream_export(analyses, format, gzip=gzip), format),
+        media_type="application/gzip" if gzip else FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,123 +1,286 @@
 """
 Process API endpoints - Endpoint principal para processar emails
 """
-import uuid
+import asyncio
 import logging
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from typing import Optional
-from datetime import datetime
+import math
+import time
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from typing import AsyncIterator, List, Optional, Tuple
 
+from app.core.admission import AdmissionController, AdmissionRejected
 from app.models.schemas import ProcessTextRequest, ProcessResponse, FeedbackRequest, StatusResponse
+from app.services.circuit_breaker import CircuitOpenError
 from app.services.parsing import extract_text_from_file
-from app.services.nlp import clean_text, extract_summary
-from app.services.ai_client import get_ai_client
-from app.utils.database import get_database
+from app.services.reply_pool import get_reply_pool
+from app.services.pipeline import MIN_TEXT_LENGTH, analyze_email, elapsed_ms
+from app.services.singleflight import SingleFlight
+from app.services.status_cache import IMMUTABLE_CACHE_CONTROL, etag_matches, get_status_cache
+from app.utils.database import compute_text_hash, get_database
+from app.core.metrics import counter
 from app.core.settings import get_settings
+from app.core.tracing import span
+from app.utils.uploads import read_body, read_upload
+from app.utils.wire import (
+    JSON, MSGPACK, NDJSON, accepted_type, decode, encode, encoded_response, media_type_of
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Requisições em andamento por Idempotency-Key
+_inflight_keys = SingleFlight("idempotency_key")
+
+idempotent_replays = counter(
+    "idempotent_replays_total",
+    "Retentativas com Idempotency-Key respondidas sem reprocessar (stored ou inflight)"
+)
+_batch_adapter = TypeAdapter(List[ProcessTextRequest])
+
+status_not_modified = counter(
+    "status_not_modified_total",
+    "Consultas de /api/status respondidas com 304 (If-None-Match com o ETag atual)"
+)
+
 
 @router.post("/process", response_model=ProcessResponse)
 async def process_email(
+    request: Request,
     file: Optional[UploadFile] = File(None),
-    text: Optional[str] = Form(None)
+    text: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
 ):
     """
     Processa email (arquivo ou texto) e retorna classificação + resposta sugerida
     
     Fluxo:
-    1. Extrai texto (de arquivo ou campo text)
-    2. Preprocessa
-    3. Classifica usando LLM (ou fallback baseline)
-    4. Gera resposta sugerida
-    5. Salva no banco
-    6. Retorna resultado
-    """
-    settings = get_settings()
+    1. Extrai texto (de arquivo .txt/.pdf/.eml, campo text do form ou corpo
+       JSON/msgpack {"text": ...})
+    2. Preprocessa, classifica, gera resposta e salva (services/pipeline.py)
+    3. Retorna resultado em JSON ou msgpack, conforme o Accept
     
+    Com o cabeçalho Idempotency-Key, retentativas do cliente (em andamento ou
+    dentro de IDEMPOTENCY_TTL_HOURS) recebem a mesma análise, sem novo
+    processamento. A mesma chave com outro texto ou arquivo recebe 422.
+    """
+    media_type = accepted_type(request.headers.get("accept"))
     if not file and not text:
+        text = await _read_text_body(request)
+    
+    response = await _process_idempotent(file, text, idempotency_key)
+    return encoded_response(response.model_dump(mode="json"), media_type)
+
+
+async def _read_text_body(request: Request) -> str:
+    """Texto de um corpo JSON ou msgpack no formato de ProcessTextRequest"""
+    media_type = media_type_of(request.headers.get("content-type"))
+    if media_type not in (JSON, MSGPACK):
         raise HTTPException(status_code=400, detail="Envie um arquivo ou texto")
+    payload = decode(await read_body(request, get_settings().MAX_UPLOAD_SIZE), media_type)
+    try:
+        return ProcessTextRequest.model_validate(payload).text
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+
+async def _process_idempotent(
+    file: Optional[UploadFile],
+    text: Optional[str],
+    idempotency_key: Optional[str]
+) -> ProcessResponse:
+    settings = get_settings()
+    
+    if not idempotency_key:
+        return await _process(file, text)
+    
+    # Fingerprint da requisição: a chave só vale para o mesmo texto/arquivo
+    upload = await _read_file(file) if file else None
+    fingerprint = upload[1] if upload else compute_text_hash(text)
     
+    db = get_database()
+    remembered = await asyncio.to_thread(db.get_idempotency_key, idempotency_key, settings.IDEMPOTENCY_TTL_HOURS)
+    if remembered:
+        _check_fingerprint(remembered["fingerprint"], fingerprint)
+        stored = await asyncio.to_thread(db.get_analysis, remembered["analysis_id"])
+        if stored:
+            idempotent_replays.inc(source="stored")
+            return stored.to_response()
+    
+    async def process_and_remember():
+        response = await _process(file, text, upload)
+        await asyncio.to_thread(
+            db.save_idempotency_key, idempotency_key, response.id, settings.IDEMPOTENCY_TTL_HOURS, fingerprint
+        )
+        return fingerprint, response
+    
+    (leader_fingerprint, response), shared = await _inflight_keys.do(idempotency_key, process_and_remember)
+    if shared:
+        _check_fingerprint(leader_fingerprint, fingerprint)
+        idempotent_replays.inc(source="inflight")
+    return response
+
+
+def _check_fingerprint(expected: Optional[str], fingerprint: str):
+    """
+    Raises:
+        HTTPException: 422 se a Idempotency-Key já foi usada com outro corpo
+    """
+    # Chaves gravadas antes do fingerprint (None) continuam valendo
+    if expected is not None and expected != fingerprint:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key já usada com outro texto ou arquivo"
+        )
+
+
+async def _read_file(file: UploadFile) -> Tuple[memoryview, str]:
+    """Conteúdo do upload e seu SHA-256"""
+    with span("upload.read", filename=file.filename) as active:
+        file_bytes, file_hash = await read_upload(file, get_settings().MAX_UPLOAD_SIZE)
+        if active is not None:
+            active.set_attribute("size_bytes", len(file_bytes))
+    return file_bytes, file_hash
+
+
+async def _process(file: Optional[UploadFile], text: Optional[str],
+                   upload: Optional[Tuple[memoryview, str]] = None) -> ProcessResponse:
     try:
+        metadata = {}
+        # Texto colado e .eml são emails; PDF e .txt são documentos (sem remoção de histórico)
+        is_email = not file or file.filename.lower().endswith(".eml")
         if file:
-            file_bytes = await file.read()
-            if len(file_bytes) > settings.MAX_UPLOAD_SIZE:
-                raise HTTPException(status_code=413, detail="Arquivo muito grande (máx 1MB)")
+            file_bytes, file_hash = upload or await _read_file(file)
+            metadata["upload_sha256"] = file_hash
             
-            extracted_text = extract_text_from_file(file_bytes, file.filename)
+            started = time.perf_counter()
+            with span("parse"):
+                extracted_text = extract_text_from_file(file_bytes, file.filename)
+            metadata["timings"] = {"extract_ms": elapsed_ms(started)}
         else:
             extracted_text = text
         
-        if len(extracted_text) < 10:
+        if len(extracted_text) < MIN_TEXT_LENGTH:
             raise HTTPException(status_code=400, detail="Texto muito curto")
         
-        clean = clean_text(extracted_text, remove_stopwords=False)
-        summary = extract_summary(extracted_text)
-        
-        ai_client = get_ai_client()
-        classification = await ai_client.classify_email(clean)
-        model_used = f"{settings.LLM_MODEL}"
-        
-        logger.info(f"Classificação: {classification['category']} ({classification['confidence']*100:.0f}%)")
-        
-        reply_result = await ai_client.generate_reply(
-            category=classification["category"],
-            summary=summary,
-            original_text=extracted_text
-        )
-        suggested_reply = reply_result["reply"]
-        
-        analysis_id = str(uuid.uuid4())
-        db = get_database()
-        
-        analysis_data = {
-            "id": analysis_id,
-            "category": classification["category"],
-            "confidence": classification["confidence"],
-            "suggested_reply": suggested_reply,
-            "summary": summary,
-            "model_used": model_used,
-            "reason": classification.get("reason"),
-            "full_text": extracted_text
-        }
-        
-        db.save_analysis(analysis_data)
-        
-        return ProcessResponse(
-            id=analysis_id,
-            category=classification["category"],
-            confidence=classification["confidence"],
-            suggested_reply=suggested_reply,
-            summary=summary,
-            model_used=model_used,
-            timestamp=datetime.now(datetime.UTC if hasattr(datetime, 'UTC') else None),
-            reason=classification.get("reason")
-        )
+        return await analyze_email(extracted_text, metadata, is_email)
         
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="Serviço de IA temporariamente indisponível. Tente novamente em instantes.",
+            headers={"Retry-After": str(max(math.ceil(e.retry_after), 1))}
+        )
     except Exception as e:
         logger.error(f"Erro ao processar email: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Erro ao processar: {str(e)}")
 
 
+@router.post("/process/batch")
+async def process_batch(request: Request):
+    """
+    Processa vários textos em uma requisição
+    
+    Corpo: lista de {"text": ...} em JSON, msgpack ou NDJSON (uma por linha),
+    até BATCH_API_MAX_ITEMS. Os textos são processados em paralelo (até
+    BATCH_API_CONCURRENCY) e a resposta sai em streaming, na ordem da
+    entrada, um item por texto: {"index", ...ProcessResponse} ou
+    {"index", "error"}. Formato pelo Accept: NDJSON (padrão), msgpack
+    (objetos concatenados) ou JSON (lista). Com controle de admissão,
+    cada item ocupa uma vaga; item recusado vira {"index", "error"}.
+    """
+    settings = get_settings()
+    media_type = accepted_type(request.headers.get("accept"), offered=(NDJSON, MSGPACK, JSON))
+    
+    body = await read_body(request, settings.BATCH_API_MAX_ITEMS * settings.BATCH_API_MAX_ITEM_BYTES)
+    payload = decode(body, media_type_of(request.headers.get("content-type")))
+    try:
+        items = _batch_adapter.validate_python(payload)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    if not items:
+        raise HTTPException(status_code=400, detail="Lote vazio")
+    if len(items) > settings.BATCH_API_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote com {len(items)} textos (máx {settings.BATCH_API_MAX_ITEMS})"
+        )
+    
+    return StreamingResponse(
+        _iter_batch([item.text for item in items], media_type, settings.BATCH_API_CONCURRENCY,
+                    getattr(request.state, "admission", None)),
+        media_type=media_type,
+        headers={"Vary": "Accept"}
+    )
+
+
+async def _iter_batch(texts: List[str], media_type: str, concurrency: int,
+                      admission: Optional[AdmissionController] = None) -> AsyncIterator[bytes]:
+    slots = asyncio.Semaphore(concurrency)
+    
+    async def process_one(text: str) -> ProcessResponse:
+        async with slots:
+            if admission is None:
+                return await _process(None, text)
+            try:
+                await admission.acquire()
+            except AdmissionRejected as rejected:
+                raise HTTPException(status_code=rejected.status, detail=rejected.detail)
+            try:
+                return await _process(None, text)
+            finally:
+                admission.release()
+    
+    tasks = [asyncio.ensure_future(process_one(text)) for text in texts]
+    try:
+        if media_type == JSON:
+            yield b"["
+        for index, task in enumerate(tasks):
+            try:
+                item = {"index": index, **(await task).model_dump(mode="json")}
+            except HTTPException as e:
+                item = {"index": index, "error": e.detail}
+            if media_type == JSON:
+                yield (b"," if index else b"") + encode(item, JSON)
+            else:
+                yield encode(item, media_type)
+        if media_type == JSON:
+            yield b"]"
+    finally:
+        # Cliente desconectou no meio do lote: não processa o resto
+        for task in tasks:
+            task.cancel()
+
+
 @router.post("/feedback")
 async def submit_feedback(feedback: FeedbackRequest):
     """Recebe feedback do usuário sobre a análise"""
     try:
         db = get_database()
         
-        analysis = db.get_analysis(feedback.analysis_id)
+        analysis = await asyncio.to_thread(db.get_analysis, feedback.analysis_id)
         if not analysis:
             raise HTTPException(status_code=404, detail="Análise não encontrada")
         
         feedback_data = feedback.model_dump()
-        success = db.save_feedback(feedback_data)
+        success = await asyncio.to_thread(db.save_feedback, feedback_data)
         
         if not success:
             raise HTTPException(status_code=500, detail="Erro ao salvar feedback")
         
+        if feedback.edited_reply:
+            get_reply_pool().learn(
+                analysis.summary,
+                feedback.user_category or analysis.category,
+                feedback.edited_reply,
+                feedback.rating
+            )
+        
         return {"status": "success", "message": "Feedback recebido"}
         
     except HTTPException:
@@ -128,29 +291,42 @@ async def submit_feedback(feedback: FeedbackRequest):
 
 
 @router.get("/status/{analysis_id}", response_model=StatusResponse)
-async def get_status(analysis_id: str):
-    """Retorna status de uma análise"""
-    try:
-        db = get_database()
-        analysis = db.get_analysis(analysis_id)
-        
-        if not analysis:
+async def get_status(
+    analysis_id: str,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
+):
+    """
+    Retorna status de uma análise
+    
+    Análises concluídas não mudam: a resposta sai do cache em memória (sem
+    abrir o banco) com ETag forte e Cache-Control immutable; If-None-Match
+    com o mesmo ETag recebe 304 sem corpo.
+    """
+    cache = get_status_cache()
+    entry = cache.get(analysis_id)
+    
+    if entry is None:
+        try:
+            db = get_database()
+            analysis = await asyncio.to_thread(db.get_analysis, analysis_id)
+            
+            if not analysis:
+                return StatusResponse(
+                    id=analysis_id,
+                    status="not_found"
+                )
+            
+            entry = cache.put(analysis)
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar status: {str(e)}")
             return StatusResponse(
                 id=analysis_id,
-                status="not_found"
+                status="failed"
             )
-        
-        return StatusResponse(
-            id=analysis_id,
-            status="completed",
-            category=analysis["category"],
-            confidence=analysis["confidence"],
-            created_at=datetime.fromisoformat(analysis["created_at"])
-        )
-        
-    except Exception as e:
-        logger.error(f"Erro ao buscar status: {str(e)}")
-        return StatusResponse(
-            id=analysis_id,
-            status="failed"
-        )
+    
+    headers = {"ETag": entry.etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if etag_matches(if_none_match, entry.etag):
+        status_not_modified.inc()
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
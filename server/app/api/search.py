@@ -0,0 +1,38 @@
+"""
+Search API endpoints - Busca textual nas análises (resumo, motivo e resposta)
+"""
+import asyncio
+import logging
+from fastapi import APIRouter, HTTPException, Query
+
+from app.models.schemas import SearchResponse
+from app.utils.database import get_database
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_analyses(
+    q: str = Query(..., min_length=1, max_length=200, description="Palavras buscadas (\"palavra*\" = prefixo)"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10_000)
+):
+    """Análises mais relevantes para a busca, paginadas, com trecho destacado"""
+    if not any(char.isalnum() for char in q):
+        raise HTTPException(status_code=400, detail="A busca precisa ter ao menos uma palavra")
+
+    try:
+        # Uma linha a mais indica se existe próxima página
+        results = await asyncio.to_thread(get_database().search_analyses, q, limit=limit + 1, offset=offset)
+    except Exception as e:
+        logger.error(f"Erro na busca: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro interno")
+
+    return SearchResponse(
+        query=q,
+        limit=limit,
+        offset=offset,
+        has_more=len(results) > limit,
+        results=results[:limit]
+    )
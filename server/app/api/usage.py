@@ -0,0 +1,36 @@
+"""
+Usage API endpoints - Consumo de tokens e latência das chamadas ao LLM
+"""
+import asyncio
+import logging
+from fastapi import APIRouter, HTTPException, Query
+
+from app.models.schemas import UsageResponse
+from app.utils.database import get_database
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+TOTAL_FIELDS = ("calls", "prompt_tokens", "completion_tokens", "cached_tokens")
+
+
+@router.get("/usage", response_model=UsageResponse)
+async def get_usage(
+    days: int = Query(30, ge=1, le=365, description="Período (dias até hoje)"),
+    top: int = Query(10, ge=0, le=100, description="Quantas análises mais caras listar")
+):
+    """Tokens e latência por dia, modelo e etapa (classify/reply), e as análises mais caras"""
+    try:
+        db = get_database()
+        by_day = await asyncio.to_thread(db.usage_by_day, days)
+        top_analyses = await asyncio.to_thread(db.top_usage, days, top) if top else []
+    except Exception as e:
+        logger.error(f"Erro ao agregar uso: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro interno")
+
+    return UsageResponse(
+        days=days,
+        totals={field: sum(row[field] for row in by_day) for field in TOTAL_FIELDS},
+        by_day=by_day,
+        top_analyses=top_analyses
+    )
@@ -0,0 +1,91 @@
+"""
+Batch classification CLI - Backfill offline sem passar pela API HTTP
+
+Uso (a partir de server/):
+    python -m app.cli.classify emails/                  # diretório com .txt/.pdf/.eml
+    python -m app.cli.classify emails.jsonl -o out.jsonl
+    python -m app.cli.classify caixa.mbox --concurrency 16
+    python -m app.cli.classify caixa.mbox --dry-run     # modelo local, sem gravar no banco
+
+Interrompido, basta rodar o mesmo comando: itens já gravados estão no
+checkpoint (<entrada>.checkpoint por padrão) e não são reclassificados.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+from app.services.ai_client import LocalAIClient, get_ai_client
+from app.services.batch import BatchRunner, Checkpoint, Progress, count_source, open_source
+from app.utils.database import get_database
+
+logger = logging.getLogger(__name__)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Classificação offline em lote")
+    parser.add_argument("input", type=Path, help="Diretório, arquivo .jsonl ou .mbox")
+    parser.add_argument("-o", "--output", type=Path, help="Grava resultados também em JSONL")
+    parser.add_argument("--no-db", action="store_true", help="Não grava no banco")
+    parser.add_argument("--checkpoint", type=Path, help="Arquivo de checkpoint (padrão: <entrada>.checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Chamadas LLM simultâneas")
+    parser.add_argument("--extract-workers", type=int, default=2, help="Threads de extração/limpeza")
+    parser.add_argument("--queue-size", type=int, default=64, help="Capacidade de cada fila do pipeline")
+    parser.add_argument("--batch-size", type=int, default=100, help="Análises por gravação")
+    parser.add_argument("--no-count", action="store_true", help="Não conta a entrada (sem ETA)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Usa o modelo local por palavras-chave, sem banco nem checkpoint")
+    parser.add_argument("--mock-latency", type=float, default=0.0,
+                        help="Latência simulada por chamada no dry-run (segundos)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    try:
+        items = open_source(args.input)
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+
+    if args.dry_run:
+        ai_client = LocalAIClient(latency=args.mock_latency)
+        db = None
+        checkpoint = None
+    else:
+        ai_client = get_ai_client()
+        db = None if args.no_db else get_database()
+        checkpoint = Checkpoint(args.checkpoint or args.input.with_name(args.input.name + ".checkpoint"))
+
+    total = None if args.no_count else count_source(args.input)
+    output = open(args.output, "a", encoding="utf-8") if args.output else None
+
+    runner = BatchRunner(
+        ai_client,
+        db=db,
+        output=output,
+        checkpoint=checkpoint,
+        concurrency=args.concurrency,
+        extract_workers=args.extract_workers,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+        progress=Progress(total)
+    )
+    try:
+        stats = asyncio.run(runner.run(items))
+    except KeyboardInterrupt:
+        print("Interrompido; execute novamente para continuar do checkpoint", file=sys.stderr)
+        return 130
+    finally:
+        if output:
+            output.close()
+
+    print(f"Concluído: {stats}", file=sys.stderr)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+IMAP CLI - Classifica as mensagens novas de caixas IMAP
+
+Uso (a partir de server/):
+    python -m app.cli.imap               # ciclos a cada IMAP_POLL_INTERVAL segundos
+    python -m app.cli.imap --once        # um ciclo (ex.: cron)
+    python -m app.cli.imap --interval 2
+
+A posição de cada pasta (UIDVALIDITY e último UID) fica no banco: reiniciar
+o processo continua de onde parou, sem reclassificar nem varrer a pasta.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.core.settings import get_settings
+from app.services.mailbox import build_mailbox_poller
+from app.utils.database import get_database
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Ingestão incremental de caixas IMAP")
+    parser.add_argument("--once", action="store_true", help="Executa um ciclo e sai")
+    parser.add_argument("--interval", type=float, default=settings.IMAP_POLL_INTERVAL,
+                        help="Intervalo entre ciclos (segundos)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    try:
+        poller = build_mailbox_poller(settings, get_database())
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+
+    async def run():
+        if args.once:
+            try:
+                totals = await poller.poll_once()
+            finally:
+                await asyncio.to_thread(poller.connection.close)
+            logger.info(
+                f"IMAP: {totals['classified']} classificadas, "
+                f"{totals['skipped']} ignoradas, {totals['failed']} falhas, "
+                f"{totals['abandoned']} abandonadas"
+            )
+        else:
+            await poller.run(args.interval)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
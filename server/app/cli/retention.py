@@ -0,0 +1,54 @@
+"""
+Retention CLI - Executa a política de retenção uma vez ou em modo agendado
+
+Uso:
+    python -m app.cli.retention                 # um ciclo
+    python -m app.cli.retention --dry-run       # apenas conta o que seria arquivado
+    python -m app.cli.retention --schedule      # repete a cada RETENTION_INTERVAL_SECONDS
+    python -m app.cli.retention --enable-incremental-vacuum  # conversão única de bancos antigos
+"""
+import argparse
+import logging
+import sys
+import time
+
+from app.core.settings import get_settings
+from app.services.retention import RetentionManager
+from app.utils.database import get_database
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Arquivamento e compactação da tabela analyses")
+    parser.add_argument("--dry-run", action="store_true", help="Não arquiva nem remove nada")
+    parser.add_argument("--schedule", action="store_true", help="Executa continuamente")
+    parser.add_argument("--interval", type=int, default=settings.RETENTION_INTERVAL_SECONDS,
+                        help="Intervalo entre ciclos no modo agendado (segundos)")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="Converte o banco para auto_vacuum=INCREMENTAL (VACUUM completo)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    try:
+        manager = RetentionManager(get_database(), settings)
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+
+    if args.enable_incremental_vacuum:
+        converted = manager.db.enable_incremental_vacuum()
+        logger.info("Banco convertido para auto_vacuum=INCREMENTAL" if converted
+                    else "Banco já usa auto_vacuum=INCREMENTAL")
+
+    while True:
+        manager.run_once(dry_run=args.dry_run)
+        if not args.schedule:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
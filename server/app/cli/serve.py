@@ -0,0 +1,100 @@
+"""
+Serve CLI - Servidor de produção pré-fork (gunicorn + workers uvicorn)
+
+O app é importado e aquecido uma única vez no master (preload) e só então
+os workers são criados, compartilhando a memória via copy-on-write.
+
+Uso:
+    python -m app.cli.serve                     # APP_WORKERS workers (padrão: núcleos)
+    python -m app.cli.serve --workers 4 --port 8000
+
+Reinício gradual (sem derrubar conexões):
+    kill -HUP <pid do master>     # recria os workers um a um a partir do master
+    kill -TTIN / -TTOU <pid>      # adiciona / remove um worker
+Como o código fica carregado no master, um deploy de código novo usa
+USR2 (novo master) seguido de QUIT no master antigo.
+"""
+import argparse
+import logging
+import os
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+from app.core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+WORKER_CLASS = "uvicorn.workers.UvicornWorker"
+
+
+def default_workers() -> int:
+    """Um worker por núcleo disponível para o processo"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def post_fork(server, worker):
+    logger.info(f"Worker {worker.pid} iniciado")
+
+
+class PreforkApplication(BaseApplication):
+    """Aplicação gunicorn que aquece o app antes do fork"""
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.core.warmup import warm_up
+        from app.main import app
+
+        warm_up()
+        return app
+
+
+def build_options(args) -> dict:
+    return {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": WORKER_CLASS,
+        "preload_app": True,
+        "graceful_timeout": args.graceful_timeout,
+        "timeout": args.timeout,
+        "keepalive": 5,
+        # Reciclagem periódica com jitter para os workers não reiniciarem juntos
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests // 10 if args.max_requests else 0,
+        "post_fork": post_fork,
+        "accesslog": None,
+    }
+
+
+def main(argv=None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Servidor de produção com workers pré-fork")
+    parser.add_argument("--host", default=settings.APP_HOST)
+    parser.add_argument("--port", type=int, default=settings.APP_PORT)
+    parser.add_argument("--workers", type=int, default=settings.APP_WORKERS or default_workers())
+    parser.add_argument("--graceful-timeout", type=int, default=settings.APP_GRACEFUL_TIMEOUT,
+                        help="Segundos para um worker terminar as requisições em curso")
+    parser.add_argument("--timeout", type=int, default=120,
+                        help="Worker sem resposta por mais que isso é reiniciado")
+    parser.add_argument("--max-requests", type=int, default=settings.APP_MAX_REQUESTS,
+                        help="Recicla cada worker após N requisições (0 = nunca)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    PreforkApplication(build_options(args)).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
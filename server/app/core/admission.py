@@ -0,0 +1,273 @@
+"""
+Admission control - Limita o trabalho em andamento e descarta excesso cedo
+Em rajadas, em vez de acumular requisições esperando o OpenAI (e a latência
+de todas subir até os clientes desistirem), o excesso recebe 429/503 com
+Retry-After na hora e as admitidas mantêm latência estável
+
+- Token bucket por chave (X-API-Key ou IP): 429
+- Limite de requisições em andamento com fila curta e limitada: 503 com fila cheia
+  (em /api/process/batch cada item ocupa sua própria vaga)
+- Espera na fila no estilo CoDel: enquanto a fila não esvaziar por um
+  intervalo inteiro (fila "parada"), a espera máxima cai para o alvo
+
+Os limites são por processo: com vários workers, cada um tem os seus.
+"""
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Iterable, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.metrics import counter, gauge
+
+admission_shed = counter(
+    "admission_shed_total",
+    "Requisições recusadas pelo controle de admissão, por motivo "
+    "(rate_limited, queue_full, queue_timeout)"
+)
+admission_admitted = counter(
+    "admission_admitted_total",
+    "Requisições admitidas pelo controle de admissão"
+)
+admission_queue_delay = counter(
+    "admission_queue_delay_seconds_total",
+    "Soma do tempo de fila das admitidas (dividir por admission_admitted_total)"
+)
+
+
+class AdmissionRejected(Exception):
+    """Requisição recusada; status 429 (limite da chave) ou 503 (sobrecarga)"""
+
+    def __init__(self, status: int, reason: str, retry_after: float):
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Requisição recusada ({reason}), tente em {retry_after:.1f}s")
+
+    @property
+    def detail(self) -> str:
+        return ("Limite de requisições excedido" if self.status == 429
+                else "Servidor sobrecarregado, tente novamente")
+
+
+class TokenBucket:
+    """rate fichas por segundo, acumulando até burst"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """Consome uma ficha; devolve 0 ou quantos segundos faltam para a próxima"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Vagas de execução + fila de espera limitada
+
+    Uma vaga liberada passa direto ao primeiro da fila (sem disputa). Quem
+    espera mais que o limite do momento sai da fila com 503.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, target_delay: float, interval: float,
+                 rate: float = 0.0, burst: float = 1.0, max_keys: int = 10_000):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.target_delay = target_delay
+        self.interval = interval
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_empty = time.monotonic()
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def check_rate(self, key: str):
+        """
+        Raises:
+            AdmissionRejected: 429 se a chave esgotou suas fichas
+        """
+        if self.rate <= 0:
+            return
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        wait = bucket.take(time.monotonic())
+        if wait:
+            admission_shed.inc(reason="rate_limited")
+            raise AdmissionRejected(429, "rate_limited", wait)
+
+    def max_wait(self, now: float) -> float:
+        """Espera máxima na fila agora: alvo com fila parada, intervalo em rajadas"""
+        if self._waiters and now - self._last_empty > self.interval:
+            return self.target_delay
+        return self.interval
+
+    async def acquire(self) -> float:
+        """
+        Ocupa uma vaga, esperando na fila se preciso
+
+        Returns:
+            Tempo de fila em segundos
+
+        Raises:
+            AdmissionRejected: 503 com fila cheia ou espera acima do limite
+        """
+        now = time.monotonic()
+        if not self._waiters:
+            self._last_empty = now
+            if self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                admission_admitted.inc()
+                return 0.0
+        if len(self._waiters) >= self.max_queue:
+            admission_shed.inc(reason="queue_full")
+            raise AdmissionRejected(503, "queue_full", self.interval)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=self.max_wait(now))
+        except asyncio.CancelledError:
+            # Cliente desconectou: devolve a vaga se ela já tinha sido passada
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._forget(waiter)
+            raise
+
+        if not waiter.done():
+            self._forget(waiter)
+            admission_shed.inc(reason="queue_timeout")
+            raise AdmissionRejected(503, "queue_timeout", self.interval)
+
+        delay = time.monotonic() - now
+        admission_admitted.inc()
+        admission_queue_delay.inc(delay)
+        return delay
+
+    def release(self):
+        """Libera a vaga (passando-a ao primeiro da fila, se houver)"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                if not self._waiters:
+                    self._last_empty = time.monotonic()
+                return
+        self.in_flight -= 1
+
+    def _forget(self, waiter: asyncio.Future):
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        if not self._waiters:
+            self._last_empty = time.monotonic()
+
+
+def request_key(scope: Scope) -> str:
+    """Chave do token bucket: X-API-Key ou, sem ela, o IP do cliente"""
+    for name, value in scope["headers"]:
+        if name == b"x-api-key" and value:
+            return "key:" + value.decode("latin-1")
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI que aplica o AdmissionController às rotas protegidas
+
+    Roda antes do corpo ser lido: a recusa não gasta upload nem parsing.
+    Em item_paths (lotes) só o rate limit é aplicado aqui; o controller vai
+    em request.state.admission e a rota ocupa uma vaga por item processado.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController,
+                 paths: Iterable[str] = ("/api/process",),
+                 item_paths: Iterable[str] = ("/api/process/batch",)):
+        self.app = app
+        self.controller = controller
+        self.paths = tuple(paths)
+        self.item_paths = tuple(item_paths)
+        gauge("admission_in_flight", "Requisições em execução", lambda: controller.in_flight)
+        gauge("admission_queue_depth", "Requisições na fila de admissão", lambda: controller.queue_depth)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] in self.item_paths:
+            try:
+                self.controller.check_rate(request_key(scope))
+            except AdmissionRejected as rejected:
+                await self._reject(send, rejected)
+                return
+            scope.setdefault("state", {})["admission"] = self.controller
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            self.controller.check_rate(request_key(scope))
+            await self.controller.acquire()
+        except AdmissionRejected as rejected:
+            await self._reject(send, rejected)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    @staticmethod
+    async def _reject(send: Send, rejected: AdmissionRejected):
+        body = json.dumps({"detail": rejected.detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": rejected.status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(rejected.retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def build_admission_controller(settings) -> Optional[AdmissionController]:
+    """Controller a partir do Settings (None com ADMISSION_MAX_IN_FLIGHT=0)"""
+    if settings.ADMISSION_MAX_IN_FLIGHT <= 0:
+        return None
+    return AdmissionController(
+        max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+        max_queue=settings.ADMISSION_MAX_QUEUE,
+        target_delay=settings.ADMISSION_TARGET_DELAY,
+        interval=settings.ADMISSION_INTERVAL,
+        rate=settings.RATE_LIMIT_PER_SECOND,
+        burst=settings.RATE_LIMIT_BURST
+    )
@@ -0,0 +1,240 @@
+"""
+Logging module - Pipeline de logs fora do event loop
+O handler no caminho da requisição só enfileira o registro; formatação (JSON
+ou texto) e escrita em stdout acontecem na thread do QueueListener
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.tracing import current_span, span
+
+# Logger dedicado aos payloads crus do LLM (amostrado em produção)
+LLM_PAYLOAD_LOGGER = "app.llm.payload"
+PRODUCTION_PAYLOAD_SAMPLE_RATE = 0.01
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+timings_var: ContextVar[Optional[Dict[str, float]]] = ContextVar("timings", default=None)
+
+# Atributos padrão de LogRecord; o resto veio de extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Mede uma etapa da requisição atual (ms), registrada em timings_var
+
+    Em requisições amostradas pelo tracing a etapa também vira um span.
+    """
+    started = time.perf_counter()
+    try:
+        with span(name):
+            yield
+    finally:
+        timings = timings_var.get()
+        if timings is not None:
+            timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+
+class ContextFilter(logging.Filter):
+    """Copia o request id (e o trace id, se rastreada) para o registro (roda na task da requisição)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        active = current_span.get()
+        record.trace_id = active.trace_id if active is not None else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Deixa passar só uma fração dos registros abaixo de WARNING"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha, com request id e campos de extra={...}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = "".join(traceback.format_exception(*record.exc_info))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler que não formata na thread de quem loga
+
+    O QueueHandler padrão formata a mensagem (e o traceback) antes de
+    enfileirar, pensando em filas entre processos. Aqui a fila é local:
+    basta resolver os args e deixar o resto para o listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def parse_sampling(value: str) -> Dict[str, float]:
+    """
+    Converte "logger:taxa,logger:taxa" em dict
+
+    Raises:
+        ValueError: Se alguma entrada não estiver no formato logger:taxa
+    """
+    rates = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        name, sep, rate = entry.rpartition(":")
+        if not sep or not name:
+            raise ValueError(f"Amostragem inválida: '{entry}' (use logger:taxa)")
+        rates[name] = float(rate)
+    return rates
+
+
+def setup_logging(settings) -> None:
+    """
+    Configura o root logger com fila + listener em thread
+
+    - LOG_FORMAT: json | text (padrão: json em produção, texto em desenvolvimento)
+    - LOG_SAMPLING: taxas por logger; o payload do LLM fica em 1% em produção
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_format = settings.LOG_FORMAT or ("json" if settings.APP_ENV == "production" else "text")
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL)
+
+    rates = {}
+    if settings.APP_ENV == "production":
+        rates[LLM_PAYLOAD_LOGGER] = PRODUCTION_PAYLOAD_SAMPLE_RATE
+    rates.update(parse_sampling(settings.LOG_SAMPLING))
+    for name, rate in rates.items():
+        if rate < 1:
+            logging.getLogger(name).addFilter(SamplingFilter(rate))
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    # A thread do listener não sobrevive ao fork (workers do app.cli.serve)
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def _restart_listener_after_fork():
+    if _listener is None:
+        return
+    # Fila nova: a antiga pode ter ficado com lock preso pela thread do pai
+    fresh_queue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueHandler):
+            handler.queue = fresh_queue
+    _listener.queue = fresh_queue
+    _listener._thread = None
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Esvazia a fila e para o listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestContextMiddleware:
+    """
+    Middleware ASGI que dá um request id a cada requisição
+
+    Usa o cabeçalho X-Request-ID quando enviado, devolve-o na resposta e
+    registra um log por requisição com status, duração e tempos por etapa.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.logger = logging.getLogger("app.access")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        request_token = request_id_var.set(request_id)
+        timings_token = timings_var.set({})
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_request_id(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            self.logger.info(
+                f"{scope['method']} {scope['path']} {status_code}",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "timings": timings_var.get() or None,
+                }
+            )
+            timings_var.reset(timings_token)
+            request_id_var.reset(request_token)
@@ -0,0 +1,73 @@
+"""
+Metrics module - Contadores em memória expostos em /metrics (formato Prometheus)
+Os valores são por processo: com vários workers, cada um reporta os seus
+"""
+import threading
+from typing import Callable, Dict, List, Tuple, Union
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """Contador monotônico com labels opcionais"""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            labels = ",".join(f'{name}="{label}"' for name, label in key)
+            lines.append(f"{self.name}{{{labels}}} {value:g}" if labels else f"{self.name} {value:g}")
+        return lines
+
+
+class Gauge:
+    """Valor instantâneo lido de uma função no momento da coleta"""
+
+    def __init__(self, name: str, description: str, read: Callable[[], float]):
+        self.name = name
+        self.description = description
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {self.read():g}",
+        ]
+
+
+_registry: Dict[str, Union[Counter, Gauge]] = {}
+
+
+def counter(name: str, description: str) -> Counter:
+    """Retorna o contador registrado com esse nome (criando na primeira vez)"""
+    if name not in _registry:
+        _registry[name] = Counter(name, description)
+    return _registry[name]
+
+
+def gauge(name: str, description: str, read: Callable[[], float]) -> Gauge:
+    """Registra (ou substitui) o gauge com esse nome"""
+    _registry[name] = Gauge(name, description, read)
+    return _registry[name]
+
+
+def render_metrics() -> str:
+    """Todos os contadores no formato texto do Prometheus"""
+    lines: List[str] = []
+    for metric in _registry.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
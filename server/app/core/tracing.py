@@ -0,0 +1,452 @@
+"""
+Tracing module - Spans por etapa das requisições (W3C trace context)
+Cada requisição amostrada vira um trace: o span raiz é aberto pelo
+TracingMiddleware (continuando o traceparent recebido, se houver) e as
+etapas (stage() do logging_config, chamadas ao LLM) viram spans filhos.
+
+Os spans terminados só são enfileirados no caminho da requisição; a
+exportação (arquivo JSON rotativo ou coletor OTLP/HTTP) acontece em lote
+numa thread, como os logs.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import counter
+
+logger = logging.getLogger(__name__)
+
+# version-trace_id-parent_id-flags (https://www.w3.org/TR/trace-context/)
+TRACEPARENT_PATTERN = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+SAMPLED_FLAG = 0x01
+
+# Probes e scrape não viram traces
+UNTRACED_PATHS = ("/health", "/metrics")
+
+SPAN_QUEUE_SIZE = 10000
+EXPORT_BATCH_SIZE = 512
+EXPORT_INTERVAL_SECONDS = 1.0
+
+dropped_spans = counter(
+    "trace_spans_dropped_total",
+    "Spans descartados com a fila de exportação cheia (exportador lento ou fora)"
+)
+
+current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+_processor: Optional["SpanProcessor"] = None
+
+
+class Span:
+    """Uma etapa medida: ids W3C em hex, horários em ns desde a epoch"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "events", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 kind: str = "internal", attributes: Optional[Dict] = None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64) or 1:016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.events: List[Tuple[str, int, Dict]] = []
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes) -> None:
+        self.events.append((name, time.time_ns(), attributes))
+
+    @property
+    def duration_ms(self) -> float:
+        return round(((self.end_ns or time.time_ns()) - self.start_ns) / 1e6, 3)
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict:
+        """Formato de uma linha do arquivo de spans"""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "events": [
+                {"name": name, "time_unix_nano": at, "attributes": attributes}
+                for name, at, attributes in self.events
+            ],
+            "status": "error" if self.error is not None else "ok",
+            "error": self.error,
+        }
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    (trace_id, parent_id, sampled) do cabeçalho traceparent
+
+    None se ausente ou inválido (versão ff, ids zerados): a requisição
+    começa um trace novo, como manda o W3C.
+    """
+    if not value:
+        return None
+    match = TRACEPARENT_PATTERN.match(value.strip().lower())
+    if not match:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == "ff" or trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    # Versão 00 não admite nada depois das flags; versões futuras podem estender
+    if version == "00" and len(value.strip()) != 55:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & SAMPLED_FLAG)
+
+
+def should_sample(parent: Optional[Tuple[str, str, bool]], rate: float) -> bool:
+    """
+    Amostragem na cabeça do trace
+
+    Com traceparent, segue a decisão de quem chamou (flag sampled); sem ele,
+    sorteia com a taxa TRACE_SAMPLE_RATE.
+    """
+    if parent is not None:
+        return parent[2]
+    return rate > 0 and random.random() < rate
+
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, kind: str = "server",
+                **attributes) -> Iterator[Optional[Span]]:
+    """
+    Abre o span raiz de um trace (ou o continua a partir do traceparent)
+
+    Rende None, sem medir nada, com o tracing desligado ou fora da amostra;
+    os span() dentro dele também viram no-ops.
+    """
+    processor = _processor
+    parent = parse_traceparent(traceparent)
+    if processor is None or not should_sample(parent, processor.sample_rate):
+        yield None
+        return
+    if parent is not None:
+        root = Span(name, parent[0], parent[1], kind, attributes)
+    else:
+        root = Span(name, f"{random.getrandbits(128) or 1:032x}", None, kind, attributes)
+    with _activate(root, processor) as active:
+        yield active
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Span filho do span atual
+
+    Fora de um trace amostrado rende None: o custo fica em uma leitura de
+    ContextVar por etapa.
+    """
+    parent = current_span.get()
+    processor = _processor
+    if parent is None or processor is None:
+        yield None
+        return
+    with _activate(Span(name, parent.trace_id, parent.span_id, attributes=attributes), processor) as active:
+        yield active
+
+
+@contextmanager
+def _activate(active: Span, processor: "SpanProcessor") -> Iterator[Span]:
+    token = current_span.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        active.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        active.end_ns = time.time_ns()
+        current_span.reset(token)
+        processor.on_end(active)
+
+
+def add_event(name: str, **attributes) -> None:
+    """Evento (instante, sem duração) no span atual, se houver"""
+    active = current_span.get()
+    if active is not None:
+        active.add_event(name, **attributes)
+
+
+class FileExporter:
+    """
+    Um span JSON por linha em path, rotacionando em max_bytes
+
+    Ao passar de max_bytes: path -> path.1 -> ... -> path.<backups> (o mais
+    antigo é apagado), como o RotatingFileHandler do logging.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10_485_760, backups: int = 5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "ab")
+
+    def export(self, spans: List[Span]) -> None:
+        data = "".join(
+            json.dumps(item.to_dict(), ensure_ascii=False, default=str) + "\n" for item in spans
+        ).encode("utf-8")
+        if self.max_bytes and 0 < self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict) -> List[Dict]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+OTLP_SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+def otlp_payload(spans: List[Span], service_name: str) -> Dict:
+    """Corpo ExportTraceServiceRequest na codificação JSON do OTLP/HTTP"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+            "scopeSpans": [{
+                "scope": {"name": "app"},
+                "spans": [
+                    {
+                        "traceId": item.trace_id,
+                        "spanId": item.span_id,
+                        **({"parentSpanId": item.parent_id} if item.parent_id else {}),
+                        "name": item.name,
+                        "kind": OTLP_SPAN_KINDS.get(item.kind, 1),
+                        "startTimeUnixNano": str(item.start_ns),
+                        "endTimeUnixNano": str(item.end_ns),
+                        "attributes": _otlp_attributes(item.attributes),
+                        "events": [
+                            {"name": name, "timeUnixNano": str(at), "attributes": _otlp_attributes(attributes)}
+                            for name, at, attributes in item.events
+                        ],
+                        "status": {"code": 2, "message": item.error} if item.error is not None else {"code": 1},
+                    }
+                    for item in spans
+                ],
+            }],
+        }]
+    }
+
+
+class OtlpExporter:
+    """POST dos spans em OTLP/HTTP JSON para um coletor (ex.: :4318/v1/traces)"""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0):
+        import httpx
+
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client = httpx.Client(timeout=timeout)
+
+    def export(self, spans: List[Span]) -> None:
+        response = self._client.post(self.endpoint, json=otlp_payload(spans, self.service_name))
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class SpanProcessor:
+    """
+    Fila limitada + thread que exporta em lotes
+
+    on_end roda no event loop e só enfileira; com a fila cheia o span é
+    descartado (trace_spans_dropped_total) em vez de segurar a requisição.
+    """
+
+    def __init__(self, exporter, sample_rate: float = 1.0, batch_size: int = EXPORT_BATCH_SIZE,
+                 interval: float = EXPORT_INTERVAL_SECONDS, max_queue: int = SPAN_QUEUE_SIZE):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_queue = max_queue
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._thread: Optional[threading.Thread] = None
+
+    def on_end(self, finished: Span) -> None:
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            dropped_spans.inc()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def restart_after_fork(self) -> None:
+        # Fila nova: a antiga pode ter ficado com lock preso pela thread do pai
+        self._queue = queue.Queue(self.max_queue)
+        self.start()
+
+    def stop(self) -> None:
+        """Exporta o que está na fila e encerra a thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.exporter.close()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.001))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                self._export(batch)
+
+    def _export(self, batch: List[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.warning(f"Falha ao exportar {len(batch)} spans: {str(e)}")
+
+
+def build_exporter(settings):
+    """
+    Exportador do TRACE_EXPORTER (None = tracing desligado)
+
+    Raises:
+        ValueError: Se TRACE_EXPORTER não for file ou otlp
+    """
+    if not settings.TRACE_EXPORTER:
+        return None
+    if settings.TRACE_EXPORTER == "file":
+        return FileExporter(settings.TRACE_FILE, settings.TRACE_FILE_MAX_BYTES, settings.TRACE_FILE_BACKUPS)
+    if settings.TRACE_EXPORTER == "otlp":
+        return OtlpExporter(settings.TRACE_OTLP_ENDPOINT, settings.TRACE_SERVICE_NAME)
+    raise ValueError(f"TRACE_EXPORTER inválido: '{settings.TRACE_EXPORTER}' (use file ou otlp)")
+
+
+def setup_tracing(settings) -> None:
+    """
+    Liga o tracing conforme o Settings
+
+    - TRACE_EXPORTER: file (TRACE_FILE, rotativo) | otlp (TRACE_OTLP_ENDPOINT)
+    - TRACE_SAMPLE_RATE: fração das requisições sem traceparent rastreadas
+    """
+    global _processor
+    if _processor is not None:
+        return
+    exporter = build_exporter(settings)
+    if exporter is None:
+        return
+
+    _processor = SpanProcessor(exporter, sample_rate=settings.TRACE_SAMPLE_RATE)
+    _processor.start()
+    atexit.register(stop_tracing)
+
+    # A thread do exportador não sobrevive ao fork (workers do app.cli.serve)
+    os.register_at_fork(after_in_child=_restart_processor_after_fork)
+
+
+def _restart_processor_after_fork():
+    if _processor is not None:
+        _processor.restart_after_fork()
+
+
+def stop_tracing() -> None:
+    """Exporta os spans pendentes e desliga o tracing"""
+    global _processor
+    if _processor is not None:
+        _processor.stop()
+        _processor = None
+
+
+class TracingMiddleware:
+    """
+    Middleware ASGI que abre o span raiz de cada requisição HTTP
+
+    Continua o trace do cabeçalho traceparent (respeitando a flag sampled)
+    ou começa um novo com probabilidade TRACE_SAMPLE_RATE. Sem tracing
+    configurado, só repassa a requisição.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or _processor is None or scope["path"].startswith(UNTRACED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        with start_trace(f"{scope['method']} {scope['path']}", traceparent,
+                         **{"http.method": scope["method"], "http.target": scope["path"]}) as root:
+            if root is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_status(message: Message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.status_code", message["status"])
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
@@ -0,0 +1,57 @@
+"""
+Warm-up module - Pré-carrega o estado compartilhado antes do fork dos workers
+Com preload, tudo o que é construído aqui fica no processo master e é
+herdado pelos workers via copy-on-write em vez de ser refeito por processo
+"""
+import gc
+import logging
+
+from app.core.settings import get_settings
+from app.services import ai_client, rules
+from app.services.pipeline import prepare_text
+from app.services.reply_pool import get_reply_pool
+from app.utils import database
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_TEXT = (
+    "Prezados, solicito o status do protocolo 12345. "
+    "Não consigo acessar o sistema desde ontem. Obrigado!"
+)
+
+
+def warm_up() -> None:
+    """
+    Constrói no master o que pode ser compartilhado entre processos
+
+    - Settings, stopwords do NLTK e regexes (nlp, rules, parsing)
+    - Schema do banco: migrações rodam uma vez, não em cada worker
+    - Reply pool com as respostas aprendidas do feedback
+    - Cliente OpenAI: bundle de CAs/SSL e cliente HTTP sem conexões abertas
+      (os sockets só são criados no worker, no primeiro uso)
+
+    Conexões e threads não sobrevivem ao fork: o pool Postgres é fechado
+    aqui e recriado sob demanda em cada worker.
+    """
+    settings = get_settings()
+
+    # Exercita o caminho de preprocessamento (stopwords, regexes, caches de re)
+    prepare_text(SAMPLE_TEXT)
+    rules.rule_features(SAMPLE_TEXT)
+
+    db = database.get_database()
+    get_reply_pool()
+    if hasattr(db, "close"):
+        db.close()
+        database._database = None
+
+    if settings.OPENAI_API_KEY:
+        ai_client.get_ai_client()
+    else:
+        logger.warning("OPENAI_API_KEY não configurada: cliente LLM não pré-carregado")
+
+    # Move os objetos já criados para a geração permanente: o GC dos workers
+    # deixa de tocá-los e as páginas continuam compartilhadas
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Warm-up concluído ({gc.get_freeze_count()} objetos congelados)")
@@ -2,18 +2,23 @@ import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from app.core.admission import AdmissionMiddleware, build_admission_controller
+from app.core.metrics import render_metrics
+from app.core.logging_config import RequestContextMiddleware, setup_logging
 from app.core.settings import get_settings
-from app.api import process
+from app.core.tracing import TracingMiddleware, setup_tracing
+from app.api import export, process, search, usage
 from app.models.schemas import HealthResponse
 from app.services.ai_client import get_ai_client
+from app.services.health import get_health_monitor
 from app.utils.database import get_database
+from app.utils.uploads import BodySizeLimitMiddleware, MULTIPART_OVERHEAD
+from app.utils.wire import FastJSONResponse
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging(get_settings())
+setup_tracing(get_settings())
 logger = logging.getLogger(__name__)
 
 
@@ -28,57 +33,123 @@ async def lifespan(app: FastAPI):
     logger.info(f"Ambiente: {settings.APP_ENV}")
     logger.info(f"OpenAI configurado: {settings.OPENAI_API_KEY is not None}")
     
+    # TCP + TLS ao provedor no startup, não no primeiro email
+    await ai_client.warm_up()
+    
+    health_monitor = get_health_monitor()
+    health_monitor.start()
+    
     yield
     
     logger.info("Encerrando aplicação...")
+    await health_monitor.stop()
+    await ai_client.aclose()
 
 
 app = FastAPI(
     title="Email Classifier API",
     description="Classifica emails em Produtivo/Improdutivo e gera respostas sugeridas",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 settings = get_settings()
 origins = settings.CORS_ORIGINS.split(",")
 
+# Rejeita uploads grandes em /api/process antes do multipart ser bufferizado
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_body_size=settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD,
+    max_upload_size=settings.MAX_UPLOAD_SIZE
+)
+
+# Excesso em /api/process recebe 429/503 antes de ler o corpo (lotes: por item)
+admission_controller = build_admission_controller(settings)
+if admission_controller is not None:
+    app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
+# Span raiz de cada requisição (inclui a espera na fila de admissão)
+app.add_middleware(TracingMiddleware)
+
+# Por fora dos middlewares que recusam: 413/429/503 também levam os
+# cabeçalhos CORS (o frontend vê o status e o Retry-After, não um erro opaco)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+# Mais externo: request id e log por requisição cobrem também os 413/429/503
+app.add_middleware(RequestContextMiddleware)
+
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    settings = get_settings()
-    db = get_database()
-    
-    db_connected = False
-    try:
-        test = db.get_analysis("test")
-        db_connected = True
-    except:
-        pass
-    
-    all_healthy = db_connected and (settings.OPENAI_API_KEY is not None)
+    """Último estado do health monitor (não consulta o banco a cada probe)"""
+    state = await get_health_monitor().current()
     
     return HealthResponse(
-        status="healthy" if all_healthy else "degraded",
-        openai_configured=settings.OPENAI_API_KEY is not None,
-        database_connected=db_connected
+        status="healthy" if state.healthy else "degraded",
+        openai_configured=state.openai_configured,
+        database_connected=state.database_connected,
+        circuit_state=state.circuit_state
     )
 
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness: o processo e o event loop respondem"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness: 503 enquanto o banco estiver fora ou o circuito do OpenAI aberto"""
+    state = await get_health_monitor().current()
+    return JSONResponse(
+        status_code=200 if state.ready else 503,
+        content={
+            "status": "ready" if state.ready else "unavailable",
+            "database_connected": state.database_connected,
+            "circuit_state": state.circuit_state
+        }
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Contadores do processo no formato texto do Prometheus"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(
     process.router,
     prefix="/api",
     tags=["processing"]
 )
 
+app.include_router(
+    usage.router,
+    prefix="/api",
+    tags=["usage"]
+)
+
+app.include_router(
+    search.router,
+    prefix="/api",
+    tags=["search"]
+)
+
+app.include_router(
+    export.router,
+    prefix="/api",
+    tags=["export"]
+)
+
 
 @app.get("/")
 async def root():
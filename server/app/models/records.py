@@ -0,0 +1,119 @@
+"""
+Internal records - Resultados do pipeline entre as etapas
+Dataclasses com __slots__ (sem __dict__ por instância), passadas adiante sem
+cópias e convertidas para o schema da API uma única vez, em to_response.
+
+Tratadas como imutáveis: quem precisa mudar um campo usa dataclasses.replace.
+Não são frozen: o __init__ de uma dataclass frozen (object.__setattr__ campo
+a campo) custa ~5x o de uma com slots, e ele roda em toda requisição.
+
+Os clientes LLM devolvem Classification/Reply; dublês e clientes externos
+que ainda devolvem dicts passam por coerce.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Mapping, Optional, Tuple, Union
+
+from app.models.schemas import ProcessResponse
+
+
+@dataclass(slots=True)
+class Classification:
+    """Saída da classificação (um modelo, roteada ou por trechos)"""
+    category: str
+    confidence: float
+    reason: Optional[str] = None
+    model: Optional[str] = None
+    routing: Optional[Dict] = None  # Decisão do ModelRouter
+    chunks: Optional[Dict] = None  # Votos dos trechos (documentos longos)
+    llm_calls: Tuple[Dict, ...] = ()
+
+    @classmethod
+    def coerce(cls, result: Union["Classification", Mapping]) -> "Classification":
+        if isinstance(result, cls):
+            return result
+        return cls(
+            category=result["category"],
+            confidence=result["confidence"],
+            reason=result.get("reason"),
+            model=result.get("model"),
+            routing=result.get("routing"),
+            chunks=result.get("chunks"),
+            llm_calls=tuple(result.get("llm_calls") or ())
+        )
+
+
+@dataclass(slots=True)
+class Reply:
+    """Resposta sugerida (LLM ou reply pool)"""
+    reply: str
+    tone: Optional[str] = None
+    source: Optional[str] = None  # "pool:<intenção>"; None = LLM
+    llm_call: Optional[Dict] = None
+
+    @classmethod
+    def coerce(cls, result: Union["Reply", Mapping]) -> "Reply":
+        if isinstance(result, cls):
+            return result
+        return cls(reply=result["reply"], tone=result.get("tone"), llm_call=result.get("llm_call"))
+
+
+@dataclass(slots=True)
+class Analysis:
+    """
+    Análise completa: produzida pelo pipeline, gravada pelo Database e lida
+    de volta pelos row factories dos backends
+
+    created_at e text_hash só vêm preenchidos em análises lidas do banco (ou
+    devolvidas por save_analysis).
+    """
+    id: str
+    category: str
+    confidence: float
+    suggested_reply: str
+    summary: str
+    model_used: str
+    reason: Optional[str] = None
+    full_text: Optional[str] = None
+    metadata: Dict = field(default_factory=dict)
+    llm_calls: Tuple[Dict, ...] = ()
+    created_at: Optional[str] = None
+    text_hash: Optional[str] = None
+
+    @classmethod
+    def coerce(cls, data: Union["Analysis", Mapping]) -> "Analysis":
+        """Aceita também o dict do formato antigo (scripts, testes, benchmarks)"""
+        if isinstance(data, cls):
+            return data
+        return cls(
+            id=data["id"],
+            category=data["category"],
+            confidence=data["confidence"],
+            suggested_reply=data["suggested_reply"],
+            summary=data["summary"],
+            model_used=data["model_used"],
+            reason=data.get("reason"),
+            full_text=data.get("full_text"),
+            metadata=data.get("metadata") or {},
+            llm_calls=tuple(data.get("llm_calls") or ()),
+            created_at=data.get("created_at"),
+            text_hash=data.get("text_hash")
+        )
+
+    def to_response(self) -> ProcessResponse:
+        """
+        Response da API
+
+        Análises lidas do banco (replay de Idempotency-Key) mantêm o horário
+        original; as recém-processadas usam o horário atual.
+        """
+        return ProcessResponse(
+            id=self.id,
+            category=self.category,
+            confidence=self.confidence,
+            suggested_reply=self.suggested_reply,
+            summary=self.summary,
+            model_used=self.model_used,
+            timestamp=self.created_at or datetime.now(datetime.UTC if hasattr(datetime, 'UTC') else None),
+            reason=self.reason
+        )
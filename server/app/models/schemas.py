@@ -2,7 +2,7 @@
 Pydantic schemas - Validação de dados de entrada/saída da API
 """
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import Dict, List, Optional, Literal
 from datetime import datetime
 
 
@@ -47,3 +47,57 @@ class HealthResponse(BaseModel):
     version: str = "1.0.0"
     openai_configured: bool
     database_connected: bool
+    circuit_state: Optional[Literal["closed", "open", "half_open"]] = None
+
+
+class UsageRow(BaseModel):
+    """Tokens e latência agregados por dia, modelo e etapa"""
+    day: str
+    model: str
+    stage: str
+    calls: int
+    analyses: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    avg_latency_ms: float
+    max_latency_ms: int
+
+
+class TopUsageRow(BaseModel):
+    """Consumo de uma análise (soma das chamadas ao LLM)"""
+    analysis_id: str
+    total_tokens: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    latency_ms: int
+    created_at: str
+
+
+class UsageResponse(BaseModel):
+    """Response do endpoint /api/usage"""
+    days: int
+    totals: Dict[str, int] = Field(..., description="Somas do período: calls, prompt/completion/cached tokens")
+    by_day: List[UsageRow]
+    top_analyses: List[TopUsageRow] = Field(default_factory=list, description="Análises que mais consumiram tokens")
+
+
+class SearchHit(BaseModel):
+    """Análise encontrada pela busca textual"""
+    id: str
+    category: str
+    confidence: float
+    summary: str
+    created_at: str
+    snippet: str = Field(..., description="Trecho com os termos encontrados entre <mark>")
+    score: float = Field(..., description="Relevância (maior = mais relevante)")
+
+
+class SearchResponse(BaseModel):
+    """Response do endpoint /api/search"""
+    query: str
+    limit: int
+    offset: int
+    has_more: bool
+    results: List[SearchHit]
@@ -2,16 +2,42 @@
 AI Client abstraction - Interface para LLMs (OpenAI, HuggingFace, etc)
 Permite trocar provider facilmente e implementa fallback strategy
 """
+import asyncio
 import json
 import logging
-from typing import Dict, Optional, Literal
+import time
+from typing import Dict, List, Optional, Literal
 from openai import AsyncOpenAI
+from app.core.logging_config import LLM_PAYLOAD_LOGGER
+from app.core.metrics import counter
 from app.core.settings import get_settings
+from app.core.tracing import span
+from app.models.records import Classification, Reply
+from app.services import http_client, long_document, rules
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.router import CHEAP, STRONG, ModelRouter
 
 logger = logging.getLogger(__name__)
+payload_logger = logging.getLogger(LLM_PAYLOAD_LOGGER)
+routing_logger = logging.getLogger("app.routing")
+
+routing_decisions = counter(
+    "model_routing_total",
+    "Classificações por tier escolhido pelo roteador e se houve escalonamento"
+)
 
 CategoryType = Literal["Produtivo", "Improdutivo"]
 
+# Caracteres do email que entram no prompt de classificação
+PROMPT_TEXT_CHARS = 2000
+
+
+def _annotate_llm_span(active, llm_call: Dict) -> None:
+    """Tokens da chamada no span llm.http (quando a requisição é rastreada)"""
+    if active is not None:
+        for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+            active.set_attribute(key, llm_call[key])
+
 
 class AIClient:
     """Cliente abstrato para chamadas LLM com fallback"""
@@ -22,50 +48,174 @@ class AIClient:
         if not self.settings.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY não configurada. Configure a chave em server/.env")
         
-        self.client = AsyncOpenAI(api_key=self.settings.OPENAI_API_KEY)
+        # Pool HTTP próprio (keep-alive, HTTP/2, timeouts) em vez do padrão do SDK
+        self.http_client = http_client.build_http_client(self.settings)
+        self.client = AsyncOpenAI(
+            api_key=self.settings.OPENAI_API_KEY,
+            base_url=self.settings.OPENAI_BASE_URL,
+            timeout=self.settings.LLM_TIMEOUT_SECONDS,
+            http_client=self.http_client
+        )
+        # Com o OpenAI fora ou lento, as requisições falham na hora (503)
+        # em vez de esperar o timeout inteiro do SDK
+        self.breaker = CircuitBreaker(
+            "openai",
+            failure_rate=self.settings.CB_FAILURE_RATE,
+            slow_call_rate=self.settings.CB_SLOW_CALL_RATE,
+            slow_call_seconds=self.settings.CB_SLOW_CALL_SECONDS,
+            window_size=self.settings.CB_WINDOW_SIZE,
+            min_calls=self.settings.CB_MIN_CALLS,
+            open_seconds=self.settings.CB_OPEN_SECONDS,
+            call_timeout=self.settings.LLM_TIMEOUT_SECONDS
+        )
+        self.router = ModelRouter(
+            long_text_chars=self.settings.ROUTER_LONG_TEXT_CHARS,
+            escalation_confidence=self.settings.ROUTER_ESCALATION_CONFIDENCE
+        )
+        # Chamadas de trechos de documentos longos em paralelo (todas as
+        # requisições): um documento grande não ocupa o pool HTTP inteiro
+        self.chunk_slots = asyncio.Semaphore(self.settings.LONG_DOC_MAX_CONCURRENCY)
         logger.info("OpenAI client inicializado")
     
-    async def classify_email(self, text: str) -> Dict:
+    async def warm_up(self) -> int:
+        """Abre as conexões do pool HTTP antes do primeiro request"""
+        return await http_client.warm_up(
+            self.http_client,
+            self.settings.OPENAI_BASE_URL,
+            self.settings.HTTP_WARM_CONNECTIONS
+        )
+    
+    async def aclose(self):
+        """Fecha as conexões do pool HTTP"""
+        await self.http_client.aclose()
+    
+    async def classify_email(self, text: str) -> Classification:
         """
         Classifica email usando LLM
         
+        Com LLM_STRONG_MODEL configurado, o ModelRouter escolhe o modelo pela
+        dificuldade do email e escala para o forte quando o barato responde
+        com confiança baixa.
+        
         Returns:
-            Dict com: category, confidence, reason
+            Classification com routing (se roteada) e llm_calls (tokens e
+            latência de cada chamada feita)
         """
-        prompt = self._build_classification_prompt(text)
+        strong_model = self.settings.LLM_STRONG_MODEL
+        if not strong_model:
+            result = await self._classify_with_model(text, self.settings.LLM_MODEL)
+            return Classification(
+                category=result["category"],
+                confidence=result["confidence"],
+                reason=result.get("reason"),
+                model=result["model"],
+                llm_calls=(result["llm_call"],)
+            )
+        
+        started = time.perf_counter()
+        decision = self.router.route(text)
+        first_model = strong_model if decision.tier == STRONG else self.settings.LLM_MODEL
+        result = await self._classify_with_model(text, first_model)
+        llm_calls = [result.pop("llm_call")]
+        first_pass_confidence = result["confidence"]
+        escalated = False
+        
+        if decision.tier == CHEAP and self.router.should_escalate(result["confidence"]):
+            try:
+                strong_result = await self._classify_with_model(text, strong_model)
+                llm_calls.append(strong_result.pop("llm_call"))
+                result = strong_result
+                escalated = True
+            except Exception as e:
+                # O resultado do modelo barato continua válido
+                logger.warning(f"Escalonamento para {strong_model} falhou: {str(e)}")
+        
+        routing = {"tier": decision.tier, "reasons": decision.reasons, "escalated": escalated}
+        routing_decisions.inc(tier=decision.tier, escalated=str(escalated).lower())
+        routing_logger.info(
+            f"Roteamento: {decision.tier}{' -> strong' if escalated else ''} "
+            f"({result['category']}, {result['confidence']:.2f})",
+            extra={
+                "tier": decision.tier,
+                "reasons": decision.reasons,
+                "features": decision.features,
+                "escalated": escalated,
+                "model": result["model"],
+                "category": result["category"],
+                "confidence": result["confidence"],
+                "first_pass_confidence": first_pass_confidence,
+                "latency_ms": round((time.perf_counter() - started) * 1000),
+            }
+        )
+        return Classification(
+            category=result["category"],
+            confidence=result["confidence"],
+            reason=result.get("reason"),
+            model=result["model"],
+            routing=routing,
+            llm_calls=tuple(llm_calls)
+        )
+    
+    async def classify_document(self, chunks: List[str]) -> Classification:
+        """
+        Classifica um documento longo por trechos (map-reduce)
+        
+        Os trechos vão em paralelo ao LLM_MODEL, cada um inteiro no prompt;
+        o resultado é o voto ponderado de long_document.reduce_votes.
+        
+        Returns:
+            Classification com chunks (votos) e llm_calls
+        """
+        async def classify_chunk(chunk: str) -> Dict:
+            with span("llm.queue_wait"):
+                await self.chunk_slots.acquire()
+            try:
+                return await self._classify_with_model(chunk, self.settings.LLM_MODEL, max_chars=len(chunk))
+            finally:
+                self.chunk_slots.release()
+        
+        return Classification.coerce(await long_document.map_reduce(chunks, classify_chunk))
+    
+    async def _classify_with_model(self, text: str, model: str, max_chars: int = PROMPT_TEXT_CHARS) -> Dict:
+        """Uma chamada de classificação a um modelo específico (dict com o JSON do LLM, model e llm_call)"""
+        prompt = self._build_classification_prompt(text, max_chars)
         
         try:
-            response = await self.client.chat.completions.create(
-                model=self.settings.LLM_MODEL,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "Você é um classificador especialista. CALIBRE a confiança baseada em: clareza do email (0.90-0.99 se muito claro, 0.70-0.85 se ambíguo, 0.60-0.70 se confuso), completude de informações (mais dados = maior confiança), e certeza da categoria. Detecte spam por: links, linguagem marketing ('ganhe', 'promoção', '50% OFF'), urgência artificial. Seja preciso na confiança - não use sempre valores altos. Responda em JSON válido."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=self.settings.LLM_TEMPERATURE,
-                max_tokens=self.settings.LLM_MAX_TOKENS,
-                response_format={"type": "json_object"}
-            )
+            started = time.perf_counter()
+            with span("llm.http", model=model, operation="classify") as active:
+                response = await self.breaker.call(
+                    self.client.chat.completions.create,
+                    model=model,
+                    messages=[
+                        {
+                            "role": "system", 
+                            "content": "Você é um classificador especialista. CALIBRE a confiança baseada em: clareza do email (0.90-0.99 se muito claro, 0.70-0.85 se ambíguo, 0.60-0.70 se confuso), completude de informações (mais dados = maior confiança), e certeza da categoria. Detecte spam por: links, linguagem marketing ('ganhe', 'promoção', '50% OFF'), urgência artificial. Seja preciso na confiança - não use sempre valores altos. Responda em JSON válido."
+                        },
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=self.settings.LLM_TEMPERATURE,
+                    max_tokens=self.settings.LLM_MAX_TOKENS,
+                    response_format={"type": "json_object"}
+                )
+                llm_call = self._llm_call_stats(response, started)
+                _annotate_llm_span(active, llm_call)
             
             content = response.choices[0].message.content
             
-            # DEBUG: Log da resposta RAW da OpenAI
-            logger.info("=" * 60)
-            logger.info("🤖 RESPOSTA RAW DA OPENAI:")
-            logger.info(f"Texto analisado (primeiros 100 chars): {text[:100]}")
-            logger.info(f"Resposta JSON: {content}")
-            logger.info("=" * 60)
-            
-            result = json.loads(content)
-            
-            # Valida campos obrigatórios
-            if "category" not in result or "confidence" not in result:
-                raise ValueError("Resposta LLM sem campos obrigatórios")
+            # Args preguiçosos: com amostragem, o texto só é montado se o registro passar
+            payload_logger.info("Resposta OpenAI (classificação): %s | texto: %.100s", content, text)
             
-            # Normaliza categoria
-            result["category"] = self._normalize_category(result["category"])
+            with span("llm.parse"):
+                result = json.loads(content)
+                
+                # Valida campos obrigatórios
+                if "category" not in result or "confidence" not in result:
+                    raise ValueError("Resposta LLM sem campos obrigatórios")
+                
+                # Normaliza categoria
+                result["category"] = self._normalize_category(result["category"])
+            result["model"] = model
+            result["llm_call"] = llm_call
             
             return result
             
@@ -73,40 +223,62 @@ class AIClient:
             logger.error(f"Erro ao chamar OpenAI: {str(e)}")
             raise
     
-    async def generate_reply(self, category: CategoryType, summary: str, original_text: str) -> Dict:
+    async def generate_reply(self, category: CategoryType, summary: str, original_text: str) -> Reply:
         """
         Gera resposta sugerida usando LLM
         
         Returns:
-            Dict com: reply, tone, max_words
+            Reply com llm_call (tokens e latência)
         """
         prompt = self._build_reply_prompt(category, summary, original_text)
         
         try:
-            response = await self.client.chat.completions.create(
-                model=self.settings.LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": "Você é um atendente humano experiente que escreve respostas personalizadas, empáticas e contextualizadas. Nunca use templates genéricos."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,  # Temperatura mais alta para respostas criativas
-                max_tokens=self.settings.LLM_MAX_TOKENS,
-                response_format={"type": "json_object"}
-            )
+            started = time.perf_counter()
+            with span("llm.http", model=self.settings.LLM_MODEL, operation="reply") as active:
+                response = await self.breaker.call(
+                    self.client.chat.completions.create,
+                    model=self.settings.LLM_MODEL,
+                    messages=[
+                        {"role": "system", "content": "Você é um atendente humano experiente que escreve respostas personalizadas, empáticas e contextualizadas. Nunca use templates genéricos."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.7,  # Temperatura mais alta para respostas criativas
+                    max_tokens=self.settings.LLM_MAX_TOKENS,
+                    response_format={"type": "json_object"}
+                )
+                llm_call = self._llm_call_stats(response, started)
+                _annotate_llm_span(active, llm_call)
             
             content = response.choices[0].message.content
-            result = json.loads(content)
-            
-            if "reply" not in result:
-                raise ValueError("Resposta LLM sem campo 'reply'")
+            with span("llm.parse"):
+                result = json.loads(content)
+                
+                if "reply" not in result:
+                    raise ValueError("Resposta LLM sem campo 'reply'")
             
-            return result
+            return Reply(
+                reply=result["reply"],
+                tone=result.get("tone"),
+                llm_call=llm_call
+            )
             
         except Exception as e:
             logger.error(f"Erro ao gerar resposta: {str(e)}")
             raise
     
-    def _build_classification_prompt(self, text: str) -> str:
+    def _llm_call_stats(self, response, started: float) -> Dict:
+        """Tokens (incluindo os de cache do prompt) e latência de uma chamada"""
+        usage = response.usage
+        details = getattr(usage, "prompt_tokens_details", None) if usage else None
+        return {
+            "model": response.model or self.settings.LLM_MODEL,
+            "prompt_tokens": usage.prompt_tokens if usage else 0,
+            "completion_tokens": usage.completion_tokens if usage else 0,
+            "cached_tokens": (getattr(details, "cached_tokens", None) or 0) if details else 0,
+            "latency_ms": round((time.perf_counter() - started) * 1000)
+        }
+    
+    def _build_classification_prompt(self, text: str, max_chars: int = PROMPT_TEXT_CHARS) -> str:
         """Constrói prompt de classificação"""
         return f"""Você é um classificador especialista em triagem de emails corporativos.
 
@@ -169,7 +341,7 @@ Email: "Descubra como GANHAR DINHEIRO rápido! Acesse agora"
 
 EMAIL:
 \"\"\"
-{text[:2000]}
+{text[:max_chars]}
 \"\"\"
 
 **INSTRUÇÕES:**
@@ -186,12 +358,7 @@ Responda APENAS com JSON:
         """Constrói prompt de geração de resposta"""
         
         # Detecta spam no texto original
-        spam_indicators = [
-            "promoção", "ganhe", "desconto", "clique aqui", "oferta", "grátis", "gratuito",
-            "www.", "http", "click", "acesse já", "imperdível", "limitado", "exclusivo",
-            "parabéns você ganhou", "foi selecionado", "prêmio", "sorteio"
-        ]
-        is_spam = any(indicator in original_text.lower() for indicator in spam_indicators)
+        is_spam = rules.is_spam(original_text)
         
         if is_spam:
             instruction = """Este email é SPAM/Propaganda comercial não solicitado. Gere uma resposta CURTA, FIRME e PROFISSIONAL que:
@@ -254,6 +421,51 @@ Responda em JSON:
         return "Improdutivo"  # Default seguro
 
 
+class LocalAIClient:
+    """
+    Modelo local por palavras-chave (sem rede), com a mesma interface de AIClient
+    
+    Usado em dry-runs do processamento em lote; latency simula o tempo de
+    resposta do LLM.
+    """
+    
+    MODEL_NAME = "local-rules"
+    
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+    
+    async def classify_email(self, text: str) -> Classification:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        category, confidence = rules.guess_category(text)
+        return Classification(
+            category=category,
+            confidence=confidence,
+            reason="Classificação local por palavras-chave",
+            model=self.MODEL_NAME
+        )
+    
+    async def classify_document(self, chunks: List[str]) -> Classification:
+        async def classify_chunk(chunk: str) -> Dict:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            category, confidence = rules.guess_category(chunk)
+            return {"category": category, "confidence": confidence, "model": self.MODEL_NAME}
+        
+        return Classification.coerce(await long_document.map_reduce(chunks, classify_chunk))
+    
+    async def generate_reply(self, category: CategoryType, summary: str, original_text: str) -> Reply:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if rules.is_spam(original_text):
+            reply = "Esta mensagem foi identificada como spam. Não aceitamos promoções comerciais neste canal."
+        elif category == "Produtivo":
+            reply = "Recebemos sua mensagem e nossa equipe vai analisar o caso. Retornaremos em até 48h úteis."
+        else:
+            reply = "Agradecemos o contato! Seguimos à disposição."
+        return Reply(reply=reply, tone="cordial")
+
+
 # Singleton instance
 _ai_client: Optional[AIClient] = None
 
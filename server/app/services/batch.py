@@ -0,0 +1,336 @@
+"""
+Batch processing service - Classificação offline em lote com checkpoints
+Pipeline concorrente com filas limitadas:
+leitura -> extração/limpeza (threads) -> LLM (N workers) -> gravação em lotes
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set, TextIO
+
+from app.services.parsing import extract_text_from_file, extract_text_from_message, iter_mbox, parse_email
+from app.services.pipeline import MIN_TEXT_LENGTH, classify_prepared, elapsed_ms, prepare_text
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FILE_EXTENSIONS = (".txt", ".pdf", ".eml")
+
+# Intervalo máximo entre gravações (segundos), mesmo com lote incompleto
+FLUSH_INTERVAL = 2.0
+
+# Campos da análise gravados no --output (sem texto, metadata e llm_calls)
+OUTPUT_COLUMNS = ("id", "category", "confidence", "suggested_reply", "summary", "model_used", "reason")
+
+# Marca de "prazo de gravação vencido" na fila do writer
+_FLUSH_TICK = object()
+
+
+# --- Fontes de entrada ---
+# Cada item é um dict {"key", "load", "metadata"}; "load" roda em thread e
+# devolve o texto extraído. "key" é estável entre execuções (checkpoint).
+# "is_email" (padrão True) é False para documentos (PDF, .txt).
+
+def iter_directory(path: Path) -> Iterator[Dict]:
+    """Arquivos .txt/.pdf/.eml do diretório (recursivo, ordem estável)"""
+    for file_path in sorted(p for p in path.rglob("*") if p.suffix.lower() in SUPPORTED_FILE_EXTENSIONS):
+        relative = file_path.relative_to(path).as_posix()
+        yield {
+            "key": relative,
+            "load": lambda fp=file_path: extract_text_from_file(fp.read_bytes(), fp.name),
+            "is_email": file_path.suffix.lower() == ".eml",
+            "metadata": {"source": "file", "path": relative},
+        }
+
+
+def _invalid_line(line_number: int, error: Exception) -> str:
+    raise ValueError(f"Linha {line_number} inválida: {type(error).__name__}: {error}")
+
+
+def iter_jsonl(path: Path) -> Iterator[Dict]:
+    """
+    Linhas JSON com campo "text" (e "id" opcional, usado como chave)
+
+    Linha malformada ou sem "text" não interrompe o lote: vira um item cujo
+    load falha, registrado como falha (e refeito na próxima execução).
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                text = record["text"]
+            except (ValueError, KeyError, TypeError) as e:
+                yield {
+                    "key": f"line-{line_number}",
+                    "load": lambda line_number=line_number, error=e: _invalid_line(line_number, error),
+                    "metadata": {"source": "jsonl", "source_id": f"line-{line_number}"},
+                }
+                continue
+            key = str(record.get("id", f"line-{line_number}"))
+            yield {
+                "key": key,
+                "load": lambda text=text: text,
+                "metadata": {"source": "jsonl", "source_id": key},
+            }
+
+
+def iter_mbox_items(path: Path) -> Iterator[Dict]:
+    """Mensagens de um mbox, uma por vez (memória constante)"""
+    with open(path, "rb") as f:
+        for index, raw in enumerate(iter_mbox(f)):
+            def load(raw=raw):
+                return extract_text_from_message(parse_email(raw))
+            yield {"key": f"mbox-{index}", "load": load, "metadata": {"source": "mbox", "mbox_index": index}}
+
+
+def open_source(path: Path) -> Iterator[Dict]:
+    """
+    Escolhe o leitor pela forma da entrada
+
+    Raises:
+        ValueError: Se a entrada não for diretório, .jsonl ou .mbox
+    """
+    if path.is_dir():
+        return iter_directory(path)
+    if path.suffix.lower() == ".jsonl":
+        return iter_jsonl(path)
+    if path.suffix.lower() == ".mbox":
+        return iter_mbox_items(path)
+    raise ValueError(f"Entrada não suportada: {path} (use diretório, .jsonl ou .mbox)")
+
+
+def count_source(path: Path) -> int:
+    """Conta os itens da entrada sem extrair texto (para progresso/ETA)"""
+    if path.is_dir():
+        return sum(1 for p in path.rglob("*") if p.suffix.lower() in SUPPORTED_FILE_EXTENSIONS)
+    with open(path, "rb") as f:
+        if path.suffix.lower() == ".jsonl":
+            return sum(1 for line in f if line.strip())
+        return sum(1 for _ in iter_mbox(f))
+
+
+# --- Checkpoint e progresso ---
+
+class Checkpoint:
+    """Arquivo append-only com as chaves já gravadas (uma por linha)"""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def load(self) -> Set[str]:
+        if not self.path.exists():
+            return set()
+        with open(self.path, encoding="utf-8") as f:
+            return {line.rstrip("\n") for line in f if line.strip()}
+
+    def append(self, keys) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(f"{key}\n" for key in keys)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class Progress:
+    """Linha de progresso com vazão e ETA (no máximo 2 atualizações/s)"""
+
+    def __init__(self, total: Optional[int] = None, stream: Optional[TextIO] = sys.stderr):
+        self.total = total
+        self.stream = stream
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._last_render = 0.0
+
+    def advance(self, done: int = 0, skipped: int = 0, failed: int = 0) -> None:
+        self.done += done
+        self.skipped += skipped
+        self.failed += failed
+        self.render()
+
+    def render(self, force: bool = False) -> None:
+        if self.stream is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_render < 0.5:
+            return
+        self._last_render = now
+        elapsed = max(now - self.started, 1e-9)
+        rate = self.done / elapsed
+        line = f"{self.done} classificados, {self.skipped} pulados, {self.failed} falhas | {rate:.1f} emails/s"
+        if self.total is not None:
+            remaining = max(self.total - self.done - self.skipped - self.failed, 0)
+            eta = remaining / rate if rate > 0 else float("inf")
+            eta_text = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta != float("inf") else "--:--:--"
+            line = f"[{self.done + self.skipped + self.failed}/{self.total}] {line} | ETA {eta_text}"
+        self.stream.write("\r" + line)
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.render(force=True)
+        if self.stream is not None:
+            self.stream.write("\n")
+
+
+# --- Pipeline ---
+
+class BatchRunner:
+    """Executa o pipeline concorrente sobre uma fonte de itens"""
+
+    def __init__(self, ai_client, db=None, output: Optional[TextIO] = None,
+                 checkpoint: Optional[Checkpoint] = None, concurrency: int = 8,
+                 extract_workers: int = 2, queue_size: int = 64, batch_size: int = 100,
+                 progress: Optional[Progress] = None):
+        self.ai_client = ai_client
+        self.db = db
+        self.output = output
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.extract_workers = extract_workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.progress = progress or Progress(stream=None)
+
+    async def run(self, items: Iterator[Dict]) -> Dict:
+        """
+        Processa todos os itens ainda não registrados no checkpoint
+
+        Returns:
+            Dict com: done, skipped, failed
+        """
+        done_keys = self.checkpoint.load() if self.checkpoint else set()
+        to_extract: asyncio.Queue = asyncio.Queue(self.queue_size)
+        to_classify: asyncio.Queue = asyncio.Queue(self.queue_size)
+        to_write: asyncio.Queue = asyncio.Queue(self.queue_size)
+
+        writer = asyncio.create_task(self._write(to_write))
+        extractors = [asyncio.create_task(self._extract(to_extract, to_classify))
+                      for _ in range(self.extract_workers)]
+        classifiers = [asyncio.create_task(self._classify(to_classify, to_write))
+                       for _ in range(self.concurrency)]
+        feeder = asyncio.create_task(self._feed(items, done_keys, to_extract, extractors,
+                                                to_classify, classifiers, to_write))
+        tasks = [feeder, writer, *extractors, *classifiers]
+        try:
+            # O writer só termina antes do feeder se falhar; sem ele ninguém
+            # drena to_write e os estágios anteriores travariam na fila cheia
+            await asyncio.wait([feeder, writer], return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Aguarda o writer gravar o lote pendente mesmo em caso de interrupção
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.progress.close()
+
+        for task in (writer, feeder):
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+
+        return {"done": self.progress.done, "skipped": self.progress.skipped, "failed": self.progress.failed}
+
+    async def _feed(self, items: Iterator[Dict], done_keys: Set[str], to_extract: asyncio.Queue,
+                    extractors, to_classify: asyncio.Queue, classifiers, to_write: asyncio.Queue):
+        """Lê a fonte e encerra os estágios em ordem (um None por worker)"""
+        await self._produce(items, done_keys, to_extract)
+        for _ in extractors:
+            await to_extract.put(None)
+        await asyncio.gather(*extractors)
+        for _ in classifiers:
+            await to_classify.put(None)
+        await asyncio.gather(*classifiers)
+        await to_write.put(None)
+
+    async def _produce(self, items: Iterator[Dict], done_keys: Set[str], to_extract: asyncio.Queue):
+        """Enfileira os itens fora do checkpoint"""
+        iterator = iter(items)
+        while True:
+            # Leitura da fonte (disco) fora do event loop
+            item = await asyncio.to_thread(next, iterator, None)
+            if item is None:
+                break
+            if item["key"] in done_keys:
+                self.progress.advance(skipped=1)
+                continue
+            await to_extract.put(item)
+
+    async def _extract(self, to_extract: asyncio.Queue, to_classify: asyncio.Queue):
+        """Worker de extração/limpeza (em thread)"""
+        while (item := await to_extract.get()) is not None:
+            try:
+                prepared = await asyncio.to_thread(self._prepare, item)
+            except Exception as e:
+                logger.error(f"Erro ao extrair {item['key']}: {str(e)}")
+                self.progress.advance(failed=1)
+                continue
+            if prepared is None:
+                self.progress.advance(skipped=1)
+                continue
+            await to_classify.put((item, prepared))
+
+    async def _classify(self, to_classify: asyncio.Queue, to_write: asyncio.Queue):
+        """Worker de classificação (chamada ao LLM)"""
+        while (entry := await to_classify.get()) is not None:
+            item, prepared = entry
+            try:
+                analysis = await classify_prepared(prepared, item["metadata"], self.ai_client)
+            except Exception as e:
+                logger.error(f"Erro ao classificar {item['key']}: {str(e)}")
+                self.progress.advance(failed=1)
+                continue
+            await to_write.put((item["key"], analysis))
+
+    @staticmethod
+    def _prepare(item: Dict) -> Optional[Dict]:
+        """Extração + limpeza (roda em thread); None se o texto for curto demais"""
+        started = time.perf_counter()
+        text = item["load"]()
+        item["metadata"]["timings"] = {"extract_ms": elapsed_ms(started)}
+        if len(text.strip()) < MIN_TEXT_LENGTH:
+            return None
+        return prepare_text(text, item.get("is_email", True))
+
+    async def _write(self, queue: asyncio.Queue):
+        """Grava em lotes (DB, JSONL, checkpoint) por tamanho ou intervalo"""
+        pending = []
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        try:
+            while True:
+                timeout = max(deadline - time.monotonic(), 0)
+                try:
+                    entry = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    entry = _FLUSH_TICK
+                if entry is None:
+                    break
+                if entry is not _FLUSH_TICK:
+                    pending.append(entry)
+                if len(pending) >= self.batch_size or time.monotonic() >= deadline:
+                    await self._flush(pending)
+                    pending = []
+                    deadline = time.monotonic() + FLUSH_INTERVAL
+        finally:
+            await self._flush(pending)
+
+    async def _flush(self, pending) -> None:
+        if not pending:
+            return
+        analyses = [analysis for _, analysis in pending]
+        # COPY/INSERT em thread: as chamadas ao LLM seguem enquanto o lote grava
+        if self.db is not None and await asyncio.to_thread(self.db.save_analyses, analyses) != len(analyses):
+            # Nada vai para o checkpoint: o lote será refeito na próxima execução
+            logger.error(f"Falha ao gravar lote de {len(analyses)} análises")
+            self.progress.advance(failed=len(analyses))
+            return
+        if self.output is not None:
+            for key, analysis in pending:
+                record = {column: getattr(analysis, column) for column in OUTPUT_COLUMNS}
+                self.output.write(json.dumps({"key": key, **record}, ensure_ascii=False) + "\n")
+            self.output.flush()
+        if self.checkpoint is not None:
+            self.checkpoint.append(key for key, _ in pending)
+        self.progress.advance(done=len(pending))
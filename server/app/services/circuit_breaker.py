@@ -0,0 +1,146 @@
+"""
+Circuit breaker - Falha rápido quando uma dependência externa está fora ou lenta
+Estados: closed (normal) -> open (rejeita tudo) -> half_open (chamadas de teste)
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Chamada rejeitada sem tentar: o circuito está aberto"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Serviço {name} indisponível (circuito aberto, nova tentativa em {retry_after:.0f}s)")
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker com janela deslizante das últimas chamadas
+
+    Abre quando, com pelo menos min_calls na janela:
+    - a taxa de falhas (exceções e timeouts) passa de failure_rate, ou
+    - a taxa de chamadas lentas (> slow_call_seconds) passa de slow_call_rate
+
+    Aberto, rejeita com CircuitOpenError por open_seconds; depois deixa passar
+    até half_open_calls chamadas de teste. Se todas tiverem sucesso, fecha;
+    qualquer falha reabre.
+    """
+
+    def __init__(self, name: str, failure_rate: float = 0.5, slow_call_rate: float = 0.8,
+                 slow_call_seconds: float = 10.0, window_size: int = 20, min_calls: int = 5,
+                 open_seconds: float = 30.0, half_open_calls: int = 1,
+                 call_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.call_timeout = call_timeout
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        # (falhou, lenta) das últimas window_size chamadas
+        self._window = deque(maxlen=window_size)
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+
+    def retry_after(self) -> float:
+        """Segundos até o circuito aceitar uma chamada de teste"""
+        return max(self.opened_at + self.open_seconds - time.monotonic(), 0.0)
+
+    def current_state(self) -> str:
+        """Estado atual, promovendo open -> half_open quando o prazo venceu"""
+        if self.state == OPEN and self.retry_after() == 0:
+            self._transition(HALF_OPEN)
+        return self.state
+
+    async def call(self, func: Callable[..., Awaitable], *args, **kwargs):
+        """
+        Executa func através do circuito
+
+        Raises:
+            CircuitOpenError: Se o circuito estiver aberto (sem chamar func)
+            asyncio.TimeoutError: Se a chamada passar de call_timeout
+        """
+        self._before_call()
+        started = time.monotonic()
+        try:
+            if self.call_timeout:
+                result = await asyncio.wait_for(func(*args, **kwargs), self.call_timeout)
+            else:
+                result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            self._release()
+            raise
+        except Exception:
+            self._record(failed=True, elapsed=time.monotonic() - started)
+            raise
+        self._record(failed=False, elapsed=time.monotonic() - started)
+        return result
+
+    def _before_call(self):
+        state = self.current_state()
+        if state == OPEN:
+            raise CircuitOpenError(self.name, self.retry_after())
+        if state == HALF_OPEN:
+            if self._half_open_in_flight >= self.half_open_calls:
+                raise CircuitOpenError(self.name, self.open_seconds)
+            self._half_open_in_flight += 1
+
+    def _release(self):
+        if self.state == HALF_OPEN and self._half_open_in_flight:
+            self._half_open_in_flight -= 1
+
+    def _record(self, failed: bool, elapsed: float):
+        slow = elapsed > self.slow_call_seconds
+
+        if self.state == HALF_OPEN:
+            self._release()
+            if failed or slow:
+                self._transition(OPEN)
+                return
+            self._half_open_successes += 1
+            if self._half_open_successes >= self.half_open_calls:
+                self._transition(CLOSED)
+            return
+
+        if self.state != CLOSED:
+            # Chamada iniciada antes de o circuito abrir
+            return
+
+        self._window.append((failed, slow))
+        calls = len(self._window)
+        if calls < self.min_calls:
+            return
+        failures = sum(1 for f, _ in self._window if f)
+        slow_calls = sum(1 for _, s in self._window if s)
+        if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+            logger.warning(
+                f"Circuito {self.name} aberto: {failures}/{calls} falhas, {slow_calls}/{calls} lentas"
+            )
+            self._transition(OPEN)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.info(f"Circuito {self.name}: {self.state} -> {state}")
+        self.state = state
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state == CLOSED:
+            self._window.clear()
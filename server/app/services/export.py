@@ -0,0 +1,91 @@
+"""
+Export service - Serialização das análises em NDJSON ou CSV, em streaming
+Cada função recebe e devolve iteradores: nenhuma etapa guarda o resultado
+inteiro em memória (usado por GET /api/export)
+"""
+import csv
+import io
+import json
+import zlib
+from typing import Dict, Iterable, Iterator
+
+from app.models.records import Analysis
+
+EXPORT_COLUMNS = (
+    "id", "created_at", "category", "confidence", "model_used",
+    "summary", "reason", "suggested_reply", "metadata"
+)
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Bytes acumulados antes de entregar um pedaço ao servidor
+CHUNK_SIZE = 64 * 1024
+
+
+def _export_row(analysis: Analysis) -> Dict:
+    row = {column: getattr(analysis, column) for column in EXPORT_COLUMNS}
+    # Sem metadata: null/vazio, como na coluna do banco
+    row["metadata"] = row["metadata"] or None
+    return row
+
+
+def iter_ndjson(analyses: Iterable[Analysis]) -> Iterator[str]:
+    """Uma análise por linha, em JSON"""
+    for analysis in analyses:
+        yield json.dumps(_export_row(analysis), ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def iter_csv(analyses: Iterable[Analysis]) -> Iterator[str]:
+    """CSV com cabeçalho; metadata vai como JSON na coluna"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for analysis in analyses:
+        row = _export_row(analysis)
+        if row["metadata"] is not None:
+            row["metadata"] = json.dumps(row["metadata"], ensure_ascii=False, separators=(",", ":"))
+        writer.writerow(row.values())
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def iter_chunks(lines: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Agrupa linhas em pedaços de ~chunk_size bytes (menos escritas no socket)"""
+    parts, size = [], 0
+    for line in lines:
+        data = line.encode()
+        parts.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b"".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b"".join(parts)
+
+
+def iter_gzip(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Comprime os pedaços como um único arquivo .gz"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = container gzip
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(analyses: Iterable[Analysis], fmt: str, gzip: bool = False) -> Iterator[bytes]:
+    """
+    Bytes da exportação no formato pedido
+
+    Raises:
+        ValueError: Se o formato não for ndjson ou csv
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de exportação não suportado: {fmt}")
+    lines = iter_ndjson(analyses) if fmt == "ndjson" else iter_csv(analyses)
+    chunks = iter_chunks(lines)
+    return iter_gzip(chunks) if gzip else chunks
@@ -0,0 +1,105 @@
+"""
+Health monitor - Estado de liveness/readiness mantido em background
+Os probes de /health leem o último resultado em memória, sem abrir conexão
+com o banco a cada chamada
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.settings import get_settings
+from app.services import ai_client as ai_client_module
+from app.services.circuit_breaker import OPEN
+from app.utils.database import get_database
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HealthState:
+    """Resultado da última verificação"""
+    database_connected: bool
+    openai_configured: bool
+    circuit_state: Optional[str]
+    checked_at: float
+
+    @property
+    def ready(self) -> bool:
+        """Pronto para receber tráfego: banco ok e OpenAI não bloqueado pelo circuito"""
+        return self.database_connected and self.circuit_state != OPEN
+
+    @property
+    def healthy(self) -> bool:
+        return self.ready and self.openai_configured
+
+
+def check_database() -> bool:
+    try:
+        return get_database().ping()
+    except Exception as e:
+        logger.warning(f"Health check do banco falhou: {str(e)}")
+        return False
+
+
+def current_circuit_state() -> Optional[str]:
+    """Estado do circuito do OpenAI, sem criar o cliente se ainda não existe"""
+    breaker = getattr(ai_client_module._ai_client, "breaker", None)
+    return breaker.current_state() if breaker else None
+
+
+class HealthMonitor:
+    """Verifica as dependências a cada interval segundos e guarda o resultado"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.state: Optional[HealthState] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def check(self) -> HealthState:
+        """Executa uma verificação agora e atualiza o estado em cache"""
+        database_connected = await asyncio.to_thread(check_database)
+        self.state = HealthState(
+            database_connected=database_connected,
+            openai_configured=get_settings().OPENAI_API_KEY is not None,
+            circuit_state=current_circuit_state(),
+            checked_at=time.time()
+        )
+        return self.state
+
+    async def current(self) -> HealthState:
+        """Estado em cache; só verifica na hora se o monitor ainda não rodou"""
+        state = self.state or await self.check()
+        # O circuito muda entre verificações e ler seu estado é barato
+        state.circuit_state = current_circuit_state()
+        return state
+
+    async def _run(self):
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Erro no health monitor: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+# Singleton instance
+_health_monitor: Optional[HealthMonitor] = None
+
+def get_health_monitor() -> HealthMonitor:
+    """Retorna instância singleton do health monitor"""
+    global _health_monitor
+    if _health_monitor is None:
+        _health_monitor = HealthMonitor(get_settings().HEALTH_CHECK_INTERVAL)
+    return _health_monitor
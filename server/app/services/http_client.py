@@ -0,0 +1,114 @@
+"""
+HTTP client - Pool de conexões compartilhado para as chamadas ao LLM
+Limites de keep-alive, timeouts e HTTP/2 vêm do Settings; as conexões são
+abertas no startup (warm_up) para o primeiro request não pagar TCP + TLS
+"""
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+
+from app.core.metrics import counter
+from app.core.tracing import add_event
+
+try:
+    import h2  # noqa: F401
+except ImportError:  # HTTP/2 é opcional (pip install httpx[http2])
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+http_requests = counter(
+    "llm_http_requests_total",
+    "Requisições HTTP feitas ao provedor do LLM"
+)
+http_connections = counter(
+    "llm_http_connections_opened_total",
+    "Conexões TCP novas abertas ao provedor do LLM (reuso = 1 - conexões/requisições)"
+)
+
+
+# Eventos do httpcore que marcam o span llm.http; o intervalo entre o início
+# do span e o envio dos cabeçalhos é a espera por uma conexão livre no pool
+TRACED_HTTP_EVENTS = frozenset({
+    "connection.connect_tcp.complete",
+    "connection.start_tls.complete",
+    "http11.send_request_headers.started",
+    "http2.send_request_headers.started",
+    "http11.receive_response_headers.complete",
+    "http2.receive_response_headers.complete",
+    "http11.receive_response_body.complete",
+    "http2.receive_response_body.complete",
+})
+
+
+async def _trace(event_name: str, info: dict):
+    # Eventos do httpcore: só o connect indica conexão nova (o resto é reuso)
+    if event_name == "connection.connect_tcp.complete":
+        http_connections.inc()
+    if event_name in TRACED_HTTP_EVENTS:
+        add_event(event_name)
+
+
+async def _on_request(request: httpx.Request):
+    http_requests.inc()
+    add_event("http.request", url=str(request.url))
+    request.extensions["trace"] = _trace
+
+
+def build_http_client(settings) -> httpx.AsyncClient:
+    """
+    AsyncClient configurado para o AsyncOpenAI
+
+    HTTP/2 (uma conexão multiplexada) só é usado com o pacote h2 instalado;
+    sem ele o pool fica em HTTP/1.1 com keep-alive.
+    """
+    http2 = settings.HTTP2_ENABLED and h2 is not None
+    if settings.HTTP2_ENABLED and h2 is None:
+        logger.warning("HTTP2_ENABLED sem o pacote 'h2': usando HTTP/1.1")
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(
+            settings.LLM_TIMEOUT_SECONDS,
+            connect=settings.HTTP_CONNECT_TIMEOUT
+        ),
+        event_hooks={"request": [_on_request]}
+    )
+
+
+async def warm_up(client: httpx.AsyncClient, base_url: Optional[str], connections: int) -> int:
+    """
+    Abre conexões ao provedor antes do primeiro request real
+
+    As requisições são concorrentes para cada uma ocupar uma conexão do pool
+    (em HTTP/2 todas compartilham a mesma). O status da resposta não importa:
+    a conexão fica no pool em keep-alive.
+
+    Returns:
+        Quantas requisições de aquecimento tiveram resposta
+    """
+    if connections <= 0:
+        return 0
+    url = str(base_url or DEFAULT_BASE_URL).rstrip("/") + "/models"
+
+    async def ping() -> bool:
+        try:
+            await client.head(url)
+            return True
+        except httpx.HTTPError as e:
+            logger.warning(f"Aquecimento de conexão falhou: {str(e)}")
+            return False
+
+    results = await asyncio.gather(*(ping() for _ in range(connections)))
+    warmed = sum(results)
+    logger.info(f"Pool HTTP do LLM aquecido ({warmed}/{connections} conexões)")
+    return warmed
@@ -0,0 +1,71 @@
+"""
+Long document - Classificação de textos longos por map-reduce
+Cada trecho é classificado em paralelo e os resultados viram uma única
+categoria e confiança por voto ponderado pela confiança
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ("Produtivo", "Improdutivo")
+
+
+def reduce_votes(results: List[Dict]) -> Dict:
+    """
+    Combina as classificações dos trechos
+
+    Cada trecho vota nas duas categorias: confidence na que escolheu e
+    1 - confidence na outra. Vence a de maior média; a média é a confiança
+    final (trechos que discordam reduzem a confiança).
+
+    Returns:
+        Dict com: category, confidence, reason, chunks (votos por categoria)
+    """
+    scores = dict.fromkeys(CATEGORIES, 0.0)
+    votes = dict.fromkeys(CATEGORIES, 0)
+    for result in results:
+        votes[result["category"]] += 1
+        for category in CATEGORIES:
+            scores[category] += result["confidence"] if category == result["category"] else 1 - result["confidence"]
+
+    category = max(CATEGORIES, key=lambda c: (scores[c], c == "Produtivo"))
+    strongest = max(
+        (r for r in results if r["category"] == category),
+        key=lambda r: r["confidence"]
+    )
+    return {
+        "category": category,
+        "confidence": round(scores[category] / len(results), 2),
+        "reason": f"{strongest.get('reason', '')} ({votes[category]} de {len(results)} trechos)".strip(),
+        "chunks": {"count": len(results), "votes": votes},
+    }
+
+
+async def map_reduce(chunks: List[str], classify: Callable[[str], Awaitable[Dict]]) -> Dict:
+    """
+    Classifica os trechos em paralelo e reduz com reduce_votes
+
+    Trechos que falharem ficam fora da votação; só falha se todos falharem.
+
+    Returns:
+        Dict de reduce_votes + model e llm_calls (uma por trecho)
+
+    Raises:
+        A exceção do primeiro trecho, se nenhum for classificado
+    """
+    outcomes = await asyncio.gather(*(classify(chunk) for chunk in chunks), return_exceptions=True)
+    results = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+    failures = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+    if not results:
+        raise failures[0]
+    if failures:
+        logger.warning(f"{len(failures)} de {len(chunks)} trechos falharam: {str(failures[0])}")
+
+    reduced = reduce_votes(results)
+    reduced["model"] = results[0].get("model")
+    reduced["llm_calls"] = [result["llm_call"] for result in results if "llm_call" in result]
+    if failures:
+        reduced["chunks"]["failed"] = len(failures)
+    return reduced
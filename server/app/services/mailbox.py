@@ -0,0 +1,334 @@
+"""
+Mailbox poller - Ingestão incremental de caixas IMAP compartilhadas
+A cada ciclo, por pasta: SELECT, UID SEARCH só acima do último UID
+processado (guardado no banco junto com o UIDVALIDITY), UID FETCH em lotes
+pela mesma conexão e classificação pelo pipeline com concorrência limitada.
+Opcionalmente grava a categoria de volta na mensagem como keyword IMAP.
+
+imaplib é bloqueante: as chamadas ao servidor rodam em thread, uma por vez
+(uma conexão por poller).
+"""
+import asyncio
+import imaplib
+import logging
+import re
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.metrics import counter
+from app.services.parsing import extract_text_from_message, parse_email
+from app.services.pipeline import MIN_TEXT_LENGTH, analyze_email
+
+logger = logging.getLogger(__name__)
+
+mailbox_messages = counter(
+    "mailbox_messages_total",
+    "Mensagens IMAP por resultado (classified, skipped, failed, abandoned)"
+)
+
+FETCH_UID_PATTERN = re.compile(rb"UID (\d+)")
+
+# Resultado de uma mensagem que não entra na classificação
+SKIPPED = "skipped"
+FAILED = "failed"
+ABANDONED = "abandoned"  # Falhou IMAP_MAX_ATTEMPTS vezes
+
+# Keyword (com IMAP_FLAG_PREFIX) das mensagens abandonadas
+FAILED_KEYWORD = "Falha"
+
+
+class ImapConnection:
+    """Conexão IMAP reaproveitada entre ciclos (reconecta após falhas)"""
+
+    def __init__(self, host: str, port: int, user: str, password: str,
+                 ssl: bool = True, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.ssl = ssl
+        self.timeout = timeout
+        self._imap: Optional[imaplib.IMAP4] = None
+
+    @property
+    def account(self) -> str:
+        return f"{self.user}@{self.host}"
+
+    def _connected(self) -> imaplib.IMAP4:
+        if self._imap is None:
+            imap_class = imaplib.IMAP4_SSL if self.ssl else imaplib.IMAP4
+            imap = imap_class(self.host, self.port, timeout=self.timeout)
+            imap.login(self.user, self.password)
+            self._imap = imap
+            logger.info(f"Conectado ao IMAP {self.account}")
+        return self._imap
+
+    def close(self):
+        """Encerra a conexão (a próxima chamada reconecta)"""
+        if self._imap is None:
+            return
+        try:
+            self._imap.logout()
+        except (imaplib.IMAP4.error, OSError):
+            pass
+        self._imap = None
+
+    def select(self, folder: str) -> Tuple[int, Optional[int]]:
+        """
+        Seleciona a pasta
+
+        Returns:
+            (UIDVALIDITY, UIDNEXT ou None se o servidor não informar)
+        """
+        imap = self._connected()
+        typ, data = imap.select(_quote(folder))
+        if typ != "OK":
+            raise imaplib.IMAP4.error(f"SELECT {folder} falhou: {data}")
+        uidvalidity = int(imap.response("UIDVALIDITY")[1][0])
+        uidnext = imap.response("UIDNEXT")[1][0]
+        return uidvalidity, int(uidnext) if uidnext else None
+
+    def last_uid(self) -> int:
+        """Maior UID da pasta selecionada (0 se vazia)"""
+        typ, data = self._connected().uid("SEARCH", None, "ALL")
+        uids = [int(uid) for uid in (data[0] or b"").split()]
+        return max(uids, default=0)
+
+    def search_after(self, last_uid: int) -> List[int]:
+        """UIDs maiores que last_uid, em ordem (sem varrer a pasta)"""
+        typ, data = self._connected().uid("SEARCH", None, f"UID {last_uid + 1}:*")
+        # "n:*" sempre inclui a última mensagem, mesmo com UID menor que n
+        return sorted(uid for uid in map(int, (data[0] or b"").split()) if uid > last_uid)
+
+    def fetch(self, uids: Sequence[int]) -> Dict[int, bytes]:
+        """Mensagens completas por UID, sem marcar como lidas (BODY.PEEK)"""
+        typ, data = self._connected().uid("FETCH", ",".join(map(str, uids)), "(BODY.PEEK[])")
+        messages = {}
+        pending = None
+        for item in data:
+            if isinstance(item, tuple):
+                match = FETCH_UID_PATTERN.search(item[0])
+                if match:
+                    messages[int(match.group(1))] = item[1]
+                else:
+                    pending = item[1]
+            elif item and pending is not None:
+                # Servidor mandou o UID depois do corpo: "BODY[] {n} ... UID 5)"
+                match = FETCH_UID_PATTERN.search(item)
+                if match:
+                    messages[int(match.group(1))] = pending
+                pending = None
+        return messages
+
+    def add_keyword(self, uids: Sequence[int], keyword: str):
+        """Adiciona a keyword IMAP às mensagens"""
+        self._connected().uid("STORE", ",".join(map(str, uids)), "+FLAGS.SILENT", f"({keyword})")
+
+
+def _quote(folder: str) -> str:
+    if folder.startswith('"') or not any(char in folder for char in ' "\\'):
+        return folder
+    return '"' + folder.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class MailboxPoller:
+    """
+    Sincroniza pastas IMAP com o pipeline de classificação
+
+    O ponto de sincronização (UIDVALIDITY, último UID) de cada pasta fica no
+    banco e avança depois que o lote foi processado. Uma falha de
+    classificação (ex.: LLM fora) não segura o lote: o UID vai para
+    mailbox_failures e é tentado de novo nos próximos ciclos, até
+    max_attempts tentativas; as mensagens que deram certo não são
+    reprocessadas.
+    """
+
+    def __init__(self, connection: ImapConnection, db, folders: Sequence[str],
+                 batch_size: int = 50, concurrency: int = 4, sync_existing: bool = False,
+                 flag_prefix: Optional[str] = None, max_attempts: int = 5,
+                 analyze: Callable[[str, Dict], Awaitable] = analyze_email):
+        self.connection = connection
+        self.db = db
+        self.folders = list(folders)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.sync_existing = sync_existing
+        self.flag_prefix = flag_prefix
+        self.max_attempts = max_attempts
+        self.analyze = analyze
+
+    async def poll_once(self) -> Dict[str, int]:
+        """
+        Um ciclo em todas as pastas
+
+        Erros de conexão fecham a conexão (reconecta no próximo ciclo) e não
+        propagam.
+
+        Returns:
+            Dict com: classified, skipped, failed, abandoned
+        """
+        totals = {"classified": 0, "skipped": 0, "failed": 0, "abandoned": 0}
+        for folder in self.folders:
+            try:
+                stats = await self.sync_folder(folder)
+            except (imaplib.IMAP4.error, OSError) as e:
+                logger.error(f"Erro IMAP em {self.connection.account}/{folder}: {str(e)}")
+                await asyncio.to_thread(self.connection.close)
+                break
+            for name, value in stats.items():
+                totals[name] += value
+        return totals
+
+    async def run(self, interval: float, stop: Optional[asyncio.Event] = None):
+        """Ciclos a cada interval segundos até stop ser sinalizado"""
+        stop = stop or asyncio.Event()
+        try:
+            while not stop.is_set():
+                totals = await self.poll_once()
+                if any(totals.values()):
+                    logger.info(
+                        f"IMAP: {totals['classified']} classificadas, "
+                        f"{totals['skipped']} ignoradas, {totals['failed']} falhas, "
+                        f"{totals['abandoned']} abandonadas"
+                    )
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await asyncio.to_thread(self.connection.close)
+
+    async def sync_folder(self, folder: str) -> Dict[str, int]:
+        """Processa as falhas pendentes e as mensagens novas de uma pasta"""
+        key = f"{self.connection.account}/{folder}"
+        uidvalidity, uidnext = await asyncio.to_thread(self.connection.select, folder)
+
+        state = await asyncio.to_thread(self.db.get_mailbox_state, key)
+        if state is not None and state["uidvalidity"] == uidvalidity:
+            last_uid = state["last_uid"]
+        else:
+            if state is not None:
+                logger.warning(f"UIDVALIDITY de {key} mudou ({state['uidvalidity']} -> {uidvalidity})")
+                # UIDs renumerados: as falhas antigas apontam para outras mensagens
+                await asyncio.to_thread(self.db.clear_mailbox_failures, key)
+            if self.sync_existing:
+                last_uid = 0
+            elif uidnext is not None:
+                last_uid = uidnext - 1
+            else:
+                last_uid = await asyncio.to_thread(self.connection.last_uid)
+            await asyncio.to_thread(self.db.save_mailbox_state, key, uidvalidity, last_uid)
+
+        stats = {"classified": 0, "skipped": 0, "failed": 0, "abandoned": 0}
+        slots = asyncio.Semaphore(self.concurrency)
+
+        # Falhas de ciclos anteriores (já abaixo do ponto de sincronização)
+        attempts = await asyncio.to_thread(self.db.get_mailbox_failures, key, self.max_attempts)
+        retry_uids = sorted(attempts)
+        for start in range(0, len(retry_uids), self.batch_size):
+            await self._process_batch(key, retry_uids[start:start + self.batch_size], attempts, slots, stats)
+
+        uids = await asyncio.to_thread(self.connection.search_after, last_uid)
+        for start in range(0, len(uids), self.batch_size):
+            batch = uids[start:start + self.batch_size]
+            await self._process_batch(key, batch, {}, slots, stats)
+            # As falhas do lote já estão em mailbox_failures: o ponto avança
+            await asyncio.to_thread(self.db.save_mailbox_state, key, uidvalidity, batch[-1])
+        return stats
+
+    async def _process_batch(self, key: str, batch: List[int], attempts: Dict[int, int],
+                             slots: asyncio.Semaphore, stats: Dict[str, int]) -> None:
+        """
+        Classifica um lote de UIDs em paralelo
+
+        Cada UID é concluído individualmente: falhas vão para mailbox_failures
+        com a contagem de tentativas (attempts traz as anteriores) e, ao
+        chegar em max_attempts, a mensagem é abandonada (keyword
+        <prefixo>Falha, se houver prefixo) para não segurar as seguintes.
+        """
+        messages = await asyncio.to_thread(self.connection.fetch, batch)
+        results = await asyncio.gather(*(
+            self._classify(key, uid, messages.get(uid), slots) for uid in batch
+        ))
+
+        by_category: Dict[str, List[int]] = {}
+        failures: Dict[int, int] = {}
+        resolved: List[int] = []
+        for uid, result in zip(batch, results):
+            if result == FAILED:
+                failures[uid] = attempts.get(uid, 0) + 1
+                if failures[uid] >= self.max_attempts:
+                    logger.error(f"{key} UID {uid} abandonado após {failures[uid]} tentativas")
+                    result = ABANDONED
+                    by_category.setdefault(FAILED_KEYWORD, []).append(uid)
+            else:
+                if uid in attempts:
+                    resolved.append(uid)
+                if result != SKIPPED:
+                    by_category.setdefault(result, []).append(uid)
+            name = result if result in (SKIPPED, FAILED, ABANDONED) else "classified"
+            stats[name] += 1
+            mailbox_messages.inc(result=name)
+
+        if failures:
+            await asyncio.to_thread(self.db.save_mailbox_failures, key, failures)
+        if resolved:
+            await asyncio.to_thread(self.db.clear_mailbox_failures, key, resolved)
+        if self.flag_prefix:
+            for category, category_uids in by_category.items():
+                await asyncio.to_thread(
+                    self.connection.add_keyword, category_uids, f"{self.flag_prefix}{category}"
+                )
+
+    async def _classify(self, mailbox: str, uid: int, raw: Optional[bytes],
+                        slots: asyncio.Semaphore) -> str:
+        """Categoria da mensagem, SKIPPED ou FAILED"""
+        if raw is None:
+            # Removida entre o SEARCH e o FETCH
+            return SKIPPED
+        async with slots:
+            try:
+                msg = await asyncio.to_thread(parse_email, raw)
+                text = await asyncio.to_thread(extract_text_from_message, msg)
+            except Exception as e:
+                logger.error(f"Erro ao extrair {mailbox} UID {uid}: {str(e)}")
+                return SKIPPED
+            if len(text.strip()) < MIN_TEXT_LENGTH:
+                return SKIPPED
+
+            metadata = {"source": "imap", "mailbox": mailbox, "uid": uid}
+            if msg.get("message-id"):
+                metadata["message_id"] = msg["message-id"]
+            try:
+                response = await self.analyze(text, metadata)
+            except Exception as e:
+                logger.error(f"Erro ao classificar {mailbox} UID {uid}: {str(e)}")
+                return FAILED
+            return response.category
+
+
+def build_mailbox_poller(settings, db) -> MailboxPoller:
+    """
+    Poller a partir do Settings
+
+    Raises:
+        ValueError: Sem IMAP_HOST, IMAP_USER ou IMAP_PASSWORD
+    """
+    if not (settings.IMAP_HOST and settings.IMAP_USER and settings.IMAP_PASSWORD):
+        raise ValueError("Configure IMAP_HOST, IMAP_USER e IMAP_PASSWORD para ler a caixa de email")
+    connection = ImapConnection(
+        settings.IMAP_HOST,
+        settings.IMAP_PORT,
+        settings.IMAP_USER,
+        settings.IMAP_PASSWORD,
+        ssl=settings.IMAP_SSL
+    )
+    return MailboxPoller(
+        connection,
+        db,
+        folders=[folder.strip() for folder in settings.IMAP_FOLDERS.split(",") if folder.strip()],
+        batch_size=settings.IMAP_BATCH_SIZE,
+        concurrency=settings.IMAP_CONCURRENCY,
+        sync_existing=settings.IMAP_SYNC_EXISTING,
+        flag_prefix=settings.IMAP_FLAG_PREFIX,
+        max_attempts=settings.IMAP_MAX_ATTEMPTS
+    )
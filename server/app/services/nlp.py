@@ -5,7 +5,7 @@ Utiliza NLTK para remoção de stopwords em português
 import re
 import nltk
 from nltk.corpus import stopwords
-from typing import Set
+from typing import List, Set
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,6 +20,31 @@ except LookupError:
 # Cache das stopwords
 STOP_WORDS: Set[str] = set(stopwords.words('portuguese'))
 
+# Padrões compilados uma vez (compartilhados entre workers via preload)
+URL_PATTERN = re.compile(r'http\S+|www\.\S+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+LINE_BREAKS_PATTERN = re.compile(r'[\r\n]+')
+SPECIAL_CHARS_PATTERN = re.compile(r'[^a-z0-9ãâêîôõçáéíóú ]')
+
+# Fim de frase (pontuação seguida de espaço) ou parágrafo
+SENTENCE_END_PATTERN = re.compile(r'(?<=[.!?…])\s+|\n\s*\n')
+
+# Início do histórico/rodapé (testados linha a linha, em minúsculas)
+REPLY_HEADER_PREFIXES = ("em ", "on ", "no dia ")
+REPLY_HEADER_SUFFIXES = ("escreveu:", "wrote:")
+ORIGINAL_MESSAGE_PATTERN = re.compile(r'^-{2,}\s*(mensagem original|original message)\s*-{2,}$')
+HEADER_FIELD_PATTERN = re.compile(r'^(de|from)\s*:')
+HEADER_SENT_PATTERN = re.compile(r'^(enviad[oa]|sent|data|date)\s*:')
+SIGNATURE_PATTERN = re.compile(r'^--$')  # Delimitador de assinatura "-- "
+# Separador do Outlook: só conta seguido do cabeçalho "De:"; sozinho é linha
+# de assinatura de contrato, formulário etc.
+OUTLOOK_SEPARATOR_PATTERN = re.compile(r'^_{10,}$')
+MOBILE_SIGNATURE_PREFIXES = ("enviado do meu", "enviado de meu", "sent from my", "obter o outlook", "get outlook for")
+DISCLAIMER_PATTERN = re.compile(
+    r'^(aviso legal|aviso de confidencialidade|confidentiality notice|disclaimer)\b'
+    r'|(esta mensagem|este e-?mail|this (e-?mail|message)).{0,120}(confidencia|confidential|privileged)'
+)
+
 
 def clean_text(text: str, remove_stopwords: bool = True) -> str:
     """
@@ -43,19 +68,19 @@ def clean_text(text: str, remove_stopwords: bool = True) -> str:
     t = text.lower()
     
     # Remove URLs
-    t = re.sub(r'http\S+|www\.\S+', '', t)
+    t = URL_PATTERN.sub('', t)
     
     # Normaliza espaços em branco
-    t = re.sub(r'\s+', ' ', t)
+    t = WHITESPACE_PATTERN.sub(' ', t)
     
     # Remove múltiplas quebras de linha
-    t = re.sub(r'[\r\n]+', ' ', t)
+    t = LINE_BREAKS_PATTERN.sub(' ', t)
     
     # Remove caracteres especiais, mantém letras com acentos PT-BR
-    t = re.sub(r'[^a-z0-9ãâêîôõçáéíóú ]', ' ', t)
+    t = SPECIAL_CHARS_PATTERN.sub(' ', t)
     
     # Remove espaços extras
-    t = re.sub(r'\s+', ' ', t).strip()
+    t = WHITESPACE_PATTERN.sub(' ', t).strip()
     
     # Remove stopwords se solicitado
     if remove_stopwords:
@@ -65,6 +90,112 @@ def clean_text(text: str, remove_stopwords: bool = True) -> str:
     return t
 
 
+def strip_reply_history(text: str) -> str:
+    """
+    Mantém só o conteúdo novo do email
+    
+    Remove em uma passada (tempo linear):
+    - Linhas citadas com ">"
+    - Tudo a partir do cabeçalho da mensagem respondida ("Em ... escreveu:",
+      "On ... wrote:", "-----Mensagem original-----", "De: ... / Enviado: ...")
+    - Assinatura ("-- ", "Enviado do meu iPhone") e avisos legais de rodapé
+    
+    Se nada sobrar (email só com citação), devolve o texto original.
+    Só para emails: em documentos (PDF, .txt) linhas como "De:/Data:" de
+    timbre ou de assinatura não marcam histórico (veja prepare_text).
+    
+    Args:
+        text: Texto extraído do email
+        
+    Returns:
+        Texto sem histórico, assinatura e rodapé
+    """
+    lines = text.splitlines()
+    kept = []
+    
+    for index, line in enumerate(lines):
+        current = line.strip().lower()
+        if current.startswith(">"):
+            continue
+        if current and _starts_footer(current, lines[index + 1].strip().lower() if index + 1 < len(lines) else ""):
+            break
+        kept.append(line)
+    
+    stripped = "\n".join(kept).strip()
+    return stripped or text.strip()
+
+
+def split_into_chunks(text: str, chunk_chars: int, overlap_chars: int = 0, max_chunks: int = 0) -> List[str]:
+    """
+    Divide um texto longo em trechos que terminam em fim de frase
+    
+    Cada trecho repete as últimas frases do anterior (até overlap_chars)
+    para não perder contexto na fronteira. Frases maiores que o trecho são
+    cortadas no tamanho.
+    
+    Args:
+        text: Texto completo (com pontuação, antes do clean_text)
+        chunk_chars: Tamanho alvo de cada trecho
+        overlap_chars: Sobreposição máxima entre trechos vizinhos
+        max_chunks: Se > 0, aumenta chunk_chars para o texto inteiro caber
+            em até max_chunks trechos
+        
+    Returns:
+        Lista de trechos (o próprio texto se couber em um)
+    """
+    if max_chunks > 0:
+        chunk_chars = max(chunk_chars, -(-len(text) // max_chunks) + overlap_chars)
+    if len(text) <= chunk_chars:
+        return [text]
+    
+    sentences = []
+    for sentence in SENTENCE_END_PATTERN.split(text):
+        sentence = sentence.strip()
+        while len(sentence) > chunk_chars:
+            sentences.append(sentence[:chunk_chars])
+            sentence = sentence[chunk_chars:]
+        if sentence:
+            sentences.append(sentence)
+    
+    chunks = []
+    current: List[str] = []
+    size = 0
+    for sentence in sentences:
+        if current and size + len(sentence) > chunk_chars:
+            chunks.append(" ".join(current))
+            # Recomeça com o fim do trecho anterior (sobreposição)
+            overlap: List[str] = []
+            overlap_size = 0
+            for previous in reversed(current):
+                if overlap_size + len(previous) > overlap_chars or overlap_size + len(previous) + len(sentence) > chunk_chars:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += len(previous) + 1
+            current, size = overlap, overlap_size
+        current.append(sentence)
+        size += len(sentence) + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _starts_footer(line: str, next_line: str) -> bool:
+    """True se a linha inicia histórico citado, assinatura ou aviso legal"""
+    if line.startswith(REPLY_HEADER_PREFIXES):
+        # Clientes de email quebram o cabeçalho longo em duas linhas
+        if line.endswith(REPLY_HEADER_SUFFIXES) or next_line.endswith(REPLY_HEADER_SUFFIXES):
+            return True
+    if ORIGINAL_MESSAGE_PATTERN.match(line):
+        return True
+    if HEADER_FIELD_PATTERN.match(line) and HEADER_SENT_PATTERN.match(next_line):
+        return True
+    if OUTLOOK_SEPARATOR_PATTERN.match(line) and HEADER_FIELD_PATTERN.match(next_line):
+        return True
+    if SIGNATURE_PATTERN.match(line) or line.startswith(MOBILE_SIGNATURE_PREFIXES):
+        return True
+    return DISCLAIMER_PATTERN.search(line) is not None
+
+
 def extract_summary(text: str, max_chars: int = 150) -> str:
     """
     Extrai um resumo simples do texto (primeiras linhas)
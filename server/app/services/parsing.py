@@ -1,17 +1,31 @@
 """
-Text extraction service - Extrai texto de PDFs e arquivos texto
+Text extraction service - Extrai texto de PDFs, arquivos texto e emails MIME
 Utiliza PyMuPDF (fitz) para PDFs por ser rápido e confiável
 """
 import fitz  # PyMuPDF
-from typing import Union
+import re
+from email import policy
+from email.message import EmailMessage
+from email.parser import Parser
+from html.parser import HTMLParser
+from typing import BinaryIO, Iterator, List, Union
 
 
-def extract_pdf_text_bytes(file_bytes: bytes) -> str:
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Tags HTML que viram quebra de linha no texto extraído
+_BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "table"}
+
+# mboxrd: linhas ">From ", ">>From " ... perdem um ">" na leitura
+_MBOXRD_ESCAPED_FROM = re.compile(rb"^>+From ")
+
+
+def extract_pdf_text_bytes(file_bytes: BytesLike) -> str:
     """
     Extrai texto de um PDF a partir de bytes
     
     Args:
-        file_bytes: Bytes do arquivo PDF
+        file_bytes: Bytes do arquivo PDF (bytes, bytearray ou memoryview, sem cópia)
         
     Returns:
         Texto extraído de todas as páginas
@@ -21,21 +35,19 @@ def extract_pdf_text_bytes(file_bytes: bytes) -> str:
     """
     try:
         doc = fitz.open(stream=file_bytes, filetype="pdf")
-        text = ""
-        for page in doc:
-            text += page.get_text()
+        text = "".join(page.get_text() for page in doc)
         doc.close()
         return text.strip()
     except Exception as e:
         raise Exception(f"Erro ao extrair texto do PDF: {str(e)}")
 
 
-def extract_text_from_file(file_bytes: bytes, filename: str) -> str:
+def extract_text_from_file(file_bytes: BytesLike, filename: str) -> str:
     """
     Extrai texto baseado na extensão do arquivo
     
     Args:
-        file_bytes: Bytes do arquivo
+        file_bytes: Bytes do arquivo (bytes, bytearray ou memoryview)
         filename: Nome do arquivo (usado para determinar extensão)
         
     Returns:
@@ -48,11 +60,160 @@ def extract_text_from_file(file_bytes: bytes, filename: str) -> str:
     
     if filename_lower.endswith('.pdf'):
         return extract_pdf_text_bytes(file_bytes)
+    elif filename_lower.endswith('.eml'):
+        return extract_text_from_email(file_bytes)
     elif filename_lower.endswith('.txt'):
+        # str() decodifica direto do buffer (memoryview não tem .decode)
         try:
-            return file_bytes.decode('utf-8')
+            return str(file_bytes, 'utf-8')
         except UnicodeDecodeError:
             # Fallback para latin-1 se UTF-8 falhar
-            return file_bytes.decode('latin-1')
+            return str(file_bytes, 'latin-1')
+    elif filename_lower.endswith('.mbox'):
+        raise ValueError(
+            "Arquivos .mbox contêm várias mensagens: use iter_mbox() / processamento em lote"
+        )
     else:
         raise ValueError(f"Formato de arquivo não suportado: {filename}")
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """Converte HTML em texto simples (ignora script/style)"""
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+    
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self._skip = max(0, self._skip - 1)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+    
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """
+    Extrai o texto visível de um HTML
+    
+    Args:
+        html: Documento ou fragmento HTML
+        
+    Returns:
+        Texto com quebras de linha nos elementos de bloco
+    """
+    parser = _HTMLTextExtractor()
+    parser.feed(html)
+    parser.close()
+    text = "".join(parser.parts)
+    # Colapsa espaços dentro das linhas e linhas em branco repetidas
+    text = re.sub(r"[ \t\r\f\v]+", " ", text)
+    text = re.sub(r" *\n[ \n]*", "\n", text)
+    return text.strip()
+
+
+def parse_email(raw: BytesLike) -> EmailMessage:
+    """
+    Faz o parse de uma mensagem MIME (RFC 5322)
+
+    Decodifica direto do buffer (memoryview do upload), sem a cópia de
+    bytes(raw): é o que BytesParser.parsebytes faz depois de copiar.
+    """
+    return Parser(policy=policy.default).parsestr(str(raw, "ascii", "surrogateescape"))
+
+
+def extract_text_from_message(msg: EmailMessage) -> str:
+    """
+    Extrai o texto relevante de uma mensagem já parseada
+    
+    - Assunto no topo (ajuda na classificação)
+    - Corpo: prefere text/plain; cai para text/html convertido em texto
+    - Anexos PDF: texto extraído anexado ao final
+    
+    Returns:
+        Texto extraído
+    """
+    parts = []
+    
+    subject = msg.get("subject")
+    if subject:
+        parts.append(f"Assunto: {subject}")
+    
+    body = msg.get_body(preferencelist=("plain", "html"))
+    if body is not None:
+        content = body.get_content()
+        if body.get_content_subtype() == "html":
+            content = html_to_text(content)
+        parts.append(content.strip())
+    
+    for attachment in msg.iter_attachments():
+        filename = attachment.get_filename() or ""
+        if attachment.get_content_type() == "application/pdf" or filename.lower().endswith(".pdf"):
+            try:
+                pdf_text = extract_pdf_text_bytes(attachment.get_content())
+            except Exception:
+                continue
+            if pdf_text:
+                parts.append(f"[Anexo: {filename or 'documento.pdf'}]\n{pdf_text}")
+    
+    return "\n\n".join(p for p in parts if p)
+
+
+def extract_text_from_email(raw: BytesLike) -> str:
+    """
+    Extrai texto de um arquivo .eml
+    
+    Args:
+        raw: Bytes da mensagem MIME
+        
+    Returns:
+        Texto extraído (assunto, corpo e anexos PDF)
+    """
+    return extract_text_from_message(parse_email(raw))
+
+
+def iter_mbox(fileobj: BinaryIO) -> Iterator[bytes]:
+    """
+    Percorre um arquivo mbox mensagem a mensagem (memória constante)
+    
+    Lê linha a linha e só mantém a mensagem corrente em memória, então
+    arquivos de vários GB são processados sem carregar o mbox inteiro.
+    Desfaz o escape ">From " (mboxrd/mboxo).
+    
+    Args:
+        fileobj: Arquivo mbox aberto em modo binário
+        
+    Yields:
+        Bytes MIME de cada mensagem (sem a linha separadora "From ")
+    """
+    lines: List[bytes] = []
+    in_message = False
+    previous_blank = True
+    
+    for line in fileobj:
+        if line.startswith(b"From ") and previous_blank:
+            if in_message:
+                yield b"".join(lines)
+            lines = []
+            in_message = True
+            previous_blank = False
+            continue
+        
+        if in_message:
+            if _MBOXRD_ESCAPED_FROM.match(line):
+                line = line[1:]
+            lines.append(line)
+        previous_blank = line in (b"\n", b"\r\n")
+    
+    if in_message:
+        yield b"".join(lines)
@@ -0,0 +1,254 @@
+"""
+Processing pipeline - Etapas compartilhadas entre a API e o processamento em lote
+Preprocessa, classifica, gera resposta e persiste uma análise
+"""
+import asyncio
+import time
+import uuid
+import logging
+from dataclasses import replace
+from typing import AsyncIterator, BinaryIO, Dict, Optional
+
+from app.models.records import Analysis, Classification, Reply
+from app.models.schemas import ProcessResponse
+from app.services import rules
+from app.services.ai_client import get_ai_client
+from app.services.nlp import clean_text, extract_summary, split_into_chunks, strip_reply_history
+from app.services.reply_pool import get_reply_pool
+from app.services.parsing import extract_text_from_message, iter_mbox, parse_email
+from app.services.singleflight import SingleFlight
+from app.services.speculation import SpeculativeReply
+from app.services.status_cache import get_status_cache
+from app.utils.database import compute_text_hash, get_database
+from app.core.logging_config import stage
+from app.core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+MIN_TEXT_LENGTH = 10
+
+# Classificações em andamento, por hash do texto
+_inflight_texts = SingleFlight("analyze_email")
+
+
+def prepare_text(extracted_text: str, is_email: bool = True) -> Dict:
+    """
+    Etapa de preprocessamento (CPU, sem I/O)
+
+    O prompt, o resumo e a resposta usam só o conteúdo novo (body), sem
+    histórico citado, assinatura e rodapé; text continua sendo o original.
+    Documentos (is_email=False: PDF, .txt) não têm histórico de resposta e
+    passam inteiros.
+    Bodies acima de LONG_DOC_THRESHOLD_CHARS são divididos em trechos
+    (chunks, já limpos) para a classificação por map-reduce.
+
+    Returns:
+        Dict com: text, body, clean, chunks, summary, clean_ms
+    """
+    settings = get_settings()
+    started = time.perf_counter()
+    body = strip_reply_history(extracted_text) if is_email else extracted_text.strip()
+    chunks = []
+    if settings.LONG_DOC_ENABLED and len(body) > settings.LONG_DOC_THRESHOLD_CHARS:
+        chunks = [
+            clean_text(chunk, remove_stopwords=False)
+            for chunk in split_into_chunks(
+                body,
+                settings.LONG_DOC_CHUNK_CHARS,
+                settings.LONG_DOC_OVERLAP_CHARS,
+                settings.LONG_DOC_MAX_CHUNKS
+            )
+        ]
+    return {
+        "text": extracted_text,
+        "body": body,
+        "clean": clean_text(body, remove_stopwords=False),
+        "chunks": chunks,
+        "summary": extract_summary(body),
+        "clean_ms": elapsed_ms(started),
+    }
+
+
+def elapsed_ms(started: float) -> float:
+    """Milissegundos desde started (time.perf_counter())"""
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+async def classify_prepared(prepared: Dict, metadata: Optional[Dict] = None, ai_client=None) -> Analysis:
+    """
+    Classifica e gera a resposta de um texto já preprocessado
+
+    Args:
+        prepared: Saída de prepare_text
+        metadata: Dados extras gravados com a análise
+        ai_client: Cliente LLM (padrão: singleton get_ai_client())
+
+    Com SPECULATIVE_REPLY_ENABLED, a resposta para a categoria prevista
+    pelas regras é gerada junto com a classificação; metadata["speculation"]
+    registra o palpite, se acertou e os ms economizados.
+
+    Returns:
+        Analysis pronta para Database.save_analysis, com llm_calls (tokens e
+        latência de cada chamada) e metadata["timings"]
+    """
+    settings = get_settings()
+    ai_client = ai_client or get_ai_client()
+
+    speculation = None
+    if settings.SPECULATIVE_REPLY_ENABLED:
+        guess, _ = rules.guess_category(prepared["body"])
+        # Improdutivo provável: o pool deve responder sem LLM, não vale gastar a chamada
+        if not (settings.REPLY_POOL_ENABLED and guess == "Improdutivo"):
+            speculation = SpeculativeReply(guess, lambda category: ai_client.generate_reply(
+                category=category,
+                summary=prepared["summary"],
+                original_text=prepared["body"]
+            ))
+
+    # Qualquer falha até take/cancel (classificação, pool, resposta) descarta a
+    # especulação: a chamada em segundo plano não pode seguir sem dono
+    try:
+        with stage("classify"):
+            if prepared.get("chunks"):
+                result = await ai_client.classify_document(prepared["chunks"])
+            else:
+                result = await ai_client.classify_email(prepared["clean"])
+        classified_at = time.perf_counter()
+        classification = Classification.coerce(result)
+
+        logger.info(f"Classificação: {classification.category} ({classification.confidence*100:.0f}%)")
+
+        # Improdutivo com alta confiança: resposta do pool, sem segunda chamada ao LLM
+        reply = None
+        if (settings.REPLY_POOL_ENABLED and classification.category == "Improdutivo"
+                and classification.confidence >= settings.REPLY_POOL_MIN_CONFIDENCE):
+            picked = get_reply_pool().pick(prepared["body"])
+            if picked is not None:
+                reply = Reply(reply=picked["reply"], tone=picked["tone"], source=f"pool:{picked['intent']}")
+        
+        metadata = dict(metadata or {})
+        metadata["timings"] = {**metadata.get("timings", {}), "clean_ms": prepared["clean_ms"]}
+        if classification.routing is not None:
+            metadata["routing"] = classification.routing
+        if classification.chunks is not None:
+            metadata["long_document"] = classification.chunks
+        llm_calls = [{"stage": "classify", **call} for call in classification.llm_calls]
+        
+        speculative = None
+        if reply is not None:
+            if speculation is not None:
+                speculation.cancel("pooled")
+            metadata["reply_source"] = reply.source
+        else:
+            with stage("reply"):
+                if speculation is not None:
+                    speculative = await speculation.take(classification.category, classified_at)
+                if speculative is not None:
+                    reply = Reply.coerce(speculative[0])
+                else:
+                    reply = Reply.coerce(await ai_client.generate_reply(
+                        category=classification.category,
+                        summary=prepared["summary"],
+                        original_text=prepared["body"]
+                    ))
+            if reply.llm_call is not None:
+                llm_calls.append({"stage": "reply", **reply.llm_call})
+    finally:
+        if speculation is not None:
+            speculation.cancel("aborted")
+    
+    if speculation is not None:
+        wasted = speculation.wasted
+        wasted_call = Reply.coerce(wasted).llm_call if wasted is not None else None
+        if wasted_call is not None:
+            # Descartada depois de pronta: os tokens foram gastos mesmo assim
+            llm_calls.append({"stage": "reply_speculative", **wasted_call})
+        metadata["speculation"] = {"guess": speculation.guess, "hit": speculative is not None}
+        if speculative is not None:
+            metadata["speculation"]["saved_ms"] = speculative[1]
+    
+    return Analysis(
+        id=str(uuid.uuid4()),
+        category=classification.category,
+        confidence=classification.confidence,
+        suggested_reply=reply.reply,
+        summary=prepared["summary"],
+        model_used=classification.model or settings.LLM_MODEL,
+        reason=classification.reason,
+        full_text=prepared["text"],
+        metadata=metadata,
+        llm_calls=tuple(llm_calls)
+    )
+
+
+async def analyze_email(extracted_text: str, metadata: Optional[Dict] = None,
+                        is_email: bool = True) -> ProcessResponse:
+    """
+    Executa o pipeline completo sobre um texto já extraído
+    
+    Fluxo:
+    1. Preprocessa
+    2. Classifica usando LLM
+    3. Gera resposta sugerida
+    4. Salva no banco
+    
+    Emails idênticos processados ao mesmo tempo (disparos em massa) fazem
+    uma única classificação: os concorrentes reaproveitam o resultado e
+    cada um é salvo com seu próprio id.
+    
+    Args:
+        extracted_text: Texto do email
+        metadata: Dados extras gravados com a análise (origem, hash do upload...)
+        is_email: False para documentos (PDF, .txt): sem remoção de histórico
+        
+    Returns:
+        ProcessResponse com a análise salva
+    """
+    async def classify():
+        with stage("prepare"):
+            prepared = prepare_text(extracted_text, is_email)
+        return await classify_prepared(prepared, metadata)
+    
+    # O mesmo texto como email e como documento prepara bodies diferentes
+    analysis, shared = await _inflight_texts.do((compute_text_hash(extracted_text), is_email), classify)
+    if shared:
+        own_metadata = dict(metadata or {})
+        own_metadata["coalesced_from"] = analysis.id
+        if "reply_source" in analysis.metadata:
+            own_metadata["reply_source"] = analysis.metadata["reply_source"]
+        # Sem llm_calls: o custo já foi contabilizado na análise original
+        analysis = replace(analysis, id=str(uuid.uuid4()), metadata=own_metadata, llm_calls=())
+    
+    with stage("save"):
+        # O cache de status usa o created_at gravado; a resposta mantém o
+        # horário do processamento
+        created_at = await asyncio.to_thread(get_database().save_analysis, analysis)
+        if created_at is not None:
+            get_status_cache().put(analysis, created_at)
+    
+    return analysis.to_response()
+
+
+async def analyze_mbox(fileobj: BinaryIO) -> AsyncIterator[ProcessResponse]:
+    """
+    Classifica um mbox mensagem a mensagem, em memória constante
+
+    Mensagens sem texto suficiente são ignoradas.
+
+    Args:
+        fileobj: Arquivo mbox aberto em modo binário
+
+    Yields:
+        ProcessResponse de cada mensagem, na ordem do arquivo
+    """
+    for index, raw in enumerate(iter_mbox(fileobj)):
+        msg = parse_email(raw)
+        text = extract_text_from_message(msg)
+        if len(text.strip()) < MIN_TEXT_LENGTH:
+            logger.info(f"Mensagem {index} do mbox ignorada: texto muito curto")
+            continue
+
+        metadata = {"source": "mbox", "mbox_index": index}
+        if msg.get("message-id"):
+            metadata["message_id"] = msg["message-id"]
+        yield await analyze_email(text, metadata)
@@ -0,0 +1,142 @@
+"""
+Reply pool - Respostas prontas para emails Improdutivos (sem chamada ao LLM)
+Agradecimentos, felicitações, spam e "problema resolvido" recebem respostas
+curtas e previsíveis: um conjunto curado por intenção, enriquecido com as
+respostas editadas pelos usuários no feedback
+"""
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+from app.services import rules
+from app.utils.database import get_database
+
+logger = logging.getLogger(__name__)
+
+# Ordem importa: a primeira intenção que casar vence
+INTENT_INDICATORS = {
+    "seasonal": ["feliz natal", "feliz ano", "boas festas", "feliz páscoa", "boas férias"],
+    "solved": ["problema resolvido", "já resolv", "funcionou", "deu certo", "foi resolvido", "está resolvido"],
+    "praise": ["parabéns", "excelente atendimento", "ótimo atendimento", "elogi", "muito atencios"],
+    "thanks": ["obrigad", "agradeç", "agradec", "valeu", "grato", "grata"],
+}
+
+CURATED_REPLIES = {
+    "spam": [
+        "Esta mensagem foi identificada como spam. Não aceitamos promoções comerciais neste canal de atendimento.",
+        "Mensagens promocionais não solicitadas não são tratadas por este canal. Para contato comercial, utilize nossos canais oficiais.",
+    ],
+    "seasonal": [
+        "Agradecemos a mensagem e retribuímos os votos! Desejamos boas festas a você e aos seus.",
+        "Muito obrigado pelo carinho! Desejamos a você um ótimo período de festas. Seguimos à disposição.",
+    ],
+    "solved": [
+        "Que ótimo saber que deu tudo certo! Se precisar de algo mais, é só nos chamar.",
+        "Ficamos felizes que o problema foi resolvido. Seguimos à disposição para o que precisar.",
+    ],
+    "praise": [
+        "Muito obrigado pelo reconhecimento! Vamos compartilhar seu elogio com a equipe.",
+        "Agradecemos imensamente o retorno positivo. É um prazer atendê-lo(a)!",
+    ],
+    "thanks": [
+        "Nós que agradecemos o contato! Seguimos à disposição sempre que precisar.",
+        "Por nada! Foi um prazer ajudar. Conte conosco sempre que precisar.",
+    ],
+}
+
+# Respostas aprendidas guardadas por intenção (as mais recentes)
+MAX_LEARNED_PER_INTENT = 20
+# Entre quantas das aprendidas mais recentes a escolha é feita
+LEARNED_CHOICES = 5
+MIN_LEARNED_RATING = 3
+
+
+def match_intent(text: str) -> Optional[str]:
+    """Intenção do email por palavras-chave, ou None se nenhuma casar"""
+    if rules.is_spam(text):
+        return "spam"
+    lower = text.lower()
+    for intent, indicators in INTENT_INDICATORS.items():
+        if any(indicator in lower for indicator in indicators):
+            return intent
+    return None
+
+
+class ReplyPool:
+    """Conjunto curado + aprendido de respostas por intenção"""
+
+    def __init__(self):
+        self.learned: Dict[str, List[str]] = {intent: [] for intent in CURATED_REPLIES}
+
+    def load(self, db) -> int:
+        """
+        Carrega respostas editadas do feedback
+
+        Returns:
+            Quantas respostas foram aprendidas
+        """
+        learned = 0
+        # Do mais antigo para o mais recente: learn() põe cada uma no topo
+        for row in reversed(db.fetch_edited_replies()):
+            learned += self.learn(row["summary"], row["category"], row["edited_reply"], row["rating"])
+        return learned
+
+    def learn(self, summary: str, category: Optional[str], reply: str, rating: Optional[int] = None) -> bool:
+        """
+        Aprende uma resposta editada pelo usuário
+
+        Só entram respostas de emails Improdutivos com intenção reconhecida
+        e avaliação aceitável (ou sem avaliação).
+        """
+        if category != "Improdutivo" or not reply or not reply.strip():
+            return False
+        if rating is not None and rating < MIN_LEARNED_RATING:
+            return False
+        intent = match_intent(summary or "")
+        if intent is None:
+            return False
+
+        reply = reply.strip()
+        replies = self.learned[intent]
+        if reply in replies:
+            replies.remove(reply)
+        replies.insert(0, reply)
+        del replies[MAX_LEARNED_PER_INTENT:]
+        return True
+
+    def pick(self, text: str) -> Optional[Dict]:
+        """
+        Escolhe uma resposta para o email
+
+        A escolha é determinística por texto (o mesmo email recebe a mesma
+        resposta) e prefere as respostas aprendidas às curadas.
+
+        Returns:
+            Dict com: reply, tone, intent, source - ou None se nenhuma intenção casar
+        """
+        intent = match_intent(text)
+        if intent is None:
+            return None
+
+        learned = self.learned[intent][:LEARNED_CHOICES]
+        candidates = learned or CURATED_REPLIES[intent]
+        index = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=4).digest(), "big") % len(candidates)
+        return {
+            "reply": candidates[index],
+            "tone": "firme" if intent == "spam" else "cordial",
+            "intent": intent,
+            "source": "learned" if learned else "curated",
+        }
+
+
+# Singleton instance
+_reply_pool: Optional[ReplyPool] = None
+
+def get_reply_pool() -> ReplyPool:
+    """Retorna instância singleton do pool (carrega o feedback no primeiro uso)"""
+    global _reply_pool
+    if _reply_pool is None:
+        _reply_pool = ReplyPool()
+        learned = _reply_pool.load(get_database())
+        logger.info(f"Reply pool carregado ({learned} respostas aprendidas)")
+    return _reply_pool
@@ -0,0 +1,194 @@
+"""
+Retention service - Arquivamento e compactação incremental da tabela analyses
+Move análises expiradas para arquivos JSONL comprimidos (particionados por mês),
+remove em lotes pequenos e devolve o espaço livre com incremental_vacuum
+"""
+import gzip
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.settings import Settings, get_settings
+from app.utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Páginas devolvidas por passo de incremental_vacuum (mantém o lock curto)
+VACUUM_STEP_PAGES = 1000
+
+
+def parse_policies(raw: str) -> Dict[str, int]:
+    """
+    Converte RETENTION_POLICIES ("Improdutivo:30,Produtivo:365") em dict
+
+    Raises:
+        ValueError: Se alguma política estiver malformada
+    """
+    policies = {}
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        category, sep, days = item.rpartition(":")
+        if not sep or not category.strip() or not days.strip().isdigit():
+            raise ValueError(f"Política de retenção inválida: {item!r}")
+        policies[category.strip()] = int(days)
+    return policies
+
+
+class ArchiveWriter:
+    """Grava linhas em arquivos JSONL comprimidos, um por mês (append)"""
+
+    def __init__(self, archive_dir: str, compression: str = "gzip"):
+        if compression not in ("gzip", "zstd"):
+            raise ValueError(f"Compressão de arquivo não suportada: {compression}")
+        if compression == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                raise ValueError("ARCHIVE_COMPRESSION=zstd requer o pacote 'zstandard'")
+        self.archive_dir = Path(archive_dir)
+        self.compression = compression
+
+    def path_for(self, month: str) -> Path:
+        """Arquivo do mês (YYYY-MM)"""
+        suffix = "gz" if self.compression == "gzip" else "zst"
+        return self.archive_dir / month / f"analyses-{month}.jsonl.{suffix}"
+
+    def write(self, rows: List[Dict]) -> None:
+        """
+        Anexa as linhas aos arquivos dos respectivos meses
+
+        Cada chamada grava um novo membro gzip / frame zstd; leitores padrão
+        (gzip.open, zstd com read_across_frames) leem o arquivo inteiro.
+        Os dados são sincronizados em disco antes de retornar.
+        """
+        by_month = defaultdict(list)
+        for row in rows:
+            by_month[str(row["created_at"])[:7]].append(row)
+
+        for month, month_rows in by_month.items():
+            path = self.path_for(month)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            payload = "".join(
+                json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in month_rows
+            ).encode("utf-8")
+
+            with open(path, "ab") as f:
+                if self.compression == "gzip":
+                    f.write(gzip.compress(payload))
+                else:
+                    import zstandard
+                    f.write(zstandard.ZstdCompressor().compress(payload))
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class RetentionManager:
+    """Aplica as políticas de retenção sobre o backend SQLite"""
+
+    def __init__(self, db: Database, settings: Optional[Settings] = None):
+        if not isinstance(db, Database):
+            raise ValueError("Retenção disponível apenas para o backend SQLite")
+        self.db = db
+        self.settings = settings or get_settings()
+        self.policies = parse_policies(self.settings.RETENTION_POLICIES)
+        self.default_days = self.settings.RETENTION_DEFAULT_DAYS
+        self.max_rows = self.settings.RETENTION_MAX_ROWS
+        self.batch_size = self.settings.RETENTION_BATCH_SIZE
+        self.writer = ArchiveWriter(self.settings.ARCHIVE_DIR, self.settings.ARCHIVE_COMPRESSION)
+
+    @staticmethod
+    def _cutoff(days: int, now: Optional[datetime] = None) -> str:
+        """Timestamp limite no formato de created_at (UTC)"""
+        now = now or datetime.utcnow()
+        return (now - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+    def _archive_batch(self, rows: List[Dict]) -> int:
+        """Arquiva e remove um lote; retorna quantas linhas saíram da tabela"""
+        if not rows:
+            return 0
+        rowids = [row.pop("rowid") for row in rows]
+        # Arquivo gravado (e fsync) antes do DELETE: uma falha no meio pode
+        # duplicar linhas no arquivo, mas nunca perdê-las
+        self.writer.write(rows)
+        return self.db.delete_analyses(rowids)
+
+    def _drain(self, fetch, limit: Optional[int] = None) -> int:
+        """Processa lotes até fetch() esgotar (ou atingir limit linhas)"""
+        total = 0
+        while limit is None or total < limit:
+            size = self.batch_size if limit is None else min(self.batch_size, limit - total)
+            rows = fetch(size)
+            if not rows:
+                break
+            total += self._archive_batch(rows)
+            if len(rows) < size:
+                break
+        return total
+
+    def run_once(self, dry_run: bool = False, now: Optional[datetime] = None) -> Dict:
+        """
+        Executa um ciclo completo de retenção
+
+        Em dry-run nada é lido nem removido: archived traz os totais que
+        seriam arquivados, contados com COUNT(*) sobre os mesmos filtros.
+
+        Returns:
+            Dict com: archived (por política), freed_pages, rows_remaining
+        """
+        archived = {}
+
+        for category, days in self.policies.items():
+            cutoff = self._cutoff(days, now)
+            if dry_run:
+                archived[category] = self.db.count_expired_analyses(cutoff, category)
+            else:
+                archived[category] = self._drain(
+                    lambda size: self.db.fetch_expired_analyses(cutoff, category, size)
+                )
+
+        if self.default_days is not None:
+            cutoff = self._cutoff(self.default_days, now)
+            # Categorias com política própria já foram tratadas acima
+            exclude = tuple(self.policies)
+            if dry_run:
+                archived["*"] = self.db.count_expired_analyses(cutoff, None, exclude)
+            else:
+                archived["*"] = self._drain(
+                    lambda size: self.db.fetch_expired_analyses(cutoff, None, size, exclude)
+                )
+
+        if self.max_rows is not None:
+            # Em dry-run as políticas acima não removeram nada: desconta o que removeriam
+            remaining = self.db.count_analyses() - (sum(archived.values()) if dry_run else 0)
+            excess = remaining - self.max_rows
+            if excess > 0:
+                archived["max_rows"] = excess if dry_run else self._drain(self.db.fetch_oldest_analyses, excess)
+
+        freed_pages = 0 if dry_run else self.compact()
+
+        stats = {
+            "archived": archived,
+            "freed_pages": freed_pages,
+            "rows_remaining": self.db.count_analyses(),
+        }
+        logger.info(f"Retenção concluída: {stats}")
+        return stats
+
+    def compact(self) -> int:
+        """Devolve páginas livres em passos curtos; retorna o total liberado"""
+        freed = 0
+        remaining = self.db.freelist_count()
+        while remaining > 0:
+            after = self.db.incremental_vacuum(VACUUM_STEP_PAGES)
+            if after >= remaining:
+                # auto_vacuum não está em INCREMENTAL: nada a liberar
+                break
+            freed += remaining - after
+            remaining = after
+        return freed
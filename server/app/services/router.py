@@ -0,0 +1,67 @@
+"""
+Model router - Escolhe o modelo de classificação pela dificuldade do email
+Sinais locais baratos (tamanho, regras de spam, perguntas, protocolo) decidem
+entre o modelo barato (LLM_MODEL) e o forte (LLM_STRONG_MODEL)
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from app.services import rules
+
+CHEAP = "cheap"
+STRONG = "strong"
+
+
+@dataclass
+class RoutingDecision:
+    """Tier escolhido e os motivos (registrados no log e na análise)"""
+    tier: str
+    reasons: List[str] = field(default_factory=list)
+    features: Dict = field(default_factory=dict)
+
+
+class ModelRouter:
+    """
+    Roteamento em duas etapas
+
+    1. Antes da chamada: emails longos com várias demandas vão direto ao
+       modelo forte; o resto começa no barato
+    2. Depois: se o barato responder com confiança abaixo de
+       escalation_confidence, a classificação é refeita no forte
+    """
+
+    def __init__(self, long_text_chars: int = 1500, escalation_confidence: float = 0.75):
+        self.long_text_chars = long_text_chars
+        self.escalation_confidence = escalation_confidence
+
+    def features(self, text: str) -> Dict:
+        features = rules.rule_features(text)
+        features["length"] = len(text)
+        features["rule_category"], features["rule_confidence"] = rules.guess_category(text)
+        return features
+
+    def route(self, text: str) -> RoutingDecision:
+        features = self.features(text)
+        reasons = []
+
+        if features["spam"] >= 2 and not features["protocol"]:
+            # Spam óbvio: o barato resolve
+            return RoutingDecision(CHEAP, ["spam"], features)
+
+        if features["length"] > self.long_text_chars:
+            reasons.append("long")
+        if features["questions"] >= 2:
+            reasons.append("multiple_questions")
+        if features["request"] >= 3:
+            reasons.append("multiple_requests")
+        if features["request"] and features["courtesy"]:
+            # Agradecimento + nova demanda: o caso ambíguo clássico
+            reasons.append("mixed_intent")
+
+        # Um sinal isolado não basta: longo E com várias demandas/ambíguo
+        if "long" in reasons and len(reasons) >= 2:
+            return RoutingDecision(STRONG, reasons, features)
+        return RoutingDecision(CHEAP, reasons, features)
+
+    def should_escalate(self, confidence: float) -> bool:
+        return confidence < self.escalation_confidence
@@ -0,0 +1,64 @@
+"""
+Keyword rules - Heurísticas locais baratas (sem LLM)
+Usadas para detectar spam no prompt de resposta e como modelo local
+(LocalAIClient) em execuções de teste/dry-run
+"""
+import re
+from typing import Dict, Tuple
+
+SPAM_INDICATORS = [
+    "promoção", "ganhe", "desconto", "clique aqui", "oferta", "grátis", "gratuito",
+    "www.", "http", "click", "acesse já", "imperdível", "limitado", "exclusivo",
+    "parabéns você ganhou", "foi selecionado", "prêmio", "sorteio"
+]
+
+COURTESY_INDICATORS = [
+    "obrigad", "agradeç", "agradec", "feliz natal", "feliz ano", "boas festas",
+    "parabéns", "problema resolvido", "funcionou", "deu certo", "bom final de semana"
+]
+
+REQUEST_INDICATORS = [
+    "preciso", "solicito", "gostaria", "poderia", "podem", "como faço", "não consigo",
+    "erro", "problema", "urgente", "prazo", "status", "protocolo", "chamado", "pedido"
+]
+
+PROTOCOL_PATTERN = re.compile(r"\b(?:protocolo|chamado|pedido|ticket)\s*(?:n[º°o.]?\s*)?#?\s*\d{3,}", re.IGNORECASE)
+
+
+def count_indicators(text: str, indicators) -> int:
+    """Quantos indicadores da lista aparecem no texto (case-insensitive)"""
+    lower = text.lower()
+    return sum(1 for indicator in indicators if indicator in lower)
+
+
+def is_spam(text: str) -> bool:
+    """True se o texto tiver qualquer indicador de spam/propaganda"""
+    return count_indicators(text, SPAM_INDICATORS) > 0
+
+
+def rule_features(text: str) -> Dict:
+    """Sinais baratos extraídos do texto"""
+    return {
+        "spam": count_indicators(text, SPAM_INDICATORS),
+        "courtesy": count_indicators(text, COURTESY_INDICATORS),
+        "request": count_indicators(text, REQUEST_INDICATORS),
+        "questions": text.count("?"),
+        "protocol": PROTOCOL_PATTERN.search(text) is not None,
+    }
+
+
+def guess_category(text: str) -> Tuple[str, float]:
+    """
+    Palpite local de categoria por palavras-chave
+
+    Returns:
+        (categoria, confiança) - a confiança é deliberadamente conservadora
+    """
+    features = rule_features(text)
+    if features["spam"] >= 2 and not features["protocol"]:
+        return "Improdutivo", 0.85
+    if features["protocol"] or features["questions"] or features["request"] > features["courtesy"]:
+        return "Produtivo", 0.75 if features["courtesy"] else 0.8
+    if features["courtesy"]:
+        return "Improdutivo", 0.85
+    return "Produtivo", 0.6
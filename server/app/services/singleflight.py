@@ -0,0 +1,53 @@
+"""
+Single-flight - Junta chamadas concorrentes com a mesma chave em uma só
+A primeira chamada executa o trabalho; as que chegam enquanto ela está em
+andamento aguardam o mesmo resultado
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from app.core.metrics import counter
+
+singleflight_calls = counter(
+    "singleflight_calls_total",
+    "Chamadas por resultado: leader (executou) ou coalesced (reaproveitou uma em andamento)"
+)
+
+
+class SingleFlight:
+    """Grupo de chamadas em andamento, indexadas por chave"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Executa func() uma única vez por chave entre chamadas concorrentes
+
+        O trabalho roda em uma task própria: se quem o iniciou for cancelado
+        (cliente desconectou), as demais chamadas continuam aguardando.
+
+        Returns:
+            (resultado, shared) - shared=True se o resultado veio de outra chamada
+
+        Raises:
+            A mesma exceção de func() para todas as chamadas aguardando
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            singleflight_calls.inc(group=self.name, result="coalesced")
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(func())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        singleflight_calls.inc(group=self.name, result="leader")
+        return await asyncio.shield(task), False
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
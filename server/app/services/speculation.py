@@ -0,0 +1,99 @@
+"""
+Speculative reply - Gera a resposta em paralelo com a classificação
+Um palpite local da categoria (rules.guess_category) dispara a geração da
+resposta junto com a classificação: se o LLM confirmar a categoria, a
+resposta já está pronta (ou quase) e a latência vira ~max das duas
+chamadas em vez da soma; se não, a especulativa é cancelada e a resposta é
+gerada de novo para a categoria real (e também se a especulativa falhar)
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.metrics import counter
+
+logger = logging.getLogger(__name__)
+
+speculative_replies = counter(
+    "speculative_replies_total",
+    "Respostas especulativas por resultado: hit (categoria confirmada), miss (categoria "
+    "errada), failed (geração falhou), pooled (pool respondeu) ou aborted (classificação falhou)"
+)
+speculative_saved = counter(
+    "speculative_reply_saved_seconds_total",
+    "Latência economizada pelas respostas especulativas aproveitadas"
+)
+
+
+class SpeculativeReply:
+    """Resposta para a categoria prevista, gerada em uma task própria"""
+
+    def __init__(self, guess: str, generate: Callable[[str], Awaitable[Dict]]):
+        self.guess = guess
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.outcome: Optional[str] = None
+        self._task = asyncio.ensure_future(self._run(generate))
+
+    async def _run(self, generate: Callable[[str], Awaitable[Dict]]) -> Dict:
+        try:
+            return await generate(self.guess)
+        finally:
+            self.finished = time.perf_counter()
+
+    def cancel(self, outcome: str = "miss"):
+        """
+        Descarta a resposta; outcome diz o motivo na métrica (miss, pooled, aborted)
+
+        Não faz nada se a especulação já foi resolvida (take ou cancel anterior).
+        """
+        if self.outcome is not None:
+            return
+        self.outcome = outcome
+        if self._task.done():
+            if not self._task.cancelled():
+                self._task.exception()  # Evita o aviso de exceção nunca lida
+        else:
+            self._task.cancel()
+        speculative_replies.inc(outcome=outcome)
+
+    async def take(self, category: str, classified_at: float) -> Optional[Tuple[Dict, float]]:
+        """
+        Resposta especulativa se category for o palpite; senão cancela
+
+        Args:
+            category: Categoria dada pelo LLM
+            classified_at: time.perf_counter() do fim da classificação
+
+        Returns:
+            (resposta, ms economizados), ou None se o palpite errou ou a
+            geração especulativa falhou (o chamador gera de novo)
+        """
+        if category != self.guess:
+            self.cancel()
+            return None
+
+        try:
+            reply = await self._task
+        except Exception as e:
+            logger.warning(f"Resposta especulativa falhou, gerando de novo: {str(e)}")
+            self.outcome = "failed"
+            speculative_replies.inc(outcome="failed")
+            return None
+        self.outcome = "hit"
+        # Sem especular, a resposta começaria em classified_at e levaria o mesmo tempo
+        sequential_end = classified_at + (self.finished - self.started)
+        saved = max(0.0, sequential_end - max(self.finished, classified_at))
+        speculative_replies.inc(outcome="hit")
+        speculative_saved.inc(saved)
+        return reply, round(saved * 1000, 2)
+
+    @property
+    def wasted(self) -> Optional[Dict]:
+        """Resposta descartada que chegou a terminar (a chamada foi paga), senão None"""
+        if self.outcome in (None, "hit") or not self._task.done() or self._task.cancelled():
+            return None
+        if self._task.exception() is not None:
+            return None
+        return self._task.result()
@@ -0,0 +1,103 @@
+"""
+Status cache - Respostas de /api/status/{id} prontas, com ETag forte
+Uma análise não muda depois de gravada: o corpo JSON e o ETag são montados
+uma vez e servidos da memória (LRU limitado) nas consultas seguintes, sem
+abrir o banco. Clientes com o ETag recebem 304.
+
+O cache é por processo. Análises removidas pela retenção podem continuar
+no cache de um worker até serem expulsas pelo LRU.
+"""
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from app.core.metrics import counter
+from app.core.settings import get_settings
+from app.models.records import Analysis
+from app.models.schemas import StatusResponse
+
+status_cache_lookups = counter(
+    "status_cache_lookups_total",
+    "Consultas de /api/status ao cache em memória, por resultado (hit, miss)"
+)
+
+# Cache-Control das análises concluídas: o cliente nem revalida
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+class CachedStatus(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def render_status(analysis: Analysis, created_at: Optional[str] = None) -> CachedStatus:
+    """
+    Corpo JSON de StatusResponse (completed) e o ETag forte desse corpo
+
+    created_at: horário gravado, para análises que não vieram do banco
+    """
+    body = StatusResponse(
+        id=analysis.id,
+        status="completed",
+        category=analysis.category,
+        confidence=analysis.confidence,
+        created_at=datetime.fromisoformat(created_at or analysis.created_at)
+    ).model_dump_json().encode()
+    return CachedStatus(body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Comparação fraca do If-None-Match (RFC 9110): "*" ou alguma das tags
+    da lista, ignorando o prefixo W/
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class StatusCache:
+    """LRU de CachedStatus por id da análise (max_entries=0 desliga)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedStatus]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, analysis_id: str) -> Optional[CachedStatus]:
+        entry = self._entries.get(analysis_id)
+        if entry is None:
+            status_cache_lookups.inc(result="miss")
+            return None
+        self._entries.move_to_end(analysis_id)
+        status_cache_lookups.inc(result="hit")
+        return entry
+
+    def put(self, analysis: Analysis, created_at: Optional[str] = None) -> CachedStatus:
+        """Monta a resposta da análise e guarda (a mais antiga sai se lotar)"""
+        entry = render_status(analysis, created_at)
+        if self.max_entries > 0:
+            self._entries[analysis.id] = entry
+            self._entries.move_to_end(analysis.id)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+# Singleton
+_status_cache: Optional[StatusCache] = None
+
+
+def get_status_cache() -> StatusCache:
+    """Retorna instância singleton do StatusCache"""
+    global _status_cache
+    if _status_cache is None:
+        _status_cache = StatusCache(get_settings().STATUS_CACHE_SIZE)
+    return _status_cache
@@ -0,0 +1,56 @@
+"""
+Compression utilities - Compressão transparente de colunas de texto grandes
+Valores abaixo do limite ficam como TEXT; acima dele viram BLOB comprimido.
+O codec é identificado pelo cabeçalho do próprio BLOB (zlib ou zstd)
+"""
+import zlib
+from typing import Optional, Union
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+try:
+    import zstandard
+except ImportError:  # zstd é opcional
+    zstandard = None
+
+
+def compress_text(text: Optional[str], codec: str = "zlib", min_bytes: int = 512) -> Union[str, bytes, None]:
+    """
+    Comprime o texto se ele passar de min_bytes e a compressão compensar
+
+    Args:
+        text: Texto original (None é preservado)
+        codec: "zlib" ou "zstd"
+        min_bytes: Tamanho mínimo (UTF-8) para tentar comprimir
+
+    Returns:
+        O próprio texto ou os bytes comprimidos
+    """
+    if text is None:
+        return None
+    raw = text.encode("utf-8")
+    if len(raw) < min_bytes:
+        return text
+
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("DB_COMPRESSION=zstd requer o pacote 'zstandard'")
+        packed = zstandard.ZstdCompressor(level=3).compress(raw)
+    elif codec == "zlib":
+        packed = zlib.compress(raw, 6)
+    else:
+        raise ValueError(f"Codec de compressão não suportado: {codec}")
+
+    return packed if len(packed) < len(raw) else text
+
+
+def decompress_text(value: Union[str, bytes, None]) -> Optional[str]:
+    """Inverso de compress_text: aceita TEXT puro ou BLOB comprimido"""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if value.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError("Valor comprimido com zstd, mas 'zstandard' não está instalado")
+        return zstandard.ZstdDecompressor().decompress(value).decode("utf-8")
+    return zlib.decompress(value).decode("utf-8")
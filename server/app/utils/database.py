@@ -1,59 +1,309 @@
 """
 Database utilities - Gerenciamento de conexão e operações básicas
-Usa SQLite para MVP, facilmente migrável para Postgres
+Usa SQLite por padrão; DATABASE_URL postgresql:// seleciona o backend Postgres
+(app/utils/postgres.py), que implementa a mesma interface
 """
 import sqlite3
 import hashlib
+import json
 import logging
-from typing import Optional, Dict
+import re
+import unicodedata
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Mapping, Optional, Dict, List, Tuple, Union
 from datetime import datetime
 from pathlib import Path
-from app.core.settings import get_settings
+from app.core.settings import Settings, get_settings
+from app.models.records import Analysis
+from app.utils.compression import compress_text, decompress_text
+
+if TYPE_CHECKING:
+    from app.utils.postgres import PostgresDatabase
 
 logger = logging.getLogger(__name__)
 
+POSTGRES_SCHEMES = ("postgresql://", "postgres://")
+
+# Ordem das colunas usada por save_analysis/save_analyses em todos os backends
+ANALYSIS_COLUMNS = (
+    "id", "text_hash", "category", "confidence", "suggested_reply",
+    "summary", "model_used", "reason", "full_text", "metadata"
+)
+
+# --- SQLite ---
+
+# v2: formato compacto (hash BLOB, dicionário labels, textos comprimidos)
+SCHEMA_VERSION = 2
+
+# Colunas sem tipo declarado guardam TEXT ou BLOB comprimido
+ANALYSES_TABLE_DDL = """
+    CREATE TABLE {table} (
+        id TEXT PRIMARY KEY,
+        text_hash BLOB NOT NULL,
+        category_id INTEGER NOT NULL REFERENCES labels(id),
+        confidence REAL NOT NULL,
+        suggested_reply NOT NULL,
+        summary TEXT NOT NULL,
+        model_id INTEGER NOT NULL REFERENCES labels(id),
+        reason,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        full_text,
+        metadata TEXT
+    )
+"""
+
+COMPRESSED_COLUMNS = ("suggested_reply", "reason", "full_text")
+
+INSERT_ANALYSIS = """
+    INSERT INTO analyses
+    (id, text_hash, category_id, confidence, suggested_reply, summary, model_id, reason, full_text, metadata)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Reconstrói os campos públicos da análise a partir do formato compacto
+SELECT_ANALYSES = """
+    SELECT a.rowid AS rowid, a.id, a.text_hash, c.value AS category, a.confidence,
+           a.suggested_reply, a.summary, m.value AS model_used, a.reason,
+           a.created_at, a.full_text, a.metadata
+    FROM analyses a
+    JOIN labels c ON c.id = a.category_id
+    JOIN labels m ON m.id = a.model_id
+"""
+
+
+# Uma linha por chamada ao LLM: tokens e latência por etapa/modelo.
+# Mantida após o arquivamento da análise (histórico de custo).
+LLM_CALLS_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS llm_calls (
+        analysis_id TEXT NOT NULL,
+        stage_id INTEGER NOT NULL REFERENCES labels(id),
+        model_id INTEGER NOT NULL REFERENCES labels(id),
+        prompt_tokens INTEGER NOT NULL,
+        completion_tokens INTEGER NOT NULL,
+        cached_tokens INTEGER NOT NULL DEFAULT 0,
+        latency_ms INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+INSERT_LLM_CALL = """
+    INSERT INTO llm_calls
+    (analysis_id, stage_id, model_id, prompt_tokens, completion_tokens, cached_tokens, latency_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+IDEMPOTENCY_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        key TEXT PRIMARY KEY,
+        analysis_id TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        fingerprint TEXT
+    )
+"""
+
+
+# Ponto de sincronização de cada pasta IMAP (app/services/mailbox.py): UIDs só
+# valem enquanto o UIDVALIDITY da pasta não mudar
+MAILBOX_STATE_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS mailbox_state (
+        mailbox TEXT PRIMARY KEY,
+        uidvalidity INTEGER NOT NULL,
+        last_uid INTEGER NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Mensagens IMAP que falharam acima do ponto de sincronização: tentadas de
+# novo a cada ciclo até attempts chegar a IMAP_MAX_RETRIES (aí ficam como
+# registro da desistência)
+MAILBOX_FAILURES_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS mailbox_failures (
+        mailbox TEXT NOT NULL,
+        uid INTEGER NOT NULL,
+        attempts INTEGER NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (mailbox, uid)
+    )
+"""
+
+# Busca textual: resumo, motivo e resposta (descomprimidos) indexados pelo
+# rowid da análise. unicode61 sem acentos: "solicitacao" encontra "solicitação"
+SEARCH_TABLE_DDL = """
+    CREATE VIRTUAL TABLE analyses_fts USING fts5(
+        summary, reason, suggested_reply,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+# Pesos do bm25 por coluna: o resumo vale mais que motivo e resposta
+SEARCH_RANK = "bm25(4.0, 1.0, 1.0)"
+
+# Inserção acontece na gravação (os textos são comprimidos antes de chegar
+# em analyses); a remoção segue analyses por trigger, inclusive na retenção
+SEARCH_DELETE_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS analyses_fts_delete AFTER DELETE ON analyses BEGIN
+        DELETE FROM analyses_fts WHERE rowid = old.rowid;
+    END
+"""
+
+INSERT_SEARCH = """
+    INSERT INTO analyses_fts (rowid, summary, reason, suggested_reply)
+    SELECT rowid, ?, ?, ? FROM analyses WHERE id = ?
+"""
+
+# Máximo de termos indexados usados na expansão de um prefixo ("atualiz*")
+SEARCH_PREFIX_TERMS = 32
+
+SEARCH_TERM_PATTERN = re.compile(r'\w+\*?')
+SNIPPET_MARKS = ("<mark>", "</mark>")
+
+
+# Limite superior de created_at. Precisa ser texto não numérico: a coluna tem
+# afinidade NUMERIC e "9999" viraria inteiro (menor que qualquer texto)
+MAX_TIMESTAMP = "9999-12-31 23:59:59"
+
+
+def fold_search_term(word: str) -> str:
+    """Minúsculas e sem acentos, como o tokenizer unicode61 indexa"""
+    decomposed = unicodedata.normalize("NFKD", word.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def build_fts_query(query: str, expand_prefix: Optional[Callable[[str], List[str]]] = None) -> str:
+    """
+    Converte a busca do usuário em uma query FTS5 segura
+    
+    Cada palavra vira um termo entre aspas (todos obrigatórios); "palavra*"
+    busca por prefixo. Operadores e pontuação são ignorados.
+    
+    Args:
+        query: Busca digitada
+        expand_prefix: Termos indexados que começam com o prefixo; a query
+            usa um OR entre eles, bem mais barato que o prefixo do FTS5
+            (que monta a lista de documentos de todos os termos de uma vez)
+    
+    Returns:
+        Query FTS5, ou "" se não houver nenhuma palavra
+    """
+    terms = []
+    for term in SEARCH_TERM_PATTERN.findall(query):
+        word = term.rstrip("*")
+        if not term.endswith("*"):
+            terms.append(f'"{word}"')
+            continue
+        expanded = expand_prefix(fold_search_term(word)) if expand_prefix else []
+        if expanded:
+            terms.append("(" + " OR ".join(f'"{w}"' for w in expanded) + ")")
+        else:
+            terms.append(f'"{word}"*')
+    return " ".join(terms)
+
+
+def compute_text_hash(text: str) -> str:
+    """Hash SHA-256 do texto (usado para deduplicação)"""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def encode_metadata(metadata: Optional[Dict]) -> Optional[str]:
+    """Serializa metadata em JSON compacto (None se vazio)"""
+    if not metadata:
+        return None
+    return json.dumps(metadata, ensure_ascii=False, separators=(",", ":"))
+
+
+def build_analysis_row(analysis: Analysis, settings: Settings) -> Tuple:
+    """
+    Converte a análise na tupla de colunas ANALYSIS_COLUMNS
+    
+    full_text só é persistido em desenvolvimento; metadata (dict) vira JSON compacto.
+    """
+    full_text = None
+    if settings.APP_ENV == "development":
+        full_text = analysis.full_text
+    
+    return (
+        analysis.id,
+        compute_text_hash(analysis.full_text or ""),
+        analysis.category,
+        analysis.confidence,
+        analysis.suggested_reply,
+        analysis.summary,
+        analysis.model_used,
+        analysis.reason,
+        full_text,
+        encode_metadata(analysis.metadata)
+    )
+
+
+def analysis_from_row(cursor, row: Tuple) -> Analysis:
+    """
+    Row factory: linha de SELECT_ANALYSES direto no Analysis (sem dict
+    intermediário); a primeira coluna (rowid) fica de fora
+    """
+    (_, analysis_id, text_hash, category, confidence, suggested_reply, summary,
+     model_used, reason, created_at, full_text, metadata) = row
+    return Analysis(
+        id=analysis_id,
+        category=category,
+        confidence=confidence,
+        suggested_reply=decompress_text(suggested_reply),
+        summary=summary,
+        model_used=model_used,
+        reason=decompress_text(reason),
+        full_text=decompress_text(full_text),
+        metadata=json.loads(metadata) if metadata else {},
+        created_at=created_at,
+        text_hash=bytes(text_hash).hex()
+    )
+
 
 class Database:
-    """Classe para operações de banco de dados"""
+    """Classe para operações de banco de dados (backend SQLite)"""
     
-    def __init__(self):
+    def __init__(self, url: Optional[str] = None):
         self.settings = get_settings()
+        self.url = url or self.settings.DATABASE_URL
         self.db_path = self._parse_db_path()
+        self._label_ids: Dict[Tuple[str, str], int] = {}
         self._init_db()
     
     def _parse_db_path(self) -> str:
         """Extrai caminho do DATABASE_URL"""
-        url = self.settings.DATABASE_URL
-        if url.startswith("sqlite:///"):
-            path = url.replace("sqlite:///", "")
-            # Cria diretório se não existir
-            Path(path).parent.mkdir(parents=True, exist_ok=True)
-            return path
-        return "db.sqlite3"
+        if not self.url.startswith("sqlite:///"):
+            raise ValueError(f"DATABASE_URL não suportado pelo backend SQLite: {self.url}")
+        
+        path = self.url.replace("sqlite:///", "")
+        # Cria diretório se não existir
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        return path
     
     def _init_db(self):
-        """Inicializa schema do banco"""
+        """Inicializa schema do banco (e migra bancos no formato antigo)"""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # Tabela de análises
+            # Só tem efeito em bancos novos; bancos existentes são convertidos
+            # por enable_incremental_vacuum() (VACUUM completo, uma vez)
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            
+            # Dicionário de valores repetidos (modelo, categoria)
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS analyses (
-                    id TEXT PRIMARY KEY,
-                    text_hash TEXT NOT NULL,
-                    category TEXT NOT NULL,
-                    confidence REAL NOT NULL,
-                    suggested_reply TEXT NOT NULL,
-                    summary TEXT NOT NULL,
-                    model_used TEXT NOT NULL,
-                    reason TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    full_text TEXT,
-                    metadata TEXT
+                CREATE TABLE IF NOT EXISTS labels (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    UNIQUE (kind, value)
                 )
             """)
             
+            if cursor.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                if self._has_legacy_schema(conn):
+                    self._migrate_to_compact_schema(conn)
+            
+            # Tabela de análises: hash em BLOB de 32 bytes, categoria/modelo
+            # como ids de labels e textos grandes comprimidos (ver compression.py)
+            cursor.execute(ANALYSES_TABLE_DDL.format(table="IF NOT EXISTS analyses"))
+            
             # Tabela de feedback
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS feedback (
@@ -68,9 +318,36 @@ class Database:
                 )
             """)
             
+            # Tokens e latência por chamada ao LLM
+            cursor.execute(LLM_CALLS_TABLE_DDL)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_calls_created_at ON llm_calls(created_at)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_calls_analysis_id ON llm_calls(analysis_id)")
+            
+            # Idempotency-Key -> análise (retentativas do cliente)
+            cursor.execute(IDEMPOTENCY_TABLE_DDL)
+            if "fingerprint" not in {row[1] for row in cursor.execute("PRAGMA table_info(idempotency_keys)")}:
+                cursor.execute("ALTER TABLE idempotency_keys ADD COLUMN fingerprint TEXT")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_created_at ON idempotency_keys(created_at)")
+            
+            # Último UID processado por pasta IMAP e falhas acima dele
+            cursor.execute(MAILBOX_STATE_TABLE_DDL)
+            cursor.execute(MAILBOX_FAILURES_TABLE_DDL)
+            
+            # Busca textual (FTS5)
+            if not cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'analyses_fts'"
+            ).fetchone():
+                self._create_search_index(conn)
+            cursor.execute(SEARCH_DELETE_TRIGGER)
+            # Vocabulário do índice (expansão de prefixos)
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts_vocab USING fts5vocab(analyses_fts, 'row')"
+            )
+            
             # Índices
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_text_hash ON analyses(text_hash)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON analyses(created_at)")
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
             
             conn.commit()
             conn.close()
@@ -79,68 +356,311 @@ class Database:
         except Exception as e:
             logger.error(f"Erro ao inicializar database: {str(e)}")
     
-    def save_analysis(self, analysis_data: Dict) -> bool:
-        """Salva resultado de análise"""
+    @staticmethod
+    def _has_legacy_schema(conn: sqlite3.Connection) -> bool:
+        """True se analyses ainda usa o formato antigo (colunas de texto)"""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(analyses)")}
+        return "category" in columns
+    
+    def _migrate_to_compact_schema(self, conn: sqlite3.Connection):
+        """
+        Converte analyses do formato antigo para o compacto (schema v2)
+        
+        Reescreve a tabela em uma única transação: hash hex -> BLOB,
+        categoria/modelo -> labels, textos grandes comprimidos.
+        """
+        logger.info("Migrando tabela analyses para o formato compacto...")
+        conn.create_function("unhex_hash", 1, bytes.fromhex, deterministic=True)
+        conn.create_function("compress_text", 1, self._compress, deterministic=True)
+        
+        with conn:
+            conn.execute("""
+                INSERT OR IGNORE INTO labels (kind, value)
+                SELECT DISTINCT 'category', category FROM analyses
+                UNION SELECT DISTINCT 'model', model_used FROM analyses
+            """)
+            # Procedimento recomendado pelo SQLite: nova tabela, cópia, DROP e
+            # RENAME (preserva a referência de feedback para "analyses")
+            conn.execute(ANALYSES_TABLE_DDL.format(table="analyses_compact"))
+            conn.execute("""
+                INSERT INTO analyses_compact
+                (id, text_hash, category_id, confidence, suggested_reply, summary,
+                 model_id, reason, created_at, full_text, metadata)
+                SELECT a.id, unhex_hash(a.text_hash), c.id, a.confidence,
+                       compress_text(a.suggested_reply), a.summary, m.id,
+                       compress_text(a.reason), a.created_at,
+                       compress_text(a.full_text), a.metadata
+                FROM analyses a
+                JOIN labels c ON c.kind = 'category' AND c.value = a.category
+                JOIN labels m ON m.kind = 'model' AND m.value = a.model_used
+                ORDER BY a.rowid
+            """)
+            conn.execute("DROP TABLE analyses")
+            conn.execute("ALTER TABLE analyses_compact RENAME TO analyses")
+        logger.info("Migração para o formato compacto concluída")
+    
+    @staticmethod
+    def _create_search_index(conn: sqlite3.Connection):
+        """Cria a tabela FTS5 e indexa as análises já existentes"""
+        conn.create_function("decompress_text", 1, decompress_text, deterministic=True)
+        conn.execute(SEARCH_TABLE_DDL)
+        conn.execute(
+            "INSERT INTO analyses_fts (analyses_fts, rank) VALUES ('rank', ?)", (SEARCH_RANK,)
+        )
+        indexed = conn.execute("""
+            INSERT INTO analyses_fts (rowid, summary, reason, suggested_reply)
+            SELECT rowid, summary, decompress_text(reason), decompress_text(suggested_reply)
+            FROM analyses
+        """).rowcount
+        if indexed:
+            logger.info(f"Índice de busca criado ({indexed} análises)")
+    
+    def _compress(self, text: Optional[str]):
+        """Aplica a compressão configurada a uma coluna de texto"""
+        return compress_text(
+            text, self.settings.DB_COMPRESSION, self.settings.DB_COMPRESS_MIN_BYTES
+        )
+    
+    def _label_id(self, conn: sqlite3.Connection, kind: str, value: str) -> int:
+        """Id do valor no dicionário labels (criando se necessário)"""
+        key = (kind, value)
+        label_id = self._label_ids.get(key)
+        if label_id is None:
+            conn.execute("INSERT OR IGNORE INTO labels (kind, value) VALUES (?, ?)", key)
+            label_id = conn.execute(
+                "SELECT id FROM labels WHERE kind = ? AND value = ?", key
+            ).fetchone()[0]
+            # Commit próprio: um rollback da análise não pode invalidar o cache
+            conn.commit()
+            self._label_ids[key] = label_id
+        return label_id
+    
+    def _encode_row(self, conn: sqlite3.Connection, analysis: Analysis) -> Tuple:
+        """Converte a análise na tupla do formato compacto"""
+        (analysis_id, text_hash, category, confidence, suggested_reply,
+         summary, model_used, reason, full_text, metadata) = build_analysis_row(analysis, self.settings)
+        return (
+            analysis_id,
+            bytes.fromhex(text_hash),
+            self._label_id(conn, "category", category),
+            confidence,
+            self._compress(suggested_reply),
+            summary,
+            self._label_id(conn, "model", model_used),
+            self._compress(reason),
+            self._compress(full_text),
+            metadata
+        )
+    
+    def _encode_llm_calls(self, conn: sqlite3.Connection, analysis: Analysis) -> List[Tuple]:
+        """Linhas de llm_calls da análise (etapa e modelo como ids de labels)"""
+        return [
+            (
+                analysis.id,
+                self._label_id(conn, "stage", call["stage"]),
+                self._label_id(conn, "model", call["model"]),
+                call["prompt_tokens"],
+                call["completion_tokens"],
+                call.get("cached_tokens", 0),
+                call["latency_ms"]
+            )
+            for call in analysis.llm_calls
+        ]
+    
+    @staticmethod
+    def _search_row(analysis: Analysis) -> Tuple:
+        """Parâmetros de INSERT_SEARCH (textos sem compressão)"""
+        return (analysis.summary, analysis.reason, analysis.suggested_reply, analysis.id)
+    
+    @staticmethod
+    def _decode_row(row: sqlite3.Row) -> Dict:
+        """Converte uma linha de SELECT_ANALYSES em dict, com rowid (arquivamento)"""
+        data = dict(row)
+        data["text_hash"] = bytes(data["text_hash"]).hex()
+        for column in COMPRESSED_COLUMNS:
+            data[column] = decompress_text(data[column])
+        if data["metadata"]:
+            data["metadata"] = json.loads(data["metadata"])
+        return data
+    
+    def save_analysis(self, analysis: Union[Analysis, Mapping]) -> Optional[str]:
+        """
+        Salva resultado de análise
+        
+        Returns:
+            created_at gravado, ou None em caso de erro
+        """
         try:
+            analysis = Analysis.coerce(analysis)
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Hash do texto (para deduplicação)
-            text_hash = hashlib.sha256(
-                analysis_data.get("full_text", "").encode()
-            ).hexdigest()
-            
-            # Decide se salva full_text baseado no ambiente
-            full_text = None
-            if self.settings.APP_ENV == "development":
-                full_text = analysis_data.get("full_text")
             
-            cursor.execute("""
-                INSERT INTO analyses 
-                (id, text_hash, category, confidence, suggested_reply, summary, model_used, reason, full_text)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                analysis_data["id"],
-                text_hash,
-                analysis_data["category"],
-                analysis_data["confidence"],
-                analysis_data["suggested_reply"],
-                analysis_data["summary"],
-                analysis_data["model_used"],
-                analysis_data.get("reason"),
-                full_text
-            ))
+            with conn:
+                cursor = conn.execute(INSERT_ANALYSIS, self._encode_row(conn, analysis))
+                created_at = conn.execute(
+                    "SELECT created_at FROM analyses WHERE rowid = ?", (cursor.lastrowid,)
+                ).fetchone()[0]
+                conn.execute(INSERT_SEARCH, self._search_row(analysis))
+                conn.executemany(INSERT_LLM_CALL, self._encode_llm_calls(conn, analysis))
             
-            conn.commit()
             conn.close()
-            return True
+            return created_at
             
         except Exception as e:
             logger.error(f"Erro ao salvar análise: {str(e)}")
-            return False
+            return None
     
-    def get_analysis(self, analysis_id: str) -> Optional[Dict]:
+    def save_analyses(self, analyses: List[Union[Analysis, Mapping]]) -> int:
+        """
+        Salva um lote de análises em uma única transação
+        
+        Returns:
+            Número de análises gravadas (0 em caso de erro)
+        """
+        if not analyses:
+            return 0
+        try:
+            analyses = [Analysis.coerce(a) for a in analyses]
+            conn = sqlite3.connect(self.db_path)
+            with conn:
+                conn.executemany(INSERT_ANALYSIS, [self._encode_row(conn, a) for a in analyses])
+                conn.executemany(INSERT_SEARCH, [self._search_row(a) for a in analyses])
+                conn.executemany(
+                    INSERT_LLM_CALL,
+                    [row for a in analyses for row in self._encode_llm_calls(conn, a)]
+                )
+            conn.close()
+            return len(analyses)
+            
+        except Exception as e:
+            logger.error(f"Erro ao salvar lote de análises: {str(e)}")
+            return 0
+    
+    def get_analysis(self, analysis_id: str) -> Optional[Analysis]:
         """Busca análise por ID"""
         try:
             conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
+            conn.row_factory = analysis_from_row
             cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT * FROM analyses WHERE id = ?
+            cursor.execute(f"""
+                {SELECT_ANALYSES} WHERE a.id = ?
             """, (analysis_id,))
             
-            row = cursor.fetchone()
+            analysis = cursor.fetchone()
             conn.close()
-            
-            if row:
-                return dict(row)
-            return None
+            return analysis
             
         except Exception as e:
             logger.error(f"Erro ao buscar análise: {str(e)}")
             return None
     
+    def search_analyses(self, query: str, limit: int = 20, offset: int = 0,
+                        recent: Optional[int] = None) -> List[Dict]:
+        """
+        Busca análises por palavras do resumo, motivo ou resposta sugerida
+        
+        A página é escolhida só pelo índice FTS5, em ordem bm25 sobre todas
+        as correspondências. Com recent (padrão SEARCH_RECENT_CANDIDATES) > 0
+        o bm25 fica restrito às recent correspondências mais recentes: termos
+        comuns ficam mais rápidos, mas análises antigas mais relevantes somem.
+        Snippet e campos da análise são buscados depois, apenas para as
+        linhas da página.
+        
+        Returns:
+            Lista de dicts com: id, category, confidence, summary, created_at,
+            snippet (termos entre <mark>) e score (maior = mais relevante)
+        """
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            fts_query = build_fts_query(query, lambda prefix: self._prefix_terms(conn, prefix))
+            if not fts_query:
+                return []
+            
+            recent = self.settings.SEARCH_RECENT_CANDIDATES if recent is None else recent
+            floor = None
+            if recent > 0:
+                # Menor rowid entre as correspondências mais recentes (percorre o
+                # índice em ordem decrescente de rowid, sem calcular bm25)
+                floor = conn.execute("""
+                    SELECT rowid FROM analyses_fts WHERE analyses_fts MATCH ?
+                    ORDER BY rowid DESC LIMIT 1 OFFSET ?
+                """, (fts_query, max(recent, offset + limit) - 1)).fetchone()
+            page = conn.execute("""
+                SELECT rowid, rank FROM analyses_fts
+                WHERE analyses_fts MATCH ? AND rowid >= ?
+                ORDER BY rank LIMIT ? OFFSET ?
+            """, (fts_query, floor[0] if floor else 0, limit, offset)).fetchall()
+            if not page:
+                return []
+            
+            ranks = {row["rowid"]: row["rank"] for row in page}
+            placeholders = ",".join("?" * len(ranks))
+            rows = conn.execute(f"""
+                SELECT f.rowid, a.id, c.value AS category, a.confidence, a.summary, a.created_at,
+                       snippet(analyses_fts, -1, ?, ?, '…', 16) AS snippet
+                FROM analyses_fts f
+                JOIN analyses a ON a.rowid = f.rowid
+                JOIN labels c ON c.id = a.category_id
+                WHERE analyses_fts MATCH ? AND f.rowid IN ({placeholders})
+            """, (*SNIPPET_MARKS, fts_query, *ranks)).fetchall()
+            
+            results = []
+            for row in sorted(rows, key=lambda r: ranks[r["rowid"]]):
+                data = dict(row)
+                # bm25 do SQLite é negativo (menor = melhor)
+                data["score"] = -ranks[data.pop("rowid")]
+                results.append(data)
+            return results
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _prefix_terms(conn: sqlite3.Connection, prefix: str) -> List[str]:
+        """Termos do índice que começam com prefix (os mais frequentes)"""
+        rows = conn.execute("""
+            SELECT term FROM analyses_fts_vocab
+            WHERE term >= ? AND term < ?
+            ORDER BY doc DESC LIMIT ?
+        """, (prefix, prefix + chr(0x10FFFF), SEARCH_PREFIX_TERMS)).fetchall()
+        return [row[0] for row in rows]
+    
+    def iter_analyses(self, start: Optional[str] = None, end: Optional[str] = None,
+                      batch_size: int = 1000) -> Iterator[Analysis]:
+        """
+        Percorre as análises de um período em ordem de created_at
+        
+        Lê em lotes por keyset (created_at, rowid) sobre idx_created_at: cada
+        lote é uma consulta curta, então a exportação não segura o lock de
+        leitura (nem bloqueia gravações) durante o período inteiro, e a
+        memória usada é a de um lote.
+        
+        Args:
+            start: created_at inicial, inclusivo ('YYYY-MM-DD HH:MM:SS'; None = início)
+            end: created_at final, exclusivo (None = sem limite)
+            batch_size: Linhas por consulta
+            
+        Yields:
+            Analysis, como em get_analysis
+        """
+        position: Tuple = (start or "", 0)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            while True:
+                rows = conn.execute(f"""
+                    {SELECT_ANALYSES}
+                    WHERE (a.created_at, a.rowid) > (?, ?) AND a.created_at < ?
+                    ORDER BY a.created_at, a.rowid LIMIT ?
+                """, (*position, end or MAX_TIMESTAMP, batch_size)).fetchall()
+                for row in rows:
+                    yield analysis_from_row(None, row)
+                if len(rows) < batch_size:
+                    return
+                # Tuplas de SELECT_ANALYSES: rowid na posição 0, created_at na 9
+                position = (rows[-1][9], rows[-1][0])
+        finally:
+            conn.close()
+    
     def save_feedback(self, feedback_data: Dict) -> bool:
         """Salva feedback do usuário"""
         try:
@@ -170,7 +690,7 @@ class Database:
     def check_duplicate(self, text: str) -> Optional[str]:
         """Verifica se texto já foi processado (retorna ID se sim)"""
         try:
-            text_hash = hashlib.sha256(text.encode()).hexdigest()
+            text_hash = bytes.fromhex(compute_text_hash(text))
             
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
@@ -192,14 +712,358 @@ class Database:
         except Exception as e:
             logger.error(f"Erro ao verificar duplicata: {str(e)}")
             return None
+    
+    def usage_by_day(self, days: int) -> List[Dict]:
+        """Tokens e latência das chamadas ao LLM agregados por dia, modelo e etapa"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute("""
+                SELECT date(l.created_at) AS day, m.value AS model, s.value AS stage,
+                       COUNT(*) AS calls,
+                       COUNT(DISTINCT l.analysis_id) AS analyses,
+                       SUM(l.prompt_tokens) AS prompt_tokens,
+                       SUM(l.completion_tokens) AS completion_tokens,
+                       SUM(l.cached_tokens) AS cached_tokens,
+                       ROUND(AVG(l.latency_ms), 1) AS avg_latency_ms,
+                       MAX(l.latency_ms) AS max_latency_ms
+                FROM llm_calls l
+                JOIN labels m ON m.id = l.model_id
+                JOIN labels s ON s.id = l.stage_id
+                WHERE l.created_at >= datetime('now', ?)
+                GROUP BY day, model, stage
+                ORDER BY day DESC, model, stage
+            """, (f"-{days} days",)).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+    
+    def top_usage(self, days: int, limit: int) -> List[Dict]:
+        """Análises que mais consumiram tokens no período"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute("""
+                SELECT analysis_id,
+                       SUM(prompt_tokens + completion_tokens) AS total_tokens,
+                       SUM(prompt_tokens) AS prompt_tokens,
+                       SUM(completion_tokens) AS completion_tokens,
+                       SUM(cached_tokens) AS cached_tokens,
+                       SUM(latency_ms) AS latency_ms,
+                       MIN(created_at) AS created_at
+                FROM llm_calls
+                WHERE created_at >= datetime('now', ?)
+                GROUP BY analysis_id
+                ORDER BY total_tokens DESC
+                LIMIT ?
+            """, (f"-{days} days", limit)).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+    
+    def get_idempotency_key(self, key: str, max_age_hours: int) -> Optional[Dict]:
+        """
+        Idempotency-Key registrada dentro do prazo
+        
+        Returns:
+            Dict com analysis_id e fingerprint (None em chaves antigas), ou None
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                row = conn.execute("""
+                    SELECT analysis_id, fingerprint FROM idempotency_keys
+                    WHERE key = ? AND created_at >= datetime('now', ?)
+                """, (key, f"-{max_age_hours} hours")).fetchone()
+                return dict(row) if row else None
+            finally:
+                conn.close()
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar idempotency key: {str(e)}")
+            return None
+    
+    def save_idempotency_key(self, key: str, analysis_id: str, max_age_hours: int,
+                             fingerprint: Optional[str] = None) -> bool:
+        """Registra a Idempotency-Key com o fingerprint da requisição (e descarta as vencidas)"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute(
+                    "DELETE FROM idempotency_keys WHERE created_at < datetime('now', ?)",
+                    (f"-{max_age_hours} hours",)
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO idempotency_keys (key, analysis_id, fingerprint) VALUES (?, ?, ?)",
+                    (key, analysis_id, fingerprint)
+                )
+                conn.commit()
+                return True
+            finally:
+                conn.close()
+            
+        except Exception as e:
+            logger.error(f"Erro ao salvar idempotency key: {str(e)}")
+            return False
+    
+    def get_mailbox_state(self, mailbox: str) -> Optional[Dict]:
+        """uidvalidity e last_uid da pasta IMAP (None se nunca sincronizada)"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT uidvalidity, last_uid FROM mailbox_state WHERE mailbox = ?", (mailbox,)
+            ).fetchone()
+            return {"uidvalidity": row[0], "last_uid": row[1]} if row else None
+        finally:
+            conn.close()
+    
+    def save_mailbox_state(self, mailbox: str, uidvalidity: int, last_uid: int) -> None:
+        """Avança o ponto de sincronização da pasta IMAP"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO mailbox_state (mailbox, uidvalidity, last_uid, updated_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                """, (mailbox, uidvalidity, last_uid))
+        finally:
+            conn.close()
+    
+    def get_mailbox_failures(self, mailbox: str, max_attempts: int) -> Dict[int, int]:
+        """UID -> tentativas das mensagens da pasta ainda abaixo de max_attempts"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(
+                "SELECT uid, attempts FROM mailbox_failures WHERE mailbox = ? AND attempts < ? ORDER BY uid",
+                (mailbox, max_attempts)
+            ).fetchall()
+            return dict(rows)
+        finally:
+            conn.close()
+    
+    def save_mailbox_failures(self, mailbox: str, attempts: Dict[int, int]) -> None:
+        """Grava (ou atualiza) as tentativas das mensagens que falharam"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany("""
+                    INSERT OR REPLACE INTO mailbox_failures (mailbox, uid, attempts, updated_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                """, [(mailbox, uid, count) for uid, count in attempts.items()])
+        finally:
+            conn.close()
+    
+    def clear_mailbox_failures(self, mailbox: str, uids: Optional[Iterable[int]] = None) -> None:
+        """Remove as falhas dos UIDs resolvidos (ou todas da pasta, com uids=None)"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                if uids is None:
+                    conn.execute("DELETE FROM mailbox_failures WHERE mailbox = ?", (mailbox,))
+                else:
+                    conn.executemany(
+                        "DELETE FROM mailbox_failures WHERE mailbox = ? AND uid = ?",
+                        [(mailbox, uid) for uid in uids]
+                    )
+        finally:
+            conn.close()
+    
+    def fetch_edited_replies(self, limit: int = 500) -> List[Dict]:
+        """Respostas editadas pelos usuários (feedback), mais recentes primeiro"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                rows = conn.execute("""
+                    SELECT a.summary, COALESCE(f.user_category, c.value) AS category,
+                           f.edited_reply, f.rating
+                    FROM feedback f
+                    JOIN analyses a ON a.id = f.analysis_id
+                    JOIN labels c ON c.id = a.category_id
+                    WHERE f.edited_reply IS NOT NULL AND f.edited_reply != ''
+                    ORDER BY f.created_at DESC, f.id DESC LIMIT ?
+                """, (limit,)).fetchall()
+                return [dict(row) for row in rows]
+            finally:
+                conn.close()
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar respostas editadas: {str(e)}")
+            return []
+    
+    def ping(self) -> bool:
+        """Verifica se o banco responde (usado pelo health monitor)"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("SELECT 1 FROM analyses LIMIT 1").fetchall()
+            return True
+        finally:
+            conn.close()
+    
+    # --- Retenção (app/services/retention.py) ---
+    
+    def fetch_expired_analyses(self, cutoff: str, category: Optional[str] = None,
+                               limit: int = 500, exclude_categories: Tuple[str, ...] = ()) -> List[Dict]:
+        """
+        Busca o lote mais antigo de análises criadas antes de cutoff
+        
+        Args:
+            cutoff: Timestamp no formato de created_at ('YYYY-MM-DD HH:MM:SS')
+            category: Restringe à categoria (None = todas)
+            limit: Tamanho máximo do lote
+            exclude_categories: Categorias ignoradas (usado com category=None)
+            
+        Returns:
+            Lista de dicts com os campos da análise + rowid
+        """
+        where, params = self._expired_filter(cutoff, category, exclude_categories)
+        
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute(f"""
+                {SELECT_ANALYSES}
+                WHERE {where}
+                ORDER BY a.created_at LIMIT ?
+            """, params + [limit]).fetchall()
+            return [self._decode_row(row) for row in rows]
+        finally:
+            conn.close()
+    
+    def count_expired_analyses(self, cutoff: str, category: Optional[str] = None,
+                               exclude_categories: Tuple[str, ...] = ()) -> int:
+        """Quantas análises fetch_expired_analyses devolveria sem limite (dry-run da retenção)"""
+        where, params = self._expired_filter(cutoff, category, exclude_categories)
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(f"""
+                SELECT COUNT(*) FROM analyses a
+                JOIN labels c ON c.id = a.category_id
+                WHERE {where}
+            """, params).fetchone()[0]
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _expired_filter(cutoff: str, category: Optional[str],
+                        exclude_categories: Tuple[str, ...]) -> Tuple[str, List]:
+        """WHERE (sobre analyses a + labels c) e parâmetros das análises expiradas"""
+        conditions = ["a.created_at < ?"]
+        params: List = [cutoff]
+        if category is not None:
+            conditions.append("c.value = ?")
+            params.append(category)
+        if exclude_categories:
+            conditions.append(f"c.value NOT IN ({','.join('?' * len(exclude_categories))})")
+            params.extend(exclude_categories)
+        return " AND ".join(conditions), params
+    
+    def fetch_oldest_analyses(self, limit: int) -> List[Dict]:
+        """Busca as análises mais antigas (para limite de linhas da tabela)"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute(f"""
+                {SELECT_ANALYSES} ORDER BY a.created_at LIMIT ?
+            """, (limit,)).fetchall()
+            return [self._decode_row(row) for row in rows]
+        finally:
+            conn.close()
+    
+    def count_analyses(self) -> int:
+        """Número de linhas na tabela de análises"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        finally:
+            conn.close()
+    
+    def delete_analyses(self, rowids: List[int]) -> int:
+        """Remove análises por rowid em uma transação curta"""
+        if not rowids:
+            return 0
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                placeholders = ",".join("?" * len(rowids))
+                cursor = conn.execute(
+                    f"DELETE FROM analyses WHERE rowid IN ({placeholders})", rowids
+                )
+            return cursor.rowcount
+        finally:
+            conn.close()
+    
+    def freelist_count(self) -> int:
+        """Número de páginas livres no arquivo do banco"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("PRAGMA freelist_count").fetchone()[0]
+        finally:
+            conn.close()
+    
+    def incremental_vacuum(self, pages: int) -> int:
+        """
+        Devolve até `pages` páginas livres ao sistema de arquivos
+        
+        Returns:
+            Número de páginas livres restantes
+        """
+        if pages <= 0:
+            # PRAGMA incremental_vacuum(0) liberaria a freelist inteira de uma vez
+            raise ValueError("pages deve ser positivo")
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            return conn.execute("PRAGMA freelist_count").fetchone()[0]
+        finally:
+            conn.close()
+    
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        Converte um banco existente para auto_vacuum=INCREMENTAL
+        
+        Exige um VACUUM completo (lock exclusivo); rodar uma única vez.
+        
+        Returns:
+            True se o banco precisou ser convertido
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # 2 = INCREMENTAL
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return False
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return True
+        finally:
+            conn.close()
+
+
+def create_database(url: Optional[str] = None) -> Union[Database, "PostgresDatabase"]:
+    """
+    Cria o backend de armazenamento adequado ao DATABASE_URL
+    
+    Raises:
+        ValueError: Se o esquema da URL não for suportado
+    """
+    url = url or get_settings().DATABASE_URL
+    if url.startswith(POSTGRES_SCHEMES):
+        # Import tardio: psycopg só é necessário com Postgres
+        from app.utils.postgres import PostgresDatabase
+        return PostgresDatabase(url)
+    if url.startswith("sqlite:///"):
+        return Database(url)
+    raise ValueError(f"DATABASE_URL não suportado: {url}")
 
 
 # Singleton instance
-_database: Optional[Database] = None
+_database: Optional[Union[Database, "PostgresDatabase"]] = None
 
-def get_database() -> Database:
+def get_database() -> Union[Database, "PostgresDatabase"]:
     """Retorna instância singleton do database"""
     global _database
     if _database is None:
-        _database = Database()
+        _database = create_database()
     return _database
@@ -0,0 +1,671 @@
+"""
+Postgres backend - Mesma interface de Database, com pool de conexões
+Permite que várias réplicas da API compartilhem um único banco sem a
+contenção de lock do SQLite
+"""
+import logging
+from typing import Callable, Iterable, Iterator, Mapping, Optional, Dict, List, Sequence, Tuple, Union
+
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
+
+from app.core.settings import get_settings
+from app.models.records import Analysis
+from app.utils.database import ANALYSIS_COLUMNS, SNIPPET_MARKS, build_analysis_row, compute_text_hash
+
+logger = logging.getLogger(__name__)
+
+# Migrações de schema em ordem; cada versão é aplicada uma única vez
+MIGRATIONS = [
+    (1, [
+        """
+        CREATE TABLE IF NOT EXISTS analyses (
+            id TEXT PRIMARY KEY,
+            text_hash TEXT NOT NULL,
+            category TEXT NOT NULL,
+            confidence DOUBLE PRECISION NOT NULL,
+            suggested_reply TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            model_used TEXT NOT NULL,
+            reason TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            full_text TEXT,
+            metadata JSONB
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS feedback (
+            id BIGSERIAL PRIMARY KEY,
+            analysis_id TEXT NOT NULL REFERENCES analyses(id),
+            edited_reply TEXT,
+            user_category TEXT,
+            rating INTEGER,
+            comments TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_text_hash ON analyses(text_hash)",
+        "CREATE INDEX IF NOT EXISTS idx_created_at ON analyses(created_at)",
+    ]),
+    # v2: hash SHA-256 em bytea (32 bytes em vez de 64 caracteres hex).
+    # Textos grandes já são comprimidos pelo TOAST do Postgres.
+    (2, [
+        "ALTER TABLE analyses ALTER COLUMN text_hash TYPE BYTEA USING decode(text_hash, 'hex')",
+    ]),
+    # v3: Idempotency-Key -> análise (retentativas do cliente)
+    (3, [
+        """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key TEXT PRIMARY KEY,
+            analysis_id TEXT NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_idempotency_created_at ON idempotency_keys(created_at)",
+    ]),
+    # v4: tokens e latência por chamada ao LLM (mantida após o arquivamento)
+    (4, [
+        """
+        CREATE TABLE IF NOT EXISTS llm_calls (
+            analysis_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            model TEXT NOT NULL,
+            prompt_tokens INTEGER NOT NULL,
+            completion_tokens INTEGER NOT NULL,
+            cached_tokens INTEGER NOT NULL DEFAULT 0,
+            latency_ms INTEGER NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_llm_calls_created_at ON llm_calls(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_llm_calls_analysis_id ON llm_calls(analysis_id)",
+    ]),
+    # v5: busca textual (tsvector gerado + GIN); resumo com peso maior
+    (5, [
+        """
+        ALTER TABLE analyses ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('portuguese', summary), 'A') ||
+            setweight(to_tsvector('portuguese', coalesce(reason, '')), 'B') ||
+            setweight(to_tsvector('portuguese', suggested_reply), 'B')
+        ) STORED
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_analyses_search ON analyses USING GIN (search_vector)",
+    ]),
+    # v6: ponto de sincronização de cada pasta IMAP (app/services/mailbox.py)
+    (6, [
+        """
+        CREATE TABLE IF NOT EXISTS mailbox_state (
+            mailbox TEXT PRIMARY KEY,
+            uidvalidity BIGINT NOT NULL,
+            last_uid BIGINT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+    ]),
+    # v7: mensagens IMAP que falharam acima do ponto de sincronização
+    (7, [
+        """
+        CREATE TABLE IF NOT EXISTS mailbox_failures (
+            mailbox TEXT NOT NULL,
+            uid BIGINT NOT NULL,
+            attempts INTEGER NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (mailbox, uid)
+        )
+        """,
+    ]),
+    # v8: fingerprint da requisição junto da Idempotency-Key (chave reusada com outro corpo = 422)
+    (8, [
+        "ALTER TABLE idempotency_keys ADD COLUMN IF NOT EXISTS fingerprint TEXT",
+    ]),
+    # v9: categoria, modelo e etapa como ids do dicionário labels (como no
+    # SQLite): 2 bytes por coluna em vez do texto repetido em cada linha.
+    # CLUSTER reescreve as tabelas para liberar o espaço das colunas removidas.
+    (9, [
+        """
+        CREATE TABLE IF NOT EXISTS labels (
+            id SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            UNIQUE (kind, value)
+        )
+        """,
+        """
+        INSERT INTO labels (kind, value)
+        SELECT 'category', category FROM analyses
+        UNION SELECT 'model', model_used FROM analyses
+        UNION SELECT 'stage', stage FROM llm_calls
+        UNION SELECT 'model', model FROM llm_calls
+        ON CONFLICT DO NOTHING
+        """,
+        """
+        ALTER TABLE analyses
+            ADD COLUMN category_id SMALLINT REFERENCES labels(id),
+            ADD COLUMN model_id SMALLINT REFERENCES labels(id)
+        """,
+        """
+        UPDATE analyses a SET category_id = c.id, model_id = m.id
+        FROM labels c, labels m
+        WHERE c.kind = 'category' AND c.value = a.category
+          AND m.kind = 'model' AND m.value = a.model_used
+        """,
+        """
+        ALTER TABLE analyses
+            ALTER COLUMN category_id SET NOT NULL,
+            ALTER COLUMN model_id SET NOT NULL,
+            DROP COLUMN category,
+            DROP COLUMN model_used
+        """,
+        """
+        ALTER TABLE llm_calls
+            ADD COLUMN stage_id SMALLINT REFERENCES labels(id),
+            ADD COLUMN model_id SMALLINT REFERENCES labels(id)
+        """,
+        """
+        UPDATE llm_calls l SET stage_id = s.id, model_id = m.id
+        FROM labels s, labels m
+        WHERE s.kind = 'stage' AND s.value = l.stage
+          AND m.kind = 'model' AND m.value = l.model
+        """,
+        """
+        ALTER TABLE llm_calls
+            ALTER COLUMN stage_id SET NOT NULL,
+            ALTER COLUMN model_id SET NOT NULL,
+            DROP COLUMN stage,
+            DROP COLUMN model
+        """,
+        "CLUSTER analyses USING idx_created_at",
+        "CLUSTER llm_calls USING idx_llm_calls_created_at",
+    ]),
+]
+
+# Colunas gravadas em analyses: ANALYSIS_COLUMNS com categoria e modelo como ids de labels
+ANALYSIS_WRITE_COLUMNS = tuple(
+    {"category": "category_id", "model_used": "model_id"}.get(column, column)
+    for column in ANALYSIS_COLUMNS
+)
+
+# ANALYSIS_COLUMNS + created_at, com categoria e modelo resolvidos (alias "a")
+SELECT_ANALYSES = f"""
+    SELECT {', '.join({"category": "c.value", "model_used": "m.value"}.get(column, "a." + column)
+                      for column in ANALYSIS_COLUMNS)}, a.created_at
+    FROM analyses a
+    JOIN labels c ON c.id = a.category_id
+    JOIN labels m ON m.id = a.model_id
+"""
+
+LLM_CALL_COLUMNS = (
+    "analysis_id", "stage_id", "model_id", "prompt_tokens", "completion_tokens", "cached_tokens", "latency_ms"
+)
+
+
+def analysis_row(cursor) -> Callable[[Sequence], Analysis]:
+    """
+    Row factory do psycopg: ANALYSIS_COLUMNS + created_at direto no Analysis,
+    no formato do backend SQLite (hash hex, timestamp ISO 8601)
+    """
+    def make_row(values: Sequence) -> Analysis:
+        (analysis_id, text_hash, category, confidence, suggested_reply, summary,
+         model_used, reason, full_text, metadata, created_at) = values
+        return Analysis(
+            id=analysis_id,
+            category=category,
+            confidence=confidence,
+            suggested_reply=suggested_reply,
+            summary=summary,
+            model_used=model_used,
+            reason=reason,
+            full_text=full_text,
+            metadata=metadata or {},
+            created_at=created_at.isoformat(),
+            text_hash=bytes(text_hash).hex()
+        )
+    return make_row
+
+
+class PostgresDatabase:
+    """Operações de banco de dados sobre Postgres (psycopg 3 + pool)"""
+
+    def __init__(self, url: Optional[str] = None):
+        self.settings = get_settings()
+        self.url = url or self.settings.DATABASE_URL
+        self._label_ids: Dict[Tuple[str, str], int] = {}
+        # prepare_threshold=0: toda query vira prepared statement já no primeiro uso
+        self.pool = ConnectionPool(
+            self.url,
+            min_size=self.settings.DB_POOL_MIN_SIZE,
+            max_size=self.settings.DB_POOL_MAX_SIZE,
+            kwargs={"prepare_threshold": 0, "row_factory": dict_row},
+            open=True
+        )
+        try:
+            self._migrate()
+        except Exception:
+            self.pool.close()
+            raise
+
+    def _migrate(self):
+        """
+        Aplica migrações pendentes (registradas em schema_migrations)
+
+        Cada migração roda na sua própria transação. Uma falha é propagada:
+        a aplicação não sobe com o schema pela metade.
+        """
+        try:
+            with self.pool.connection() as conn:
+                conn.autocommit = True
+                # Lock de sessão (sobrevive aos commits): serializa as réplicas
+                # desde a criação de schema_migrations até a última migração
+                conn.execute("SELECT pg_advisory_lock(hashtext('schema_migrations'))")
+                try:
+                    self._apply_migrations(conn)
+                finally:
+                    conn.execute("SELECT pg_advisory_unlock(hashtext('schema_migrations'))")
+                    conn.autocommit = False
+            logger.info("Database Postgres inicializado")
+
+        except Exception as e:
+            logger.error(f"Erro ao inicializar database Postgres: {str(e)}")
+            raise
+
+    @staticmethod
+    def _apply_migrations(conn):
+        """Cria schema_migrations e aplica as versões que faltam, uma transação cada"""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """)
+        applied = {
+            row["version"]
+            for row in conn.execute("SELECT version FROM schema_migrations")
+        }
+        for version, statements in MIGRATIONS:
+            if version in applied:
+                continue
+            with conn.transaction():
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+            logger.info(f"Migração Postgres aplicada: v{version}")
+
+    def close(self):
+        """Fecha o pool de conexões"""
+        self.pool.close()
+
+    def _label_id(self, kind: str, value: str) -> int:
+        """Id do valor no dicionário labels (criando se necessário)"""
+        key = (kind, value)
+        label_id = self._label_ids.get(key)
+        if label_id is None:
+            # Conexão e transação próprias: um rollback da análise não pode
+            # invalidar o cache. Chamar antes de pegar a conexão da gravação.
+            with self.pool.connection() as conn:
+                conn.execute(
+                    "INSERT INTO labels (kind, value) VALUES (%s, %s) ON CONFLICT DO NOTHING", key
+                )
+                label_id = conn.execute(
+                    "SELECT id FROM labels WHERE kind = %s AND value = %s", key
+                ).fetchone()["id"]
+            self._label_ids[key] = label_id
+        return label_id
+
+    def _encode_row(self, analysis: Analysis) -> tuple:
+        """Linha de ANALYSIS_WRITE_COLUMNS: hash em bytea, categoria e modelo como ids"""
+        (analysis_id, text_hash, category, confidence, suggested_reply,
+         summary, model_used, reason, full_text, metadata) = build_analysis_row(analysis, self.settings)
+        return (
+            analysis_id,
+            bytes.fromhex(text_hash),
+            self._label_id("category", category),
+            confidence,
+            suggested_reply,
+            summary,
+            self._label_id("model", model_used),
+            reason,
+            full_text,
+            metadata
+        )
+
+    def _encode_llm_calls(self, analysis: Analysis) -> List[tuple]:
+        """Linhas de llm_calls da análise (etapa e modelo como ids de labels)"""
+        return [
+            (
+                analysis.id,
+                self._label_id("stage", call["stage"]),
+                self._label_id("model", call["model"]),
+                call["prompt_tokens"],
+                call["completion_tokens"],
+                call.get("cached_tokens", 0),
+                call["latency_ms"]
+            )
+            for call in analysis.llm_calls
+        ]
+
+    def save_analysis(self, analysis: Union[Analysis, Mapping]) -> Optional[str]:
+        """
+        Salva resultado de análise
+
+        Returns:
+            created_at gravado (ISO 8601), ou None em caso de erro
+        """
+        try:
+            analysis = Analysis.coerce(analysis)
+            encoded = self._encode_row(analysis)
+            llm_calls = self._encode_llm_calls(analysis)
+            with self.pool.connection() as conn:
+                row = conn.execute(f"""
+                    INSERT INTO analyses ({', '.join(ANALYSIS_WRITE_COLUMNS)})
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    RETURNING created_at
+                """, encoded).fetchone()
+                if llm_calls:
+                    with conn.cursor() as cursor:
+                        cursor.executemany(
+                            f"INSERT INTO llm_calls ({', '.join(LLM_CALL_COLUMNS)}) "
+                            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                            llm_calls
+                        )
+            return row["created_at"].isoformat()
+
+        except Exception as e:
+            logger.error(f"Erro ao salvar análise: {str(e)}")
+            return None
+
+    def save_analyses(self, analyses: List[Union[Analysis, Mapping]]) -> int:
+        """
+        Salva um lote de análises via COPY
+
+        Returns:
+            Número de análises gravadas (0 em caso de erro)
+        """
+        if not analyses:
+            return 0
+        try:
+            analyses = [Analysis.coerce(a) for a in analyses]
+            rows = [self._encode_row(analysis) for analysis in analyses]
+            llm_calls = [row for analysis in analyses for row in self._encode_llm_calls(analysis)]
+            with self.pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    with cursor.copy(f"COPY analyses ({', '.join(ANALYSIS_WRITE_COLUMNS)}) FROM STDIN") as copy:
+                        for row in rows:
+                            copy.write_row(row)
+                    with cursor.copy(f"COPY llm_calls ({', '.join(LLM_CALL_COLUMNS)}) FROM STDIN") as copy:
+                        for row in llm_calls:
+                            copy.write_row(row)
+            return len(analyses)
+
+        except Exception as e:
+            logger.error(f"Erro ao salvar lote de análises: {str(e)}")
+            return 0
+
+    def get_analysis(self, analysis_id: str) -> Optional[Analysis]:
+        """Busca análise por ID"""
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor(row_factory=analysis_row) as cursor:
+                    return cursor.execute(
+                        f"{SELECT_ANALYSES} WHERE a.id = %s",
+                        (analysis_id,)
+                    ).fetchone()
+
+        except Exception as e:
+            logger.error(f"Erro ao buscar análise: {str(e)}")
+            return None
+
+    def search_analyses(self, query: str, limit: int = 20, offset: int = 0,
+                        recent: Optional[int] = None) -> List[Dict]:
+        """
+        Busca análises por palavras do resumo, motivo ou resposta sugerida
+
+        websearch_to_tsquery aceita a busca do usuário sem escapes; o
+        ts_headline (caro) roda só nas linhas da página. recent: ver
+        Database.search_analyses.
+        """
+        recent = self.settings.SEARCH_RECENT_CANDIDATES if recent is None else recent
+        window, window_params = "", ()
+        if recent > 0:
+            window, window_params = "ORDER BY a.created_at DESC LIMIT %s", (max(recent, offset + limit),)
+        with self.pool.connection() as conn:
+            rows = conn.execute(f"""
+                WITH q AS (SELECT websearch_to_tsquery('portuguese', %s) AS query),
+                matches AS (
+                    SELECT a.* FROM analyses a, q
+                    WHERE a.search_vector @@ q.query
+                    {window}
+                ),
+                page AS (
+                    SELECT a.id, a.category_id, a.confidence, a.summary, a.reason,
+                           a.suggested_reply, a.created_at,
+                           ts_rank(a.search_vector, q.query) AS score
+                    FROM matches a, q
+                    ORDER BY score DESC, a.created_at DESC
+                    LIMIT %s OFFSET %s
+                )
+                SELECT page.id, c.value AS category, page.confidence, page.summary, page.created_at,
+                       ts_headline('portuguese',
+                                   concat_ws(' … ', page.summary, page.reason, page.suggested_reply),
+                                   q.query, %s) AS snippet,
+                       page.score
+                FROM page
+                JOIN labels c ON c.id = page.category_id, q
+                ORDER BY page.score DESC, page.created_at DESC
+            """, (query, *window_params, limit, offset,
+                  f"StartSel={SNIPPET_MARKS[0]}, StopSel={SNIPPET_MARKS[1]}, MaxWords=16, MinWords=6")
+            ).fetchall()
+        for row in rows:
+            row["created_at"] = row["created_at"].isoformat()
+        return rows
+
+    def iter_analyses(self, start: Optional[str] = None, end: Optional[str] = None,
+                      batch_size: int = 1000) -> Iterator[Analysis]:
+        """
+        Percorre as análises de um período em ordem de created_at
+
+        Cursor nomeado (do lado do servidor): o Postgres envia batch_size
+        linhas por vez; o MVCC não bloqueia gravações durante a leitura.
+        """
+        conditions, params = [], []
+        if start:
+            conditions.append("a.created_at >= %s")
+            params.append(start)
+        if end:
+            conditions.append("a.created_at < %s")
+            params.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self.pool.connection() as conn:
+            with conn.cursor(name="export_analyses", row_factory=analysis_row) as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(
+                    f"{SELECT_ANALYSES} {where} ORDER BY a.created_at, a.id",
+                    params
+                )
+                yield from cursor
+
+    def save_feedback(self, feedback_data: Dict) -> bool:
+        """Salva feedback do usuário"""
+        try:
+            with self.pool.connection() as conn:
+                conn.execute("""
+                    INSERT INTO feedback
+                    (analysis_id, edited_reply, user_category, rating, comments)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (
+                    feedback_data["analysis_id"],
+                    feedback_data.get("edited_reply"),
+                    feedback_data.get("user_category"),
+                    feedback_data.get("rating"),
+                    feedback_data.get("comments")
+                ))
+            return True
+
+        except Exception as e:
+            logger.error(f"Erro ao salvar feedback: {str(e)}")
+            return False
+
+    def check_duplicate(self, text: str) -> Optional[str]:
+        """Verifica se texto já foi processado (retorna ID se sim)"""
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute("""
+                    SELECT id FROM analyses
+                    WHERE text_hash = %s
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                """, (bytes.fromhex(compute_text_hash(text)),)).fetchone()
+
+            if row:
+                return row["id"]
+            return None
+
+        except Exception as e:
+            logger.error(f"Erro ao verificar duplicata: {str(e)}")
+            return None
+
+    def usage_by_day(self, days: int) -> List[Dict]:
+        """Tokens e latência das chamadas ao LLM agregados por dia, modelo e etapa"""
+        with self.pool.connection() as conn:
+            rows = conn.execute("""
+                SELECT to_char(l.created_at::date, 'YYYY-MM-DD') AS day, m.value AS model, s.value AS stage,
+                       COUNT(*) AS calls,
+                       COUNT(DISTINCT l.analysis_id) AS analyses,
+                       SUM(l.prompt_tokens) AS prompt_tokens,
+                       SUM(l.completion_tokens) AS completion_tokens,
+                       SUM(l.cached_tokens) AS cached_tokens,
+                       ROUND(AVG(l.latency_ms), 1)::float AS avg_latency_ms,
+                       MAX(l.latency_ms) AS max_latency_ms
+                FROM llm_calls l
+                JOIN labels m ON m.id = l.model_id
+                JOIN labels s ON s.id = l.stage_id
+                WHERE l.created_at >= now() - make_interval(days => %s)
+                GROUP BY 1, m.value, s.value
+                ORDER BY day DESC, model, stage
+            """, (days,)).fetchall()
+        return rows
+
+    def top_usage(self, days: int, limit: int) -> List[Dict]:
+        """Análises que mais consumiram tokens no período"""
+        with self.pool.connection() as conn:
+            rows = conn.execute("""
+                SELECT analysis_id,
+                       SUM(prompt_tokens + completion_tokens) AS total_tokens,
+                       SUM(prompt_tokens) AS prompt_tokens,
+                       SUM(completion_tokens) AS completion_tokens,
+                       SUM(cached_tokens) AS cached_tokens,
+                       SUM(latency_ms) AS latency_ms,
+                       MIN(created_at) AS created_at
+                FROM llm_calls
+                WHERE created_at >= now() - make_interval(days => %s)
+                GROUP BY analysis_id
+                ORDER BY total_tokens DESC
+                LIMIT %s
+            """, (days, limit)).fetchall()
+        for row in rows:
+            row["created_at"] = row["created_at"].isoformat()
+        return rows
+
+    def get_idempotency_key(self, key: str, max_age_hours: int) -> Optional[Dict]:
+        """Idempotency-Key registrada dentro do prazo (dict com analysis_id e fingerprint)"""
+        try:
+            with self.pool.connection() as conn:
+                return conn.execute("""
+                    SELECT analysis_id, fingerprint FROM idempotency_keys
+                    WHERE key = %s AND created_at >= now() - make_interval(hours => %s)
+                """, (key, max_age_hours)).fetchone()
+
+        except Exception as e:
+            logger.error(f"Erro ao buscar idempotency key: {str(e)}")
+            return None
+
+    def save_idempotency_key(self, key: str, analysis_id: str, max_age_hours: int,
+                             fingerprint: Optional[str] = None) -> bool:
+        """Registra a Idempotency-Key com o fingerprint da requisição (e descarta as vencidas)"""
+        try:
+            with self.pool.connection() as conn:
+                conn.execute(
+                    "DELETE FROM idempotency_keys WHERE created_at < now() - make_interval(hours => %s)",
+                    (max_age_hours,)
+                )
+                conn.execute("""
+                    INSERT INTO idempotency_keys (key, analysis_id, fingerprint) VALUES (%s, %s, %s)
+                    ON CONFLICT (key) DO UPDATE
+                    SET analysis_id = EXCLUDED.analysis_id, fingerprint = EXCLUDED.fingerprint,
+                        created_at = now()
+                """, (key, analysis_id, fingerprint))
+            return True
+
+        except Exception as e:
+            logger.error(f"Erro ao salvar idempotency key: {str(e)}")
+            return False
+
+    def get_mailbox_state(self, mailbox: str) -> Optional[Dict]:
+        """uidvalidity e last_uid da pasta IMAP (None se nunca sincronizada)"""
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT uidvalidity, last_uid FROM mailbox_state WHERE mailbox = %s", (mailbox,)
+            ).fetchone()
+
+    def save_mailbox_state(self, mailbox: str, uidvalidity: int, last_uid: int) -> None:
+        """Avança o ponto de sincronização da pasta IMAP"""
+        with self.pool.connection() as conn:
+            conn.execute("""
+                INSERT INTO mailbox_state (mailbox, uidvalidity, last_uid) VALUES (%s, %s, %s)
+                ON CONFLICT (mailbox) DO UPDATE
+                SET uidvalidity = EXCLUDED.uidvalidity, last_uid = EXCLUDED.last_uid, updated_at = now()
+            """, (mailbox, uidvalidity, last_uid))
+
+    def get_mailbox_failures(self, mailbox: str, max_attempts: int) -> Dict[int, int]:
+        """UID -> tentativas das mensagens da pasta ainda abaixo de max_attempts"""
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT uid, attempts FROM mailbox_failures WHERE mailbox = %s AND attempts < %s ORDER BY uid",
+                (mailbox, max_attempts)
+            ).fetchall()
+            return {row["uid"]: row["attempts"] for row in rows}
+
+    def save_mailbox_failures(self, mailbox: str, attempts: Dict[int, int]) -> None:
+        """Grava (ou atualiza) as tentativas das mensagens que falharam"""
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.executemany("""
+                    INSERT INTO mailbox_failures (mailbox, uid, attempts) VALUES (%s, %s, %s)
+                    ON CONFLICT (mailbox, uid) DO UPDATE
+                    SET attempts = EXCLUDED.attempts, updated_at = now()
+                """, [(mailbox, uid, count) for uid, count in attempts.items()])
+
+    def clear_mailbox_failures(self, mailbox: str, uids: Optional[Iterable[int]] = None) -> None:
+        """Remove as falhas dos UIDs resolvidos (ou todas da pasta, com uids=None)"""
+        with self.pool.connection() as conn:
+            if uids is None:
+                conn.execute("DELETE FROM mailbox_failures WHERE mailbox = %s", (mailbox,))
+            else:
+                conn.execute(
+                    "DELETE FROM mailbox_failures WHERE mailbox = %s AND uid = ANY(%s)", (mailbox, list(uids))
+                )
+
+    def fetch_edited_replies(self, limit: int = 500) -> List[Dict]:
+        """Respostas editadas pelos usuários (feedback), mais recentes primeiro"""
+        try:
+            with self.pool.connection() as conn:
+                return conn.execute("""
+                    SELECT a.summary, COALESCE(f.user_category, c.value) AS category,
+                           f.edited_reply, f.rating
+                    FROM feedback f
+                    JOIN analyses a ON a.id = f.analysis_id
+                    JOIN labels c ON c.id = a.category_id
+                    WHERE f.edited_reply IS NOT NULL AND f.edited_reply <> ''
+                    ORDER BY f.created_at DESC, f.id DESC LIMIT %s
+                """, (limit,)).fetchall()
+
+        except Exception as e:
+            logger.error(f"Erro ao buscar respostas editadas: {str(e)}")
+            return []
+
+    def ping(self) -> bool:
+        """Verifica se o banco responde (usado pelo health monitor)"""
+        with self.pool.connection() as conn:
+            conn.execute("SELECT 1")
+        return True
@@ -0,0 +1,152 @@
+"""
+Upload utilities - Leitura de uploads em blocos com limite de tamanho
+Rejeita corpos grandes antes de bufferizá-los e calcula o hash do conteúdo
+enquanto lê
+"""
+import hashlib
+import json
+from typing import Tuple
+
+from fastapi import HTTPException, Request, UploadFile
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CHUNK_SIZE = 64 * 1024
+
+# Folga para boundaries, cabeçalhos das partes e o campo "text" do multipart
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def upload_too_large(max_size: int) -> HTTPException:
+    """Erro 413 padronizado com o limite em formato legível"""
+    return HTTPException(
+        status_code=413,
+        detail=f"Arquivo muito grande (máx {max_size / 1_048_576:g}MB)"
+    )
+
+
+class BodySizeLimitMiddleware:
+    """
+    Middleware ASGI que limita o tamanho dos uploads multipart em path
+
+    Só os uploads multipart de /api/process passam por aqui; rotas que leem
+    o corpo inteiro (JSON, lotes) aplicam o próprio limite com read_body.
+
+    - Content-Length acima do limite: 413 sem ler o corpo
+    - Sem Content-Length (chunked) ou cliente mentindo: aborta com 413 assim
+      que os bytes recebidos passam do limite, antes do multipart ser
+      bufferizado por inteiro
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int, max_upload_size: int, path: str = "/api/process"):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.max_upload_size = max_upload_size
+        self.path = path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").lower().startswith(b"multipart/"):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_body_size:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    # Repassado pelo FastAPI ao tratador de HTTPException
+                    raise upload_too_large(self.max_upload_size)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send: Send):
+        error = upload_too_large(self.max_upload_size)
+        body = json.dumps({"detail": error.detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def read_body(request: Request, max_size: int) -> bytes:
+    """
+    Lê o corpo da requisição em blocos, abortando assim que passar de max_size
+
+    Raises:
+        HTTPException: 413 se o corpo passar do limite
+    """
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_size:
+        raise body_too_large(max_size)
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_size:
+            raise body_too_large(max_size)
+    return bytes(body)
+
+
+def body_too_large(max_size: int) -> HTTPException:
+    """Erro 413 para corpos JSON/msgpack/NDJSON acima do limite da rota"""
+    return HTTPException(
+        status_code=413,
+        detail=f"Corpo da requisição muito grande (máx {max_size / 1_048_576:g}MB)"
+    )
+
+
+async def read_upload(file: UploadFile, max_size: int) -> Tuple[memoryview, str]:
+    """
+    Lê o upload em blocos, abortando assim que passar de max_size
+
+    Returns:
+        (memoryview sobre o buffer lido, SHA-256 hex do conteúdo)
+
+    Raises:
+        HTTPException: 413 se o arquivo passar do limite
+    """
+    if file.size is not None and file.size > max_size:
+        raise upload_too_large(max_size)
+
+    # Pré-aloca quando o tamanho é conhecido: um único buffer, sem realocações
+    buffer = bytearray(file.size) if file.size is not None else bytearray()
+    hasher = hashlib.sha256()
+    view = memoryview(buffer)
+    size = 0
+
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        end = size + len(chunk)
+        if end > max_size:
+            raise upload_too_large(max_size)
+        hasher.update(chunk)
+        if end <= len(buffer):
+            view[size:end] = chunk
+        else:
+            view.release()
+            buffer[size:] = chunk
+            view = memoryview(buffer)
+        size = end
+
+    return view[:size], hasher.hexdigest()
@@ -0,0 +1,151 @@
+"""
+Wire formats - Negociação de conteúdo e (de)serialização dos corpos da API
+JSON (orjson quando instalado), msgpack (opcional) e NDJSON para lotes e
+streaming. Os mesmos formatos valem para respostas (Accept) e requisições
+(Content-Type)
+"""
+import json
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele, json da stdlib
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack é opcional
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+NDJSON = "application/x-ndjson"
+
+# Nomes alternativos usados por clientes e bibliotecas
+MEDIA_ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/ndjson": NDJSON,
+    "application/jsonl": NDJSON,
+}
+
+
+def dumps_json(data: Any) -> bytes:
+    """JSON compacto em UTF-8 (data já em tipos JSON, ex.: model_dump(mode="json"))"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def supported(media_type: str) -> bool:
+    """True se o formato pode ser usado neste processo"""
+    return media_type in (JSON, NDJSON) or (media_type == MSGPACK and msgpack is not None)
+
+
+def media_type_of(content_type: Optional[str]) -> str:
+    """Tipo base do cabeçalho (sem parâmetros, minúsculo, aliases resolvidos)"""
+    base = (content_type or "").split(";", 1)[0].strip().lower()
+    return MEDIA_ALIASES.get(base, base)
+
+
+def negotiate(accept: Optional[str], offered: Sequence[str]) -> Optional[str]:
+    """
+    Melhor formato de offered para o cabeçalho Accept
+
+    Maior q vence; no empate vale a ordem de offered (preferência do
+    servidor). Sem Accept, o primeiro de offered.
+
+    Returns:
+        Media type escolhido ou None se nenhum for aceito (406)
+    """
+    offered = [media_type for media_type in offered if supported(media_type)]
+    if not accept:
+        return offered[0] if offered else None
+
+    quality = {}
+    for item in accept.split(","):
+        media_range, *params = item.split(";")
+        media_range = MEDIA_ALIASES.get(media_range.strip().lower(), media_range.strip().lower())
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        for media_type in offered:
+            if media_range in (media_type, "*/*", media_type.split("/")[0] + "/*"):
+                # O intervalo mais específico define o q do tipo
+                specificity = media_range.count("*")
+                current = quality.get(media_type)
+                if current is None or specificity < current[0]:
+                    quality[media_type] = (specificity, q)
+
+    best = None
+    for media_type in offered:
+        if media_type in quality and quality[media_type][1] > 0:
+            if best is None or quality[media_type][1] > quality[best][1]:
+                best = media_type
+    return best
+
+
+def encode(data: Any, media_type: str) -> bytes:
+    """Serializa um objeto (JSON/msgpack) ou uma linha NDJSON"""
+    if media_type == MSGPACK:
+        return msgpack.packb(data, use_bin_type=True)
+    if media_type == NDJSON:
+        return dumps_json(data) + b"\n"
+    return dumps_json(data)
+
+
+def decode(body: bytes, media_type: str) -> Any:
+    """
+    Desserializa o corpo da requisição (NDJSON vira lista)
+
+    Raises:
+        HTTPException: 415 para formato não suportado, 400 para corpo inválido
+    """
+    if not supported(media_type):
+        raise HTTPException(status_code=415, detail=f"Content-Type não suportado: {media_type or 'ausente'}")
+    try:
+        if media_type == MSGPACK:
+            return msgpack.unpackb(body, raw=False)
+        if media_type == NDJSON:
+            return [loads_json(line) for line in body.splitlines() if line.strip()]
+        return loads_json(body)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Corpo inválido ({media_type}): {str(e)}")
+
+
+def accepted_type(accept: Optional[str], offered: Sequence[str] = (JSON, MSGPACK)) -> str:
+    """
+    negotiate que falha cedo (antes de processar a requisição)
+
+    Raises:
+        HTTPException: 406 se nenhum formato oferecido for aceito
+    """
+    media_type = negotiate(accept, offered)
+    if media_type is None:
+        available = [media_type for media_type in offered if supported(media_type)]
+        raise HTTPException(status_code=406, detail=f"Formatos disponíveis: {', '.join(available)}")
+    return media_type
+
+
+def encoded_response(data: Any, media_type: str) -> Response:
+    """Resposta com data serializado no formato negociado"""
+    return Response(encode(data, media_type), media_type=media_type, headers={"Vary": "Accept"})
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse com dumps_json (orjson quando instalado)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
@@ -0,0 +1 @@
+"""Benchmarks - run from server/ with python -m benchmarks.<name>"""
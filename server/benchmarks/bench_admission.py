@@ -0,0 +1,121 @@
+"""
+Admission benchmark - Latência das requisições admitidas com carga acima da capacidade
+
+Roda a API em processo (httpx.ASGITransport) com um AIClient simulado: no
+máximo --capacity chamadas simultâneas ao "OpenAI", cada uma levando
+--service-ms. Dispara POST /api/process em ritmo fixo (carga aberta, como
+clientes reais que não esperam os outros) acima da capacidade e compara:
+
+- sem admissão: tudo entra e espera o upstream
+- com admissão: AdmissionController com os limites dados
+
+Uso (a partir de server/):
+    python -m benchmarks.bench_admission [--rate 60] [--duration 10] [--capacity 8] [--service-ms 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+_tmp = tempfile.mkdtemp()
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_tmp}/bench.sqlite3",
+    "ADMISSION_MAX_IN_FLIGHT": "0",  # O caso "com admissão" é montado abaixo
+    "RATE_LIMIT_PER_SECOND": "0",
+    "LOG_LEVEL": "WARNING",
+    "REPLY_POOL_ENABLED": "false",
+})
+
+from app.core.admission import AdmissionController, AdmissionMiddleware  # noqa: E402
+from app.main import app  # noqa: E402
+import app.services.ai_client as ai_client_module  # noqa: E402
+
+
+class UpstreamAIClient:
+    """Classificação e resposta disputando um upstream de capacidade fixa"""
+
+    def __init__(self, capacity: int, service_seconds: float):
+        self.upstream = asyncio.Semaphore(capacity)
+        self.service_seconds = service_seconds
+
+    async def _call(self):
+        async with self.upstream:
+            await asyncio.sleep(self.service_seconds)
+
+    async def classify_email(self, text):
+        await self._call()
+        return {"category": "Produtivo", "confidence": 0.9, "reason": "Solicitação"}
+
+    async def generate_reply(self, category, summary, original_text):
+        await self._call()
+        return {"reply": "Vamos verificar.", "tone": "cordial"}
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_load(asgi_app, rate: float, duration: float):
+    latencies, statuses = [], {}
+
+    async def one(client, index):
+        started = time.perf_counter()
+        response = await client.post("/api/process", data={"text": f"Preciso do status do pedido {index} " * 3})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code == 200:
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        tasks = []
+        started = time.perf_counter()
+        for index in range(int(rate * duration)):
+            # Carga aberta: a próxima requisição sai no horário, independente das anteriores
+            delay = started + index / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(one(client, f"{id(asgi_app)}-{index}")))
+        await asyncio.gather(*tasks)
+    return latencies, statuses
+
+
+async def main_async(args):
+    capacity_rps = args.capacity / (2 * args.service_ms / 1000)
+    print(f"capacidade ~{capacity_rps:.0f} req/s (2 chamadas ao upstream por email), "
+          f"carga {args.rate:g} req/s por {args.duration:g}s")
+    print(f"{'admissão':<10} {'200':>6} {'429/503':>8} {'p50(ms)':>9} {'p99(ms)':>9} {'max(ms)':>9}")
+
+    controller = AdmissionController(
+        max_in_flight=args.in_flight, max_queue=args.queue,
+        target_delay=args.target_ms / 1000, interval=args.interval_ms / 1000
+    )
+    for label, asgi_app in (("sem", app), ("com", AdmissionMiddleware(app, controller))):
+        ai_client_module._ai_client = UpstreamAIClient(args.capacity, args.service_ms / 1000)
+        latencies, statuses = await run_load(asgi_app, args.rate, args.duration)
+        shed = statuses.get(429, 0) + statuses.get(503, 0)
+        print(f"{label:<10} {statuses.get(200, 0):>6} {shed:>8} {statistics.median(latencies):>9.0f} "
+              f"{percentile(latencies, 0.99):>9.0f} {max(latencies):>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do controle de admissão")
+    parser.add_argument("--rate", type=float, default=60.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--capacity", type=int, default=8, help="Chamadas simultâneas ao upstream")
+    parser.add_argument("--service-ms", type=float, default=200.0)
+    parser.add_argument("--in-flight", type=int, default=8)
+    parser.add_argument("--queue", type=int, default=16)
+    parser.add_argument("--target-ms", type=float, default=100.0)
+    parser.add_argument("--interval-ms", type=float, default=500.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
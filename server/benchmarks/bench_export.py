@@ -0,0 +1,49 @@
+"""
+Export benchmark - Memória e vazão da exportação em streaming para tamanhos crescentes
+
+Semeia bancos com N análises (benchmarks.bench_search.seed) e consome a
+exportação inteira (Database.iter_analyses -> stream_export) descartando os
+bytes. O pico de memória alocada (tracemalloc) deve ficar igual para 10x
+mais linhas.
+
+Uso (a partir de server/):
+    python -m benchmarks.bench_export [--rows 100000,1000000] [--format ndjson] [--gzip]
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.services.export import stream_export
+from app.utils.database import Database
+from benchmarks.bench_search import seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da exportação em streaming")
+    parser.add_argument("--rows", default="100000,1000000")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'bytes':>12} {'linhas/s':>10} {'pico (KiB)':>11}")
+    for rows in (int(n) for n in args.rows.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(f"sqlite:///{Path(tmp) / 'export.sqlite3'}")
+            seed(db, rows)
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            total = 0
+            for chunk in stream_export(db.iter_analyses(), args.format, gzip=args.gzip):
+                total += len(chunk)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        print(f"{rows:>10} {total:>12} {rows / elapsed:>10.0f} {peak / 1024:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+HTTP pool benchmark - Latência do primeiro request e reuso de conexões do cliente do LLM
+
+Sobe um endpoint local compatível com /v1/chat/completions que conta conexões
+TCP e simula o custo do handshake TLS atrasando cada conexão nova
+(--handshake-ms). Compara:
+
+- default: AsyncOpenAI com o transporte padrão do SDK, sem aquecimento
+- tuned: http_client.build_http_client(settings) + warm_up, como no lifespan
+
+Uso (a partir de server/):
+    python -m benchmarks.bench_http_pool [--requests 200] [--concurrency 8] [--handshake-ms 80]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from openai import AsyncOpenAI
+
+from app.core.settings import Settings
+from app.services import http_client
+
+COMPLETION = json.dumps({
+    "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {
+        "role": "assistant",
+        "content": '{"category": "Produtivo", "confidence": 0.9, "reason": "Solicitação"}'
+    }}],
+    "usage": {"prompt_tokens": 900, "completion_tokens": 30, "total_tokens": 930},
+}).encode()
+
+
+class MockServer:
+    """Servidor HTTP/1.1 mínimo com keep-alive que conta conexões e requisições"""
+
+    def __init__(self, handshake_ms: float, latency_ms: float):
+        self.handshake = handshake_ms / 1000
+        self.latency = latency_ms / 1000
+        self.connections = 0
+        self.requests = 0
+
+    def reset(self):
+        self.connections = 0
+        self.requests = 0
+
+    def delay(self, length: int) -> float:
+        """Tempo de resposta de uma requisição com length bytes de corpo"""
+        return self.latency
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        await asyncio.sleep(self.handshake)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method = lines[0].split(" ", 1)[0]
+                length = 0
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                if length:
+                    await reader.readexactly(length)
+
+                self.requests += 1
+                await asyncio.sleep(self.delay(length))
+                body = b"" if method == "HEAD" else COMPLETION
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+                    + f"content-length: {len(COMPLETION)}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def run_case(name: str, openai_client: AsyncOpenAI, server: MockServer,
+                   requests: int, concurrency: int, warm_up=None):
+    server.reset()
+    warm_ms = 0.0
+    if warm_up is not None:
+        started = time.perf_counter()
+        await warm_up()
+        warm_ms = (time.perf_counter() - started) * 1000
+    warm_connections = server.connections
+
+    async def call() -> float:
+        started = time.perf_counter()
+        await openai_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": "Qual o status do protocolo 123456?"}]
+        )
+        return (time.perf_counter() - started) * 1000
+
+    first_ms = await call()
+
+    latencies = []
+    queue = iter(range(requests - 1))
+
+    async def worker():
+        for _ in queue:
+            latencies.append(await call())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    opened = server.connections - warm_connections
+    reuse = 1 - opened / requests
+    p95 = statistics.quantiles(latencies, n=20)[18] if len(latencies) >= 20 else max(latencies)
+    print(f"{name:<8} {warm_ms:>9.1f} {first_ms:>10.1f} {statistics.median(latencies):>8.1f} "
+          f"{p95:>8.1f} {opened:>6d} {reuse:>7.1%}")
+
+
+async def main_async(args):
+    server = MockServer(args.handshake_ms, args.latency_ms)
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}/v1"
+
+    print(f"mock em {base_url}: handshake {args.handshake_ms:g} ms, latência {args.latency_ms:g} ms, "
+          f"{args.requests} requisições, concorrência {args.concurrency}")
+    print(f"{'cliente':<8} {'warm(ms)':>9} {'1º(ms)':>10} {'p50(ms)':>8} {'p95(ms)':>8} "
+          f"{'conex.':>6} {'reuso':>7}")
+
+    default = AsyncOpenAI(api_key="bench", base_url=base_url, max_retries=0)
+    await run_case("default", default, server, args.requests, args.concurrency)
+    await default.close()
+
+    settings = Settings(OPENAI_API_KEY="bench", OPENAI_BASE_URL=base_url,
+                        HTTP_WARM_CONNECTIONS=args.concurrency)
+    pool = http_client.build_http_client(settings)
+    tuned = AsyncOpenAI(api_key="bench", base_url=base_url, max_retries=0, http_client=pool)
+    await run_case("tuned", tuned, server, args.requests, args.concurrency,
+                   warm_up=lambda: http_client.warm_up(pool, base_url, settings.HTTP_WARM_CONNECTIONS))
+    await pool.aclose()
+
+    counted = http_client.http_connections.value()
+    sent = http_client.http_requests.value()
+    print(f"métricas do pool tuned: {sent:g} requisições, {counted:g} conexões abertas")
+
+    listener.close()
+    await listener.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pool HTTP do cliente do LLM")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--handshake-ms", type=float, default=80.0,
+                        help="Atraso por conexão nova (simula TCP + TLS)")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
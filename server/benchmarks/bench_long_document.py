@@ -0,0 +1,121 @@
+"""
+Long document benchmark - Tempo e cobertura da classificação de um documento longo
+
+Sobe o mock compatível com /v1/chat/completions do bench_http_pool, com
+tempo de resposta --latency-ms + --prefill-ms-per-kchar por 1000 caracteres
+do corpo (prompts maiores demoram mais), e classifica um documento sintético
+de --pages páginas com o AIClient de verdade:
+
+- truncado: classify_email (só os primeiros PROMPT_TEXT_CHARS no prompt)
+- inteiro: uma chamada com o documento inteiro no prompt
+- sequencial: os trechos de split_into_chunks um por vez
+- map-reduce: classify_document (trechos em paralelo + voto)
+
+Uso (a partir de server/):
+    python -m benchmarks.bench_long_document [--pages 30] [--latency-ms 800] [--prefill-ms-per-kchar 30]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ.update({
+    "OPENAI_API_KEY": "bench",
+    "LLM_TIMEOUT_SECONDS": "120",
+    "CB_SLOW_CALL_SECONDS": "120",
+    "LOG_LEVEL": "WARNING",
+})
+
+from app.core.settings import get_settings  # noqa: E402
+from app.services.ai_client import PROMPT_TEXT_CHARS, AIClient  # noqa: E402
+from app.services.nlp import clean_text, split_into_chunks  # noqa: E402
+from benchmarks.bench_http_pool import MockServer  # noqa: E402
+
+PAGE_CHARS = 3000
+SENTENCES = [
+    "O contratante deverá apresentar os comprovantes até o quinto dia útil do mês.",
+    "As partes concordam com a renovação automática por igual período.",
+    "Eventuais reajustes seguirão o índice acordado na cláusula quarta.",
+    "O atendimento técnico estará disponível em horário comercial.",
+    "Solicitamos a revisão dos valores cobrados no último trimestre.",
+    "Qualquer alteração deverá ser comunicada por escrito com trinta dias de antecedência.",
+]
+
+
+class PrefillMockServer(MockServer):
+    """Mock cujo tempo de resposta cresce com o tamanho do prompt"""
+
+    def __init__(self, latency_ms: float, prefill_ms_per_kchar: float):
+        super().__init__(handshake_ms=0, latency_ms=latency_ms)
+        self.prefill = prefill_ms_per_kchar / 1000
+
+    def delay(self, length: int) -> float:
+        return self.latency + length / 1000 * self.prefill
+
+
+def synthetic_document(pages: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    paragraphs, size = [], 0
+    while size < pages * PAGE_CHARS:
+        paragraph = " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(3, 8)))
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+async def main_async(args):
+    server = PrefillMockServer(args.latency_ms, args.prefill_ms_per_kchar)
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    settings = get_settings()
+
+    document = synthetic_document(args.pages)
+    clean = clean_text(document, remove_stopwords=False)
+    chunks = [
+        clean_text(chunk, remove_stopwords=False)
+        for chunk in split_into_chunks(document, settings.LONG_DOC_CHUNK_CHARS,
+                                       settings.LONG_DOC_OVERLAP_CHARS, settings.LONG_DOC_MAX_CHUNKS)
+    ]
+    print(f"documento: {args.pages} páginas, {len(document)} caracteres, {len(chunks)} trechos "
+          f"de até {max(len(c) for c in chunks)} caracteres")
+
+    client = AIClient()
+    await client.warm_up()
+
+    async def sequential():
+        for chunk in chunks:
+            await client._classify_with_model(chunk, settings.LLM_MODEL, max_chars=len(chunk))
+
+    cases = [
+        ("truncado", lambda: client.classify_email(clean), min(len(clean), PROMPT_TEXT_CHARS)),
+        ("inteiro", lambda: client._classify_with_model(clean, settings.LLM_MODEL, max_chars=len(clean)), len(clean)),
+        ("sequencial", sequential, len(clean)),
+        ("map-reduce", lambda: client.classify_document(chunks), len(clean)),
+    ]
+    print(f"{'caso':<12} {'tempo(ms)':>10} {'chamadas':>9} {'cobertura':>10}")
+    for label, run, covered in cases:
+        server.reset()
+        started = time.perf_counter()
+        await run()
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{label:<12} {elapsed:>10.0f} {server.requests:>9} {covered / len(clean):>10.0%}")
+
+    await client.aclose()
+    listener.close()
+    await listener.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da classificação de documentos longos")
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, default=800.0,
+                        help="Tempo fixo por chamada (geração da resposta)")
+    parser.add_argument("--prefill-ms-per-kchar", type=float, default=30.0,
+                        help="Tempo extra por 1000 caracteres do corpo da requisição")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
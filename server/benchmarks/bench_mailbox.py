@@ -0,0 +1,104 @@
+"""
+Mailbox benchmark - Vazão do backlog e latência de ingestão do poller IMAP
+
+Sobe o servidor IMAP de teste (tests/imap_stub.py) com --backlog mensagens
+e o modelo local com latência simulada (--llm-ms), e mede:
+
+- backlog: tempo para classificar a pasta inteira (IMAP_SYNC_EXISTING)
+- ingestão: com o poller rodando (--interval), mensagens chegam uma a uma
+  e medimos do APPEND até a análise gravada
+
+Uso (a partir de server/):
+    python -m benchmarks.bench_mailbox [--backlog 500] [--live 40] [--interval 1] [--llm-ms 300]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp()
+os.environ.update({"DATABASE_URL": f"sqlite:///{_tmp}/bench.sqlite3", "LOG_LEVEL": "WARNING"})
+
+import app.services.ai_client as ai_client_module  # noqa: E402
+from app.services.ai_client import LocalAIClient  # noqa: E402
+from app.services.mailbox import ImapConnection, MailboxPoller  # noqa: E402
+from app.services.pipeline import analyze_email  # noqa: E402
+from app.utils.database import get_database  # noqa: E402
+from tests.imap_stub import ImapStub  # noqa: E402
+
+BODIES = [
+    "Preciso da segunda via do boleto de junho, o anterior venceu.",
+    "Não consigo acessar o sistema desde ontem, aparece erro 500.",
+    "Muito obrigado pelo atendimento de hoje!",
+    "Qual o status do protocolo 48213? Estou aguardando retorno.",
+]
+
+
+def make_email(index: int) -> bytes:
+    body = BODIES[index % len(BODIES)]
+    return (
+        f"From: cliente{index}@example.com\r\nTo: suporte@example.com\r\n"
+        f"Subject: Mensagem {index}\r\nMessage-ID: <{index}@bench>\r\n\r\n{body} (#{index})\r\n"
+    ).encode()
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backlog", type=int, default=500)
+    parser.add_argument("--live", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--spacing", type=float, default=0.25, help="Segundos entre chegadas")
+    parser.add_argument("--llm-ms", type=float, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    ai_client_module._ai_client = LocalAIClient(latency=args.llm_ms / 1000)
+    done = {}
+
+    async def timed_analyze(text, metadata):
+        response = await analyze_email(text, metadata)
+        done[metadata["uid"]] = time.perf_counter()
+        return response
+
+    with ImapStub() as server:
+        for index in range(args.backlog):
+            server.append("INBOX", make_email(index))
+        connection = ImapConnection("127.0.0.1", server.port, "user", "pass", ssl=False)
+        poller = MailboxPoller(connection, get_database(), ["INBOX"], concurrency=args.concurrency,
+                               sync_existing=True, analyze=timed_analyze)
+
+        started = time.perf_counter()
+        totals = await poller.poll_once()
+        elapsed = time.perf_counter() - started
+        print(f"backlog: {totals['classified']} mensagens em {elapsed:.2f}s "
+              f"({totals['classified'] / elapsed:.0f}/s, concorrência {args.concurrency}, LLM {args.llm_ms:.0f} ms)")
+
+        stop = asyncio.Event()
+        worker = asyncio.create_task(poller.run(args.interval, stop))
+        arrived = {}
+        for index in range(args.live):
+            uid = server.append("INBOX", make_email(args.backlog + index))
+            arrived[uid] = time.perf_counter()
+            await asyncio.sleep(args.spacing)
+        while not all(uid in done for uid in arrived):
+            await asyncio.sleep(0.05)
+        stop.set()
+        await worker
+
+        latencies = [(done[uid] - arrived[uid]) * 1000 for uid in arrived]
+        searches = sum(command.startswith("UID SEARCH") for command in server.commands)
+        print(f"ingestão ({args.live} mensagens, intervalo {args.interval}s): "
+              f"p50 {statistics.median(latencies):.0f} ms, p95 {percentile(latencies, 0.95):.0f} ms, "
+              f"máx {max(latencies):.0f} ms")
+        print(f"conexões: {server.logins}, UID SEARCH: {searches} (todas só acima do último UID)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,168 @@
+"""
+Records benchmark - Alocações e tempo por análise: dicts vs records com __slots__
+
+Monta --requests análises mantidas vivas ao mesmo tempo (como requisições
+concorrentes esperando o banco) pelos dois caminhos e mede com tracemalloc
+os bytes retidos por análise e o tempo de montagem:
+
+- dicts: o formato anterior (dict da classificação com as chaves do LLM,
+  dict da resposta, dict da análise, cópia para o save_analysis e
+  ProcessResponse validado campo a campo)
+- records: Classification/Reply/Analysis com __slots__, sem cópia no
+  save e Analysis.to_response
+
+Também compara a leitura de --reads análises do SQLite: sqlite3.Row + dict
+decodificado (formato anterior) vs o row factory analysis_from_row.
+
+Uso (a partir de server/):
+    python -m benchmarks.bench_records [--requests 5000] [--reads 5000]
+"""
+import argparse
+import gc
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from app.models.records import Analysis, Classification, Reply
+from app.models.schemas import ProcessResponse
+from app.utils.database import SELECT_ANALYSES, Database, analysis_from_row
+
+REASON = "Solicitação específica de segunda via de boleto com dados completos. Precisão alta."
+REPLY = "Olá! Recebemos sua solicitação e enviaremos a segunda via do boleto ainda hoje."
+SUMMARY = "Cliente pede a segunda via do boleto de junho."
+LLM_CALL = {"model": "gpt-4o-mini", "prompt_tokens": 900, "completion_tokens": 35,
+            "cached_tokens": 768, "latency_ms": 820}
+
+
+def build_dicts(index: int):
+    """Caminho anterior: um dict por etapa + cópia + response validado"""
+    classification = {"category": "Produtivo", "confidence": 0.93, "reason": REASON,
+                      "model": "gpt-4o-mini", "llm_calls": [dict(LLM_CALL)]}
+    reply = {"reply": REPLY, "tone": "cordial", "max_words": 80, "llm_call": dict(LLM_CALL)}
+    llm_calls = [{"stage": "classify", **call} for call in classification["llm_calls"]]
+    llm_calls.append({"stage": "reply", **reply["llm_call"]})
+    analysis = {
+        "id": str(uuid.UUID(int=index)),
+        "category": classification["category"],
+        "confidence": classification["confidence"],
+        "suggested_reply": reply["reply"],
+        "summary": SUMMARY,
+        "model_used": classification.get("model"),
+        "reason": classification.get("reason"),
+        "full_text": None,
+        "metadata": {"timings": {"clean_ms": 0.4}},
+        "llm_calls": llm_calls,
+    }
+    stored = dict(analysis)
+    stored["created_at"] = "2024-06-03 10:00:00"
+    response = ProcessResponse(
+        id=analysis["id"], category=analysis["category"], confidence=analysis["confidence"],
+        suggested_reply=analysis["suggested_reply"], summary=analysis["summary"],
+        model_used=analysis["model_used"], timestamp=datetime.now(), reason=analysis.get("reason")
+    )
+    return stored, response
+
+
+def build_records(index: int):
+    """Caminho atual: records com __slots__, sem cópia no save, to_response"""
+    classification = Classification(category="Produtivo", confidence=0.93, reason=REASON,
+                                    model="gpt-4o-mini", llm_calls=(dict(LLM_CALL),))
+    reply = Reply(reply=REPLY, tone="cordial", llm_call=dict(LLM_CALL))
+    llm_calls = [{"stage": "classify", **call} for call in classification.llm_calls]
+    llm_calls.append({"stage": "reply", **reply.llm_call})
+    analysis = Analysis(
+        id=str(uuid.UUID(int=index)),
+        category=classification.category,
+        confidence=classification.confidence,
+        suggested_reply=reply.reply,
+        summary=SUMMARY,
+        model_used=classification.model,
+        reason=classification.reason,
+        metadata={"timings": {"clean_ms": 0.4}},
+        llm_calls=tuple(llm_calls)
+    )
+    created_at = "2024-06-03 10:00:00"
+    return analysis, created_at, analysis.to_response()
+
+
+def measure(run, count: int):
+    """
+    (bytes retidos por análise, µs por análise) das count análises que run
+    devolve, todas vivas ao mesmo tempo
+
+    O tempo é medido numa passada sem tracemalloc (que pesa por alocação)
+    """
+    gc.collect()
+    started = time.perf_counter()
+    alive = run()
+    elapsed = time.perf_counter() - started
+    del alive
+    gc.collect()
+    tracemalloc.start()
+    alive = run()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del alive
+    return retained / count, elapsed / count * 1e6
+
+
+def read_dicts(db: Database, ids):
+    conn = sqlite3.connect(db.db_path)
+    conn.row_factory = sqlite3.Row
+    results = []
+    for analysis_id in ids:
+        data = Database._decode_row(conn.execute(f"{SELECT_ANALYSES} WHERE a.id = ?", (analysis_id,)).fetchone())
+        del data["rowid"]
+        results.append(data)
+    conn.close()
+    return results
+
+
+def read_records(db: Database, ids):
+    conn = sqlite3.connect(db.db_path)
+    conn.row_factory = analysis_from_row
+    results = [conn.execute(f"{SELECT_ANALYSES} WHERE a.id = ?", (analysis_id,)).fetchone() for analysis_id in ids]
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--reads", type=int, default=5000)
+    args = parser.parse_args()
+
+    # Aquece imports e caches do pydantic antes de medir
+    build_dicts(0)
+    build_records(0)
+
+    print(f"{'pipeline':<10} {'bytes/análise':>14} {'µs/análise':>11}   ({args.requests} análises vivas)")
+    results = {}
+    for label, build in (("dicts", build_dicts), ("records", build_records)):
+        results[label] = measure(lambda: [build(index) for index in range(args.requests)], args.requests)
+        print(f"{label:<10} {results[label][0]:>14.0f} {results[label][1]:>11.1f}")
+    print(f"{'redução':<10} {1 - results['records'][0] / results['dicts'][0]:>14.0%} "
+          f"{1 - results['records'][1] / results['dicts'][1]:>11.0%}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(f"sqlite:///{tmp}/bench.sqlite3")
+        ids = []
+        for start in range(0, args.reads, 1000):
+            batch = [build_records(index)[0] for index in range(start, min(start + 1000, args.reads))]
+            db.save_analyses(batch)
+            ids += [analysis.id for analysis in batch]
+
+        print(f"\n{'leitura':<10} {'bytes/análise':>14} {'µs/análise':>11}   ({args.reads} get_analysis)")
+        reads = {}
+        for label, read in (("dicts", read_dicts), ("records", read_records)):
+            reads[label] = measure(lambda: read(db, ids), len(ids))
+            print(f"{label:<10} {reads[label][0]:>14.0f} {reads[label][1]:>11.1f}")
+        print(f"{'redução':<10} {1 - reads['records'][0] / reads['dicts'][0]:>14.0%} "
+              f"{1 - reads['records'][1] / reads['dicts'][1]:>11.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Search benchmark - Latência de Database.search_analyses (FTS5) em um banco semeado
+
+Grava --rows análises sintéticas com save_analyses (o mesmo caminho da API,
+que mantém o índice FTS5) e mede a latência de buscas com termos raros,
+comuns, por prefixo e com várias palavras, na primeira página e em uma
+página mais funda.
+
+Cada busca roda com o bm25 sobre todas as correspondências (padrão) e com
+a janela de recência (--recent, como SEARCH_RECENT_CANDIDATES); a coluna
+"top-20 igual" diz quantos dos 20 primeiros da janela coincidem com a
+ordem real por relevância.
+
+Uso (a partir de server/):
+    python -m benchmarks.bench_search [--rows 1000000] [--recent 2000] [--db /tmp/bench_search.sqlite3]
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from pathlib import Path
+
+from app.utils.database import Database
+
+SUMMARIES = [
+    "Solicitação de segunda via do boleto",
+    "Atualização do status do chamado",
+    "Erro ao acessar o sistema após a atualização",
+    "Agradecimento pelo atendimento",
+    "Dúvida sobre o prazo de entrega do pedido",
+    "Pedido de cancelamento do contrato",
+    "Envio de comprovante de pagamento",
+    "Felicitações de fim de ano",
+]
+REASONS = ["Pedido explícito de ação", "Mensagem de cortesia", "Dúvida operacional", "Problema técnico"]
+REPLIES = [
+    "Segue o boleto atualizado com vencimento em {n} dias.",
+    "Seu chamado {n} está em análise pela equipe responsável.",
+    "Obrigado pela mensagem! Seguimos à disposição.",
+    "Verificamos o acesso do usuário {n} e o problema foi corrigido.",
+    "O pedido {n} será entregue em até 5 dias úteis.",
+]
+# Termos raros: aparecem em ~1 a cada RARE_EVERY análises
+RARE_TERMS = ["reembolso", "portabilidade", "chargeback", "homologação"]
+RARE_EVERY = 5000
+
+QUERIES = [
+    ("raro", "chargeback"),
+    ("comum", "boleto"),
+    ("prefixo", "atualiz*"),
+    ("2 palavras", "prazo entrega"),
+    ("sem acento", "solicitacao boleto"),
+]
+
+
+def seed(db: Database, rows: int, batch_size: int = 5000):
+    rng = random.Random(42)
+    started = time.perf_counter()
+    for start in range(0, rows, batch_size):
+        batch = []
+        for index in range(start, min(start + batch_size, rows)):
+            summary = rng.choice(SUMMARIES)
+            if index % RARE_EVERY == 0:
+                summary += f" ({rng.choice(RARE_TERMS)})"
+            batch.append({
+                "id": str(uuid.uuid4()),
+                "category": rng.choice(["Produtivo", "Improdutivo"]),
+                "confidence": rng.uniform(0.6, 0.99),
+                "suggested_reply": rng.choice(REPLIES).format(n=rng.randint(1000, 99999)),
+                "summary": summary,
+                "model_used": "gpt-4o-mini",
+                "reason": rng.choice(REASONS),
+                "full_text": f"email {index}",
+            })
+        db.save_analyses(batch)
+    print(f"{rows} análises gravadas em {time.perf_counter() - started:.1f}s")
+
+
+def measure(db: Database, query: str, offset: int, repeat: int, recent: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = db.search_analyses(query, limit=21, offset=offset, recent=recent)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da busca textual (FTS5)")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--db", type=Path, default=Path("/tmp/bench_search.sqlite3"))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--recent", type=int, default=2000, help="Janela de recência comparada")
+    parser.add_argument("--reuse", action="store_true", help="Usa o banco existente sem semear")
+    args = parser.parse_args()
+
+    if not args.reuse:
+        args.db.unlink(missing_ok=True)
+    db = Database(f"sqlite:///{args.db}")
+    if not args.reuse:
+        seed(db, args.rows)
+    print(f"banco: {args.db} ({args.db.stat().st_size / 1e6:.0f} MB, {db.count_analyses()} análises)")
+
+    print(f"{'busca':<12} {'query':<22} {'ranking':<14} {'p50 pág.1':>10} {'max':>8} "
+          f"{'p50 pág.50':>11} {'max':>8} {'top-20 igual':>13}")
+    for label, query in QUERIES:
+        expected = None
+        for ranking, recent in (("todas", 0), (f"recentes {args.recent}", args.recent)):
+            first_p50, first_max, results = measure(db, query, 0, args.repeat, recent)
+            deep_p50, deep_max, _ = measure(db, query, 20 * 49, args.repeat, recent)
+            top = [hit["id"] for hit in results[:20]]
+            expected = expected or top
+            same = len(set(top) & set(expected))
+            print(f"{label:<12} {query:<22} {ranking:<14} {first_p50:>8.2f}ms {first_max:>6.2f}ms "
+                  f"{deep_p50:>9.2f}ms {deep_max:>6.2f}ms {same:>10}/{len(expected)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Speculation benchmark - Latência por email com e sem resposta especulativa
+
+Roda classify_prepared sobre um corpus rotulado com um LLM simulado que
+devolve o rótulo (confiança 0.8, abaixo do pool) com latências
+aleatórias de classificação (--classify-ms) e de resposta (--reply-ms).
+O palpite é o rules.guess_category de verdade, então a taxa de acerto é a
+das regras sobre o corpus. Compara:
+
+- sequencial: classificação e depois resposta
+- especulativo: SPECULATIVE_REPLY_ENABLED=true
+
+Uso (a partir de server/):
+    python -m benchmarks.bench_speculation [--emails 400] [--classify-ms 800] [--reply-ms 1200]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp()
+os.environ.update({"DATABASE_URL": f"sqlite:///{_tmp}/bench.sqlite3", "LOG_LEVEL": "WARNING"})
+
+from app.core.settings import get_settings  # noqa: E402
+from app.services.nlp import clean_text  # noqa: E402
+from app.services.pipeline import classify_prepared, prepare_text  # noqa: E402
+from app.services.speculation import speculative_replies  # noqa: E402
+
+# (texto, categoria que o LLM dá) - inclui casos em que as regras erram
+CORPUS = [
+    ("Preciso da segunda via do boleto de junho.", "Produtivo"),
+    ("Qual o status do protocolo 48213?", "Produtivo"),
+    ("Não consigo acessar o sistema desde ontem, aparece erro 500.", "Produtivo"),
+    ("Gostaria de alterar o endereço de entrega do pedido 9921.", "Produtivo"),
+    ("Podem me enviar o contrato assinado?", "Produtivo"),
+    ("Segue em anexo o comprovante de pagamento para baixa.", "Produtivo"),
+    ("O relatório mensal está com valores divergentes, favor revisar.", "Produtivo"),
+    ("Obrigado, o problema foi resolvido, mas preciso do número do chamado para registro.", "Produtivo"),
+    ("Muito obrigado pelo atendimento de hoje!", "Improdutivo"),
+    ("Feliz Natal a toda a equipe!", "Improdutivo"),
+    ("Bom final de semana a todos.", "Improdutivo"),
+    ("Parabéns pelo excelente trabalho no projeto.", "Improdutivo"),
+    ("Promoção imperdível! Ganhe 50% de desconto, clique aqui.", "Improdutivo"),
+    ("Você foi selecionado para um sorteio exclusivo, acesse já.", "Improdutivo"),
+    ("Ok, ciente.", "Improdutivo"),
+    ("Vocês viram o jogo de ontem?", "Improdutivo"),
+]
+
+
+class SimulatedLLM:
+    def __init__(self, labels, classify_ms, reply_ms, rng):
+        self.labels = labels
+        self.classify_ms = classify_ms
+        self.reply_ms = reply_ms
+        self.rng = rng
+        self.reply_calls = 0
+
+    def _latency(self, mean_ms):
+        return max(0.05, self.rng.gauss(mean_ms, mean_ms * 0.2)) / 1000
+
+    async def classify_email(self, text):
+        await asyncio.sleep(self._latency(self.classify_ms))
+        return {"category": self.labels[text], "confidence": 0.8, "reason": "Simulado"}
+
+    async def generate_reply(self, category, summary, original_text):
+        self.reply_calls += 1
+        await asyncio.sleep(self._latency(self.reply_ms))
+        return {"reply": f"Resposta para {category}", "tone": "cordial"}
+
+
+async def run(texts, llm):
+    async def one(text):
+        started = time.perf_counter()
+        analysis = await classify_prepared(prepare_text(text), ai_client=llm)
+        return (time.perf_counter() - started) * 1000, analysis.metadata.get("speculation")
+
+    return await asyncio.gather(*(one(text) for text in texts))
+
+
+async def main_async(args):
+    rng = random.Random(42)
+    texts = [rng.choice(CORPUS)[0] for _ in range(args.emails)]
+    # O classificador recebe o texto limpo
+    labels = {clean_text(text, remove_stopwords=False): label for text, label in CORPUS}
+    settings = get_settings()
+
+    print(f"{args.emails} emails, classificação ~{args.classify_ms:g} ms, resposta ~{args.reply_ms:g} ms")
+    print(f"{'modo':<13} {'p50(ms)':>8} {'p95(ms)':>8} {'acerto':>7} {'especuladas':>12} {'respostas LLM':>14}")
+    for label, enabled in (("sequencial", False), ("especulativo", True)):
+        settings.SPECULATIVE_REPLY_ENABLED = enabled
+        llm = SimulatedLLM(labels, args.classify_ms, args.reply_ms, random.Random(7))
+        hits_before = speculative_replies.value(outcome="hit")
+        misses_before = speculative_replies.value(outcome="miss")
+        results = await run(texts, llm)
+        latencies = [ms for ms, _ in results]
+        hits = speculative_replies.value(outcome="hit") - hits_before
+        speculated = hits + speculative_replies.value(outcome="miss") - misses_before
+        hit_rate = f"{hits / speculated:.0%}" if speculated else "-"
+        print(f"{label:<13} {statistics.median(latencies):>8.0f} {statistics.quantiles(latencies, n=20)[18]:>8.0f} "
+              f"{hit_rate:>7} {speculated:>12g} {llm.reply_calls:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da resposta especulativa")
+    parser.add_argument("--emails", type=int, default=400)
+    parser.add_argument("--classify-ms", type=float, default=800.0)
+    parser.add_argument("--reply-ms", type=float, default=1200.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Status benchmark - Custo de uma consulta a /api/status/{id} (polling do frontend)
+
+Roda a API em processo (httpx.ASGITransport) sobre um banco SQLite com uma
+análise gravada e mede a latência média de GET /api/status/{id}:
+
+- banco: cache desligado (STATUS_CACHE_SIZE=0), abre o SQLite a cada consulta
+- cache: corpo e ETag servidos da memória
+- 304: If-None-Match com o ETag atual, sem corpo
+
+Uso (a partir de server/):
+    python -m benchmarks.bench_status [--requests 5000]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+import httpx
+
+_tmp = tempfile.mkdtemp()
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_tmp}/bench.sqlite3",
+    "ADMISSION_MAX_IN_FLIGHT": "0",
+    "LOG_LEVEL": "WARNING",
+})
+
+from app.main import app  # noqa: E402
+import app.services.status_cache as status_cache_module  # noqa: E402
+from app.utils.database import get_database  # noqa: E402
+
+
+async def measure(client, url: str, requests: int, headers=None):
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(url, headers=headers)
+    elapsed = time.perf_counter() - started
+    return elapsed / requests * 1e6, response
+
+
+async def main_async(args):
+    analysis_id = str(uuid.uuid4())
+    get_database().save_analysis({
+        "id": analysis_id, "category": "Produtivo", "confidence": 0.93,
+        "suggested_reply": "Segue o boleto atualizado.", "summary": "Segunda via do boleto",
+        "model_used": "gpt-4o-mini", "reason": "Pedido explícito", "full_text": "boleto"
+    })
+    url = f"/api/status/{analysis_id}"
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'caso':<8} {'µs/consulta':>12} {'status':>7} {'bytes':>6}")
+        cases = [
+            ("banco", status_cache_module.StatusCache(0), False),
+            ("cache", status_cache_module.StatusCache(10000), False),
+            ("304", status_cache_module.StatusCache(10000), True),
+        ]
+        for label, cache, conditional in cases:
+            status_cache_module._status_cache = cache
+            warm = await client.get(url)
+            headers = {"If-None-Match": warm.headers["etag"]} if conditional else None
+            per_request, response = await measure(client, url, args.requests, headers)
+            print(f"{label:<8} {per_request:>12.0f} {response.status_code:>7} {len(response.content):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das consultas de status")
+    parser.add_argument("--requests", type=int, default=5000)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Storage benchmark - Bytes por linha e tamanho dos índices antes/depois do formato compacto
+
+Cria um banco no formato antigo (colunas de texto), mede com dbstat, deixa
+Database migrar para o schema v2 e mede de novo.
+
+Com --postgres, faz o mesmo num schema temporário do Postgres: semeia no
+schema v8 (categoria, modelo e etapa em texto), mede com pg_relation_size,
+aplica a v9 (dicionário labels) e mede de novo.
+
+Uso (a partir de server/):
+    python -m benchmarks.bench_storage [--rows 20000] [--postgres postgresql://...]
+"""
+import argparse
+import random
+import sqlite3
+import tempfile
+import uuid
+from pathlib import Path
+
+from app.utils.database import Database, compute_text_hash
+
+LEGACY_SCHEMA = """
+    CREATE TABLE analyses (
+        id TEXT PRIMARY KEY,
+        text_hash TEXT NOT NULL,
+        category TEXT NOT NULL,
+        confidence REAL NOT NULL,
+        suggested_reply TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        model_used TEXT NOT NULL,
+        reason TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        full_text TEXT,
+        metadata TEXT
+    );
+    CREATE INDEX idx_text_hash ON analyses(text_hash);
+    CREATE INDEX idx_created_at ON analyses(created_at);
+"""
+
+PARAGRAPHS = [
+    "Prezados, solicito a atualização do status do chamado referente ao pedido informado abaixo.",
+    "Segue em anexo o comprovante de pagamento, conforme solicitado pela equipe de suporte.",
+    "Não consigo acessar o sistema desde ontem, aparece uma mensagem de erro ao efetuar login.",
+    "Agradeço pela ajuda no atendimento de hoje, o problema foi resolvido com sucesso.",
+    "Gostaria de saber o prazo para a análise do meu contrato e quais documentos faltam.",
+]
+
+
+def legacy_rows(rows: int):
+    """Linhas no formato texto: (id, hash, categoria, ..., texto, created_at)"""
+    rng = random.Random(42)
+    batch = []
+    for i in range(rows):
+        text = "\n\n".join(rng.choice(PARAGRAPHS) for _ in range(rng.randint(3, 20)))
+        batch.append((
+            str(uuid.uuid4()), compute_text_hash(text),
+            rng.choice(["Produtivo", "Improdutivo"]), rng.uniform(0.6, 0.99),
+            " ".join(rng.choice(PARAGRAPHS) for _ in range(3)), text[:150],
+            "gpt-4o-mini", "Solicitação específica com dados completos. " * 2, text,
+            f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 10:00:00"
+        ))
+    return batch
+
+
+def seed_legacy(path: Path, rows: int):
+    batch = legacy_rows(rows)
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.executemany(
+        "INSERT INTO analyses (id, text_hash, category, confidence, suggested_reply, summary, "
+        "model_used, reason, full_text, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure(path: Path):
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    rows = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+    sizes = dict(conn.execute("""
+        SELECT name, SUM(pgsize) FROM dbstat
+        WHERE name IN ('analyses', 'idx_text_hash', 'idx_created_at', 'sqlite_autoindex_analyses_1')
+        GROUP BY name
+    """).fetchall())
+    file_size = path.stat().st_size
+    conn.close()
+    return rows, sizes, file_size
+
+
+def report(label, rows, sizes, file_size):
+    print(f"\n{label}")
+    print(f"  {'arquivo:':<30}{file_size / 1024:10.1f} KiB")
+    print(f"  {'analyses:':<30}{sizes.get('analyses', 0) / rows:10.1f} bytes/linha")
+    for name in ("idx_text_hash", "idx_created_at", "sqlite_autoindex_analyses_1"):
+        print(f"  {name + ':':<30}{sizes.get(name, 0) / 1024:10.1f} KiB")
+
+
+def seed_postgres(url: str, rows: int):
+    """Semeia o schema v8 (texto) com as análises e duas chamadas ao LLM por análise"""
+    from app.utils import postgres
+
+    migrations = postgres.MIGRATIONS
+    postgres.MIGRATIONS = [m for m in migrations if m[0] < 9]
+    try:
+        db = postgres.PostgresDatabase(url)
+    finally:
+        postgres.MIGRATIONS = migrations
+    with db.pool.connection() as conn:
+        with conn.cursor() as cursor:
+            with cursor.copy(
+                "COPY analyses (id, text_hash, category, confidence, suggested_reply, summary, "
+                "model_used, reason, full_text, created_at) FROM STDIN"
+            ) as copy:
+                for row in legacy_rows(rows):
+                    copy.write_row(row[:1] + (bytes.fromhex(row[1]),) + row[2:])
+            with cursor.copy(
+                "COPY llm_calls (analysis_id, stage, model, prompt_tokens, completion_tokens, "
+                "latency_ms, created_at) FROM STDIN"
+            ) as copy:
+                for row in legacy_rows(rows):
+                    for stage in ("classify", "reply"):
+                        copy.write_row((row[0], stage, row[6], 900, 120, 800, row[-1]))
+    db.close()
+
+
+def measure_postgres(url: str):
+    import psycopg
+
+    with psycopg.connect(url, autocommit=True) as conn:
+        # Tabelas e índices recém-reescritos nos dois lados da comparação
+        conn.execute("VACUUM FULL analyses")
+        conn.execute("VACUUM FULL llm_calls")
+        sizes = {}
+        for table in ("analyses", "llm_calls"):
+            rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            sizes[table] = conn.execute(f"SELECT pg_relation_size('{table}')").fetchone()[0] / rows
+            sizes.update(conn.execute("""
+                SELECT indexrelid::regclass::text, pg_relation_size(indexrelid)
+                FROM pg_index WHERE indrelid = %s::regclass
+            """, (table,)).fetchall())
+        total = conn.execute(
+            "SELECT pg_total_relation_size('analyses') + pg_total_relation_size('llm_calls')"
+        ).fetchone()[0]
+    return sizes, total
+
+
+def report_postgres(label, sizes, total):
+    print(f"\n{label}")
+    print(f"  {'total (com TOAST e índices):':<34}{total / 1024:10.1f} KiB")
+    for name, size in sorted(sizes.items()):
+        if name in ("analyses", "llm_calls"):
+            print(f"  {name + ':':<34}{size:10.1f} bytes/linha")
+        else:
+            print(f"  {name + ':':<34}{size / 1024:10.1f} KiB")
+
+
+def main_postgres(url: str, rows: int):
+    import psycopg
+
+    schema = f"bench_{uuid.uuid4().hex[:8]}"
+    schema_url = f"{url}{'&' if '?' in url else '?'}options=-csearch_path%3D{schema}"
+    with psycopg.connect(url, autocommit=True) as conn:
+        conn.execute(f"CREATE SCHEMA {schema}")
+    try:
+        seed_postgres(schema_url, rows)
+        before = measure_postgres(schema_url)
+        report_postgres("Antes (v8: categoria, modelo e etapa em texto)", *before)
+
+        from app.utils.postgres import PostgresDatabase
+        PostgresDatabase(schema_url).close()
+        after = measure_postgres(schema_url)
+        report_postgres("Depois (v9: ids de labels)", *after)
+
+        print(f"\nRedução total: {100 * (1 - after[1] / before[1]):.1f}%")
+    finally:
+        with psycopg.connect(url, autocommit=True) as conn:
+            conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--postgres", help="URL do Postgres (mede o backend Postgres em vez do SQLite)")
+    args = parser.parse_args()
+
+    if args.postgres:
+        main_postgres(args.postgres, args.rows)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.sqlite3"
+        seed_legacy(path, args.rows)
+        before = measure(path)
+        report("Antes (formato texto)", *before)
+
+        Database(f"sqlite:///{path}")
+        after = measure(path)
+        report("Depois (formato compacto)", *after)
+
+        print(f"\nRedução do arquivo: {100 * (1 - after[2] / before[2]):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
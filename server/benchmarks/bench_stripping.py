@@ -0,0 +1,110 @@
+"""
+Stripping benchmark - Tokens do prompt por email e % de emails truncados, com e sem a remoção de histórico
+
+Para cada email monta o prompt de classificação como o AIClient monta
+(texto limpo cortado em PROMPT_TEXT_CHARS) a partir do texto inteiro
+("antes") e do texto sem histórico/assinatura/rodapé ("depois").
+Tokens são estimados em ~4 caracteres por token.
+
+Corpus: o mesmo formato de entrada do `app.cli.classify` (diretório,
+.jsonl ou .mbox); sem --input usa emails sintéticos com cadeias de resposta.
+
+Uso (a partir de server/):
+    python -m benchmarks.bench_stripping [--input emails.mbox] [--emails 2000]
+"""
+import argparse
+import random
+import statistics
+import time
+from pathlib import Path
+
+from app.services.ai_client import PROMPT_TEXT_CHARS, AIClient
+from app.services.batch import open_source
+from app.services.nlp import clean_text, strip_reply_history
+
+CHARS_PER_TOKEN = 4
+
+NEW_CONTENT = [
+    "Bom dia, ainda não recebi o boleto atualizado. Podem reenviar?",
+    "Obrigado pelo retorno, o acesso voltou a funcionar.",
+    "Segue em anexo o comprovante. Qual o prazo para a baixa do pagamento?",
+    "Preciso alterar o endereço de entrega do pedido 48213, é possível ainda hoje?",
+    "Confirmo a reunião de quinta às 14h.",
+]
+QUOTED = [
+    "Olá, conforme conversamos, seguem as informações solicitadas sobre o contrato e os prazos de renovação.",
+    "Prezado cliente, seu chamado foi registrado e será analisado pela equipe responsável em até 48 horas.",
+    "Informamos que o sistema passará por manutenção programada no sábado, das 22h às 2h.",
+]
+SIGNATURE = "\n--\nMaria Souza\nAnalista Financeiro | Empresa S.A.\nTel: (11) 4000-0000"
+DISCLAIMER = ("\n\nEsta mensagem e seus anexos são confidenciais e destinados exclusivamente ao destinatário. "
+              "Se você a recebeu por engano, informe o remetente e apague-a. ") * 2
+
+
+def synthetic_corpus(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    for _ in range(count):
+        text = rng.choice(NEW_CONTENT)
+        if rng.random() < 0.6:
+            text += SIGNATURE
+        if rng.random() < 0.4:
+            text += DISCLAIMER
+        # Cadeia de 0 a 6 respostas citadas, cada nível com mais ">"
+        for depth in range(1, rng.randint(0, 6) + 1):
+            quote = ">" * depth + " "
+            text += f"\n\nEm seg., {depth} de jun. de 2024 às 10:0{depth}, Suporte <suporte@empresa.com>\nescreveu:\n"
+            body = "\n".join(rng.choice(QUOTED) for _ in range(rng.randint(2, 5))) + SIGNATURE
+            text += "\n".join(quote + line for line in body.splitlines())
+        yield text
+
+
+def load_corpus(path: Path, limit: int):
+    for index, item in enumerate(open_source(path)):
+        if index >= limit:
+            return
+        try:
+            yield item["load"]()
+        except Exception:
+            continue
+
+
+def measure(texts, strip: bool):
+    tokens, truncated, elapsed = [], 0, 0.0
+    for text in texts:
+        started = time.perf_counter()
+        body = strip_reply_history(text) if strip else text
+        elapsed += time.perf_counter() - started
+        clean = clean_text(body, remove_stopwords=False)
+        truncated += len(clean) > PROMPT_TEXT_CHARS
+        prompt = AIClient._build_classification_prompt(None, clean)
+        tokens.append(len(prompt) / CHARS_PER_TOKEN)
+    return tokens, truncated, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da remoção de histórico citado")
+    parser.add_argument("--input", type=Path, help="Diretório, .jsonl ou .mbox (padrão: sintético)")
+    parser.add_argument("--emails", type=int, default=2000)
+    args = parser.parse_args()
+
+    texts = list(load_corpus(args.input, args.emails) if args.input else synthetic_corpus(args.emails))
+    print(f"{len(texts)} emails ({args.input or 'sintético'})")
+    print(f"{'':<8} {'tokens médios':>14} {'p95':>8} {'truncados':>10} {'strip µs/email':>15}")
+    for label, strip in (("antes", False), ("depois", True)):
+        tokens, truncated, elapsed = measure(texts, strip)
+        p95 = statistics.quantiles(tokens, n=20)[18]
+        per_email = elapsed / len(texts) * 1e6 if strip else 0.0
+        print(f"{label:<8} {statistics.mean(tokens):>14.0f} {p95:>8.0f} "
+              f"{truncated / len(texts):>10.1%} {per_email:>15.1f}")
+
+    # Tempo linear: 10x o texto deve custar ~10x (pior caso: nenhuma linha
+    # interrompe a varredura, todas são testadas)
+    sample = "\n".join("> " + line for line in QUOTED * 300) + "\nTexto novo\n"
+    for factor in (1, 10):
+        started = time.perf_counter()
+        strip_reply_history(sample * factor)
+        print(f"strip de {len(sample) * factor:>9} caracteres: {(time.perf_counter() - started) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
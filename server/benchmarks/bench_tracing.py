@@ -0,0 +1,76 @@
+"""
+Tracing benchmark - Custo do tracing por requisição no pipeline
+
+Roda --requests análises (modelo local, sem latência simulada, para o
+custo do tracing não sumir atrás do LLM) em três cenários e compara o
+tempo médio por requisição:
+
+- desligado: sem TRACE_EXPORTER (start_trace/span viram no-ops)
+- fora da amostra: tracing ligado, TRACE_SAMPLE_RATE=0
+- amostrado: todas as requisições rastreadas, spans exportados para o
+  arquivo JSON pela thread do exportador
+
+Uso (a partir de server/):
+    python -m benchmarks.bench_tracing [--requests 2000]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp()
+os.environ.update({"DATABASE_URL": f"sqlite:///{_tmp}/bench.sqlite3", "LOG_LEVEL": "WARNING"})
+
+import app.services.ai_client as ai_client_module  # noqa: E402
+from app.core import tracing  # noqa: E402
+from app.core.logging_config import timings_var  # noqa: E402
+from app.core.tracing import FileExporter, SpanProcessor, start_trace  # noqa: E402
+from app.services.ai_client import LocalAIClient  # noqa: E402
+from app.services.pipeline import analyze_email  # noqa: E402
+
+TEXTS = [
+    "Preciso da segunda via do boleto de junho, o anterior venceu. (#{})",
+    "Não consigo acessar o sistema desde ontem, aparece erro 500. (#{})",
+    "Qual o status do protocolo {}? Estou aguardando retorno.",
+]
+
+
+async def run(requests: int) -> float:
+    """µs por requisição (span raiz + pipeline completo)"""
+    timings_var.set({})
+    started = time.perf_counter()
+    for index in range(requests):
+        with start_trace("POST /api/process"):
+            await analyze_email(TEXTS[index % len(TEXTS)].format(index))
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    ai_client_module._ai_client = LocalAIClient()
+    asyncio.run(run(50))  # Aquece imports, banco e caches
+
+    path = os.path.join(_tmp, "spans.jsonl")
+    results = {"desligado": asyncio.run(run(args.requests))}
+    for label, rate in (("fora da amostra", 0.0), ("amostrado", 1.0)):
+        tracing._processor = SpanProcessor(FileExporter(path), sample_rate=rate)
+        tracing._processor.start()
+        results[label] = asyncio.run(run(args.requests))
+        tracing._processor.stop()
+        tracing._processor = None
+
+    with open(path, "rb") as spans_file:
+        exported = sum(1 for _ in spans_file)
+    baseline = results["desligado"]
+    print(f"{'cenário':<16} {'µs/requisição':>14} {'overhead':>9}   ({args.requests} requisições)")
+    for label, elapsed in results.items():
+        print(f"{label:<16} {elapsed:>14.1f} {elapsed / baseline - 1:>9.1%}")
+    print(f"spans exportados: {exported} ({exported / args.requests:.1f} por requisição)")
+
+
+if __name__ == "__main__":
+    main()
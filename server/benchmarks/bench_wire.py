@@ -0,0 +1,95 @@
+"""
+Wire benchmark - CPU de serialização e bytes por ProcessResponse em cada formato
+
+Serializa --items respostas sintéticas como a API faria:
+
+- atual: model_dump(mode="json") + json.dumps (response_model + JSONResponse
+  padrão do FastAPI, sem contar a revalidação do response_model)
+- orjson: model_dump(mode="json") + wire.dumps_json (FastJSONResponse)
+- msgpack: model_dump(mode="json") + msgpack
+- ndjson: um objeto por linha (POST /api/process/batch)
+
+e mede também a leitura de um corpo de requisição {"text"} em JSON e msgpack.
+
+Uso (a partir de server/):
+    python -m benchmarks.bench_wire [--items 20000]
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+
+from app.models.schemas import ProcessResponse
+from app.utils import wire
+
+REPLIES = [
+    "Olá! Recebemos sua solicitação e o boleto atualizado segue em anexo, com vencimento em 5 dias úteis.",
+    "Obrigado pela mensagem! Ficamos felizes em saber que o acesso voltou a funcionar. Seguimos à disposição.",
+    "Seu chamado foi registrado e está em análise pela equipe responsável. Retornaremos em até 48 horas.",
+]
+
+
+def sample_responses(count: int):
+    rng = random.Random(42)
+    return [
+        ProcessResponse(
+            id=str(uuid.uuid4()),
+            category=rng.choice(["Produtivo", "Improdutivo"]),
+            confidence=round(rng.uniform(0.6, 0.99), 2),
+            suggested_reply=rng.choice(REPLIES),
+            summary="Solicitação de segunda via do boleto com vencimento atualizado",
+            model_used="gpt-4o-mini",
+            timestamp=datetime.now(timezone.utc),
+            reason="Pedido explícito de ação"
+        )
+        for _ in range(count)
+    ]
+
+
+def current(response: ProcessResponse) -> bytes:
+    return json.dumps(response.model_dump(mode="json"), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def measure(responses, serialize):
+    started = time.process_time()
+    total = sum(len(serialize(response)) for response in responses)
+    return (time.process_time() - started) / len(responses) * 1e6, total / len(responses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos formatos de serialização da API")
+    parser.add_argument("--items", type=int, default=20000)
+    args = parser.parse_args()
+
+    responses = sample_responses(args.items)
+    cases = [
+        ("atual", current),
+        ("orjson", lambda r: wire.encode(r.model_dump(mode="json"), wire.JSON)),
+        ("ndjson", lambda r: wire.encode(r.model_dump(mode="json"), wire.NDJSON)),
+    ]
+    if wire.msgpack is not None:
+        cases.append(("msgpack", lambda r: wire.encode(r.model_dump(mode="json"), wire.MSGPACK)))
+    print(f"{args.items} ProcessResponse (orjson: {wire.orjson is not None}, msgpack: {wire.msgpack is not None})")
+    print(f"{'formato':<9} {'µs CPU/item':>12} {'bytes/item':>11}")
+    for label, serialize in cases:
+        per_item, size = measure(responses, serialize)
+        print(f"{label:<9} {per_item:>12.2f} {size:>11.0f}")
+
+    body = {"text": "Bom dia, preciso da segunda via do boleto de junho. " * 20}
+    print(f"\n{'corpo':<9} {'µs CPU/leitura':>15} {'bytes':>7}")
+    for media_type in (wire.JSON, wire.MSGPACK):
+        if not wire.supported(media_type):
+            continue
+        raw = wire.encode(body, media_type)
+        started = time.process_time()
+        for _ in range(args.items):
+            wire.decode(raw, media_type)
+        per_read = (time.process_time() - started) / args.items * 1e6
+        print(f"{media_type.split('/')[1]:<9} {per_read:>15.2f} {len(raw):>7}")
+
+
+if __name__ == "__main__":
+    main()
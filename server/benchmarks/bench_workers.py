@@ -0,0 +1,128 @@
+"""
+Workers benchmark - Memória por worker e requisições/s conforme o número de workers
+
+Sobe `python -m app.cli.serve` com 1, 2, 4... workers, mede RSS/PSS/USS de
+cada worker em /proc (PSS < RSS indica páginas compartilhadas com o master
+via copy-on-write) e dispara carga em GET / a partir de processos clientes.
+
+Uso (a partir de server/, Linux):
+    python -m benchmarks.bench_workers [--workers 1,2,4] [--duration 5] [--clients 4]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+PORT = 8799
+
+
+def read_memory(pid: int):
+    """(RSS, PSS, USS) em KiB a partir de /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return fields.get("Rss", 0), fields.get("Pss", 0), uss
+
+
+def child_pids(pid: int):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Servidor não respondeu a tempo")
+
+
+def client_process(url: str, duration: float, connections: int, results):
+    async def run():
+        done = 0
+        deadline = time.monotonic() + duration
+        limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+        async with httpx.AsyncClient(limits=limits) as client:
+            async def loop():
+                nonlocal done
+                while time.monotonic() < deadline:
+                    await client.get(url)
+                    done += 1
+            await asyncio.gather(*(loop() for _ in range(connections)))
+        return done
+
+    results.put(asyncio.run(run()))
+
+
+def load(url: str, duration: float, clients: int, connections: int) -> float:
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=client_process, args=(url, duration, connections, results))
+             for _ in range(clients)]
+    for proc in procs:
+        proc.start()
+    total = sum(results.get() for _ in procs)
+    for proc in procs:
+        proc.join()
+    return total / duration
+
+
+def bench(workers: int, args, workdir: Path):
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-bench")
+    env["DATABASE_URL"] = f"sqlite:///{workdir / 'bench.sqlite3'}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.cli.serve", "--workers", str(workers), "--port", str(PORT)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        url = f"http://127.0.0.1:{PORT}/"
+        wait_ready(url)
+        while len(child_pids(server.pid)) < workers:
+            time.sleep(0.2)
+        rps = load(url, args.duration, args.clients, args.connections)
+        master = read_memory(server.pid)
+        per_worker = [read_memory(pid) for pid in child_pids(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+    avg = [sum(m[i] for m in per_worker) / len(per_worker) for i in range(3)]
+    return rps, master, avg
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=4, help="Processos geradores de carga")
+    parser.add_argument("--connections", type=int, default=16, help="Conexões por processo cliente")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}{'req/s':>10}{'escala':>8}{'RSS/worker':>12}{'PSS/worker':>12}{'USS/worker':>12}{'RSS master':>12}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in (int(w) for w in args.workers.split(",")):
+            rps, master, (rss, pss, uss) = bench(workers, args, Path(tmp))
+            baseline = baseline or rps
+            print(f"{workers:>8}{rps:>10.0f}{rps / baseline:>7.2f}x"
+                  f"{rss / 1024:>9.1f} MB{pss / 1024:>9.1f} MB{uss / 1024:>9.1f} MB{master[0] / 1024:>9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,3 +7,46 @@ from pathlib import Path
 
 # Adiciona app ao path
 sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class FakeAIClient:
+    """AIClient local para testes: classifica por palavras-chave, sem rede"""
+
+    def __init__(self):
+        self.classify_calls = 0
+        self.reply_calls = 0
+
+    async def classify_email(self, text: str):
+        self.classify_calls += 1
+        if any(word in text.lower() for word in ("obrigad", "feliz natal", "parabéns")):
+            return {"category": "Improdutivo", "confidence": 0.96, "reason": "Agradecimento"}
+        return {"category": "Produtivo", "confidence": 0.9, "reason": "Solicitação"}
+
+    async def classify_document(self, chunks):
+        from app.services.long_document import map_reduce
+        return await map_reduce(chunks, self.classify_email)
+
+    async def generate_reply(self, category, summary, original_text):
+        self.reply_calls += 1
+        return {"reply": f"Resposta para {category}", "tone": "cordial", "max_words": 80}
+
+
+@pytest.fixture
+def fake_ai_client(monkeypatch):
+    """Substitui o singleton do AIClient por FakeAIClient"""
+    import app.services.ai_client as ai_client_module
+    fake = FakeAIClient()
+    monkeypatch.setattr(ai_client_module, "_ai_client", fake)
+    return fake
+
+
+@pytest.fixture
+def tmp_database(monkeypatch, tmp_path):
+    """Substitui o singleton do Database por um SQLite temporário"""
+    import app.utils.database as database_module
+    import app.services.reply_pool as reply_pool_module
+    db = database_module.Database(f"sqlite:///{tmp_path / 'test.sqlite3'}")
+    monkeypatch.setattr(database_module, "_database", db)
+    # O pool aprende do feedback do banco: recarrega a partir do banco temporário
+    monkeypatch.setattr(reply_pool_module, "_reply_pool", None)
+    return db
@@ -0,0 +1,170 @@
+"""
+Servidor IMAP mínimo em memória para testes e benchmarks do poller
+
+Implementa só o que o ImapConnection usa (LOGIN, SELECT, UID SEARCH/FETCH/STORE,
+NOOP, LOGOUT), sem TLS, em uma thread local.
+"""
+import re
+import socketserver
+import threading
+
+COMMAND_PATTERN = re.compile(r"^(\S+) (\S+)(?: (.*))?$")
+
+
+class Folder:
+    def __init__(self, uidvalidity: int):
+        self.uidvalidity = uidvalidity
+        self.next_uid = 1
+        self.messages = {}  # uid -> bytes
+        self.keywords = {}  # uid -> set
+
+    def uid_set(self, spec: str):
+        """UIDs existentes que casam com "1,3,5:7" ou "n:*" (semântica do RFC 3501)"""
+        uids = sorted(self.messages)
+        highest = uids[-1] if uids else 0
+        selected = set()
+        for part in spec.split(","):
+            start, _, end = part.partition(":")
+            low = highest if start == "*" else int(start)
+            high = low if not end else (highest if end == "*" else int(end))
+            low, high = min(low, high), max(low, high)
+            selected.update(uid for uid in uids if low <= uid <= high)
+        return sorted(selected)
+
+
+class ImapStub:
+    """
+    Uso:
+        with ImapStub() as server:
+            server.append("INBOX", raw_bytes)
+            ImapConnection("127.0.0.1", server.port, "user", "pass", ssl=False)
+    """
+
+    def __init__(self, user="user", password="pass"):
+        self.user = user
+        self.password = password
+        self.folders = {"INBOX": Folder(uidvalidity=1)}
+        self.commands = []
+        self.logins = 0
+        self.lock = threading.Lock()
+        self._server = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def append(self, folder: str, raw: bytes) -> int:
+        with self.lock:
+            box = self.folders.setdefault(folder, Folder(uidvalidity=1))
+            uid = box.next_uid
+            box.next_uid += 1
+            box.messages[uid] = raw
+            return uid
+
+    def expunge(self, folder: str, uid: int):
+        with self.lock:
+            self.folders[folder].messages.pop(uid, None)
+
+    def reset_uidvalidity(self, folder: str):
+        """Simula a pasta recriada: novo UIDVALIDITY e UIDs renumerados a partir de 1"""
+        with self.lock:
+            old = self.folders[folder]
+            box = Folder(uidvalidity=old.uidvalidity + 1)
+            for uid in sorted(old.messages):
+                box.messages[box.next_uid] = old.messages[uid]
+                box.next_uid += 1
+            self.folders[folder] = box
+
+    def keywords(self, folder: str, uid: int) -> set:
+        return self.folders[folder].keywords.get(uid, set())
+
+    def start(self):
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stub._session(self.rfile, self.wfile)
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _session(self, rfile, wfile):
+        def send(line: str):
+            wfile.write(line.encode() + b"\r\n")
+
+        send("* OK [CAPABILITY IMAP4rev1] stub pronto")
+        selected = None
+        for raw_line in rfile:
+            match = COMMAND_PATTERN.match(raw_line.decode().rstrip("\r\n"))
+            if not match:
+                continue
+            tag, command, args = match.group(1), match.group(2).upper(), match.group(3) or ""
+            with self.lock:
+                self.commands.append(f"{command} {args}".strip())
+                if command == "CAPABILITY":
+                    send("* CAPABILITY IMAP4rev1")
+                    send(f"{tag} OK CAPABILITY concluído")
+                elif command == "LOGIN":
+                    user, password = [value.strip('"') for value in args.split(" ", 1)]
+                    if (user, password) != (self.user, self.password):
+                        send(f"{tag} NO [AUTHENTICATIONFAILED] credenciais inválidas")
+                        continue
+                    self.logins += 1
+                    send(f"{tag} OK LOGIN concluído")
+                elif command == "SELECT":
+                    name = args.strip('"')
+                    if name not in self.folders:
+                        send(f"{tag} NO pasta inexistente")
+                        continue
+                    selected = name
+                    box = self.folders[name]
+                    send(f"* {len(box.messages)} EXISTS")
+                    send(f"* OK [UIDVALIDITY {box.uidvalidity}] UIDs válidos")
+                    send(f"* OK [UIDNEXT {box.next_uid}] próximo UID")
+                    send(f"{tag} OK [READ-WRITE] SELECT concluído")
+                elif command == "UID":
+                    self._uid_command(tag, args, self.folders[selected], send, wfile)
+                elif command == "NOOP":
+                    send(f"{tag} OK NOOP concluído")
+                elif command == "LOGOUT":
+                    send("* BYE até logo")
+                    send(f"{tag} OK LOGOUT concluído")
+                    return
+                else:
+                    send(f"{tag} BAD comando não suportado")
+            wfile.flush()
+
+    def _uid_command(self, tag, args, box, send, wfile):
+        subcommand, _, rest = args.partition(" ")
+        subcommand = subcommand.upper()
+        if subcommand == "SEARCH":
+            spec = rest.split()[-1] if rest.upper().startswith("UID ") else "1:*"
+            send("* SEARCH " + " ".join(map(str, box.uid_set(spec))))
+        elif subcommand == "FETCH":
+            spec = rest.split(" ", 1)[0]
+            seqs = {uid: seq for seq, uid in enumerate(sorted(box.messages), start=1)}
+            for uid in box.uid_set(spec):
+                body = box.messages[uid]
+                wfile.write(f"* {seqs[uid]} FETCH (UID {uid} BODY[] {{{len(body)}}}\r\n".encode())
+                wfile.write(body + b")\r\n")
+        elif subcommand == "STORE":
+            spec, _, flags = rest.partition(" ")
+            keywords = flags.split(" ", 1)[1].strip("()").split()
+            for uid in box.uid_set(spec):
+                box.keywords.setdefault(uid, set()).update(keywords)
+        else:
+            send(f"{tag} BAD UID {subcommand} não suportado")
+            return
+        send(f"{tag} OK UID {subcommand} concluído")
@@ -0,0 +1,149 @@
+"""
+Tests for admission control (in-flight cap, bounded queue, token buckets)
+"""
+import asyncio
+import json
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from app.core.admission import AdmissionController, AdmissionMiddleware, AdmissionRejected, admission_shed
+
+
+def make_controller(**overrides):
+    values = dict(max_in_flight=1, max_queue=1, target_delay=0.01, interval=0.2)
+    values.update(overrides)
+    return AdmissionController(**values)
+
+
+async def test_queue_hands_slot_over_and_rejects_when_full():
+    """Test that a released slot goes to the queued request and overflow gets 503"""
+    controller = make_controller()
+    assert await controller.acquire() == 0.0
+
+    queued = asyncio.ensure_future(controller.acquire())
+    await asyncio.sleep(0)
+    assert controller.queue_depth == 1
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await controller.acquire()
+    assert (exc_info.value.status, exc_info.value.reason) == (503, "queue_full")
+
+    controller.release()
+    assert await queued >= 0
+    assert controller.in_flight == 1
+    controller.release()
+    assert controller.in_flight == 0
+
+
+async def test_queue_wait_is_bounded():
+    """Test that a request waiting longer than the limit is shed"""
+    before = admission_shed.value(reason="queue_timeout")
+    controller = make_controller(interval=0.05)
+    await controller.acquire()
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await controller.acquire()
+
+    assert exc_info.value.reason == "queue_timeout"
+    assert controller.queue_depth == 0
+    assert admission_shed.value(reason="queue_timeout") == before + 1
+
+
+async def test_standing_queue_shortens_wait():
+    """Test the CoDel-style switch from interval to target delay"""
+    controller = make_controller(max_queue=5, interval=0.2, target_delay=0.01)
+    await controller.acquire()
+    first = asyncio.ensure_future(controller.acquire())
+    await asyncio.sleep(0)
+
+    assert controller.max_wait(controller._last_empty + 0.1) == 0.2
+    assert controller.max_wait(controller._last_empty + 0.3) == 0.01
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+    assert controller.queue_depth == 0
+
+
+def test_token_bucket_per_key():
+    """Test 429 once a key exhausts its burst, without affecting other keys"""
+    controller = make_controller(rate=1.0, burst=2)
+    controller.check_rate("key:a")
+    controller.check_rate("key:a")
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        controller.check_rate("key:a")
+    assert exc_info.value.status == 429
+    assert 0 < exc_info.value.retry_after <= 1.0
+
+    controller.check_rate("key:b")
+
+
+async def test_middleware_sheds_with_retry_after():
+    """Test that overload on the protected path gets fast 503s with Retry-After"""
+    async def slow(request):
+        await asyncio.sleep(0.1)
+        return JSONResponse({"ok": True})
+
+    app = Starlette(routes=[Route("/api/process", slow, methods=["POST"]), Route("/health", slow)])
+    app.add_middleware(AdmissionMiddleware, controller=make_controller(interval=0.02))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        responses = await asyncio.gather(*(client.post("/api/process") for _ in range(4)))
+        statuses = sorted(response.status_code for response in responses)
+        assert statuses == [200, 503, 503, 503]
+        shed = next(response for response in responses if response.status_code == 503)
+        assert shed.headers["retry-after"] == "1"
+
+        # Rotas fora da lista não passam pelo controle
+        others = await asyncio.gather(*(client.get("/health") for _ in range(3)))
+        assert all(response.status_code == 200 for response in others)
+
+
+
+def batch_app(controller):
+    from fastapi import FastAPI
+    from app.api import process
+
+    app = FastAPI()
+    app.include_router(process.router, prefix="/api")
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_batch_items_take_one_slot_each(fake_ai_client, tmp_database, monkeypatch):
+    """Test that a batch is admitted per item, so it cannot run more pipelines than the cap"""
+    controller = make_controller(max_in_flight=2, max_queue=8, interval=5.0)
+    peak = 0
+    original = fake_ai_client.classify_email
+
+    async def slow_classify(text):
+        nonlocal peak
+        peak = max(peak, controller.in_flight)
+        await asyncio.sleep(0.01)
+        return await original(text)
+    monkeypatch.setattr(fake_ai_client, "classify_email", slow_classify)
+    texts = [{"text": f"Preciso da segunda via do boleto número {i}"} for i in range(6)]
+
+    async with batch_app(controller) as client:
+        response = await client.post("/api/process/batch", json=texts)
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["category"] for line in lines] == ["Produtivo"] * 6
+    assert peak == 2
+    assert controller.in_flight == 0
+
+
+async def test_batch_items_shed_individually(fake_ai_client, tmp_database):
+    """Test that items refused by admission come back as per-item errors"""
+    controller = make_controller(max_in_flight=1, max_queue=0)
+    await controller.acquire()
+    texts = [{"text": f"Preciso da segunda via do boleto número {i}"} for i in range(2)]
+
+    async with batch_app(controller) as client:
+        response = await client.post("/api/process/batch", json=texts)
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["error"] for line in lines] == ["Servidor sobrecarregado, tente novamente"] * 2
+    assert fake_ai_client.classify_calls == 0
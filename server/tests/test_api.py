@@ -2,6 +2,7 @@
 Tests for FastAPI endpoints
 """
 import pytest
+from fastapi.middleware.cors import CORSMiddleware
 from fastapi.testclient import TestClient
 from app.main import app
 
@@ -137,3 +138,86 @@ def test_process_returns_valid_json():
     assert isinstance(data["confidence"], (int, float))
     assert isinstance(data["suggested_reply"], str)
     assert len(data["suggested_reply"]) > 0
+
+
+def test_process_rejects_oversized_upload_by_content_length():
+    """Test 413 before the multipart body is read"""
+    response = client.post(
+        "/api/process",
+        content=b"x" * 10,
+        headers={"content-type": "multipart/form-data; boundary=x", "content-length": str(50 * 1_048_576)}
+    )
+
+    assert response.status_code == 413
+
+
+def test_process_rejects_oversized_upload_while_streaming():
+    """Test 413 for chunked bodies that cross the limit"""
+    def body():
+        for _ in range(40):
+            yield b"a" * 65536
+
+    response = client.post(
+        "/api/process",
+        content=body(),
+        headers={"content-type": "multipart/form-data; boundary=x"}
+    )
+
+    assert response.status_code == 413
+
+
+def test_process_rejects_oversized_file_field():
+    """Test 413 for a file larger than MAX_UPLOAD_SIZE within the body slack"""
+    from app.core.settings import get_settings
+    size = get_settings().MAX_UPLOAD_SIZE + 1024
+
+    response = client.post("/api/process", files={"file": ("big.txt", b"a" * size, "text/plain")})
+
+    assert response.status_code == 413
+
+
+def test_process_returns_503_when_circuit_is_open(monkeypatch):
+    """Test fail-fast 503 with Retry-After while OpenAI is unavailable"""
+    import app.services.ai_client as ai_client_module
+    from app.services.circuit_breaker import CircuitOpenError
+
+    class UnavailableAIClient:
+        async def classify_email(self, text):
+            raise CircuitOpenError("openai", retry_after=12.5)
+
+    monkeypatch.setattr(ai_client_module, "_ai_client", UnavailableAIClient())
+
+    response = client.post("/api/process", data={"text": "Preciso do status do meu pedido"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "13"
+
+
+def test_liveness_and_readiness_endpoints():
+    """Test probe endpoints"""
+    assert client.get("/health/live").json() == {"status": "alive"}
+
+    response = client.get("/health/ready")
+    assert response.status_code in (200, 503)
+    assert "database_connected" in response.json()
+
+
+def test_rejections_carry_cors_headers():
+    """Test that 413/429/503 answered by middleware still reach the browser with CORS headers"""
+    from app.core.admission import AdmissionMiddleware
+    from app.core.settings import get_settings
+    from app.utils.uploads import BodySizeLimitMiddleware
+
+    origin = get_settings().CORS_ORIGINS.split(",")[0]
+    content = b"a" * (get_settings().MAX_UPLOAD_SIZE + 1)
+
+    response = client.post("/api/process", files={"file": ("big.txt", content, "text/plain")},
+                           headers={"Origin": origin})
+
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == origin
+    # add_middleware insere no início: índice menor = mais externo
+    order = [item.cls for item in app.user_middleware]
+    assert order.index(CORSMiddleware) < order.index(BodySizeLimitMiddleware)
+    if AdmissionMiddleware in order:
+        assert order.index(CORSMiddleware) < order.index(AdmissionMiddleware)
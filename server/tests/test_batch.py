@@ -0,0 +1,122 @@
+"""
+Tests for offline batch classification
+"""
+import asyncio
+import io
+import json
+import pytest
+from app.services.ai_client import LocalAIClient
+from app.services.batch import BatchRunner, Checkpoint, count_source, open_source
+
+
+def write_jsonl(path, texts):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, text in enumerate(texts):
+            f.write(json.dumps({"id": f"email-{i}", "text": text}, ensure_ascii=False) + "\n")
+
+
+async def test_batch_jsonl_writes_db_output_and_checkpoint(tmp_path, tmp_database, fake_ai_client):
+    """Test the full pipeline over a JSONL source"""
+    source = tmp_path / "emails.jsonl"
+    write_jsonl(source, [f"Preciso do boleto número {i}" for i in range(25)] + ["curto"])
+    output = io.StringIO()
+    checkpoint = Checkpoint(tmp_path / "emails.checkpoint")
+
+    runner = BatchRunner(fake_ai_client, db=tmp_database, output=output,
+                         checkpoint=checkpoint, concurrency=4, batch_size=10)
+    stats = await runner.run(open_source(source))
+
+    assert stats == {"done": 25, "skipped": 1, "failed": 0}
+    assert count_source(source) == 26
+    assert len(checkpoint.load()) == 25
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert {r["key"] for r in records} == {f"email-{i}" for i in range(25)}
+    assert tmp_database.get_analysis(records[0]["id"]).metadata["source"] == "jsonl"
+
+
+async def test_batch_resume_skips_checkpointed_items(tmp_path, tmp_database, fake_ai_client):
+    """Test that a resumed run does not reclassify anything already saved"""
+    source = tmp_path / "emails.jsonl"
+    write_jsonl(source, [f"Solicito revisão do contrato {i}" for i in range(12)])
+    checkpoint = Checkpoint(tmp_path / "emails.checkpoint")
+    checkpoint.append(["email-0", "email-1", "email-2"])
+
+    runner = BatchRunner(fake_ai_client, db=tmp_database, checkpoint=checkpoint)
+    stats = await runner.run(open_source(source))
+
+    assert stats["done"] == 9
+    assert stats["skipped"] == 3
+    assert fake_ai_client.classify_calls == 9
+
+    second = await BatchRunner(fake_ai_client, db=tmp_database, checkpoint=checkpoint).run(open_source(source))
+    assert second["done"] == 0
+    assert fake_ai_client.classify_calls == 9
+
+
+async def test_batch_directory_with_local_model(tmp_path):
+    """Test dry-run style execution: directory source, local model, no DB"""
+    inbox = tmp_path / "inbox"
+    (inbox / "sub").mkdir(parents=True)
+    (inbox / "a.txt").write_text("Obrigado pelo atendimento de hoje!", encoding="utf-8")
+    (inbox / "sub" / "b.txt").write_text("Não consigo acessar o sistema, erro no login", encoding="utf-8")
+    (inbox / "ignorado.docx").write_bytes(b"x")
+    output = io.StringIO()
+
+    stats = await BatchRunner(LocalAIClient(), output=output).run(open_source(inbox))
+
+    assert stats["done"] == 2
+    records = {json.loads(line)["key"]: json.loads(line) for line in output.getvalue().splitlines()}
+    assert records["a.txt"]["category"] == "Improdutivo"
+    assert records["sub/b.txt"]["category"] == "Produtivo"
+    assert records["a.txt"]["model_used"] == "local-rules"
+
+
+async def test_batch_failures_are_not_checkpointed(tmp_path):
+    """Test that items whose LLM call failed are retried on the next run"""
+    class FailingClient(LocalAIClient):
+        async def classify_email(self, text):
+            if "falha" in text:
+                raise RuntimeError("timeout")
+            return await super().classify_email(text)
+
+    source = tmp_path / "emails.jsonl"
+    write_jsonl(source, ["Pedido de reembolso urgente", "Este vai dar falha no modelo"])
+    checkpoint = Checkpoint(tmp_path / "emails.checkpoint")
+
+    stats = await BatchRunner(FailingClient(), checkpoint=checkpoint).run(open_source(source))
+
+    assert stats == {"done": 1, "skipped": 0, "failed": 1}
+    assert checkpoint.load() == {"email-0"}
+
+
+async def test_batch_writer_failure_stops_the_pipeline(tmp_path):
+    """Test that a crashing writer aborts the run instead of leaving producers blocked"""
+    class BrokenDatabase:
+        def save_analyses(self, analyses):
+            raise OSError("disco cheio")
+
+    source = tmp_path / "emails.jsonl"
+    write_jsonl(source, [f"Preciso do boleto número {i}" for i in range(50)])
+    runner = BatchRunner(LocalAIClient(), db=BrokenDatabase(), concurrency=2,
+                         queue_size=2, batch_size=1)
+
+    with pytest.raises(OSError, match="disco cheio"):
+        await asyncio.wait_for(runner.run(open_source(source)), timeout=10)
+
+
+async def test_batch_jsonl_bad_lines_are_counted_as_failed(tmp_path, tmp_database, fake_ai_client):
+    """Test that malformed lines or records without "text" do not abort the run"""
+    source = tmp_path / "emails.jsonl"
+    write_jsonl(source, [f"Preciso do boleto número {i}" for i in range(4)])
+    with open(source, "a", encoding="utf-8") as f:
+        f.write('{"id": "quebrado", "text": "sem fim\n')
+        f.write('{"id": "sem-texto"}\n')
+        f.write('["lista"]\n')
+        f.write(json.dumps({"id": "depois", "text": "Solicito o status do chamado 99"}) + "\n")
+    checkpoint = Checkpoint(tmp_path / "emails.checkpoint")
+
+    runner = BatchRunner(fake_ai_client, db=tmp_database, checkpoint=checkpoint)
+    stats = await runner.run(open_source(source))
+
+    assert stats == {"done": 5, "skipped": 0, "failed": 3}
+    assert "depois" in checkpoint.load()
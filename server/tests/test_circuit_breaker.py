@@ -0,0 +1,96 @@
+"""
+Tests for the circuit breaker and the cached health monitor
+"""
+import asyncio
+import pytest
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from app.services.health import HealthMonitor
+
+
+async def ok():
+    return "ok"
+
+
+async def fail():
+    raise RuntimeError("boom")
+
+
+async def slow():
+    await asyncio.sleep(0.05)
+    return "slow"
+
+
+async def test_opens_on_failure_rate_and_fails_fast():
+    """Test that the circuit opens and rejects without calling"""
+    breaker = CircuitBreaker("test", failure_rate=0.5, window_size=4, min_calls=4, open_seconds=60)
+    for func in (ok, fail, ok, fail):
+        try:
+            await breaker.call(func)
+        except RuntimeError:
+            pass
+
+    assert breaker.current_state() == OPEN
+
+    calls = []
+
+    async def tracked():
+        calls.append(1)
+
+    with pytest.raises(CircuitOpenError) as exc_info:
+        await breaker.call(tracked)
+    assert calls == []
+    assert 0 < exc_info.value.retry_after <= 60
+
+
+async def test_opens_on_slow_calls():
+    """Test the latency trigger"""
+    breaker = CircuitBreaker("test", slow_call_seconds=0.01, slow_call_rate=0.5, window_size=2, min_calls=2)
+    await breaker.call(slow)
+    await breaker.call(slow)
+
+    assert breaker.current_state() == OPEN
+
+
+async def test_timeout_counts_as_failure():
+    """Test that call_timeout bounds the wait and is recorded as a failure"""
+    breaker = CircuitBreaker("test", call_timeout=0.01, window_size=1, min_calls=1)
+    with pytest.raises(asyncio.TimeoutError):
+        await breaker.call(slow)
+
+    assert breaker.current_state() == OPEN
+
+
+async def test_half_open_recovers_or_reopens(monkeypatch):
+    """Test half-open probes: success closes, failure reopens"""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker("test", window_size=1, min_calls=1, open_seconds=30)
+
+    with pytest.raises(RuntimeError):
+        await breaker.call(fail)
+    assert breaker.current_state() == OPEN
+
+    now[0] += 31
+    assert breaker.current_state() == HALF_OPEN
+    with pytest.raises(RuntimeError):
+        await breaker.call(fail)
+    assert breaker.current_state() == OPEN
+
+    now[0] += 31
+    assert await breaker.call(ok) == "ok"
+    assert breaker.current_state() == CLOSED
+
+
+async def test_health_monitor_caches_database_check(monkeypatch, tmp_database):
+    """Test that probes read the cached state instead of pinging every time"""
+    pings = []
+    original_ping = tmp_database.ping
+    monkeypatch.setattr(tmp_database, "ping", lambda: pings.append(1) or original_ping())
+    monitor = HealthMonitor(interval=60)
+
+    for _ in range(5):
+        state = await monitor.current()
+
+    assert state.database_connected is True
+    assert len(pings) == 1
@@ -0,0 +1,317 @@
+"""
+Tests for storage backends (SQLite always, Postgres when TEST_POSTGRES_URL is set)
+"""
+import os
+import sqlite3
+import uuid
+import pytest
+from app.utils.compression import compress_text, decompress_text
+from app.utils.database import SCHEMA_VERSION, Database, build_fts_query, compute_text_hash, create_database
+
+
+def make_analysis(**overrides):
+    data = {
+        "id": str(uuid.uuid4()),
+        "category": "Produtivo",
+        "confidence": 0.9,
+        "suggested_reply": "Vamos verificar seu chamado.",
+        "summary": "Solicitação de status",
+        "model_used": "gpt-4o-mini",
+        "reason": "Pedido explícito",
+        "full_text": "Solicito o status do chamado 123"
+    }
+    data.update(overrides)
+    return data
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    return Database(f"sqlite:///{tmp_path / 'test.sqlite3'}")
+
+
+@pytest.fixture
+def postgres_db():
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL não definida")
+    pytest.importorskip("psycopg")
+    db = create_database(url)
+    with db.pool.connection() as conn:
+        conn.execute("TRUNCATE analyses, feedback")
+    yield db
+    db.close()
+
+
+@pytest.fixture(params=["sqlite_db", "postgres_db"])
+def db(request):
+    return request.getfixturevalue(request.param)
+
+
+def test_create_database_selects_sqlite(tmp_path):
+    """Test that sqlite URLs select the SQLite backend"""
+    db = create_database(f"sqlite:///{tmp_path / 'x.sqlite3'}")
+    assert isinstance(db, Database)
+
+
+def test_postgres_failed_migration_aborts_startup(postgres_db, monkeypatch):
+    """Test that a broken migration raises and is not recorded as applied"""
+    from app.utils import postgres
+
+    monkeypatch.setattr(postgres, "MIGRATIONS", postgres.MIGRATIONS + [
+        (9999, ["CREATE TABLE migration_probe (id INTEGER)", "SELECT * FROM tabela_inexistente"]),
+    ])
+
+    with pytest.raises(Exception):
+        create_database(os.environ["TEST_POSTGRES_URL"])
+
+    with postgres_db.pool.connection() as conn:
+        assert conn.execute("SELECT 1 FROM schema_migrations WHERE version = 9999").fetchone() is None
+        assert conn.execute("SELECT to_regclass('migration_probe') AS name").fetchone()["name"] is None
+
+
+def test_idempotency_keys_gain_fingerprint_column(tmp_path):
+    """Test that an existing idempotency table is upgraded and old keys still resolve"""
+    path = tmp_path / "old.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE idempotency_keys (
+            key TEXT PRIMARY KEY, analysis_id TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("INSERT INTO idempotency_keys (key, analysis_id) VALUES ('antiga', 'a-1')")
+    conn.commit()
+    conn.close()
+
+    db = Database(f"sqlite:///{path}")
+    db.save_idempotency_key("nova", "a-2", 24, fingerprint="abc")
+
+    assert db.get_idempotency_key("antiga", 24) == {"analysis_id": "a-1", "fingerprint": None}
+    assert db.get_idempotency_key("nova", 24) == {"analysis_id": "a-2", "fingerprint": "abc"}
+
+
+def test_create_database_rejects_unknown_scheme():
+    """Test that unsupported URLs fail instead of silently using db.sqlite3"""
+    with pytest.raises(ValueError):
+        create_database("mysql://localhost/db")
+
+
+def test_save_and_get_analysis(db):
+    """Test round trip of a single analysis"""
+    data = make_analysis()
+    created_at = db.save_analysis(data)
+    assert created_at is not None
+
+    stored = db.get_analysis(data["id"])
+    assert stored.created_at == created_at
+    assert stored.category == "Produtivo"
+    assert stored.summary == data["summary"]
+    assert isinstance(stored.created_at, str)
+
+
+def test_save_analyses_batch(db):
+    """Test batch insert path"""
+    batch = [make_analysis(full_text=f"Email número {i}") for i in range(20)]
+    assert db.save_analyses(batch) == 20
+
+    for data in batch:
+        assert db.get_analysis(data["id"]) is not None
+
+
+def test_check_duplicate(db):
+    """Test duplicate detection by text hash"""
+    data = make_analysis(full_text="Texto único para deduplicação")
+    db.save_analysis(data)
+
+    assert db.check_duplicate("Texto único para deduplicação") == data["id"]
+    assert db.check_duplicate("Outro texto") is None
+
+
+def test_save_feedback(db):
+    """Test feedback persistence"""
+    data = make_analysis()
+    db.save_analysis(data)
+
+    assert db.save_feedback({"analysis_id": data["id"], "rating": 4}) is True
+
+
+LEGACY_SCHEMA = """
+    CREATE TABLE analyses (
+        id TEXT PRIMARY KEY,
+        text_hash TEXT NOT NULL,
+        category TEXT NOT NULL,
+        confidence REAL NOT NULL,
+        suggested_reply TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        model_used TEXT NOT NULL,
+        reason TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        full_text TEXT,
+        metadata TEXT
+    )
+"""
+
+
+def test_large_text_is_compressed_transparently(sqlite_db):
+    """Test that long columns are stored compressed and read back intact"""
+    long_reply = "Resposta longa sobre o chamado. " * 100
+    data = make_analysis(suggested_reply=long_reply)
+    sqlite_db.save_analysis(data)
+
+    conn = sqlite3.connect(sqlite_db.db_path)
+    raw_reply, raw_hash = conn.execute(
+        "SELECT suggested_reply, text_hash FROM analyses WHERE id = ?", (data["id"],)
+    ).fetchone()
+    conn.close()
+
+    assert isinstance(raw_reply, bytes) and len(raw_reply) < len(long_reply)
+    assert isinstance(raw_hash, bytes) and len(raw_hash) == 32
+
+    stored = sqlite_db.get_analysis(data["id"])
+    assert stored.suggested_reply == long_reply
+    assert stored.text_hash == compute_text_hash(data["full_text"])
+
+
+def test_labels_dictionary_deduplicates_values(sqlite_db):
+    """Test that category and model values are stored once"""
+    sqlite_db.save_analyses([make_analysis() for _ in range(5)])
+
+    conn = sqlite3.connect(sqlite_db.db_path)
+    labels = conn.execute("SELECT kind, value FROM labels ORDER BY kind").fetchall()
+    conn.close()
+
+    assert labels == [("category", "Produtivo"), ("model", "gpt-4o-mini")]
+
+
+def test_postgres_migrates_text_labels_to_ids(postgres_db, monkeypatch):
+    """Test that Postgres v9 moves category, model and stage into labels"""
+    from app.utils import postgres
+
+    schema = f"mig_{uuid.uuid4().hex[:8]}"
+    url = f"{os.environ['TEST_POSTGRES_URL']}?options=-csearch_path%3D{schema}"
+    with postgres_db.pool.connection() as conn:
+        conn.execute(f"CREATE SCHEMA {schema}")
+    try:
+        monkeypatch.setattr(postgres, "MIGRATIONS", [m for m in postgres.MIGRATIONS if m[0] < 9])
+        legacy = create_database(url)
+        with legacy.pool.connection() as conn:
+            conn.execute("""
+                INSERT INTO analyses (id, text_hash, category, confidence, suggested_reply,
+                                      summary, model_used, reason, full_text)
+                VALUES ('legado', '\\x00', 'Improdutivo', 0.8, 'Obrigado!', 'Agradecimento',
+                        'gpt-4o', 'Sem pedido', 'Obrigado pela ajuda')
+            """)
+            conn.execute("""
+                INSERT INTO llm_calls (analysis_id, stage, model, prompt_tokens, completion_tokens, latency_ms)
+                VALUES ('legado', 'classify', 'gpt-4o', 100, 20, 300)
+            """)
+        legacy.close()
+
+        monkeypatch.undo()
+        db = create_database(url)
+        stored = db.get_analysis("legado")
+        assert (stored.category, stored.model_used) == ("Improdutivo", "gpt-4o")
+        [usage] = db.usage_by_day(1)
+        assert (usage["model"], usage["stage"], usage["prompt_tokens"]) == ("gpt-4o", "classify", 100)
+
+        db.save_analysis(make_analysis(model_used="gpt-4o"))
+        with db.pool.connection() as conn:
+            labels = conn.execute("SELECT kind, value FROM labels ORDER BY kind, value").fetchall()
+        db.close()
+        assert [(row["kind"], row["value"]) for row in labels] == [
+            ("category", "Improdutivo"), ("category", "Produtivo"), ("model", "gpt-4o"), ("stage", "classify")
+        ]
+    finally:
+        with postgres_db.pool.connection() as conn:
+            conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+def test_migrates_legacy_schema(tmp_path):
+    """Test migration of an existing database in the old text format"""
+    path = tmp_path / "legacy.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_SCHEMA)
+    conn.execute(
+        "INSERT INTO analyses (id, text_hash, category, confidence, suggested_reply, summary, "
+        "model_used, reason, full_text, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ("legacy-1", compute_text_hash("abc"), "Improdutivo", 0.97, "Obrigado! " * 100,
+         "Agradecimento", "gpt-4o-mini", "Agradecimento puro", "abc", "2024-05-01 12:00:00")
+    )
+    conn.commit()
+    conn.close()
+
+    db = Database(f"sqlite:///{path}")
+    stored = db.get_analysis("legacy-1")
+
+    assert stored.category == "Improdutivo"
+    assert stored.model_used == "gpt-4o-mini"
+    assert stored.suggested_reply == "Obrigado! " * 100
+    assert stored.created_at == "2024-05-01 12:00:00"
+    assert db.check_duplicate("abc") == "legacy-1"
+    # Análises antigas entram no índice de busca na criação do FTS
+    assert [hit["id"] for hit in db.search_analyses("agradecimento")] == ["legacy-1"]
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    conn.close()
+
+
+def test_compress_text_round_trip():
+    """Test compression threshold and round trip"""
+    assert compress_text("curto", min_bytes=512) == "curto"
+    long_text = "ação " * 500
+    packed = compress_text(long_text, min_bytes=512)
+    assert isinstance(packed, bytes)
+    assert decompress_text(packed) == long_text
+    assert decompress_text(None) is None
+
+
+def test_search_ranks_and_paginates(db):
+    """Test full-text search over summary, reason and reply"""
+    boleto = make_analysis(summary="Segunda via do boleto", reason="Pedido de boleto",
+                           suggested_reply="Segue o boleto atualizado.")
+    reply_only = make_analysis(summary="Dúvida sobre pagamento", suggested_reply="O boleto vence amanhã.")
+    other = make_analysis(summary="Agradecimento", suggested_reply="Obrigado pelo retorno!")
+    assert db.save_analyses([boleto, reply_only, other]) == 3
+
+    hits = db.search_analyses("boleto")
+
+    assert [hit["id"] for hit in hits] == [boleto["id"], reply_only["id"]]
+    assert hits[0]["score"] >= hits[1]["score"]
+    assert "<mark>" in hits[0]["snippet"]
+    assert hits[0]["category"] == "Produtivo"
+    assert [hit["id"] for hit in db.search_analyses("boleto", limit=1, offset=1)] == [reply_only["id"]]
+    assert db.search_analyses("inexistente") == []
+
+
+def test_search_ranks_every_match_unless_windowed(db):
+    """Test that an older, more relevant match wins unless the recency window is set"""
+    best = make_analysis(summary="Reembolso", reason="Reembolso", suggested_reply="Reembolso aprovado.")
+    db.save_analysis(best)
+    newer = [make_analysis(summary=f"Dúvida sobre o pedido {i}, o prazo, a entrega e o reembolso")
+             for i in range(5)]
+    db.save_analyses(newer)
+
+    assert db.search_analyses("reembolso", limit=1)[0]["id"] == best["id"]
+    windowed = db.search_analyses("reembolso", limit=5, recent=3)
+    assert best["id"] not in {hit["id"] for hit in windowed}
+
+
+def test_search_ignores_accents_and_follows_deletes(sqlite_db):
+    """Test diacritics-insensitive matching and index cleanup on delete"""
+    analysis = make_analysis(summary="Solicitação de reembolso")
+    sqlite_db.save_analysis(analysis)
+
+    assert [hit["id"] for hit in sqlite_db.search_analyses("solicitacao")] == [analysis["id"]]
+    assert [hit["id"] for hit in sqlite_db.search_analyses("reemb*")] == [analysis["id"]]
+
+    rowid = sqlite_db.fetch_oldest_analyses(1)[0]["rowid"]
+    sqlite_db.delete_analyses([rowid])
+
+    assert sqlite_db.search_analyses("reembolso") == []
+
+
+def test_build_fts_query_escapes_syntax():
+    """Test that user input cannot inject FTS5 operators"""
+    assert build_fts_query('boleto NEAR("x") pag*') == '"boleto" "NEAR" "x" "pag"*'
+    assert build_fts_query("-- ()") == ""
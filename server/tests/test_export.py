@@ -0,0 +1,77 @@
+"""
+Tests for the streaming export (service, keyset iteration and endpoint)
+"""
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import uuid
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.records import Analysis
+from app.services.export import EXPORT_COLUMNS, iter_chunks, stream_export
+
+client = TestClient(app)
+
+
+def seed(db, created_at_values):
+    ids = []
+    for created_at in created_at_values:
+        analysis_id = str(uuid.uuid4())
+        db.save_analysis({
+            "id": analysis_id, "category": "Produtivo", "confidence": 0.9,
+            "suggested_reply": "Vamos verificar.", "summary": "Status do chamado",
+            "model_used": "gpt-4o-mini", "reason": "Pedido", "full_text": analysis_id,
+            "metadata": {"source": "api"}
+        })
+        conn = sqlite3.connect(db.db_path)
+        conn.execute("UPDATE analyses SET created_at = ? WHERE id = ?", (created_at, analysis_id))
+        conn.commit()
+        conn.close()
+        ids.append(analysis_id)
+    return ids
+
+
+def test_iter_analyses_pages_by_keyset(tmp_database):
+    """Test that small batches return every row once, in created_at order, within the range"""
+    ids = seed(tmp_database, ["2024-05-01 10:00:00"] * 5 + ["2024-05-02 10:00:00"] * 3 + ["2024-06-01 00:00:00"])
+
+    exported = list(tmp_database.iter_analyses("2024-05-01 00:00:00", "2024-06-01 00:00:00", batch_size=2))
+
+    assert [a.id for a in exported] == ids[:8]
+    assert exported[0].metadata == {"source": "api"}
+    assert len(list(tmp_database.iter_analyses(batch_size=4))) == 9
+
+
+def test_stream_export_formats():
+    """Test NDJSON, CSV and gzip output"""
+    rows = [Analysis(id="a", created_at="2024-05-01 10:00:00", category="Produtivo", confidence=0.9,
+                     suggested_reply="Ok", summary='Resumo, com "aspas"', model_used="gpt-4o-mini",
+                     metadata={"k": 1})]
+
+    ndjson = b"".join(stream_export(iter(rows), "ndjson")).decode()
+    assert json.loads(ndjson)["summary"] == 'Resumo, com "aspas"'
+
+    text = gzip.decompress(b"".join(stream_export(iter(rows), "csv", gzip=True))).decode()
+    parsed = list(csv.DictReader(io.StringIO(text)))
+    assert tuple(parsed[0]) == EXPORT_COLUMNS
+    assert parsed[0]["summary"] == 'Resumo, com "aspas"'
+    assert json.loads(parsed[0]["metadata"]) == {"k": 1}
+
+    assert list(iter_chunks(["ab", "cd", "e"], chunk_size=4)) == [b"abcd", b"e"]
+
+
+def test_export_endpoint_streams_range(tmp_database):
+    """Test the endpoint filters by date and returns a gzip attachment"""
+    ids = seed(tmp_database, ["2024-05-01 10:00:00", "2024-05-03 10:00:00"])
+
+    response = client.get("/api/export", params={"start": "2024-05-01", "end": "2024-05-02", "gzip": "true"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert 'filename="analyses.ndjson.gz"' in response.headers["content-disposition"]
+    lines = gzip.decompress(response.content).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ids[:1]
+
+    assert client.get("/api/export", params={"start": "2024-05-02", "end": "2024-05-01"}).status_code == 400
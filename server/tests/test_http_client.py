@@ -0,0 +1,59 @@
+"""
+Tests for the shared LLM HTTP client (pool settings and warm-up)
+"""
+import httpx
+from types import SimpleNamespace
+from app.services import http_client
+
+
+def make_settings(**overrides):
+    values = dict(
+        HTTP2_ENABLED=True, HTTP_MAX_CONNECTIONS=8, HTTP_MAX_KEEPALIVE_CONNECTIONS=4,
+        HTTP_KEEPALIVE_EXPIRY=30.0, HTTP_CONNECT_TIMEOUT=2.0, LLM_TIMEOUT_SECONDS=15.0
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+async def test_build_http_client_applies_settings(monkeypatch):
+    """Test that timeouts come from Settings and HTTP/2 needs h2"""
+    monkeypatch.setattr(http_client, "h2", None)
+    client = http_client.build_http_client(make_settings())
+
+    assert client.timeout.connect == 2.0
+    assert client.timeout.read == 15.0
+    pool = client._transport._pool
+    assert pool._max_connections == 8
+    assert pool._max_keepalive_connections == 4
+    assert pool._http2 is False
+    await client.aclose()
+
+
+async def test_request_hook_counts_and_traces():
+    """Test that every request is counted and carries the connection trace"""
+    before = http_client.http_requests.value()
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+    await http_client._on_request(request)
+
+    assert http_client.http_requests.value() == before + 1
+    assert request.extensions["trace"] is http_client._trace
+
+
+async def test_warm_up_opens_connections_and_tolerates_errors():
+    """Test that warm-up pings the models endpoint and ignores failures"""
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, str(request.url)))
+        if len(seen) == 2:
+            raise httpx.ConnectError("recusada")
+        return httpx.Response(401)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    warmed = await http_client.warm_up(client, "http://localhost:9999/v1/", connections=3)
+
+    assert warmed == 2
+    assert seen[0] == ("HEAD", "http://localhost:9999/v1/models")
+    assert await http_client.warm_up(client, None, connections=0) == 0
+    await client.aclose()
@@ -0,0 +1,99 @@
+"""
+Tests for the queue-based structured logging
+"""
+import json
+import logging
+import queue
+import sys
+import pytest
+from fastapi.testclient import TestClient
+from app.core.logging_config import (
+    ContextFilter, DeferredQueueHandler, JsonFormatter, SamplingFilter,
+    parse_sampling, request_id_var, stage, timings_var
+)
+from app.main import app
+
+
+def make_record(level=logging.INFO, msg="mensagem %s", args=("x",), **extra):
+    record = logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_json_formatter_includes_context_and_extra():
+    """Test JSON lines carry request id and extra fields"""
+    token = request_id_var.set("abc123")
+    try:
+        record = make_record(duration_ms=12.5)
+        ContextFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "mensagem x"
+    assert entry["request_id"] == "abc123"
+    assert entry["duration_ms"] == 12.5
+    assert entry["level"] == "INFO"
+
+
+def test_sampling_filter_keeps_warnings():
+    """Test that sampling drops low-level records only"""
+    sampler = SamplingFilter(0.0)
+
+    assert sampler.filter(make_record(logging.INFO)) is False
+    assert sampler.filter(make_record(logging.WARNING)) is True
+    assert SamplingFilter(1.0).filter(make_record(logging.INFO)) is True
+
+
+def test_parse_sampling():
+    """Test LOG_SAMPLING parsing"""
+    assert parse_sampling("app.llm.payload:0.01, app.access:0.5") == {
+        "app.llm.payload": 0.01, "app.access": 0.5
+    }
+    assert parse_sampling("") == {}
+    with pytest.raises(ValueError):
+        parse_sampling("sem-taxa")
+
+
+def test_queue_handler_defers_formatting():
+    """Test that only args are resolved before enqueueing"""
+    q = queue.SimpleQueue()
+    handler = DeferredQueueHandler(q)
+    try:
+        raise RuntimeError("falha")
+    except RuntimeError:
+        record = make_record(exc_info=None)
+        record.exc_info = sys.exc_info()
+
+    handler.emit(record)
+    queued = q.get_nowait()
+
+    assert queued.msg == "mensagem x" and queued.args is None
+    assert queued.exc_info is not None and queued.exc_text is None
+
+
+def test_stage_records_timings():
+    """Test stage timings only when a request context exists"""
+    with stage("fora"):
+        pass
+
+    token = timings_var.set({})
+    try:
+        with stage("classify"):
+            pass
+        assert "classify" in timings_var.get()
+    finally:
+        timings_var.reset(token)
+
+
+def test_request_id_header():
+    """Test X-Request-ID is generated or propagated"""
+    client = TestClient(app)
+
+    generated = client.get("/")
+    assert len(generated.headers["x-request-id"]) == 32
+
+    propagated = client.get("/", headers={"X-Request-ID": "req-42"})
+    assert propagated.headers["x-request-id"] == "req-42"
@@ -0,0 +1,73 @@
+"""
+Tests for long document map-reduce classification
+"""
+import pytest
+from app.core.settings import get_settings
+from app.services.long_document import map_reduce, reduce_votes
+from app.services.pipeline import analyze_email, prepare_text
+
+
+def test_reduce_votes_weights_by_confidence():
+    """Test that one confident chunk outweighs several unsure ones"""
+    results = [
+        {"category": "Produtivo", "confidence": 0.95, "reason": "Pedido de reembolso"},
+        {"category": "Improdutivo", "confidence": 0.55, "reason": "Texto informativo"},
+        {"category": "Improdutivo", "confidence": 0.55, "reason": "Texto informativo"},
+    ]
+
+    reduced = reduce_votes(results)
+
+    assert reduced["category"] == "Produtivo"
+    assert reduced["confidence"] == pytest.approx((0.95 + 0.45 + 0.45) / 3, abs=0.01)
+    assert reduced["reason"] == "Pedido de reembolso (1 de 3 trechos)"
+    assert reduced["chunks"] == {"count": 3, "votes": {"Produtivo": 1, "Improdutivo": 2}}
+
+
+async def test_map_reduce_tolerates_partial_failures():
+    """Test that failed chunks are left out and all failing raises"""
+    async def classify(chunk):
+        if chunk == "falha":
+            raise RuntimeError("timeout")
+        return {"category": "Produtivo", "confidence": 0.8, "reason": "Pedido",
+                "model": "m", "llm_call": {"prompt_tokens": 10}}
+
+    reduced = await map_reduce(["a", "falha", "b"], classify)
+
+    assert reduced["category"] == "Produtivo"
+    assert reduced["chunks"]["failed"] == 1
+    assert reduced["llm_calls"] == [{"prompt_tokens": 10}] * 2
+    with pytest.raises(RuntimeError):
+        await map_reduce(["falha", "falha"], classify)
+
+
+async def test_documents_keep_signature_lines_and_letterheads(fake_ai_client, tmp_database):
+    """Test that PDF-like documents are chunked whole, without reply stripping"""
+    settings = get_settings()
+    clause = "O contratado prestará os serviços de suporte conforme o anexo técnico. "
+    text = (
+        "De: Departamento Jurídico\nData: 03/06/2024\n\nCONTRATO DE PRESTAÇÃO DE SERVIÇOS\n"
+        + clause * 20
+        + "\n______________________________\nContratante\n\n"
+        + "Em caso de dúvidas, o contratante escreveu:\n"
+        + clause * (settings.LONG_DOC_THRESHOLD_CHARS // len(clause) * 2)
+    )
+
+    prepared = prepare_text(text, is_email=False)
+    assert prepared["body"] == text.strip()
+    assert len(prepared["chunks"]) > 1
+
+    result = await analyze_email(text, is_email=False)
+    assert tmp_database.get_analysis(result.id).metadata["long_document"]["count"] == len(prepared["chunks"])
+
+
+async def test_analyze_email_classifies_long_documents_by_chunks(fake_ai_client, tmp_database):
+    """Test that texts above the threshold are classified chunk by chunk"""
+    settings = get_settings()
+    paragraph = "Segue o relatório trimestral com os indicadores da operação. "
+    text = paragraph * (settings.LONG_DOC_THRESHOLD_CHARS // len(paragraph) * 4)
+
+    result = await analyze_email(text)
+
+    stored = tmp_database.get_analysis(result.id).metadata["long_document"]
+    assert stored["count"] == fake_ai_client.classify_calls > 1
+    assert stored["votes"]["Produtivo"] == stored["count"]
@@ -0,0 +1,179 @@
+"""
+Tests for the incremental IMAP poller
+"""
+import asyncio
+from email.message import EmailMessage
+import pytest
+from app.services.mailbox import ImapConnection, MailboxPoller
+from tests.imap_stub import ImapStub
+
+
+def make_email(subject: str, body: str) -> bytes:
+    msg = EmailMessage()
+    msg["From"] = "cliente@example.com"
+    msg["To"] = "suporte@example.com"
+    msg["Subject"] = subject
+    msg["Message-ID"] = f"<{abs(hash(subject))}@example.com>"
+    msg.set_content(body)
+    return msg.as_bytes()
+
+
+REQUEST = make_email("Acesso", "Preciso de ajuda para acessar o sistema, está dando erro no login.")
+THANKS = make_email("Obrigado", "Muito obrigado pelo atendimento de ontem, resolveu tudo.")
+
+
+@pytest.fixture
+def imap_server():
+    with ImapStub() as server:
+        yield server
+
+
+def make_poller(server, db, **kwargs):
+    connection = ImapConnection("127.0.0.1", server.port, "user", "pass", ssl=False, timeout=5)
+    return MailboxPoller(connection, db, folders=["INBOX"], **kwargs)
+
+
+def test_first_sync_skips_existing_mail_by_default(imap_server, tmp_database, fake_ai_client):
+    imap_server.append("INBOX", REQUEST)
+    poller = make_poller(imap_server, tmp_database)
+
+    stats = asyncio.run(poller.poll_once())
+
+    assert stats["classified"] == 0
+    state = tmp_database.get_mailbox_state("user@127.0.0.1/INBOX")
+    assert state == {"uidvalidity": 1, "last_uid": 1}
+
+
+def test_sync_existing_classifies_and_advances(imap_server, tmp_database, fake_ai_client):
+    imap_server.append("INBOX", REQUEST)
+    imap_server.append("INBOX", THANKS)
+    poller = make_poller(imap_server, tmp_database, sync_existing=True, batch_size=1)
+
+    stats = asyncio.run(poller.poll_once())
+
+    assert stats == {"classified": 2, "skipped": 0, "failed": 0, "abandoned": 0}
+    assert tmp_database.get_mailbox_state("user@127.0.0.1/INBOX")["last_uid"] == 2
+    analyses = list(tmp_database.iter_analyses())
+    assert {analysis.metadata["uid"] for analysis in analyses} == {1, 2}
+    assert all(analysis.metadata["source"] == "imap" for analysis in analyses)
+
+
+def test_new_mail_is_picked_up_without_reprocessing(imap_server, tmp_database, fake_ai_client):
+    imap_server.append("INBOX", REQUEST)
+    poller = make_poller(imap_server, tmp_database, sync_existing=True)
+
+    async def scenario():
+        first = await poller.poll_once()
+        imap_server.append("INBOX", THANKS)
+        second = await poller.poll_once()
+        third = await poller.poll_once()
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+
+    assert first["classified"] == 1
+    assert second["classified"] == 1
+    assert third["classified"] == 0
+    assert fake_ai_client.classify_calls == 2
+    # Uma conexão para os três ciclos e nenhuma varredura da pasta inteira
+    assert imap_server.logins == 1
+    searches = [command for command in imap_server.commands if command.startswith("UID SEARCH")]
+    assert searches == ["UID SEARCH UID 1:*", "UID SEARCH UID 2:*", "UID SEARCH UID 3:*"]
+
+
+def test_uidvalidity_change_resets_high_water_mark(imap_server, tmp_database, fake_ai_client):
+    imap_server.append("INBOX", REQUEST)
+    imap_server.append("INBOX", THANKS)
+    poller = make_poller(imap_server, tmp_database, sync_existing=True)
+    asyncio.run(poller.poll_once())
+
+    imap_server.reset_uidvalidity("INBOX")
+    stats = asyncio.run(poller.poll_once())
+
+    assert stats["classified"] == 2
+    assert tmp_database.get_mailbox_state("user@127.0.0.1/INBOX") == {"uidvalidity": 2, "last_uid": 2}
+
+
+def test_failures_are_retried_without_reprocessing_the_batch(imap_server, tmp_database, fake_ai_client):
+    for body in (REQUEST, THANKS, REQUEST):
+        imap_server.append("INBOX", body)
+    calls = []
+
+    async def flaky_analyze(text, metadata):
+        calls.append(metadata["uid"])
+        if metadata["uid"] == 2 and calls.count(2) == 1:
+            raise RuntimeError("LLM indisponível")
+        return type("Response", (), {"category": "Produtivo"})()
+
+    poller = make_poller(imap_server, tmp_database, sync_existing=True, analyze=flaky_analyze)
+
+    first = asyncio.run(poller.poll_once())
+    assert first == {"classified": 2, "skipped": 0, "failed": 1, "abandoned": 0}
+    assert tmp_database.get_mailbox_state("user@127.0.0.1/INBOX")["last_uid"] == 3
+    assert tmp_database.get_mailbox_failures("user@127.0.0.1/INBOX", 5) == {2: 1}
+
+    second = asyncio.run(poller.poll_once())
+    assert second == {"classified": 1, "skipped": 0, "failed": 0, "abandoned": 0}
+    # Só o UID que falhou foi tentado de novo
+    assert sorted(calls) == [1, 2, 2, 3]
+    assert tmp_database.get_mailbox_failures("user@127.0.0.1/INBOX", 5) == {}
+
+
+def test_message_that_always_fails_is_abandoned(imap_server, tmp_database, fake_ai_client):
+    imap_server.append("INBOX", REQUEST)
+    calls = []
+
+    async def broken_analyze(text, metadata):
+        calls.append(metadata["uid"])
+        if metadata["uid"] == 1:
+            raise RuntimeError("texto que sempre quebra o parser do LLM")
+        return type("Response", (), {"category": "Produtivo"})()
+
+    poller = make_poller(imap_server, tmp_database, sync_existing=True, analyze=broken_analyze,
+                         max_attempts=2, flag_prefix="Triagem-")
+
+    first = asyncio.run(poller.poll_once())
+    imap_server.append("INBOX", THANKS)
+    second = asyncio.run(poller.poll_once())
+    third = asyncio.run(poller.poll_once())
+
+    assert first["failed"] == 1
+    assert second == {"classified": 1, "skipped": 0, "failed": 0, "abandoned": 1}
+    assert third == {"classified": 0, "skipped": 0, "failed": 0, "abandoned": 0}
+    assert calls == [1, 1, 2]
+    assert imap_server.keywords("INBOX", 1) == {"Triagem-Falha"}
+    assert imap_server.keywords("INBOX", 2) == {"Triagem-Produtivo"}
+
+
+def test_messages_without_text_are_skipped(imap_server, tmp_database, fake_ai_client):
+    imap_server.append("INBOX", b"From: cliente@example.com\r\n\r\nok\r\n")
+    poller = make_poller(imap_server, tmp_database, sync_existing=True)
+
+    stats = asyncio.run(poller.poll_once())
+
+    assert stats == {"classified": 0, "skipped": 1, "failed": 0, "abandoned": 0}
+    assert tmp_database.get_mailbox_state("user@127.0.0.1/INBOX")["last_uid"] == 1
+
+
+def test_category_is_written_back_as_keyword(imap_server, tmp_database, fake_ai_client):
+    imap_server.append("INBOX", REQUEST)
+    imap_server.append("INBOX", THANKS)
+    poller = make_poller(imap_server, tmp_database, sync_existing=True, flag_prefix="Triagem-")
+
+    asyncio.run(poller.poll_once())
+
+    assert imap_server.keywords("INBOX", 1) == {"Triagem-Produtivo"}
+    assert imap_server.keywords("INBOX", 2) == {"Triagem-Improdutivo"}
+
+
+def test_connection_errors_reconnect_next_cycle(imap_server, tmp_database, fake_ai_client):
+    poller = make_poller(imap_server, tmp_database, sync_existing=True)
+    poller.folders = ["Inexistente", "INBOX"]
+
+    stats = asyncio.run(poller.poll_once())
+    assert stats["classified"] == 0
+
+    imap_server.append("Inexistente", REQUEST)
+    stats = asyncio.run(poller.poll_once())
+    assert stats["classified"] == 1
+    assert imap_server.logins == 2
@@ -2,7 +2,7 @@
 Tests for NLP preprocessing service
 """
 import pytest
-from app.services.nlp import clean_text, extract_summary
+from app.services.nlp import clean_text, extract_summary, split_into_chunks, strip_reply_history
 
 
 def test_clean_text_lowercase():
@@ -112,3 +112,74 @@ def test_clean_text_only_special_chars():
     
     # Deve resultar em string vazia ou muito curta
     assert len(result) < len(text)
+
+
+def test_strip_reply_history_removes_quoted_chain():
+    """Test that only the new content before the reply header is kept"""
+    text = (
+        "Oi, preciso do boleto atualizado.\n\n"
+        "Em seg., 3 de jun. de 2024 às 10:00, Suporte <suporte@empresa.com>\n"
+        "escreveu:\n"
+        "> Olá, segue o boleto.\n"
+        "> Obrigado!"
+    )
+    assert strip_reply_history(text) == "Oi, preciso do boleto atualizado."
+    assert strip_reply_history("Confirmado.\nOn Mon, Jun 3, 2024 Ana wrote:\nold") == "Confirmado."
+
+
+def test_strip_reply_history_removes_outlook_header_and_quotes():
+    """Test Outlook-style headers and interleaved > lines"""
+    text = (
+        "> Qual o prazo?\n"
+        "Prazo de 5 dias.\n"
+        "________________________________\n"
+        "De: João <joao@empresa.com>\n"
+        "Enviado: terça-feira\n"
+        "Mensagem antiga"
+    )
+    assert strip_reply_history(text) == "Prazo de 5 dias."
+    assert strip_reply_history("Ok\nDe: João\nEnviado: ontem\nantigo") == "Ok"
+    assert strip_reply_history("Ok\n-----Original Message-----\nantigo") == "Ok"
+
+
+def test_strip_reply_history_removes_signature_and_disclaimer():
+    """Test signature delimiters, mobile signatures and legal footers"""
+    assert strip_reply_history("Pode enviar?\n-- \nMaria | Financeiro") == "Pode enviar?"
+    assert strip_reply_history("Recebido.\nEnviado do meu iPhone") == "Recebido."
+    text = "Segue o contrato.\n\nEsta mensagem é confidencial e destinada apenas ao destinatário."
+    assert strip_reply_history(text) == "Segue o contrato."
+
+
+def test_strip_reply_history_needs_header_after_outlook_separator():
+    """Test that an underscore line alone (signature line) is not a reply separator"""
+    text = "Segue o termo assinado.\n__________________\nMaria Souza\nDiretora"
+    assert strip_reply_history(text) == text
+
+
+def test_strip_reply_history_keeps_text_without_history():
+    """Test that plain emails and quote-only emails are kept"""
+    text = "De acordo com o combinado, segue o relatório.\nData de entrega: amanhã"
+    assert strip_reply_history(text) == text
+    assert strip_reply_history("> só citação\n> sem texto novo") == "> só citação\n> sem texto novo"
+
+
+def test_split_into_chunks_ends_on_sentences_with_overlap():
+    """Test that chunks respect the size, end on sentences and overlap"""
+    sentences = [f"Frase número {i} do contrato." for i in range(40)]
+    chunks = split_into_chunks(" ".join(sentences), chunk_chars=200, overlap_chars=60)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    # O trecho seguinte recomeça com a última frase do anterior
+    assert chunks[0].split(". ")[-1] in chunks[1]
+    assert sentences[-1] in chunks[-1]
+
+
+def test_split_into_chunks_limits_chunk_count():
+    """Test short texts, oversize sentences and the max_chunks cap"""
+    assert split_into_chunks("Texto curto.", chunk_chars=200) == ["Texto curto."]
+    assert split_into_chunks("a" * 450, chunk_chars=200) == ["a" * 200, "a" * 200, "a" * 50]
+
+    text = " ".join(f"Frase {i}." for i in range(1000))
+    assert len(split_into_chunks(text, chunk_chars=100, max_chunks=5)) <= 5
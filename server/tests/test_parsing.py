@@ -51,3 +51,111 @@ def test_extract_text_preserves_spaces():
     assert "Palavra1" in result
     assert "Palavra2" in result
     assert "Palavra3" in result
+
+
+def test_extract_text_from_memoryview():
+    """Test extraction straight from a memoryview buffer (upload reader output)"""
+    buffer = memoryview(bytearray("Texto em memória".encode("utf-8")))
+
+    result = extract_text_from_file(buffer, "email.txt")
+
+    assert result == "Texto em memória"
+
+
+def test_extract_pdf_text_from_memoryview():
+    """Test PDF extraction from a memoryview without copying to bytes"""
+    import fitz
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Pedido 123 pendente")
+    pdf = memoryview(bytearray(doc.tobytes()))
+
+    assert "Pedido 123" in extract_pdf_text_bytes(pdf)
+
+
+def build_pdf(text):
+    import fitz
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    return doc.tobytes()
+
+
+def build_eml(plain=None, html=None, pdf=None, subject="Status do pedido"):
+    from email.message import EmailMessage
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = "cliente@example.com"
+    msg["Message-ID"] = "<abc@example.com>"
+    if plain is not None:
+        msg.set_content(plain)
+        if html is not None:
+            msg.add_alternative(html, subtype="html")
+    elif html is not None:
+        msg.set_content(html, subtype="html")
+    if pdf is not None:
+        msg.add_attachment(pdf, maintype="application", subtype="pdf", filename="fatura.pdf")
+    return msg.as_bytes()
+
+
+def test_extract_eml_prefers_plain_text():
+    """Test that text/plain wins over the HTML alternative"""
+    raw = build_eml(plain="Corpo em texto puro", html="<p>Corpo em <b>HTML</b></p>")
+
+    result = extract_text_from_file(raw, "mensagem.eml")
+
+    assert "Assunto: Status do pedido" in result
+    assert "Corpo em texto puro" in result
+    assert "HTML" not in result
+
+
+def test_extract_eml_falls_back_to_html():
+    """Test HTML-to-text conversion when there is no text/plain part"""
+    raw = build_eml(html="<html><style>p{}</style><p>Preciso de ajuda</p><p>Pedido&nbsp;42</p></html>")
+
+    result = extract_text_from_file(raw, "mensagem.eml")
+
+    assert "Preciso de ajuda\nPedido\xa042" in result
+    assert "p{}" not in result
+
+
+def test_extract_eml_reads_pdf_attachments():
+    """Test text extraction from PDF attachments"""
+    raw = build_eml(plain="Segue a fatura", pdf=build_pdf("Fatura 987 vencida"))
+
+    result = extract_text_from_file(raw, "mensagem.eml")
+
+    assert "[Anexo: fatura.pdf]" in result
+    assert "Fatura 987" in result
+
+
+def test_extract_eml_from_memoryview():
+    """Test that .eml uploads parse straight from the upload buffer, 8-bit bodies included"""
+    raw = build_eml(plain="Não consigo acessar o relatório")
+
+    result = extract_text_from_file(memoryview(bytearray(raw)), "mensagem.eml")
+
+    assert "Não consigo acessar o relatório" in result
+
+
+def test_mbox_is_not_a_single_upload():
+    """Test that .mbox uploads are rejected in favour of the streaming reader"""
+    with pytest.raises(ValueError):
+        extract_text_from_file(b"From x\n", "caixa.mbox")
+
+
+def test_iter_mbox_yields_one_message_at_a_time():
+    """Test mbox splitting and mboxrd unescaping"""
+    import io
+    from app.services.parsing import iter_mbox, extract_text_from_email
+    mbox = (
+        b"From a@example.com Mon Jan  1 00:00:00 2024\n"
+        + build_eml(plain="Primeira mensagem\n>From aqui no corpo\n", subject="Um")
+        + b"\nFrom b@example.com Mon Jan  1 00:00:00 2024\n"
+        + build_eml(plain="Segunda mensagem", subject="Dois")
+    )
+
+    messages = iter_mbox(io.BytesIO(mbox))
+    first = next(messages)
+    assert "Primeira mensagem\nFrom aqui no corpo" in extract_text_from_email(first)
+    second = next(messages)
+    assert "Segunda mensagem" in extract_text_from_email(second)
+    assert next(messages, None) is None
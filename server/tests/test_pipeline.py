@@ -0,0 +1,38 @@
+"""
+Tests for the shared processing pipeline
+"""
+import io
+from app.services.pipeline import analyze_email, analyze_mbox
+
+
+def mbox_message(message_id, body, subject=None):
+    headers = f"Subject: {subject}\n" if subject else ""
+    return (
+        f"From sender@example.com Mon Jan  1 00:00:00 2024\n"
+        f"{headers}Message-ID: <{message_id}@example.com>\n"
+        f"Content-Type: text/plain; charset=utf-8\n\n{body}\n\n"
+    ).encode("utf-8")
+
+
+async def test_analyze_email_saves_analysis(fake_ai_client, tmp_database):
+    """Test pipeline run and persistence"""
+    result = await analyze_email("Preciso da segunda via do boleto", {"source": "teste"})
+
+    stored = tmp_database.get_analysis(result.id)
+    assert stored.category == "Produtivo"
+    assert stored.metadata["source"] == "teste"
+    assert "clean_ms" in stored.metadata["timings"]
+
+
+async def test_analyze_mbox_classifies_each_message(fake_ai_client, tmp_database):
+    """Test that every mbox message feeds the pipeline, skipping empty ones"""
+    mbox = io.BytesIO(
+        mbox_message("pedido", "Preciso atualizar meu cadastro", subject="Cadastro")
+        + mbox_message("vazio", "")
+        + mbox_message("natal", "Feliz Natal a toda a equipe")
+    )
+
+    results = [r async for r in analyze_mbox(mbox)]
+
+    assert [r.category for r in results] == ["Produtivo", "Improdutivo"]
+    assert tmp_database.get_analysis(results[1].id).metadata["message_id"] == "<natal@example.com>"
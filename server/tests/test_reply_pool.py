@@ -0,0 +1,69 @@
+"""
+Tests for the Improdutivo reply pool
+"""
+import uuid
+from app.services.pipeline import analyze_email
+from app.services.reply_pool import CURATED_REPLIES, ReplyPool, get_reply_pool, match_intent
+
+
+def test_match_intent():
+    """Test intent detection order"""
+    assert match_intent("PROMOÇÃO! Clique aqui e ganhe desconto") == "spam"
+    assert match_intent("Feliz Natal e obrigado por tudo!") == "seasonal"
+    assert match_intent("Funcionou, obrigado!") == "solved"
+    assert match_intent("Muito obrigada pela ajuda") == "thanks"
+    assert match_intent("Preciso do boleto atualizado") is None
+
+
+def test_pick_is_deterministic_and_prefers_learned():
+    """Test curated fallback, stable choice and learned replies"""
+    pool = ReplyPool()
+    text = "Obrigado pelo retorno rápido"
+
+    first = pool.pick(text)
+    assert first["source"] == "curated"
+    assert first["reply"] in CURATED_REPLIES["thanks"]
+    assert pool.pick(text) == first
+
+    assert pool.learn("Obrigado pela ajuda", "Improdutivo", "Disponha! Equipe Financeira.", rating=5)
+    learned = pool.pick(text)
+    assert learned["source"] == "learned"
+    assert learned["reply"] == "Disponha! Equipe Financeira."
+
+    assert pool.pick("Preciso de ajuda com o contrato") is None
+
+
+def test_learn_filters_feedback():
+    """Test that only good Improdutivo feedback with a known intent is learned"""
+    pool = ReplyPool()
+
+    assert not pool.learn("Obrigado", "Produtivo", "Vamos verificar")
+    assert not pool.learn("Obrigado", "Improdutivo", "Ruim", rating=1)
+    assert not pool.learn("Segue o documento", "Improdutivo", "Recebido")
+    assert not pool.learn("Obrigado", "Improdutivo", "   ")
+    assert pool.learned["thanks"] == []
+
+
+async def test_pipeline_skips_llm_reply_for_confident_improdutivo(fake_ai_client, tmp_database):
+    """Test that the second LLM call is skipped and the source recorded"""
+    result = await analyze_email("Muito obrigado pela ajuda de ontem!")
+
+    assert fake_ai_client.reply_calls == 0
+    assert result.suggested_reply in CURATED_REPLIES["thanks"]
+    assert tmp_database.get_analysis(result.id).metadata["reply_source"] == "pool:thanks"
+
+    await analyze_email("Preciso da segunda via do boleto")
+    assert fake_ai_client.reply_calls == 1
+
+
+def test_pool_loads_edited_replies_from_feedback(tmp_database):
+    """Test learning from feedback.edited_reply at startup"""
+    analysis_id = str(uuid.uuid4())
+    tmp_database.save_analysis({
+        "id": analysis_id, "category": "Improdutivo", "confidence": 0.97,
+        "suggested_reply": "Obrigado!", "summary": "Agradeço pelo atendimento",
+        "model_used": "gpt-4o-mini", "full_text": "Agradeço pelo atendimento"
+    })
+    tmp_database.save_feedback({"analysis_id": analysis_id, "edited_reply": "Sempre às ordens!", "rating": 4})
+
+    assert get_reply_pool().learned["thanks"] == ["Sempre às ordens!"]
@@ -0,0 +1,134 @@
+"""
+Tests for retention service - archival, batched deletion and compaction
+"""
+import gzip
+import json
+import sqlite3
+import uuid
+import pytest
+from app.core.settings import Settings
+from app.services.retention import RetentionManager, parse_policies
+from app.utils.database import Database
+
+
+def seed(db, category, created_at, count=1):
+    ids = []
+    for _ in range(count):
+        analysis_id = str(uuid.uuid4())
+        db.save_analysis({
+            "id": analysis_id,
+            "category": category,
+            "confidence": 0.9,
+            "suggested_reply": "Obrigado! " * 50,
+            "summary": "Resumo",
+            "model_used": "gpt-4o-mini",
+            "full_text": "Texto"
+        })
+        ids.append(analysis_id)
+    conn = sqlite3.connect(db.db_path)
+    with conn:
+        conn.executemany(
+            "UPDATE analyses SET created_at = ? WHERE id = ?",
+            [(created_at, i) for i in ids]
+        )
+    conn.close()
+    return ids
+
+
+@pytest.fixture
+def db(tmp_path):
+    return Database(f"sqlite:///{tmp_path / 'retention.sqlite3'}")
+
+
+def make_manager(db, tmp_path, **overrides):
+    settings = Settings(ARCHIVE_DIR=str(tmp_path / "archive"), RETENTION_BATCH_SIZE=7, **overrides)
+    return RetentionManager(db, settings)
+
+
+def test_parse_policies():
+    """Test policy string parsing"""
+    assert parse_policies("Improdutivo:30, Produtivo:365") == {"Improdutivo": 30, "Produtivo": 365}
+    assert parse_policies("") == {}
+    with pytest.raises(ValueError):
+        parse_policies("Improdutivo=30")
+
+
+def test_policy_archives_expired_rows_by_category(db, tmp_path):
+    """Test that only expired rows of the configured category are archived"""
+    old_ids = seed(db, "Improdutivo", "2024-01-15 10:00:00", count=20)
+    seed(db, "Produtivo", "2024-01-15 10:00:00", count=3)
+    recent = seed(db, "Improdutivo", "2099-01-01 00:00:00")
+
+    manager = make_manager(db, tmp_path, RETENTION_POLICIES="Improdutivo:30")
+    stats = manager.run_once()
+
+    assert stats["archived"]["Improdutivo"] == 20
+    assert stats["rows_remaining"] == 4
+    assert db.get_analysis(old_ids[0]) is None
+    assert db.get_analysis(recent[0]) is not None
+
+    archive = tmp_path / "archive" / "2024-01" / "analyses-2024-01.jsonl.gz"
+    with gzip.open(archive, "rt", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert sorted(r["id"] for r in rows) == sorted(old_ids)
+    assert "rowid" not in rows[0]
+
+
+def test_default_policy_skips_categories_with_own_policy(db, tmp_path):
+    """Test that RETENTION_DEFAULT_DAYS does not override per-category policies"""
+    seed(db, "Produtivo", "2024-03-01 00:00:00", count=2)
+    seed(db, "Improdutivo", "2024-03-01 00:00:00", count=2)
+
+    manager = make_manager(
+        db, tmp_path, RETENTION_POLICIES="Produtivo:100000", RETENTION_DEFAULT_DAYS=30
+    )
+    stats = manager.run_once()
+
+    assert stats["archived"] == {"Produtivo": 0, "*": 2}
+    assert stats["rows_remaining"] == 2
+
+
+def test_max_rows_bounds_table(db, tmp_path):
+    """Test that RETENTION_MAX_ROWS archives the oldest rows beyond the cap"""
+    seed(db, "Produtivo", "2024-01-01 00:00:00", count=10)
+    seed(db, "Produtivo", "2025-06-01 00:00:00", count=5)
+
+    stats = make_manager(db, tmp_path, RETENTION_MAX_ROWS=5).run_once()
+
+    assert stats["archived"]["max_rows"] == 10
+    assert stats["rows_remaining"] == 5
+
+
+def test_dry_run_keeps_rows(db, tmp_path):
+    """Test that dry-run neither deletes nor writes archives"""
+    seed(db, "Improdutivo", "2024-01-15 10:00:00", count=3)
+
+    stats = make_manager(db, tmp_path, RETENTION_POLICIES="Improdutivo:30").run_once(dry_run=True)
+
+    assert stats["archived"]["Improdutivo"] == 3
+    assert stats["rows_remaining"] == 3
+    assert not (tmp_path / "archive").exists()
+
+
+def test_dry_run_counts_beyond_one_batch(db, tmp_path):
+    """Test that dry-run totals are not capped at RETENTION_BATCH_SIZE"""
+    seed(db, "Improdutivo", "2024-01-15 10:00:00", count=20)
+    seed(db, "Produtivo", "2024-01-15 10:00:00", count=9)
+    seed(db, "Produtivo", "2099-01-01 00:00:00", count=6)
+
+    manager = make_manager(db, tmp_path, RETENTION_POLICIES="Improdutivo:30",
+                           RETENTION_DEFAULT_DAYS=30, RETENTION_MAX_ROWS=4)
+    stats = manager.run_once(dry_run=True)
+
+    assert stats["archived"] == {"Improdutivo": 20, "*": 9, "max_rows": 2}
+    assert stats["rows_remaining"] == 35
+
+
+def test_incremental_vacuum_reclaims_pages(db, tmp_path):
+    """Test that freed pages are returned to the filesystem"""
+    seed(db, "Improdutivo", "2024-01-15 10:00:00", count=300)
+
+    stats = make_manager(db, tmp_path, RETENTION_POLICIES="Improdutivo:30").run_once()
+
+    assert stats["freed_pages"] > 0
+    assert db.freelist_count() == 0
@@ -0,0 +1,109 @@
+"""
+Tests for adaptive model routing (cheap vs strong model)
+"""
+from types import SimpleNamespace
+from app.services.ai_client import AIClient, routing_decisions
+from app.services.router import CHEAP, STRONG, ModelRouter
+
+
+def make_client(strong_model="gpt-4o", confidences=None, fail_strong=False):
+    """AIClient sem rede: _classify_with_model devolve a confiança configurada por modelo"""
+    client = AIClient.__new__(AIClient)
+    client.settings = SimpleNamespace(LLM_MODEL="gpt-4o-mini", LLM_STRONG_MODEL=strong_model)
+    client.router = ModelRouter(long_text_chars=200, escalation_confidence=0.75)
+    client.calls = []
+
+    async def classify_with_model(text, model):
+        client.calls.append(model)
+        if fail_strong and model == strong_model:
+            raise RuntimeError("timeout")
+        return {
+            "category": "Produtivo", "confidence": confidences[model], "reason": "Solicitação",
+            "model": model, "llm_call": {"model": model, "prompt_tokens": 100, "completion_tokens": 10,
+                                         "cached_tokens": 0, "latency_ms": 5},
+        }
+
+    client._classify_with_model = classify_with_model
+    return client
+
+
+def test_short_and_spam_emails_go_cheap():
+    """Test that simple emails start on the cheap model"""
+    router = ModelRouter(long_text_chars=200)
+
+    assert router.route("Qual o status do protocolo 123456?").tier == CHEAP
+    spam = router.route("PROMOÇÃO imperdível! Clique aqui e ganhe desconto " * 10)
+    assert spam.tier == CHEAP
+    assert spam.reasons == ["spam"]
+
+
+def test_long_multi_request_email_goes_strong():
+    """Test that long emails with several asks skip the cheap model"""
+    router = ModelRouter(long_text_chars=200)
+    text = ("Obrigado pelo retorno de ontem. Preciso do status do chamado? "
+            "Também preciso de ajuda com a fatura? E podem verificar o acesso? ") * 3
+
+    decision = router.route(text)
+
+    assert decision.tier == STRONG
+    assert "long" in decision.reasons
+    assert "multiple_questions" in decision.reasons
+    assert decision.features["length"] == len(text)
+
+
+def test_long_text_alone_stays_cheap():
+    """Test that length without other signals does not escalate up front"""
+    router = ModelRouter(long_text_chars=50)
+    decision = router.route("Segue em anexo o relatório mensal conforme combinado na reunião. " * 3)
+
+    assert decision.tier == CHEAP
+    assert decision.reasons == ["long"]
+
+
+async def test_confident_cheap_result_is_kept():
+    """Test that a confident cheap answer makes a single call"""
+    client = make_client(confidences={"gpt-4o-mini": 0.92, "gpt-4o": 0.97})
+
+    result = await client.classify_email("Qual o status do protocolo 123456?")
+
+    assert client.calls == ["gpt-4o-mini"]
+    assert result.model == "gpt-4o-mini"
+    assert result.routing == {"tier": CHEAP, "reasons": [], "escalated": False}
+    assert len(result.llm_calls) == 1
+
+
+async def test_low_confidence_escalates_to_strong_model():
+    """Test that the strong model re-classifies when the cheap one is unsure"""
+    before = routing_decisions.value(tier=CHEAP, escalated="true")
+    client = make_client(confidences={"gpt-4o-mini": 0.6, "gpt-4o": 0.93})
+
+    result = await client.classify_email("Qual o status do protocolo 123456?")
+
+    assert client.calls == ["gpt-4o-mini", "gpt-4o"]
+    assert result.model == "gpt-4o"
+    assert result.confidence == 0.93
+    assert result.routing["escalated"] is True
+    assert [call["model"] for call in result.llm_calls] == ["gpt-4o-mini", "gpt-4o"]
+    assert routing_decisions.value(tier=CHEAP, escalated="true") == before + 1
+
+
+async def test_failed_escalation_keeps_cheap_result():
+    """Test that an error on the strong model falls back to the cheap answer"""
+    client = make_client(confidences={"gpt-4o-mini": 0.6}, fail_strong=True)
+
+    result = await client.classify_email("Qual o status do protocolo 123456?")
+
+    assert result.model == "gpt-4o-mini"
+    assert result.routing["escalated"] is False
+    assert len(result.llm_calls) == 1
+
+
+async def test_routing_disabled_without_strong_model():
+    """Test that without LLM_STRONG_MODEL every email uses LLM_MODEL once"""
+    client = make_client(strong_model=None, confidences={"gpt-4o-mini": 0.5})
+
+    result = await client.classify_email("Qual o status do protocolo 123456?")
+
+    assert client.calls == ["gpt-4o-mini"]
+    assert result.routing is None
+    assert len(result.llm_calls) == 1
@@ -0,0 +1,75 @@
+"""
+Tests for the /api/search endpoint
+"""
+import uuid
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_search_endpoint_paginates(tmp_database):
+    """Test ranked results with has_more and snippets"""
+    for index in range(3):
+        tmp_database.save_analysis({
+            "id": str(uuid.uuid4()), "category": "Produtivo", "confidence": 0.9,
+            "suggested_reply": "Segue o boleto.", "summary": f"Boleto do pedido {index}",
+            "model_used": "gpt-4o-mini", "reason": "Pedido", "full_text": f"boleto {index}"
+        })
+
+    response = client.get("/api/search", params={"q": "boleto", "limit": 2})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["results"]) == 2
+    assert data["has_more"] is True
+    assert "<mark>" in data["results"][0]["snippet"]
+
+    last_page = client.get("/api/search", params={"q": "boleto", "limit": 2, "offset": 2}).json()
+    assert len(last_page["results"]) == 1
+    assert last_page["has_more"] is False
+
+
+def test_search_endpoint_rejects_queries_without_words(tmp_database):
+    """Test that punctuation-only queries are rejected"""
+    assert client.get("/api/search", params={"q": "()*"}).status_code == 400
+    assert client.get("/api/search").status_code == 422
+
+
+def test_search_endpoint_reports_database_errors(tmp_database, monkeypatch):
+    """Test that a failing database yields 500 instead of an empty result list"""
+    def broken(*args, **kwargs):
+        raise RuntimeError("database is locked")
+    monkeypatch.setattr(tmp_database, "search_analyses", broken)
+
+    response = client.get("/api/search", params={"q": "boleto"})
+
+    assert response.status_code == 500
+
+
+def test_search_does_not_block_the_event_loop(tmp_database, monkeypatch):
+    """Test that a slow database query runs off the event loop"""
+    import asyncio
+    import time
+    from app.api.search import search_analyses
+
+    def slow(*args, **kwargs):
+        time.sleep(0.2)
+        return []
+    monkeypatch.setattr(tmp_database, "search_analyses", slow)
+
+    async def run():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        await search_analyses(q="boleto", limit=20, offset=0)
+        beat.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 5
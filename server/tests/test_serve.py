@@ -0,0 +1,47 @@
+"""
+Tests for the pre-fork launcher and warm-up
+"""
+import argparse
+import gc
+from app.cli.serve import WORKER_CLASS, build_options
+from app.core import warmup
+from app.services import reply_pool
+from app.utils import database
+
+
+def test_build_options_preloads_app():
+    """Test that the gunicorn config preloads the app and jitters recycling"""
+    args = argparse.Namespace(host="0.0.0.0", port=8000, workers=3, graceful_timeout=30,
+                              timeout=120, max_requests=1000)
+    options = build_options(args)
+
+    assert options["preload_app"] is True
+    assert options["workers"] == 3
+    assert options["worker_class"] == WORKER_CLASS
+    assert options["max_requests_jitter"] == 100
+
+
+def test_warm_up_closes_pooled_backends(monkeypatch):
+    """Test that backends with connection pools are closed before forking"""
+    class PooledDatabase:
+        closed = False
+
+        def fetch_edited_replies(self):
+            return []
+
+        def close(self):
+            self.closed = True
+
+    pooled = PooledDatabase()
+    monkeypatch.setattr(database, "_database", pooled)
+    monkeypatch.setattr(reply_pool, "_reply_pool", None)
+    monkeypatch.setattr(warmup.get_settings(), "OPENAI_API_KEY", None)
+
+    try:
+        warmup.warm_up()
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+    assert pooled.closed is True
+    assert database._database is None
@@ -0,0 +1,118 @@
+"""
+Tests for single-flight coalescing and idempotency keys
+"""
+import asyncio
+from fastapi.testclient import TestClient
+from app.core.metrics import render_metrics
+from app.main import app
+from app.services.pipeline import analyze_email
+from app.services.singleflight import SingleFlight, singleflight_calls
+
+
+async def test_concurrent_calls_share_one_execution():
+    """Test that only the first call runs the work"""
+    group = SingleFlight("test")
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "resultado"
+
+    results = await asyncio.gather(*(group.do("k", work) for _ in range(5)))
+
+    assert runs == [1]
+    assert [shared for _, shared in results] == [False, True, True, True, True]
+    assert {value for value, _ in results} == {"resultado"}
+    assert len(group) == 0
+
+
+async def test_errors_reach_every_waiter():
+    """Test that a failure is shared and the key is released"""
+    group = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("falhou")
+
+    results = await asyncio.gather(*(group.do("k", work) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(group) == 0
+
+
+async def test_leader_cancellation_does_not_cancel_followers():
+    """Test that a disconnected first caller does not fail the others"""
+    group = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return 42
+
+    leader = asyncio.create_task(group.do("k", work))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(group.do("k", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == (42, True)
+
+
+async def test_identical_emails_are_classified_once(fake_ai_client, tmp_database):
+    """Test mass-mailing coalescing: one LLM call, one saved analysis per request"""
+    text = "Prezados, solicito o boleto atualizado do contrato"
+    before = singleflight_calls.value(group="analyze_email", result="coalesced")
+
+    results = await asyncio.gather(*(analyze_email(text) for _ in range(4)))
+
+    assert fake_ai_client.classify_calls == 1
+    assert len({r.id for r in results}) == 4
+    coalesced = [tmp_database.get_analysis(r.id).metadata for r in results[1:]]
+    assert all(m["coalesced_from"] == results[0].id for m in coalesced)
+    assert singleflight_calls.value(group="analyze_email", result="coalesced") - before == 3
+    assert 'singleflight_calls_total{group="analyze_email",result="coalesced"}' in render_metrics()
+
+
+def test_idempotency_key_replays_stored_analysis(fake_ai_client, tmp_database):
+    """Test that a retried request returns the same analysis without reprocessing"""
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "pedido-123"}
+    data = {"text": "Preciso da segunda via da fatura"}
+
+    first = client.post("/api/process", data=data, headers=headers)
+    retry = client.post("/api/process", data=data, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json()["id"] == first.json()["id"]
+    assert fake_ai_client.classify_calls == 1
+
+    other = client.post("/api/process", data=data, headers={"Idempotency-Key": "pedido-456"})
+    assert other.json()["id"] != first.json()["id"]
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert 'idempotent_replays_total{source="stored"}' in metrics.text
+
+
+def test_idempotency_key_reused_with_another_body_is_rejected(fake_ai_client, tmp_database):
+    """Test that a key is bound to the request it was first used with (text or file)"""
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "pedido-789"}
+
+    first = client.post("/api/process", data={"text": "Preciso da segunda via da fatura"}, headers=headers)
+    other = client.post("/api/process", data={"text": "Solicito o cancelamento do contrato"}, headers=headers)
+
+    assert first.status_code == 200
+    assert other.status_code == 422
+    assert fake_ai_client.classify_calls == 1
+
+    upload = {"file": ("email.txt", "Solicito acesso ao sistema financeiro.".encode(), "text/plain")}
+    file_headers = {"Idempotency-Key": "upload-1"}
+    uploaded = client.post("/api/process", files=upload, headers=file_headers)
+    retry = client.post("/api/process", files=upload, headers=file_headers)
+    changed = client.post("/api/process", headers=file_headers,
+                          files={"file": ("email.txt", b"Outro arquivo, outro pedido de acesso.", "text/plain")})
+
+    assert retry.json()["id"] == uploaded.json()["id"]
+    assert changed.status_code == 422
+    assert fake_ai_client.classify_calls == 2
@@ -0,0 +1,146 @@
+"""
+Tests for speculative reply generation
+"""
+import asyncio
+import time
+import pytest
+from app.core.settings import get_settings
+from app.services.pipeline import classify_prepared, prepare_text
+from app.services.speculation import speculative_replies
+
+
+class SlowAIClient:
+    """Classificação e resposta com latência; registra as respostas pedidas e canceladas"""
+
+    def __init__(self, category="Produtivo", confidence=0.9, latency=0.1, fail=False, reply_failures=0):
+        self.category = category
+        self.confidence = confidence
+        self.latency = latency
+        self.fail = fail
+        self.reply_failures = reply_failures
+        self.replies = []
+        self.cancelled = []
+
+    async def classify_email(self, text):
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError("timeout")
+        return {"category": self.category, "confidence": self.confidence, "reason": "Teste"}
+
+    async def generate_reply(self, category, summary, original_text):
+        self.replies.append(category)
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled.append(category)
+            raise
+        if self.reply_failures:
+            self.reply_failures -= 1
+            raise RuntimeError("timeout")
+        return {"reply": f"Resposta para {category}", "tone": "cordial",
+                "llm_call": {"model": "gpt-4o-mini", "prompt_tokens": 300, "completion_tokens": 40}}
+
+
+@pytest.fixture
+def speculative(monkeypatch):
+    monkeypatch.setattr(get_settings(), "SPECULATIVE_REPLY_ENABLED", True)
+
+
+async def test_speculative_hit_overlaps_both_calls(speculative):
+    """Test that a confirmed guess reuses the reply started with classification"""
+    client = SlowAIClient()
+    started = time.perf_counter()
+
+    analysis = await classify_prepared(prepare_text("Preciso da segunda via do boleto"), ai_client=client)
+
+    assert time.perf_counter() - started < 0.18
+    assert client.replies == ["Produtivo"]
+    assert analysis.suggested_reply == "Resposta para Produtivo"
+    assert analysis.metadata["speculation"]["hit"] is True
+    assert analysis.metadata["speculation"]["saved_ms"] > 50
+
+
+async def test_speculative_miss_regenerates_for_real_category(speculative):
+    """Test that a wrong guess is cancelled and the reply is regenerated"""
+    client = SlowAIClient(category="Improdutivo", confidence=0.7)
+
+    analysis = await classify_prepared(prepare_text("Preciso da segunda via do boleto"), ai_client=client)
+
+    assert client.replies == ["Produtivo", "Improdutivo"]
+    assert client.cancelled == ["Produtivo"]
+    assert analysis.suggested_reply == "Resposta para Improdutivo"
+    assert analysis.metadata["speculation"] == {"guess": "Produtivo", "hit": False}
+
+
+async def test_speculation_is_cancelled_when_classification_fails(speculative):
+    """Test that no speculative call outlives a failed classification"""
+    client = SlowAIClient(latency=0.05, fail=True)
+
+    with pytest.raises(RuntimeError):
+        await classify_prepared(prepare_text("Preciso da segunda via do boleto"), ai_client=client)
+    await asyncio.sleep(0)
+
+    assert client.cancelled == ["Produtivo"]
+
+
+async def test_failed_speculative_reply_is_regenerated(speculative):
+    """Test that an error in the speculative reply falls back to a fresh generate_reply"""
+    client = SlowAIClient(latency=0.01, reply_failures=1)
+    before = speculative_replies.value(outcome="failed")
+
+    analysis = await classify_prepared(prepare_text("Preciso da segunda via do boleto"), ai_client=client)
+
+    assert client.replies == ["Produtivo", "Produtivo"]
+    assert analysis.suggested_reply == "Resposta para Produtivo"
+    assert analysis.metadata["speculation"] == {"guess": "Produtivo", "hit": False}
+    assert speculative_replies.value(outcome="failed") == before + 1
+
+
+async def test_pool_reply_is_not_counted_as_miss(speculative, tmp_database):
+    """Test that a speculation discarded because the pool answered gets its own outcome"""
+    client = SlowAIClient(category="Improdutivo", confidence=0.95, latency=0.01)
+    before = {outcome: speculative_replies.value(outcome=outcome) for outcome in ("miss", "pooled")}
+
+    analysis = await classify_prepared(
+        prepare_text("Feliz natal! Aproveito para pedir o status do chamado"), ai_client=client
+    )
+
+    assert analysis.metadata["reply_source"].startswith("pool:")
+    assert speculative_replies.value(outcome="pooled") == before["pooled"] + 1
+    assert speculative_replies.value(outcome="miss") == before["miss"]
+
+
+async def test_finished_miss_is_recorded_in_llm_calls(speculative):
+    """Test that a speculative reply discarded after it finished still reports its tokens"""
+    client = SlowAIClient(category="Improdutivo", confidence=0.7, latency=0.01)
+    original = client.classify_email
+
+    async def slow_classify(text):
+        await asyncio.sleep(0.05)
+        return await original(text)
+    client.classify_email = slow_classify
+
+    analysis = await classify_prepared(prepare_text("Preciso da segunda via do boleto"), ai_client=client)
+
+    assert client.cancelled == []
+    stages = [call["stage"] for call in analysis.llm_calls]
+    assert stages == ["reply", "reply_speculative"]
+    assert analysis.llm_calls[1]["prompt_tokens"] == 300
+
+
+async def test_speculation_is_cancelled_when_pool_lookup_fails(speculative, monkeypatch):
+    """Test that an error after classification still cancels the speculative call"""
+    from app.services import pipeline
+
+    def broken_pool():
+        raise RuntimeError("pool indisponível")
+    monkeypatch.setattr(pipeline, "get_reply_pool", broken_pool)
+    client = SlowAIClient(category="Improdutivo", confidence=0.95, latency=0.05)
+    before = speculative_replies.value(outcome="aborted")
+
+    with pytest.raises(RuntimeError):
+        await classify_prepared(prepare_text("Preciso da segunda via do boleto"), ai_client=client)
+    await asyncio.sleep(0)
+
+    assert client.cancelled == ["Produtivo"]
+    assert speculative_replies.value(outcome="aborted") == before + 1
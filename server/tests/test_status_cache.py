@@ -0,0 +1,84 @@
+"""
+Tests for cached /api/status responses (ETag, 304, in-memory LRU)
+"""
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.records import Analysis
+from app.services.pipeline import analyze_email
+from app.services.status_cache import StatusCache, etag_matches, render_status
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def status_cache(monkeypatch):
+    """StatusCache novo por teste"""
+    import app.services.status_cache as status_cache_module
+    cache = StatusCache(max_entries=100)
+    monkeypatch.setattr(status_cache_module, "_status_cache", cache)
+    return cache
+
+
+def save(db, category="Produtivo"):
+    analysis_id = str(uuid.uuid4())
+    db.save_analysis({
+        "id": analysis_id, "category": category, "confidence": 0.9,
+        "suggested_reply": "Segue o boleto.", "summary": "Boleto",
+        "model_used": "gpt-4o-mini", "reason": "Pedido", "full_text": "boleto"
+    })
+    return analysis_id
+
+
+def test_status_is_immutable_with_etag_and_304(tmp_database, status_cache, monkeypatch):
+    """Test caching headers, revalidation and reads served without the database"""
+    analysis_id = save(tmp_database)
+
+    response = client.get(f"/api/status/{analysis_id}")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert "immutable" in response.headers["cache-control"]
+    etag = response.headers["etag"]
+
+    def fail(analysis_id):
+        raise AssertionError("status lido do banco")
+    monkeypatch.setattr(tmp_database, "get_analysis", fail)
+
+    assert client.get(f"/api/status/{analysis_id}").content == response.content
+    not_modified = client.get(f"/api/status/{analysis_id}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+
+async def test_created_analysis_is_cached_as_stored(fake_ai_client, tmp_database, status_cache):
+    """Test that the pipeline caches the same body a database read would produce"""
+    result = await analyze_email("Preciso da segunda via do boleto")
+
+    cached = status_cache.get(result.id)
+
+    assert cached == render_status(tmp_database.get_analysis(result.id))
+
+
+def test_status_cache_evicts_least_recently_used():
+    """Test the LRU bound and weak If-None-Match comparison"""
+    cache = StatusCache(max_entries=2)
+    analyses = [
+        Analysis(id=str(index), category="Produtivo", confidence=0.9, suggested_reply="Ok",
+                 summary="Resumo", model_used="gpt-4o-mini", created_at="2024-06-03 10:00:00")
+        for index in range(3)
+    ]
+    cache.put(analyses[0])
+    cache.put(analyses[1])
+    cache.get("0")
+    entry = cache.put(analyses[2])
+
+    assert cache.get("1") is None
+    assert cache.get("0") is not None
+    assert len(cache) == 2
+    assert etag_matches(f'"outro", W/{entry.etag}', entry.etag)
+    assert etag_matches("*", entry.etag)
+    assert not etag_matches('"outro"', entry.etag)
+    assert StatusCache(max_entries=0).put(analyses[0]) == render_status(analyses[0])
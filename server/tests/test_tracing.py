@@ -0,0 +1,203 @@
+"""
+Tests for request tracing (spans, W3C traceparent, exporters)
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from app.core import tracing
+from app.core.tracing import FileExporter, Span, otlp_payload, parse_traceparent, span, start_trace
+from app.main import app
+from app.services.ai_client import AIClient
+
+client = TestClient(app)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+class CollectingProcessor:
+    """SpanProcessor sem thread: guarda os spans terminados"""
+
+    def __init__(self, sample_rate=1.0):
+        self.sample_rate = sample_rate
+        self.spans = []
+
+    def on_end(self, finished):
+        self.spans.append(finished)
+
+    def by_name(self):
+        return {item.name: item for item in self.spans}
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    collected = CollectingProcessor()
+    monkeypatch.setattr(tracing, "_processor", collected)
+    return collected
+
+
+def test_parse_traceparent():
+    """Test W3C header parsing, including the invalid cases that start a new trace"""
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, True)
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00") == (TRACE_ID, PARENT_ID, False)
+    # Versões futuras podem acrescentar campos
+    assert parse_traceparent(f"01-{TRACE_ID}-{PARENT_ID}-01-extra") == (TRACE_ID, PARENT_ID, True)
+
+    assert parse_traceparent(None) is None
+    assert parse_traceparent("lixo") is None
+    assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+    assert parse_traceparent(f"00-{TRACE_ID}-{'0' * 16}-01") is None
+    assert parse_traceparent(f"ff-{TRACE_ID}-{PARENT_ID}-01") is None
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01-extra") is None
+
+
+def test_process_continues_incoming_trace(processor, fake_ai_client, tmp_database):
+    """Test pipeline stages become children of the caller's trace"""
+    response = client.post(
+        "/api/process",
+        data={"text": "Preciso da segunda via do boleto de junho, por favor."},
+        headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+    )
+
+    assert response.status_code == 200
+    spans = processor.by_name()
+    assert {"POST /api/process", "prepare", "classify", "reply", "save"} <= set(spans)
+    assert all(item.trace_id == TRACE_ID for item in processor.spans)
+
+    root = spans["POST /api/process"]
+    assert root.parent_id == PARENT_ID
+    assert root.kind == "server"
+    assert root.attributes["http.status_code"] == 200
+    for name in ("prepare", "classify", "reply", "save"):
+        assert spans[name].parent_id == root.span_id
+        assert root.start_ns <= spans[name].start_ns <= spans[name].end_ns <= root.end_ns
+
+
+def test_upload_spans(processor, fake_ai_client, tmp_database):
+    """Test file uploads trace the read and parse steps"""
+    content = "Solicito acesso ao sistema financeiro para o novo analista.".encode()
+
+    response = client.post(
+        "/api/process",
+        files={"file": ("email.txt", content, "text/plain")},
+        headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+    )
+
+    assert response.status_code == 200
+    spans = processor.by_name()
+    assert spans["upload.read"].attributes == {"filename": "email.txt", "size_bytes": len(content)}
+    assert "parse" in spans
+
+
+def test_head_sampling(processor, fake_ai_client, tmp_database):
+    """Test the caller's unsampled flag and the sample rate are both honoured"""
+    client.post("/api/process", data={"text": "Preciso da segunda via do boleto."},
+                headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00"})
+    assert processor.spans == []
+
+    processor.sample_rate = 0.0
+    client.post("/api/process", data={"text": "Preciso da segunda via do boleto."})
+    assert processor.spans == []
+
+    processor.sample_rate = 1.0
+    client.get("/health/live")
+    assert processor.spans == []
+
+
+def test_span_records_errors_and_is_noop_outside_trace(processor):
+    """Test failing steps are marked as errors and untraced code pays nothing"""
+    with span("fora") as outside:
+        assert outside is None
+
+    with pytest.raises(ValueError):
+        with start_trace("raiz") as root:
+            with span("etapa"):
+                raise ValueError("quebrou")
+
+    spans = processor.by_name()
+    assert spans["etapa"].error == "ValueError: quebrou"
+    assert spans["etapa"].parent_id == root.span_id
+    assert spans["raiz"].parent_id is None
+    assert len(spans["raiz"].trace_id) == 32
+
+
+def test_ai_client_spans(processor):
+    """Test the LLM call is split into HTTP time (with tokens) and JSON parsing"""
+    usage = SimpleNamespace(prompt_tokens=900, completion_tokens=35, prompt_tokens_details=None)
+    response = SimpleNamespace(
+        model="gpt-4o-mini",
+        usage=usage,
+        choices=[SimpleNamespace(message=SimpleNamespace(
+            content='{"category": "Produtivo", "confidence": 0.9, "reason": "Pedido"}'
+        ))]
+    )
+
+    async def call(func, **kwargs):
+        return response
+
+    ai_client = AIClient.__new__(AIClient)
+    ai_client.settings = SimpleNamespace(LLM_MODEL="gpt-4o-mini", LLM_TEMPERATURE=0.3,
+                                         LLM_MAX_TOKENS=500, LONG_DOC_MAX_CONCURRENCY=2)
+    ai_client.breaker = SimpleNamespace(call=call)
+    ai_client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=None)))
+    ai_client.chunk_slots = asyncio.Semaphore(2)
+
+    async def scenario():
+        with start_trace("raiz"):
+            await ai_client.classify_document(["Preciso do boleto de junho."] * 3)
+
+    asyncio.run(scenario())
+
+    names = [item.name for item in processor.spans]
+    assert names.count("llm.queue_wait") == 3
+    assert names.count("llm.http") == 3
+    assert names.count("llm.parse") == 3
+    http = processor.by_name()["llm.http"]
+    assert http.attributes["operation"] == "classify"
+    assert http.attributes["prompt_tokens"] == 900
+
+
+def test_file_exporter_rotates(tmp_path):
+    """Test spans are written as JSON lines and the file rotates by size"""
+    path = tmp_path / "spans.jsonl"
+    exporter = FileExporter(str(path), max_bytes=1500, backups=2)
+    finished = []
+    for index in range(12):
+        item = Span(f"etapa-{index}", TRACE_ID, attributes={"index": index})
+        item.end_ns = item.start_ns + 1_000_000
+        finished.append(item)
+
+    for item in finished:
+        exporter.export([item])
+    exporter.close()
+
+    assert (tmp_path / "spans.jsonl.1").exists()
+    assert (tmp_path / "spans.jsonl.2").exists()
+    assert not (tmp_path / "spans.jsonl.3").exists()
+    assert path.stat().st_size <= 1500
+    last = json.loads(path.read_text().splitlines()[-1])
+    assert last["name"] == "etapa-11"
+    assert last["duration_ms"] == 1.0
+    assert last["trace_id"] == TRACE_ID
+
+
+def test_otlp_payload():
+    """Test the OTLP/HTTP JSON encoding of a span"""
+    item = Span("classify", TRACE_ID, PARENT_ID, attributes={"model": "gpt-4o-mini", "tokens": 10})
+    item.end_ns = item.start_ns + 5
+    item.error = "TimeoutError: "
+
+    payload = otlp_payload([item], "email-classifier")
+
+    resource = payload["resourceSpans"][0]
+    assert resource["resource"]["attributes"] == [
+        {"key": "service.name", "value": {"stringValue": "email-classifier"}}
+    ]
+    encoded = resource["scopeSpans"][0]["spans"][0]
+    assert encoded["traceId"] == TRACE_ID
+    assert encoded["parentSpanId"] == PARENT_ID
+    assert encoded["endTimeUnixNano"] == str(item.start_ns + 5)
+    assert {"key": "tokens", "value": {"intValue": "10"}} in encoded["attributes"]
+    assert encoded["status"]["code"] == 2
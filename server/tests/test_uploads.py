@@ -0,0 +1,39 @@
+"""
+Tests for the streaming upload reader
+"""
+import hashlib
+import io
+import pytest
+from fastapi import HTTPException, UploadFile
+from app.utils.uploads import read_upload
+
+
+async def test_read_upload_returns_buffer_and_hash():
+    """Test chunked read with incremental hash"""
+    data = b"0123456789" * 20000
+    upload = UploadFile(io.BytesIO(data), filename="a.txt", size=len(data))
+
+    view, digest = await read_upload(upload, max_size=1_048_576)
+
+    assert bytes(view) == data
+    assert digest == hashlib.sha256(data).hexdigest()
+
+
+async def test_read_upload_without_known_size():
+    """Test read when the client did not declare a size"""
+    data = b"abc" * 50000
+    upload = UploadFile(io.BytesIO(data), filename="a.txt")
+
+    view, digest = await read_upload(upload, max_size=1_048_576)
+
+    assert bytes(view) == data
+
+
+async def test_read_upload_aborts_past_limit():
+    """Test early abort once the limit is crossed"""
+    upload = UploadFile(io.BytesIO(b"a" * 300000), filename="a.txt")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await read_upload(upload, max_size=100000)
+
+    assert exc_info.value.status_code == 413
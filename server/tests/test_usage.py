@@ -0,0 +1,84 @@
+"""
+Tests for per-call token and latency accounting
+"""
+import sqlite3
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.ai_client import AIClient
+from app.services.pipeline import analyze_email
+
+
+class MeteredAIClient:
+    """Cliente fake que reporta uso como o AIClient real"""
+
+    async def classify_email(self, text):
+        return {
+            "category": "Produtivo", "confidence": 0.9, "reason": "Solicitação",
+            "llm_calls": [{"model": "gpt-4o-mini", "prompt_tokens": 1200, "completion_tokens": 40,
+                           "cached_tokens": 1024, "latency_ms": 850}]
+        }
+
+    async def generate_reply(self, category, summary, original_text):
+        return {
+            "reply": "Vamos verificar.",
+            "llm_call": {"model": "gpt-4o-mini", "prompt_tokens": 300, "completion_tokens": 60,
+                         "cached_tokens": 0, "latency_ms": 1400}
+        }
+
+
+def test_llm_call_stats_reads_usage():
+    """Test extraction of tokens (including cached) from the SDK response"""
+    client = AIClient.__new__(AIClient)
+    client.settings = SimpleNamespace(LLM_MODEL="gpt-4o-mini")
+    response = SimpleNamespace(
+        model="gpt-4o-mini-2024-07-18",
+        usage=SimpleNamespace(prompt_tokens=900, completion_tokens=35,
+                              prompt_tokens_details=SimpleNamespace(cached_tokens=768))
+    )
+
+    stats = client._llm_call_stats(response, started=0.0)
+
+    assert stats["model"] == "gpt-4o-mini-2024-07-18"
+    assert (stats["prompt_tokens"], stats["completion_tokens"], stats["cached_tokens"]) == (900, 35, 768)
+
+    no_usage = client._llm_call_stats(SimpleNamespace(model=None, usage=None), started=0.0)
+    assert no_usage["prompt_tokens"] == 0 and no_usage["model"] == "gpt-4o-mini"
+
+
+async def test_analysis_records_llm_calls_and_timings(monkeypatch, tmp_database):
+    """Test that each LLM call is stored and stage durations go to metadata"""
+    import app.services.ai_client as ai_client_module
+    monkeypatch.setattr(ai_client_module, "_ai_client", MeteredAIClient())
+
+    result = await analyze_email("Preciso da segunda via do boleto", {"timings": {"extract_ms": 3.5}})
+
+    conn = sqlite3.connect(tmp_database.db_path)
+    rows = conn.execute(
+        "SELECT prompt_tokens, completion_tokens, cached_tokens, latency_ms FROM llm_calls WHERE analysis_id = ?",
+        (result.id,)
+    ).fetchall()
+    conn.close()
+    assert sorted(rows) == [(300, 60, 0, 1400), (1200, 40, 1024, 850)]
+
+    timings = tmp_database.get_analysis(result.id).metadata["timings"]
+    assert timings["extract_ms"] == 3.5
+    assert "clean_ms" in timings
+
+
+def test_usage_endpoint_aggregates_by_model_and_stage(monkeypatch, tmp_database):
+    """Test /api/usage totals, per-stage rows and most expensive analyses"""
+    import app.services.ai_client as ai_client_module
+    monkeypatch.setattr(ai_client_module, "_ai_client", MeteredAIClient())
+    client = TestClient(app)
+    for i in range(3):
+        client.post("/api/process", data={"text": f"Solicito revisão do contrato {i}"})
+
+    data = client.get("/api/usage", params={"days": 7, "top": 2}).json()
+
+    assert data["totals"] == {"calls": 6, "prompt_tokens": 4500, "completion_tokens": 300, "cached_tokens": 3072}
+    by_stage = {row["stage"]: row for row in data["by_day"]}
+    assert by_stage["classify"]["analyses"] == 3
+    assert by_stage["reply"]["avg_latency_ms"] == 1400
+    assert len(data["top_analyses"]) == 2
+    assert data["top_analyses"][0]["total_tokens"] == 1600
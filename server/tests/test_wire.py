@@ -0,0 +1,119 @@
+"""
+Tests for content negotiation and the msgpack/NDJSON wire formats
+"""
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.wire import JSON, MSGPACK, NDJSON, negotiate
+
+client = TestClient(app)
+
+
+def test_negotiate_prefers_quality_then_server_order():
+    """Test Accept parsing with q-values, wildcards and aliases"""
+    offered = (JSON, NDJSON)
+    assert negotiate(None, offered) == JSON
+    assert negotiate("*/*", offered) == JSON
+    assert negotiate("application/json;q=0.5, application/x-ndjson", offered) == NDJSON
+    assert negotiate("application/ndjson", offered) == NDJSON
+    assert negotiate("application/*;q=0.2, application/json;q=0", offered) == NDJSON
+    assert negotiate("text/html", offered) is None
+
+
+def test_process_accepts_json_body(fake_ai_client, tmp_database):
+    """Test a JSON request body on /api/process and the 406/415/422 errors"""
+    response = client.post("/api/process", json={"text": "Preciso da segunda via do boleto"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == JSON
+    assert response.json()["category"] == "Produtivo"
+
+    assert client.post("/api/process", json={"text": "curto"}).status_code == 422
+    assert client.post("/api/process", content=b"texto", headers={"Content-Type": "text/csv"}).status_code == 400
+    not_acceptable = client.post("/api/process", json={"text": "Preciso do boleto"}, headers={"Accept": "text/html"})
+    assert not_acceptable.status_code == 406
+
+
+def test_process_speaks_msgpack(fake_ai_client, tmp_database):
+    """Test a msgpack request answered in msgpack"""
+    msgpack = pytest.importorskip("msgpack")
+
+    response = client.post(
+        "/api/process",
+        content=msgpack.packb({"text": "Muito obrigado pelo atendimento"}),
+        headers={"Content-Type": "application/x-msgpack", "Accept": MSGPACK}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == MSGPACK
+    assert msgpack.unpackb(response.content)["category"] == "Improdutivo"
+
+
+def test_batch_streams_ndjson_in_input_order(fake_ai_client, tmp_database):
+    """Test NDJSON in, NDJSON out, one line per text in input order"""
+    texts = ["Preciso do boleto de junho", "Feliz Natal a todos da equipe", "Qual o status do pedido 123?"]
+    body = "".join(json.dumps({"text": text}) + "\n" for text in texts)
+
+    response = client.post("/api/process/batch", content=body, headers={"Content-Type": NDJSON})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == NDJSON
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert [line["category"] for line in lines] == ["Produtivo", "Improdutivo", "Produtivo"]
+
+    as_json = client.post("/api/process/batch", json=[{"text": texts[0]}], headers={"Accept": JSON})
+    assert as_json.json()[0]["category"] == "Produtivo"
+
+
+def test_batch_body_is_not_capped_by_the_upload_limit(fake_ai_client, tmp_database):
+    """Test a full batch larger than MAX_UPLOAD_SIZE is accepted"""
+    from app.core.settings import get_settings
+    settings = get_settings()
+    text = "Preciso da segunda via do boleto de junho. " * 300
+    items = [{"text": text}] * settings.BATCH_API_MAX_ITEMS
+    body = json.dumps(items).encode()
+    assert len(body) > settings.MAX_UPLOAD_SIZE
+
+    response = client.post("/api/process/batch", content=body, headers={"content-type": JSON})
+
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == settings.BATCH_API_MAX_ITEMS
+
+
+def test_process_json_body_is_capped(fake_ai_client, tmp_database):
+    """Test JSON bodies on /api/process still respect MAX_UPLOAD_SIZE"""
+    from app.core.settings import get_settings
+    body = json.dumps({"text": "a" * (get_settings().MAX_UPLOAD_SIZE + 1)}).encode()
+
+    response = client.post("/api/process", content=body, headers={"content-type": JSON})
+
+    assert response.status_code == 413
+
+
+def test_batch_rejects_oversized_and_reports_item_errors(fake_ai_client, tmp_database, monkeypatch):
+    """Test the item limit and per-item errors that do not fail the batch"""
+    from app.core.settings import get_settings
+    monkeypatch.setattr(get_settings(), "BATCH_API_MAX_ITEMS", 2)
+    texts = [{"text": "Preciso do boleto de junho"}] * 3
+    assert client.post("/api/process/batch", json=texts).status_code == 413
+    monkeypatch.setattr(get_settings(), "BATCH_API_MAX_ITEM_BYTES", 10)
+    response = client.post("/api/process/batch", json=texts[:2])
+    assert response.status_code == 413
+    assert "Corpo" in response.json()["detail"]
+    monkeypatch.setattr(get_settings(), "BATCH_API_MAX_ITEM_BYTES", 131_072)
+
+    original = fake_ai_client.classify_email
+
+    async def flaky(text):
+        if "falha" in text:
+            raise RuntimeError("timeout")
+        return await original(text)
+    monkeypatch.setattr(fake_ai_client, "classify_email", flaky)
+
+    response = client.post("/api/process/batch", json=[{"text": "Preciso do boleto"}, {"text": "Este texto falha"}])
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["category"] == "Produtivo"
+    assert lines[1]["index"] == 1 and "timeout" in lines[1]["error"]